@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: CompressionBenchmark
+    :synopsis: Size and speed of the compression codecs of FileUtil.FilePicking on review snapshots
+
+.. moduleauthor:: DivyenduDutta
+
+Builds the review details of books of 1000 and 5000 reviews by scraping the pages of
+:mod:`Benchmarks.SyntheticCorpus`, the same dict :func:`BookReviews.retrieve_book_review_details`
+builds, and serializes each one the way :func:`FileUtil.FilePicking.save_obj` does, as
+a pickle and as json. Every codec whose package is installed then compresses both and
+the compressed size, ratio and encode/decode throughput (MB/s of uncompressed data) are
+printed, so a codec can be picked for `PICKLE_CODEC` in `CommonConstants.Constants`.
+The pipeline saves reviews as rows of :mod:`FileUtil.Catalog`, so there the codec only
+compresses the other pickled snapshots eg, book lists and processed ratings.
+
+Run from `web_scraper_goodreads_root` with ``python -m Benchmarks.CompressionBenchmark``.
+
+- `_build_snapshots()`
+- `_available_codecs()`
+- `run_benchmark(runs)`
+"""
+from __future__ import print_function
+import json
+import pickle
+import timeit
+import argparse
+from BookReviews import (
+    _create_book_review_scraper_from_source,
+    _retrieve_book_review_details_per_page,
+)
+from Benchmarks.SyntheticCorpus import build_review_pages
+from FileUtil.FilePicking import (
+    CODEC_EXTENSIONS,
+    _compress,
+    _decompress,
+    zstandard,
+    lz4_frame,
+)
+from Records import record_to_dict
+from CommonConstants.Constants import REVIEW_PARSE_SUBTREE_ONLY
+from YALogger.custom_logger import Logger
+
+# name and reviews of the synthetic books
+SNAPSHOT_BOOKS = [("reviews-1k", 1000), ("reviews-5k", 5000)]
+CODEC_ORDER = ["none", "gzip", "zstd", "lz4"]
+
+
+def _build_snapshots():
+    """
+    Scrapes the review pages of every synthetic book and serializes its review details
+
+    Returns:
+        list : name and serialized data of each snapshot
+    """
+    snapshots = []
+    for book_name, review_count in SNAPSHOT_BOOKS:
+        book_review_details = {}
+        book_review_index = 0
+        for review_page in build_review_pages(review_count):
+            root_book_review_tags = _create_book_review_scraper_from_source(
+                '<div id="bookReviews">' + review_page + "</div>",
+                REVIEW_PARSE_SUBTREE_ONLY,
+            ).find("div", attrs={"id": "bookReviews"})
+            book_review_details, book_review_index = _retrieve_book_review_details_per_page(
+                book_review_details, root_book_review_tags, book_review_index
+            )
+        snapshots.append(
+            (
+                book_name + "/pkl",
+                pickle.dumps(book_review_details, pickle.HIGHEST_PROTOCOL),
+            )
+        )
+        snapshots.append(
+            (
+                book_name + "/json",
+                json.dumps(book_review_details, default=record_to_dict).encode(
+                    "utf-8"
+                ),
+            )
+        )
+    return snapshots
+
+
+def _available_codecs():
+    """
+    Returns:
+        list : codecs whose package is installed
+    """
+    codecs = []
+    codec_modules = {"zstd": zstandard, "lz4": lz4_frame}
+    for codec in CODEC_ORDER:
+        if codec in codec_modules and codec_modules[codec] == None:
+            Logger.log(
+                "warning",
+                "CompressionBenchmark",
+                "_available_codecs",
+                "Skipping " + codec + ", its package is not installed",
+            )
+            continue
+        codecs.append(codec)
+    return codecs
+
+
+def run_benchmark(runs=5):
+    """
+    Compresses every snapshot with every available codec and prints
+    the size, ratio and throughput of each
+
+    Args:
+        runs (int) : times each snapshot is compressed and decompressed, the fastest one counts
+
+    Returns:
+        list : snapshot, codec, compressed bytes, ratio, encode MB/s and decode MB/s of each case
+    """
+    results = []
+    for snapshot_name, data in _build_snapshots():
+        megabytes = len(data) / (1024.0 * 1024.0)
+        for codec in _available_codecs():
+            compressed_data = _compress(data, codec)
+            if _decompress(compressed_data, codec) != data:
+                raise ValueError(codec + " did not round trip " + snapshot_name)
+            encode_seconds = min(
+                timeit.repeat(lambda: _compress(data, codec), number=1, repeat=runs)
+            )
+            decode_seconds = min(
+                timeit.repeat(
+                    lambda: _decompress(compressed_data, codec), number=1, repeat=runs
+                )
+            )
+            results.append(
+                (
+                    snapshot_name,
+                    codec,
+                    len(compressed_data),
+                    len(data) / float(len(compressed_data)),
+                    megabytes / max(encode_seconds, 1e-9),
+                    megabytes / max(decode_seconds, 1e-9),
+                )
+            )
+
+    print(
+        "%-18s %-6s %-5s %12s %7s %12s %12s"
+        % ("snapshot", "codec", "ext", "bytes", "ratio", "encode MB/s", "decode MB/s")
+    )
+    for snapshot_name, codec, size, ratio, encode_speed, decode_speed in results:
+        if codec == "none":
+            # nothing is done so the speeds mean nothing
+            speeds = "%12s %12s" % ("-", "-")
+        else:
+            speeds = "%12.1f %12.1f" % (encode_speed, decode_speed)
+        print(
+            "%-18s %-6s %-5s %12d %7.2f %s"
+            % (
+                snapshot_name,
+                codec,
+                CODEC_EXTENSIONS[codec] or "-",
+                size,
+                ratio,
+                speeds,
+            )
+        )
+    return results
+
+
+if __name__ == "__main__":
+    argument_parser = argparse.ArgumentParser(
+        description="Size and speed of the compression codecs on review snapshots"
+    )
+    argument_parser.add_argument(
+        "--runs",
+        type=int,
+        default=5,
+        help="times each snapshot is compressed and decompressed",
+    )
+    arguments = argument_parser.parse_args()
+    Logger.initialize_logger(
+        logger_prop_file_path="./logger.properties", log_file_path="./logs"
+    )
+    run_benchmark(arguments.runs)
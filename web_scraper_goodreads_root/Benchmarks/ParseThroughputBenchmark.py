@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: ParseThroughputBenchmark
+    :synopsis: Offline parse throughput of the shelf and review scrapers, compared against a baseline
+
+.. moduleauthor:: DivyenduDutta
+
+Times parsing plus extraction, the way the scrapers do it, over the corpora below,
+without going to goodreads.com:
+
+- `fixtures` : the shelf pages in `Fixtures/shelf` and the review pages of every book in `Fixtures`
+- `synthetic-1k` and `synthetic-5k` : pages built by :mod:`Benchmarks.SyntheticCorpus`
+  holding 1000 and 5000 reviews and a fifth as many books
+
+Shelf pages go through :func:`GenreScraper._retrieve_book_details` for every book block
+and review pages through :func:`BookReviews._retrieve_book_review_details_per_page`, with
+the parser backend and subtree setting in `CommonConstants.Constants`. Books/sec,
+reviews/sec (rated reviews kept) and peak memory are reported for each corpus, along with the
+speedup over the numbers saved in `parse_throughput_baseline.json`. Peak memory is the
+python heap traced by tracemalloc, so the memory lxml allocates in C is not counted. Without
+tracemalloc (python 2) it is the peak resident size of the whole process.
+
+Run from `web_scraper_goodreads_root` with ``python -m Benchmarks.ParseThroughputBenchmark``,
+add ``--save-baseline`` to save the numbers as the new baseline once a parser change is in.
+
+- `_load_fixture_corpus()`
+- `_build_corpora()`
+- `_scrape_shelf_pages(shelf_pages)`
+- `_scrape_review_pages(review_pages)`
+- `_peak_memory(scrape_function, pages)`
+- `_load_baseline()`
+- `_save_baseline(results)`
+- `run_benchmark(runs, save_baseline)`
+"""
+from __future__ import print_function
+import os
+import json
+import timeit
+import argparse
+from bs4 import BeautifulSoup
+from BookReviews import (
+    _create_book_review_scraper_from_source,
+    _retrieve_book_review_details_per_page,
+)
+from GenreScraper import _retrieve_book_details
+from FixtureServer import FIXTURE_DIRECTORY, _read_fixture
+from Benchmarks.SyntheticCorpus import build_review_pages, build_shelf_pages
+from CommonConstants.Constants import REVIEW_PARSE_SUBTREE_ONLY
+from YALogger.custom_logger import Logger
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+    import resource
+
+SHELF_FIXTURE_DIRECTORY = os.path.join(FIXTURE_DIRECTORY, "shelf")
+BASELINE_FILE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "parse_throughput_baseline.json"
+)
+# name, reviews and books of the synthetic corpora
+SYNTHETIC_CORPORA = [("synthetic-1k", 1000, 200), ("synthetic-5k", 5000, 1000)]
+
+
+def _load_fixture_corpus():
+    """
+    Reads the shelf pages and the review pages of every fixture book
+
+    Returns:
+        list : html code of each shelf page
+        list : html code of each review page
+    """
+    shelf_pages = []
+    for file_name in sorted(os.listdir(SHELF_FIXTURE_DIRECTORY)):
+        with open(os.path.join(SHELF_FIXTURE_DIRECTORY, file_name), "rb") as f:
+            shelf_pages.append(f.read().decode("utf-8"))
+    review_pages = []
+    for book_id in sorted(os.listdir(FIXTURE_DIRECTORY)):
+        page_number = 1
+        review_page = _read_fixture(book_id, page_number)
+        while review_page != None:
+            review_pages.append(review_page)
+            page_number += 1
+            review_page = _read_fixture(book_id, page_number)
+    return shelf_pages, review_pages
+
+
+def _build_corpora():
+    """
+    Returns:
+        list : name, shelf pages and review pages of each corpus
+    """
+    corpora = [("fixtures",) + _load_fixture_corpus()]
+    for corpus_name, review_count, book_count in SYNTHETIC_CORPORA:
+        corpora.append(
+            (
+                corpus_name,
+                build_shelf_pages(book_count),
+                build_review_pages(review_count),
+            )
+        )
+    return corpora
+
+
+def _scrape_shelf_pages(shelf_pages):
+    """
+    Parses shelf pages like :func:`GenreScraper._create_main_parser` and retrieves
+    the details of every book block like :func:`GenreScraper.retriveSciFiBookList`
+
+    Args:
+        shelf_pages (list) : html code of each shelf page
+
+    Returns:
+        int : number of books scraped
+    """
+    book_count = 0
+    for shelf_page in shelf_pages:
+        soup = BeautifulSoup(shelf_page, "html.parser")
+        for book_block in soup.findAll("div", class_="elementList"):
+            if _retrieve_book_details(book_block) != None:
+                book_count += 1
+    return book_count
+
+
+def _scrape_review_pages(review_pages):
+    """
+    Parses review pages and retrieves their review details like
+    :func:`BookReviews.retrieve_book_review_details` does for other pages
+
+    Args:
+        review_pages (list) : html code of each review page
+
+    Returns:
+        int : number of rated reviews scraped
+    """
+    review_count = 0
+    for review_page in review_pages:
+        root_book_review_tags = _create_book_review_scraper_from_source(
+            '<div id="bookReviews">' + review_page + "</div>",
+            REVIEW_PARSE_SUBTREE_ONLY,
+        ).find("div", attrs={"id": "bookReviews"})
+        _, book_review_index = _retrieve_book_review_details_per_page(
+            {}, root_book_review_tags, 0
+        )
+        review_count += book_review_index
+    return review_count
+
+
+def _peak_memory(scrape_function, pages):
+    """
+    Measures the peak memory of one scrape
+
+    Args:
+        scrape_function (function) : `_scrape_shelf_pages` or `_scrape_review_pages`
+        pages (list) : html code of each page
+
+    Returns:
+        float : peak memory in MB
+    """
+    if tracemalloc == None:
+        scrape_function(pages)
+        # kilobytes on linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+    tracemalloc.start()
+    try:
+        scrape_function(pages)
+        return tracemalloc.get_traced_memory()[1] / (1024.0 * 1024.0)
+    finally:
+        tracemalloc.stop()
+
+
+def _load_baseline():
+    """
+    Returns:
+        dict : baseline numbers of each case or an empty dict if none were saved
+    """
+    if not os.path.exists(BASELINE_FILE_PATH):
+        return {}
+    with open(BASELINE_FILE_PATH, "r") as f:
+        return json.load(f)
+
+
+def _save_baseline(results):
+    """
+    Saves the numbers of a run as the baseline later runs are compared against
+
+    Args:
+        results (list) : case name, items scraped, items per second and peak memory of each case
+    """
+    baseline = {}
+    for case_name, _, items_per_second, peak_memory in results:
+        baseline[case_name] = {
+            "items_per_second": round(items_per_second, 1),
+            "peak_memory_mb": round(peak_memory, 2),
+        }
+    with open(BASELINE_FILE_PATH, "w") as f:
+        json.dump(baseline, f, indent=4, separators=(",", ": "), sort_keys=True)
+        f.write("\n")
+
+
+def run_benchmark(runs=3, save_baseline=False):
+    """
+    Times scraping the shelf and review pages of every corpus and prints
+    the throughput, peak memory and speedup over the baseline
+
+    Args:
+        runs (int) : times each case is scraped, the fastest one counts
+        save_baseline (bool) : save the numbers as the new baseline
+
+    Returns:
+        list : case name, items scraped, items per second and peak memory of each case
+    """
+    baseline = _load_baseline()
+    results = []
+    for corpus_name, shelf_pages, review_pages in _build_corpora():
+        for unit, scrape_function, pages in [
+            ("books", _scrape_shelf_pages, shelf_pages),
+            ("reviews", _scrape_review_pages, review_pages),
+        ]:
+            item_count = scrape_function(pages)
+            seconds = min(
+                timeit.repeat(
+                    lambda: scrape_function(pages), number=1, repeat=runs
+                )
+            )
+            results.append(
+                (
+                    corpus_name + "/" + unit,
+                    item_count,
+                    item_count / seconds,
+                    _peak_memory(scrape_function, pages),
+                )
+            )
+
+    print(
+        "%-22s %8s %12s %14s %10s"
+        % ("case", "items", "items/s", "peak mem (MB)", "vs base")
+    )
+    for case_name, item_count, items_per_second, peak_memory in results:
+        if case_name in baseline:
+            speedup = "%9.2fx" % (
+                items_per_second / baseline[case_name]["items_per_second"]
+            )
+        else:
+            speedup = "%10s" % "-"
+        print(
+            "%-22s %8d %12.1f %14.2f %s"
+            % (case_name, item_count, items_per_second, peak_memory, speedup)
+        )
+    if save_baseline:
+        _save_baseline(results)
+        print("Saved baseline to " + BASELINE_FILE_PATH)
+    return results
+
+
+if __name__ == "__main__":
+    argument_parser = argparse.ArgumentParser(
+        description="Offline parse throughput of the shelf and review scrapers"
+    )
+    argument_parser.add_argument(
+        "--runs", type=int, default=3, help="times each case is scraped"
+    )
+    argument_parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="save the numbers as the new baseline",
+    )
+    arguments = argument_parser.parse_args()
+    Logger.initialize_logger(
+        logger_prop_file_path="./logger.properties", log_file_path="./logs"
+    )
+    run_benchmark(arguments.runs, arguments.save_baseline)
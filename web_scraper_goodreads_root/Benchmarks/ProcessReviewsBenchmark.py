@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: ProcessReviewsBenchmark
+    :synopsis: Scaling of the per book rating of review_rating_calculation with the number of workers
+
+.. moduleauthor:: DivyenduDutta
+
+Writes the review arrays of synthetic books, the likes and ratings of
+:func:`Benchmarks.RatingBenchmark._build_book`, to a temporary directory and rates all of
+them with :func:`review_rating_calculation._rate_books` for 1, 2, 4, ... workers up to the
+number of cores. The pickled ratings of every run are checked to be byte identical to the
+run with 1 worker and the fastest of `runs` timings of each is printed with its speedup.
+No review is kept open between runs and the rating memo is turned off, so every run reads
+the arrays and rates the books again.
+
+With ``--memo`` the books are rated by 1 worker with an empty rating memo -
+:mod:`FileUtil.RatingMemo`, as on the first run or after `RATING_MODEL_VERSION` is bumped,
+and with the memo holding the ratings of every book, as on a daily run where the reviews
+did not change. The memo file is written in both, the ratings are checked to be the same.
+
+Run from `web_scraper_goodreads_root` with ``python -m Benchmarks.ProcessReviewsBenchmark``
+or ``python -m Benchmarks.ProcessReviewsBenchmark --memo``.
+
+- `_build_book_entries(book_catalog, book_count, review_count)`
+- `_worker_counts(max_workers)`
+- `_use_rating_memo(enabled)`
+- `run_benchmark(book_count, review_count, max_workers, runs)`
+- `run_memo_benchmark(book_count, review_count, runs)`
+"""
+from __future__ import print_function, division
+import os
+import pickle
+import shutil
+import timeit
+import argparse
+import tempfile
+import multiprocessing
+import numpy as np
+import review_rating_calculation
+from review_rating_calculation import _rate_books, RATING_MODEL_VERSION
+from Benchmarks.RatingBenchmark import _build_book
+from FileUtil.BookCatalog import BookCatalog, BookEntry
+from FileUtil.Catalog import Catalog, _review_digest
+from FileUtil.RatingMemo import RatingMemo
+from FileUtil.ReviewArrays import save_review_array
+from FileUtil.ColumnarReviews import REVIEW_DTYPE
+from Records import Book
+from CommonConstants.Constants import RATING_CHUNK_SIZE, RATING_MEMO_PATH
+from YALogger.custom_logger import Logger
+
+
+def _build_book_entries(book_catalog, book_count, review_count):
+    """
+    Writes the review arrays of the synthetic books under the current directory
+
+    Args:
+        book_catalog (BookCatalog) : catalog the entries read their reviews through
+        book_count (int) : number of books
+        review_count (int) : reviews of each book
+
+    Returns:
+        list : `BookEntry` of each book
+    """
+    book_entries = []
+    for book_index in range(book_count):
+        book_name = "benchmark_book_" + str(book_index)
+        review_likes, review_ratings = _build_book(review_count, book_index)
+        reviews = np.zeros(review_count, dtype=REVIEW_DTYPE)
+        reviews["review_id"] = np.arange(1, review_count + 1)
+        reviews["review_likes"] = review_likes
+        reviews["review_rating"] = review_ratings
+        save_review_array(reviews, book_name)
+        book_entries.append(
+            BookEntry(
+                book_name,
+                Book(book_name=book_name, avg_rating="4.00"),
+                review_count,
+                None,
+                book_catalog,
+                review_digest=_review_digest(reviews),
+            )
+        )
+    return book_entries
+
+
+def _worker_counts(max_workers):
+    """
+    Args:
+        max_workers (int) : most workers to run with
+
+    Returns:
+        list : 1, 2, 4, ... up to `max_workers`, `max_workers` included
+    """
+    worker_counts = [1]
+    while worker_counts[-1] * 2 < max_workers:
+        worker_counts.append(worker_counts[-1] * 2)
+    if max_workers > 1:
+        worker_counts.append(max_workers)
+    return worker_counts
+
+
+def _use_rating_memo(enabled):
+    """
+    Replaces the rating memo of :mod:`review_rating_calculation` with an empty one
+    under the current directory, the caller puts the earlier one back once done
+
+    Args:
+        enabled (bool) : whether the new memo is used
+    """
+    if os.path.exists(RATING_MEMO_PATH):
+        os.remove(RATING_MEMO_PATH)
+    review_rating_calculation.rating_memo = RatingMemo(
+        RATING_MEMO_PATH, RATING_MODEL_VERSION, enabled=enabled
+    )
+
+
+def run_benchmark(book_count=64, review_count=100000, max_workers=None, runs=3):
+    """
+    Rates all the synthetic books with every worker count and prints the timings
+
+    Args:
+        book_count (int) : number of books
+        review_count (int) : reviews of each book
+        max_workers (int) : most workers to run with, the number of cores when None
+        runs (int) : times the books are rated with each worker count, the fastest one counts
+
+    Returns:
+        list : workers, seconds and speedup over 1 worker of each run
+    """
+    if max_workers == None:
+        max_workers = multiprocessing.cpu_count()
+    working_directory = os.getcwd()
+    benchmark_directory = tempfile.mkdtemp()
+    rating_memo = review_rating_calculation.rating_memo
+    try:
+        os.chdir(benchmark_directory)  # review arrays are read from Data/ under it
+        _use_rating_memo(False)
+        # nothing is kept open so every run reads the review arrays
+        book_catalog = BookCatalog(
+            Catalog(os.path.join("Data", "catalog.sqlite3")), cache_size=0
+        )
+        book_entries = _build_book_entries(book_catalog, book_count, review_count)
+
+        sequential_ratings = pickle.dumps(
+            _rate_books(book_entries, 1), pickle.HIGHEST_PROTOCOL
+        )
+        results = []
+        for workers in _worker_counts(max_workers):
+            ratings = pickle.dumps(
+                _rate_books(book_entries, workers, RATING_CHUNK_SIZE),
+                pickle.HIGHEST_PROTOCOL,
+            )
+            if ratings != sequential_ratings:
+                raise ValueError(
+                    "Ratings with " + str(workers) + " workers differ from 1 worker"
+                )
+            seconds = min(
+                timeit.repeat(
+                    lambda: _rate_books(book_entries, workers, RATING_CHUNK_SIZE),
+                    number=1,
+                    repeat=runs,
+                )
+            )
+            results.append((workers, seconds))
+    finally:
+        review_rating_calculation.rating_memo = rating_memo
+        os.chdir(working_directory)
+        shutil.rmtree(benchmark_directory, ignore_errors=True)
+
+    print(
+        str(book_count)
+        + " books of "
+        + str(review_count)
+        + " reviews, "
+        + str(multiprocessing.cpu_count())
+        + " cores"
+    )
+    print("%8s %10s %9s" % ("workers", "seconds", "speedup"))
+    results = [
+        (workers, seconds, results[0][1] / max(seconds, 1e-9))
+        for workers, seconds in results
+    ]
+    for workers, seconds, speedup in results:
+        print("%8d %10.4f %8.2fx" % (workers, seconds, speedup))
+    return results
+
+
+def run_memo_benchmark(book_count=64, review_count=100000, runs=3):
+    """
+    Rates all the synthetic books with an empty and with a full rating memo and prints the timings
+
+    Args:
+        book_count (int) : number of books
+        review_count (int) : reviews of each book
+        runs (int) : times the books are rated each way, the fastest one counts
+
+    Returns:
+        tuple : seconds with an empty memo, seconds with a full memo and the speedup
+    """
+    working_directory = os.getcwd()
+    benchmark_directory = tempfile.mkdtemp()
+    rating_memo = review_rating_calculation.rating_memo
+    try:
+        os.chdir(benchmark_directory)  # review arrays are read from Data/ under it
+        book_catalog = BookCatalog(
+            Catalog(os.path.join("Data", "catalog.sqlite3")), cache_size=0
+        )
+        book_entries = _build_book_entries(book_catalog, book_count, review_count)
+
+        empty_memo_seconds = []
+        for _ in range(runs):
+            _use_rating_memo(True)
+            start = timeit.default_timer()
+            rated_ratings = _rate_books(book_entries, 1)
+            empty_memo_seconds.append(timeit.default_timer() - start)
+        memoized_ratings = _rate_books(book_entries, 1)
+        if pickle.dumps(memoized_ratings, pickle.HIGHEST_PROTOCOL) != pickle.dumps(
+            rated_ratings, pickle.HIGHEST_PROTOCOL
+        ):
+            raise ValueError("Memoized ratings differ from the ones rated")
+        full_memo_seconds = min(
+            timeit.repeat(lambda: _rate_books(book_entries, 1), number=1, repeat=runs)
+        )
+    finally:
+        review_rating_calculation.rating_memo = rating_memo
+        os.chdir(working_directory)
+        shutil.rmtree(benchmark_directory, ignore_errors=True)
+
+    empty_memo_seconds = min(empty_memo_seconds)
+    speedup = empty_memo_seconds / max(full_memo_seconds, 1e-9)
+    print(str(book_count) + " books of " + str(review_count) + " reviews")
+    print("%12s %10s" % ("rating memo", "seconds"))
+    print("%12s %10.4f" % ("empty", empty_memo_seconds))
+    print("%12s %10.4f %8.1fx" % ("full", full_memo_seconds, speedup))
+    return empty_memo_seconds, full_memo_seconds, speedup
+
+
+if __name__ == "__main__":
+    argument_parser = argparse.ArgumentParser(
+        description="Scaling of the per book rating with the number of workers"
+    )
+    argument_parser.add_argument(
+        "--books", type=int, default=64, help="number of synthetic books"
+    )
+    argument_parser.add_argument(
+        "--reviews", type=int, default=100000, help="reviews of each book"
+    )
+    argument_parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=None,
+        help="most workers to run with, the number of cores by default",
+    )
+    argument_parser.add_argument(
+        "--runs", type=int, default=3, help="times the books are rated per worker count"
+    )
+    argument_parser.add_argument(
+        "--memo",
+        action="store_true",
+        help="rate with an empty and a full rating memo instead of per worker count",
+    )
+    arguments = argument_parser.parse_args()
+    Logger.initialize_logger(
+        logger_prop_file_path="./logger.properties", log_file_path="./logs"
+    )
+    if arguments.memo:
+        run_memo_benchmark(arguments.books, arguments.reviews, arguments.runs)
+    else:
+        run_benchmark(
+            arguments.books, arguments.reviews, arguments.max_workers, arguments.runs
+        )
@@ -0,0 +1,292 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: RatingBenchmark
+    :synopsis: Speed of the numpy rating kernels of review_rating_calculation against the pure python loops they replaced
+
+.. moduleauthor:: DivyenduDutta
+
+Builds the likes and ratings of synthetic books of 100k and 1M reviews, likes heavy tailed
+with most reviews on 0 likes like on goodreads, and rates every book both with the pure
+python loops :mod:`review_rating_calculation` used before and with its numpy kernels:
+the zero like adjustment, the simple average and the Bayesian Adjusted Rating. The ratings
+are checked to match within floating point tolerance and the fastest of `runs` timings
+of each is printed along with the speedup.
+
+With ``--packed`` many small books, the common case on goodreads lists, are rated one
+book at a time with the numpy kernels and all at once with the `mean` and `bar` models of
+:mod:`RatingEngine` over :class:`RatingEngine.PackedReviews`, packing included. The time
+of packing alone is printed too, it is paid once however many models are run.
+
+Run from `web_scraper_goodreads_root` with ``python -m Benchmarks.RatingBenchmark``
+or ``python -m Benchmarks.RatingBenchmark --packed``.
+
+- `_reference_rate_book(review_likes, review_ratings)`
+- `_vectorized_rate_book(review_likes, review_ratings)`
+- `_packed_rate_books(book_reviews)`
+- `_build_book(review_count, seed)`
+- `run_benchmark(review_counts, runs)`
+- `run_packed_benchmark(book_count, review_count, runs)`
+"""
+from __future__ import print_function, division
+import timeit
+import argparse
+import numpy as np
+from review_rating_calculation import (
+    _adjust_zero_likes,
+    _calculate_simple_avg_review_rating,
+    _convert_to_bayesian_adj_rating,
+    _calculate_bayesian_adj_rating,
+)
+from RatingEngine import PackedReviews, rate_packed_reviews
+from FileUtil.ColumnarReviews import REVIEW_DTYPE
+from YALogger.custom_logger import Logger
+
+BENCHMARK_REVIEW_COUNTS = [100000, 1000000]
+PACKED_BENCHMARK_BOOK_COUNT = 2000
+PACKED_BENCHMARK_REVIEW_COUNT = 300
+RATING_TOLERANCE = 1e-9
+
+
+def _reference_rate_book(review_likes, review_ratings):
+    """
+    The pure python loops of :func:`review_rating_calculation._process_reviews` before numpy
+
+    Args:
+        review_likes (list) : likes from the reviews
+        review_ratings (list) : ratings from the reviews
+
+    Returns:
+        2 floats : simple average and average bayesian adjusted rating
+    """
+    if not all([review_like != 0 for review_like in review_likes]):
+        review_likes = [review_like + 1 for review_like in review_likes]
+    total_rating = 0
+    for review_rating in review_ratings:
+        total_rating += review_rating
+    avg_rating_simple = total_rating / len(review_ratings)
+
+    bayesian_adj_ratings = []
+    sum_of_likes = sum(review_likes)
+    sum_of_likes_mul_ratings = sum(
+        [
+            review_like * review_rating
+            for review_like, review_rating in zip(review_likes, review_ratings)
+        ]
+    )
+    for i in range(len(review_likes)):
+        bayesian_adj_ratings.append(
+            (review_likes[i] * review_ratings[i] + sum_of_likes_mul_ratings)
+            / (review_likes[i] + sum_of_likes)
+        )
+    return (
+        avg_rating_simple,
+        sum(bayesian_adj_ratings) / len(bayesian_adj_ratings),
+    )
+
+
+def _vectorized_rate_book(review_likes, review_ratings):
+    """
+    The numpy kernels of :mod:`review_rating_calculation`
+
+    Args:
+        review_likes (numpy array) : likes from the reviews
+        review_ratings (numpy array) : ratings from the reviews
+
+    Returns:
+        2 floats : simple average and average bayesian adjusted rating
+    """
+    review_likes, _ = _adjust_zero_likes(review_likes)
+    return (
+        _calculate_simple_avg_review_rating(review_ratings),
+        _calculate_bayesian_adj_rating(
+            _convert_to_bayesian_adj_rating(review_likes, review_ratings)
+        ),
+    )
+
+
+def _packed_rate_books(book_reviews):
+    """
+    The `mean` and `bar` models of :mod:`RatingEngine` over all the books at once
+
+    Args:
+        book_reviews (list) : numpy structured array of the reviews of each book
+
+    Returns:
+        2 numpy arrays : simple average and average bayesian adjusted rating of each book
+    """
+    model_ratings = rate_packed_reviews(
+        PackedReviews.from_reviews(book_reviews), ["mean", "bar"]
+    )
+    return model_ratings["mean"], model_ratings["bar"]
+
+
+def _build_book(review_count, seed):
+    """
+    Args:
+        review_count (int) : number of reviews
+        seed (int) : seed of the random likes and ratings
+
+    Returns:
+        2 numpy arrays : likes and ratings as int64
+    """
+    random_state = np.random.RandomState(seed)
+    # most reviews get no likes, a few get thousands
+    review_likes = np.floor(random_state.pareto(1.2, review_count)).astype(np.int64)
+    review_ratings = random_state.choice(
+        np.arange(1, 6), review_count, p=[0.04, 0.07, 0.18, 0.33, 0.38]
+    ).astype(np.int64)
+    return review_likes, review_ratings
+
+
+def run_benchmark(review_counts=BENCHMARK_REVIEW_COUNTS, runs=3):
+    """
+    Rates every synthetic book both ways and prints the timings
+
+    Args:
+        review_counts (list) : reviews of each synthetic book
+        runs (int) : times each book is rated each way, the fastest one counts
+
+    Returns:
+        list : reviews, python seconds, numpy seconds and speedup of each book
+    """
+    results = []
+    for seed, review_count in enumerate(review_counts):
+        review_likes, review_ratings = _build_book(review_count, seed)
+        review_likes_list = review_likes.tolist()
+        review_ratings_list = review_ratings.tolist()
+        reference_ratings = _reference_rate_book(review_likes_list, review_ratings_list)
+        vectorized_ratings = _vectorized_rate_book(review_likes, review_ratings)
+        if not np.allclose(
+            reference_ratings, vectorized_ratings, rtol=RATING_TOLERANCE, atol=0
+        ):
+            raise ValueError(
+                "Ratings of "
+                + str(review_count)
+                + " reviews differ "
+                + repr(reference_ratings)
+                + " "
+                + repr(vectorized_ratings)
+            )
+        python_seconds = min(
+            timeit.repeat(
+                lambda: _reference_rate_book(review_likes_list, review_ratings_list),
+                number=1,
+                repeat=runs,
+            )
+        )
+        numpy_seconds = min(
+            timeit.repeat(
+                lambda: _vectorized_rate_book(review_likes, review_ratings),
+                number=1,
+                repeat=runs,
+            )
+        )
+        results.append(
+            (
+                review_count,
+                python_seconds,
+                numpy_seconds,
+                python_seconds / max(numpy_seconds, 1e-9),
+            )
+        )
+
+    print("%10s %12s %12s %9s" % ("reviews", "python s", "numpy s", "speedup"))
+    for review_count, python_seconds, numpy_seconds, speedup in results:
+        print(
+            "%10d %12.4f %12.4f %8.1fx"
+            % (review_count, python_seconds, numpy_seconds, speedup)
+        )
+    return results
+
+
+def run_packed_benchmark(
+    book_count=PACKED_BENCHMARK_BOOK_COUNT,
+    review_count=PACKED_BENCHMARK_REVIEW_COUNT,
+    runs=3,
+):
+    """
+    Rates the synthetic books one at a time and all at once and prints the timings
+
+    Args:
+        book_count (int) : number of synthetic books
+        review_count (int) : reviews of each synthetic book
+        runs (int) : times the books are rated each way, the fastest one counts
+
+    Returns:
+        tuple : per book seconds, packed seconds and speedup
+    """
+    book_reviews = []
+    for seed in range(book_count):
+        reviews = np.zeros(review_count, dtype=REVIEW_DTYPE)
+        reviews["review_likes"], reviews["review_rating"] = _build_book(
+            review_count, seed
+        )
+        book_reviews.append(reviews)
+
+    def rate_books_one_at_a_time():
+        return [
+            _vectorized_rate_book(reviews["review_likes"], reviews["review_rating"])
+            for reviews in book_reviews
+        ]
+
+    per_book_ratings = np.array(rate_books_one_at_a_time()).T
+    packed_ratings = np.array(_packed_rate_books(book_reviews))
+    if not np.allclose(per_book_ratings, packed_ratings, rtol=RATING_TOLERANCE, atol=0):
+        raise ValueError("Packed ratings differ from the ones rated one book at a time")
+    per_book_seconds = min(
+        timeit.repeat(rate_books_one_at_a_time, number=1, repeat=runs)
+    )
+    packed_seconds = min(
+        timeit.repeat(lambda: _packed_rate_books(book_reviews), number=1, repeat=runs)
+    )
+    packing_seconds = min(
+        timeit.repeat(
+            lambda: PackedReviews.from_reviews(book_reviews), number=1, repeat=runs
+        )
+    )
+    speedup = per_book_seconds / max(packed_seconds, 1e-9)
+
+    print(str(book_count) + " books of " + str(review_count) + " reviews")
+    print("%10s %10s %11s %9s" % ("per book s", "packed s", "packing s", "speedup"))
+    print(
+        "%10.4f %10.4f %11.4f %8.1fx"
+        % (per_book_seconds, packed_seconds, packing_seconds, speedup)
+    )
+    return per_book_seconds, packed_seconds, speedup
+
+
+if __name__ == "__main__":
+    argument_parser = argparse.ArgumentParser(
+        description="Speed of the numpy rating kernels against the pure python loops"
+    )
+    argument_parser.add_argument(
+        "--reviews",
+        type=int,
+        nargs="+",
+        default=BENCHMARK_REVIEW_COUNTS,
+        help="reviews of each synthetic book",
+    )
+    argument_parser.add_argument(
+        "--runs", type=int, default=3, help="times each book is rated each way"
+    )
+    argument_parser.add_argument(
+        "--packed",
+        action="store_true",
+        help="rate many small books one at a time and packed with RatingEngine",
+    )
+    argument_parser.add_argument(
+        "--books",
+        type=int,
+        default=PACKED_BENCHMARK_BOOK_COUNT,
+        help="with --packed, number of synthetic books",
+    )
+    arguments = argument_parser.parse_args()
+    Logger.initialize_logger(
+        logger_prop_file_path="./logger.properties", log_file_path="./logs"
+    )
+    if arguments.packed:
+        run_packed_benchmark(
+            arguments.books, PACKED_BENCHMARK_REVIEW_COUNT, arguments.runs
+        )
+    else:
+        run_benchmark(arguments.reviews, arguments.runs)
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: ReviewParseBenchmark
+    :synopsis: Compares the parse modes of BookReviews on a chrome like review page
+
+.. moduleauthor:: DivyenduDutta
+
+Builds a review page the way chrome returns it, ie, the whole book page with a lot of
+markup outside the `bookReviews` div, from the pages in `Fixtures/1-fixture-book`.
+Then parses it with every parser backend installed, once building the whole page
+and once building only the `bookReviews` div, and checks every mode extracts the same
+review details as the original mode (whole page with `html.parser`).
+
+Run from `web_scraper_goodreads_root` with ``python -m Benchmarks.ReviewParseBenchmark``
+
+- `_build_review_page_source(review_copies, filler_blocks)`
+- `_parse_and_extract(html_source, subtree_only)`
+- `run_benchmark(review_copies, filler_blocks, runs)`
+"""
+from __future__ import print_function
+import timeit
+import BookReviews
+from BookReviews import (
+    _create_book_review_scraper_from_source,
+    _retrieve_book_review_details_per_page,
+    _select_parser_backend,
+)
+from FixtureServer import _read_fixture, _build_book_page
+from YALogger.custom_logger import Logger
+
+FIXTURE_BOOK_ID = "1-fixture-book"
+FIXTURE_PAGES = 3
+
+# stands in for the book description, shelves, lists and ads of a real book page
+FILLER_BLOCK = (
+    '<div class="bigBoxContent containerWithHeaderContent">'
+    '<div class="elementList"><div class="left">'
+    '<a class="actionLinkLite bookPageGenreLink" href="/genres/science-fiction">Science Fiction</a>'
+    '</div><div class="right"><a title="1,234 people shelved this book" class="actionLinkLite greyText bookPageGenreLink" '
+    'href="/shelf/users/1">1,234 users</a></div><div class="clear"></div></div>'
+    '<div class="cover"><a href="/book/show/1"><img alt="Another Book" src="https://images.example.com/1.jpg"/></a></div>'
+    "</div>\n"
+)
+
+
+def _build_review_page_source(review_copies, filler_blocks):
+    """
+    Builds a chrome like page source holding the fixture reviews `review_copies` times
+
+    Args:
+        review_copies (int) : times the fixture review pages are repeated
+        filler_blocks (int) : blocks of markup put outside the `bookReviews` div
+
+    Returns:
+        str : html code of the page
+    """
+    review_html = "".join(
+        _read_fixture(FIXTURE_BOOK_ID, page_number)
+        for page_number in range(1, FIXTURE_PAGES + 1)
+    )
+    book_page = _build_book_page(review_html * review_copies)
+    filler = FILLER_BLOCK * filler_blocks
+    # half of the filler above the reviews and half below, like on goodreads
+    book_page = book_page.replace(
+        '<div class="mainContent">', '<div class="mainContent">' + filler, 1
+    )
+    return book_page.replace("</body>", filler + "</body>", 1)
+
+
+def _parse_and_extract(html_source, subtree_only):
+    """
+    Parses a review page and extracts the review details the same way
+    :func:`BookReviews.retrieve_book_review_details` does for other pages
+
+    Args:
+        html_source (str) : html code of the page
+        subtree_only (bool) : build only the `bookReviews` div
+
+    Returns:
+        dict : review details
+    """
+    root_book_review_tags = _create_book_review_scraper_from_source(
+        html_source, subtree_only
+    ).find("div", attrs={"id": "bookReviews"})
+    book_review_details, _ = _retrieve_book_review_details_per_page(
+        {}, root_book_review_tags, 0
+    )
+    return book_review_details
+
+
+def run_benchmark(review_copies=10, filler_blocks=400, runs=5):
+    """
+    Times every parse mode and prints the seconds per page, the speedup over
+    the original mode and whether the review details match the original mode
+
+    Args:
+        review_copies (int) : times the fixture review pages are repeated
+        filler_blocks (int) : blocks of markup put outside the `bookReviews` div
+        runs (int) : times each mode parses the page
+
+    Returns:
+        list : parser backend, subtree only flag, seconds per page and whether the output matched
+    """
+    html_source = _build_review_page_source(review_copies, filler_blocks)
+    parser_backends = ["html.parser"]
+    if _select_parser_backend("lxml") == "lxml":
+        parser_backends.append("lxml")
+
+    configured_parser_backend = BookReviews.parser_backend
+    results = []
+    try:
+        BookReviews.parser_backend = "html.parser"
+        baseline_review_details = _parse_and_extract(html_source, False)
+        for parser_backend in parser_backends:
+            BookReviews.parser_backend = parser_backend
+            for subtree_only in [False, True]:
+                seconds = min(
+                    timeit.repeat(
+                        lambda: _parse_and_extract(html_source, subtree_only),
+                        number=1,
+                        repeat=runs,
+                    )
+                )
+                same_output = (
+                    _parse_and_extract(html_source, subtree_only)
+                    == baseline_review_details
+                )
+                results.append((parser_backend, subtree_only, seconds, same_output))
+    finally:
+        BookReviews.parser_backend = configured_parser_backend
+
+    print(
+        "Page of "
+        + str(len(html_source) // 1024)
+        + " KB with "
+        + str(len(baseline_review_details))
+        + " rated reviews"
+    )
+    print(
+        "%-12s %-13s %10s %8s %12s"
+        % ("parser", "subtree only", "s/page", "speedup", "same output")
+    )
+    for parser_backend, subtree_only, seconds, same_output in results:
+        print(
+            "%-12s %-13s %10.4f %7.2fx %12s"
+            % (
+                parser_backend,
+                subtree_only,
+                seconds,
+                results[0][2] / seconds,
+                same_output,
+            )
+        )
+    return results
+
+
+if __name__ == "__main__":
+    Logger.initialize_logger(
+        logger_prop_file_path="./logger.properties", log_file_path="./logs"
+    )
+    run_benchmark()
@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: SyntheticCorpus
+    :synopsis: Generates shelf and review pages of any size in the markup of the fixtures
+
+.. moduleauthor:: DivyenduDutta
+
+The fixtures in `Fixtures` hold a handful of books and reviews, enough to check the
+scraper but too few to time it. The pages built here follow the same markup, with
+ratings, likes, dates and missing fields drawn from a seeded random generator so the
+same arguments always build the same pages (on a given python version).
+
+- `_build_review_block(review_id, generator)`
+- `_build_book_block(book_number, generator)`
+- `build_review_pages(review_count, reviews_per_page, seed)`
+- `build_shelf_pages(book_count, books_per_page, seed)`
+"""
+import random
+from CommonConstants.Constants import GOODREADS_REVIEW_RATING
+
+REVIEWS_PER_PAGE = 30  # as on goodreads
+BOOKS_PER_PAGE = 50  # as on goodreads
+
+MONTHS = "Jan Feb Mar Apr May Jun Jul Aug Sep Oct Nov Dec".split()
+RATING_TITLES = sorted(title for title in GOODREADS_REVIEW_RATING if title != "")
+
+REVIEW_BLOCK_TEMPLATE = """<div id="review_{review_id}" class="friendReviews elementListBrown">
+  <div class="section firstReview">
+    <div class="review" id="review_{review_id}" itemprop="reviews" itemscope itemtype="http://schema.org/Review">
+      <div class="left bodycol">
+        <div class="reviewHeader uitext stacked">
+          <a class="reviewDate createdAt right" href="/review/show/{review_id}">{review_date}</a>
+          <span itemprop="author"><a title="Reader {review_id}" class="user" href="/user/show/{review_id}-reader">Reader {review_id}</a></span>
+          {rating_markup}
+        </div>
+        <div class="reviewText stacked"><span class="readable"><span id="freeTextContainer{review_id}">{review_text}</span></span></div>
+        <div class="reviewFooter uitext buttons">
+          <div class="updateActionLinks">
+            <span class="likeItContainer"><a class="likeItLink" href="/rating/like/{review_id}">Like</a></span>
+            {likes_markup}
+          </div>
+        </div>
+      </div>
+    </div>
+  </div>
+</div>
+"""
+
+RATING_MARKUP_TEMPLATE = (
+    '<span class="notranslate">rated it</span>\n'
+    '          <span class=" staticStars notranslate" title="{rating_title}">'
+    '<span size="15x15" class="staticStar p10">{rating_title}</span></span>'
+)
+
+PAGINATION_TEMPLATE = """<div class="uitext">
+  <div>
+    <em class="current">{page_number}</em>
+    {next_page_markup}
+  </div>
+</div>
+"""
+
+BOOK_BLOCK_TEMPLATE = """<div class="elementList" style="width: 100%">
+  <div class="left" style="width: 75%;">
+    <span class="greyText">{book_number}.</span>
+    <a class="leftAlignedImage" href="/book/show/{book_id}" title="{book_name}"><img alt="{book_name}" src="https://images.gr-assets.com/books/{book_number}/{book_id}.jpg" /></a>
+    <a class="bookTitle" href="/book/show/{book_id}">{book_name}</a>
+    <br />
+    <span class="by">by</span>
+    <span itemprop="author" itemscope="" itemtype="http://schema.org/Person">
+      <div class="authorName__container">
+        <a class="authorName" itemprop="url" href="https://www.goodreads.com/author/show/{author_id}"><span itemprop="name">Author {author_id}</span></a>{goodreads_author_markup}
+      </div>
+    </span>
+    <br />
+    <span class="greyText smallText">
+      avg rating {avg_rating} &mdash;
+      {number_of_ratings} ratings &mdash;{published_markup}
+    </span>
+  </div>
+  <div class="right">
+    <a class="smallText" href="/shelf/users/{book_id}">shelved {shelved} times</a>
+  </div>
+  <div class="clear"></div>
+</div>
+"""
+
+SHELF_PAGE_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+  <meta charset="utf-8">
+  <title>Synthetic Shelf</title>
+</head>
+<body>
+  <div class="mainContentContainer">
+    <div class="leftContainer">
+{book_blocks}
+    </div>
+  </div>
+</body>
+</html>
+"""
+
+
+def _build_review_block(review_id, generator):
+    """
+    Builds the markup of one review, about 1 in 10 reviews has no rating
+    and about 1 in 3 has no likes, like on goodreads
+
+    Args:
+        review_id (int) : id of the review
+        generator (random.Random) : seeded random generator
+
+    Returns:
+        str : html code of the review
+    """
+    rating_markup = ""
+    if generator.random() >= 0.1:
+        rating_markup = RATING_MARKUP_TEMPLATE.format(
+            rating_title=generator.choice(RATING_TITLES)
+        )
+    likes_markup = ""
+    if generator.random() >= 0.33:
+        likes = int(generator.paretovariate(1.2))
+        likes_markup = (
+            '<span class="likesCount">'
+            + "{:,}".format(likes)
+            + (" like" if likes == 1 else " likes")
+            + "</span>"
+        )
+    return REVIEW_BLOCK_TEMPLATE.format(
+        review_id=review_id,
+        review_date=generator.choice(MONTHS)
+        + " "
+        + "%02d" % generator.randint(1, 28)
+        + ", "
+        + str(generator.randint(2007, 2019)),
+        rating_markup=rating_markup,
+        review_text="Review text number "
+        + str(review_id)
+        + "."
+        + " More of the review." * generator.randint(0, 40),
+        likes_markup=likes_markup,
+    )
+
+
+def _build_book_block(book_number, generator):
+    """
+    Builds the markup of one book on a shelf page, about 1 in 20 books
+    has no published year
+
+    Args:
+        book_number (int) : position of the book on the shelf
+        generator (random.Random) : seeded random generator
+
+    Returns:
+        str : html code of the book
+    """
+    book_id = str(book_number) + ".Synthetic_Book_" + str(book_number)
+    published_markup = ""
+    if generator.random() >= 0.05:
+        published_markup = "\n      published " + str(generator.randint(1900, 2019))
+    goodreads_author_markup = ""
+    if generator.random() < 0.5:
+        goodreads_author_markup = ' <span class="greyText">(Goodreads Author)</span>'
+    return BOOK_BLOCK_TEMPLATE.format(
+        book_number=book_number,
+        book_id=book_id,
+        book_name="Synthetic Book " + str(book_number),
+        author_id=generator.randint(1, 100000),
+        goodreads_author_markup=goodreads_author_markup,
+        avg_rating="%.2f" % generator.uniform(3.0, 4.8),
+        number_of_ratings="{:,}".format(generator.randint(1000, 3000000)),
+        published_markup=published_markup,
+        shelved=generator.randint(100, 50000),
+    )
+
+
+def build_review_pages(review_count, reviews_per_page=REVIEWS_PER_PAGE, seed=0):
+    """
+    Builds review pages the way :func:`HttpNavigator.get_html_code_for_other_pages`
+    returns them, ie, the reviews and pagination of a page without the `bookReviews` div
+
+    Args:
+        review_count (int) : reviews across all the pages
+        reviews_per_page (int) : reviews on each page
+        seed (int) : seed of the random generator
+
+    Returns:
+        list : html code of each review page
+    """
+    generator = random.Random(seed)
+    review_pages = []
+    for first_review in range(0, review_count, reviews_per_page):
+        page_number = len(review_pages) + 1
+        last_review = min(review_count, first_review + reviews_per_page)
+        if last_review < review_count:
+            next_page_markup = (
+                '<a class="next_page" rel="next" href="?page='
+                + str(page_number + 1)
+                + '">next &raquo;</a>'
+            )
+        else:
+            next_page_markup = '<span class="next_page disabled">next &raquo;</span>'
+        review_pages.append(
+            "".join(
+                _build_review_block(review_number + 1, generator)
+                for review_number in range(first_review, last_review)
+            )
+            + PAGINATION_TEMPLATE.format(
+                page_number=page_number, next_page_markup=next_page_markup
+            )
+        )
+    return review_pages
+
+
+def build_shelf_pages(book_count, books_per_page=BOOKS_PER_PAGE, seed=0):
+    """
+    Builds shelf pages the way :func:`GenreScraper._create_main_parser` fetches them
+
+    Args:
+        book_count (int) : books across all the pages
+        books_per_page (int) : books on each page
+        seed (int) : seed of the random generator
+
+    Returns:
+        list : html code of each shelf page
+    """
+    generator = random.Random(seed)
+    shelf_pages = []
+    for first_book in range(0, book_count, books_per_page):
+        shelf_pages.append(
+            SHELF_PAGE_TEMPLATE.format(
+                book_blocks="".join(
+                    _build_book_block(book_number + 1, generator)
+                    for book_number in range(
+                        first_book, min(book_count, first_book + books_per_page)
+                    )
+                )
+            )
+        )
+    return shelf_pages
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: test_ParseThroughputBenchmark
+    :synopsis: Regression tests of the synthetic corpus and of the parse throughput benchmark on small corpora
+
+.. moduleauthor:: DivyenduDutta
+
+The synthetic corpora of :mod:`Benchmarks.ParseThroughputBenchmark` are replaced by small
+ones and the baseline is saved to a temporary directory for each test.
+
+Run from `web_scraper_goodreads_root` with ``python -m pytest Benchmarks/test_ParseThroughputBenchmark.py``
+or ``python -m unittest Benchmarks.test_ParseThroughputBenchmark``.
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from bs4 import BeautifulSoup
+from Benchmarks import ParseThroughputBenchmark
+from Benchmarks.ParseThroughputBenchmark import (
+    _scrape_shelf_pages,
+    _scrape_review_pages,
+    run_benchmark,
+)
+from Benchmarks.SyntheticCorpus import build_review_pages, build_shelf_pages
+from BookReviews import _retrieve_book_review_details_per_page
+
+SMALL_SYNTHETIC_CORPORA = [("synthetic-60", 60, 12)]
+
+
+class SyntheticCorpusTest(unittest.TestCase):
+    def test_review_pages(self):
+        review_pages = build_review_pages(65, reviews_per_page=30)
+        self.assertEqual(len(review_pages), 3)
+        self.assertEqual(review_pages, build_review_pages(65, reviews_per_page=30))
+        self.assertNotEqual(review_pages, build_review_pages(65, 30, seed=1))
+        # only the last page has no next page
+        self.assertEqual(
+            [
+                'class="next_page disabled"' in review_page
+                for review_page in review_pages
+            ],
+            [False, False, True],
+        )
+
+    def test_rated_reviews_are_scraped(self):
+        review_pages = build_review_pages(65, reviews_per_page=30)
+        rated_review_count = sum(
+            review_page.count("staticStars") for review_page in review_pages
+        )
+        self.assertTrue(0 < rated_review_count < 65)
+        self.assertEqual(_scrape_review_pages(review_pages), rated_review_count)
+
+    def test_review_details(self):
+        review_page = build_review_pages(30)[0]
+        book_review_details, _ = _retrieve_book_review_details_per_page(
+            {}, BeautifulSoup(review_page, "html.parser"), 0
+        )
+        review_ids = [review.review_id for review in book_review_details.values()]
+        self.assertEqual(review_ids, sorted(set(review_ids)))
+        for review in book_review_details.values():
+            self.assertTrue(1 <= review.review_id <= 30)
+            self.assertTrue(1 <= review.review_rating <= 5)
+            self.assertTrue(review.review_likes >= 0)
+
+    def test_shelf_pages(self):
+        shelf_pages = build_shelf_pages(120, books_per_page=50)
+        self.assertEqual(len(shelf_pages), 3)
+        self.assertEqual(shelf_pages, build_shelf_pages(120, books_per_page=50))
+        self.assertEqual(_scrape_shelf_pages(shelf_pages), 120)
+
+
+class ParseThroughputBenchmarkTest(unittest.TestCase):
+    def setUp(self):
+        self.baseline_directory = tempfile.mkdtemp()
+        self.synthetic_corpora = ParseThroughputBenchmark.SYNTHETIC_CORPORA
+        self.baseline_file_path = ParseThroughputBenchmark.BASELINE_FILE_PATH
+        ParseThroughputBenchmark.SYNTHETIC_CORPORA = SMALL_SYNTHETIC_CORPORA
+        ParseThroughputBenchmark.BASELINE_FILE_PATH = os.path.join(
+            self.baseline_directory, "parse_throughput_baseline.json"
+        )
+
+    def tearDown(self):
+        ParseThroughputBenchmark.SYNTHETIC_CORPORA = self.synthetic_corpora
+        ParseThroughputBenchmark.BASELINE_FILE_PATH = self.baseline_file_path
+        shutil.rmtree(self.baseline_directory, ignore_errors=True)
+
+    def test_every_case_is_run(self):
+        results = run_benchmark(runs=1)
+        self.assertEqual(
+            [case_name for case_name, _, _, _ in results],
+            [
+                "fixtures/books",
+                "fixtures/reviews",
+                "synthetic-60/books",
+                "synthetic-60/reviews",
+            ],
+        )
+        self.assertEqual(results[2][1], 12)
+        self.assertEqual(results[3][1], _scrape_review_pages(build_review_pages(60)))
+        for _, item_count, items_per_second, peak_memory in results:
+            self.assertTrue(item_count > 0)
+            self.assertTrue(items_per_second > 0)
+            self.assertTrue(peak_memory > 0)
+
+    def test_saved_baseline_is_compared_against(self):
+        self.assertEqual(ParseThroughputBenchmark._load_baseline(), {})
+        results = run_benchmark(runs=1, save_baseline=True)
+        baseline = ParseThroughputBenchmark._load_baseline()
+        self.assertEqual(
+            sorted(baseline), sorted(case_name for case_name, _, _, _ in results)
+        )
+        self.assertEqual(
+            baseline["synthetic-60/books"]["items_per_second"], round(results[2][2], 1)
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: BookRanking
+    :synopsis: Top k books by any of the ratings computed by review_rating_calculation
+
+.. moduleauthor:: DivyenduDutta
+
+Ranks the processed book rating info built by :func:`review_rating_calculation._process_reviews`,
+a dict of book index to the ratings of the book, on one or more of its metrics:
+
+- `bayesianAdj_rating_goodreads` (`METRIC_BAR`) : Bayesian Adjusted Rating
+- `avg_rating_simple` (`METRIC_SIMPLE_AVG`) : average of the review ratings
+- `avg_rating_goodreads` (`METRIC_GOODREADS_AVG`) : average rating shown on goodreads
+
+The top k are picked with a heap of size k so ranking n books takes n * logk and no
+recursion. Later metrics break the ties of earlier ones, books tied on every metric keep
+the order of the book list, and books missing a metric rank after the ones having it.
+
+- `_metric_value(book_rating_info, metric)`
+- `_ranking_key(book_rating_info, metrics)`
+- `top_books(processed_book_review_info, k, metrics)`
+"""
+import heapq
+
+METRIC_BAR = "bayesianAdj_rating_goodreads"
+METRIC_SIMPLE_AVG = "avg_rating_simple"
+METRIC_GOODREADS_AVG = "avg_rating_goodreads"
+
+
+def _metric_value(book_rating_info, metric):
+    """
+    Args:
+        book_rating_info (dict) : ratings of a book
+        metric (str) : name of the rating
+
+    Returns:
+        float : the rating or None when the book doesnt have it, goodreads averages are scraped as str
+    """
+    value = book_rating_info.get(metric)
+    if value == None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def _ranking_key(book_rating_info, metrics):
+    """
+    Builds a key where smaller means ranked higher
+
+    Args:
+        book_rating_info (dict) : ratings of a book
+        metrics (list) : metric names, or (metric name, highest first) pairs
+
+    Returns:
+        tuple : missing flag and signed value of each metric
+    """
+    key = []
+    for metric in metrics:
+        highest_first = True
+        if isinstance(metric, tuple):
+            metric, highest_first = metric
+        value = _metric_value(book_rating_info, metric)
+        if value == None:
+            key.extend((1, 0.0))
+        elif highest_first:
+            key.extend((0, -value))
+        else:
+            key.extend((0, value))
+    return tuple(key)
+
+
+def top_books(processed_book_review_info, k=1, metrics=(METRIC_BAR,)):
+    """
+    Finds the k books ranked highest on `metrics`
+
+    Args:
+        processed_book_review_info (dict) : book index to the ratings of the book
+        k (int) : number of books to return, all of them when None
+        metrics (list) : metric names, or (metric name, highest first) pairs eg,
+            [METRIC_BAR, (METRIC_SIMPLE_AVG, False)], the first one decides the ranking
+            and the later ones break its ties
+
+    Returns:
+        list : (book index, ratings of the book) of the top k books, best first
+    """
+    if k == None:
+        k = len(processed_book_review_info)
+    ranked_books = heapq.nsmallest(
+        k,
+        (
+            (
+                _ranking_key(processed_book_review_info[book_index], metrics),
+                book_index,
+            )
+            for book_index in processed_book_review_info
+        ),
+    )
+    return [
+        (book_index, processed_book_review_info[book_index])
+        for _, book_index in ranked_books
+    ]
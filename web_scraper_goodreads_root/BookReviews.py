@@ -5,22 +5,50 @@
 
 .. moduleauthor:: DivyenduDutta
 
-- `_create_book_review_scraper_from_source(html_source)`
+- `_select_parser_backend(preferred_parser_backend)`
+- `_create_book_review_scraper_from_source(html_source, subtree_only)`
+- `_convert_review_rating(rating_title)`
+- `_convert_review_likes(likes_text)`
 - `_retrieve_review_rating(book_review_tag)`
 - `_retrieve_review_likes(first_page_book_review_tag)`
 - `_retrieve_review_date(first_page_book_review_tag)`
+- `_retrieve_review_id(first_page_book_review_tag)`
 - `_build_review_rating_map(book_review_details, book_review_index, key, value)`
 - `_retrieve_book_review_details_per_page(book_review_details, root_book_review_tags, book_review_index)`
-- `retrieve_book_review_details(book_url, new_book)`
+- `_get_navigator(fetch_backend)`
+- `_load_known_reviews(book_name)`
+- `_is_full_scrape_due(book_name)`
+- `_is_page_known(page_review_details, known_review_ids)`
+- `_merge_known_reviews(scraped_reviews, known_reviews)`
+- `_log_live_ratings(rating_aggregator, page_number, page_review_details)`
+- `retrieve_book_review_details(book_url, new_book, fetch_backend, resume, incremental)`
 """
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer, FeatureNotFound
 import sys
-from CommonConstants.Constants import GOODREADS_REVIEW_RATING, ROOT_URL
-from SiteNavigator import get_html_code_for_first_page, get_html_code_for_other_pages
+from datetime import datetime
+import numpy as np
+from CommonConstants.Constants import (
+    GOODREADS_REVIEW_RATING,
+    FETCH_BACKEND_SELENIUM,
+    FETCH_BACKEND_HTTP,
+    REVIEW_PARSER_BACKEND,
+    REVIEW_PARSE_SUBTREE_ONLY,
+    REVIEW_SORT_NEWEST,
+    INCREMENTAL_FULL_REFRESH_DAYS,
+)
+import SiteNavigator
+import HttpNavigator
 from HelperUtils import extract_book_name_from_root_url
-from FileUtil.FilePicking import save_obj
-from FileUtil.FilePicking import load_obj
-from book_review_visualization import visualize_and_save_review_information
+from ExtractionSchema import ExtractionSchema, Field
+from Records import Review, MISSING_REVIEW_ID
+from FileUtil.ColumnarReviews import REVIEW_DTYPE
+from FileUtil.Catalog import (
+    REVIEW_SNAPSHOT_NAME,
+    load_latest_reviews,
+    last_full_scrape_on,
+)
+from FileUtil.ReviewStream import ReviewStreamWriter
+from RatingAggregator import RatingAggregator
 from YALogger.custom_logger import Logger
 
 
@@ -32,20 +60,116 @@ from YALogger.custom_logger import Logger
 #    return soup
 
 
-def _create_book_review_scraper_from_source(html_source):
+def _select_parser_backend(preferred_parser_backend):
+    """
+    Picks the parser bs4 builds the tree with, falls back to the pure python
+    `html.parser` when the preferred one (eg, lxml) is not installed
+    
+    Args:
+        preferred_parser_backend (str) : parser to use if installed
+        
+    Returns:
+        str : name of the parser
+    """
+    try:
+        BeautifulSoup("", preferred_parser_backend)
+        return preferred_parser_backend
+    except FeatureNotFound:
+        return "html.parser"
+
+
+parser_backend = _select_parser_backend(REVIEW_PARSER_BACKEND)
+
+# only the review section of a page is needed
+book_reviews_strainer = SoupStrainer("div", attrs={"id": "bookReviews"})
+
+
+def _create_book_review_scraper_from_source(html_source, subtree_only=False):
     """
     Creates the bs4 parser from the HTML source
+    With `subtree_only` only the `bookReviews` div is built, the rest of the page
+    is skipped while parsing
     
     Args:
         html_source (str) : html source of the book
+        subtree_only (bool) : build only the `bookReviews` div
         
     Returns:
         bs4 parser
     """
-    soup = BeautifulSoup(html_source, "html.parser")
+    if subtree_only:
+        return BeautifulSoup(
+            html_source, parser_backend, parse_only=book_reviews_strainer
+        )
+    soup = BeautifulSoup(html_source, parser_backend)
     return soup
 
 
+def _convert_review_rating(rating_title):
+    """
+    Maps the title of the rating stars to an integer value from `web_scraper_goodreads_root.CommonConstants.Constants`
+    
+    Args:
+        rating_title (str) : title of the rating stars eg, "it was amazing"
+        
+    Returns:
+        int : review rating, 0 for an unknown title so the review is skipped like an unrated one
+    """
+    # ascii str and unicode keys hash and compare the same on python 2, no encoding needed
+    review_rating = GOODREADS_REVIEW_RATING.get(rating_title)
+    if review_rating == None:
+        Logger.log(
+            "warning",
+            "BookReviews",
+            "_convert_review_rating",
+            "Unknown rating title " + repr(rating_title) + "...skipping the review",
+        )
+        return 0
+    return review_rating
+
+
+def _convert_review_likes(likes_text):
+    """
+    Args:
+        likes_text (str) : number part of the likes text eg, "1,024" from "1,024 likes"
+        
+    Returns:
+        int : review likes
+    """
+    return int(likes_text.replace(",", ""))
+
+
+# fields scraped from every review block
+REVIEW_SCHEMA = ExtractionSchema(
+    [
+        Field(
+            "review_rating",
+            "span.staticStars.notranslate",
+            attribute="title",
+            converter=_convert_review_rating,
+            default=0,  # havent rated it
+        ),
+        Field(
+            "review_likes",
+            "span.likesCount",
+            regex=r"\d[\d,]*",
+            converter=_convert_review_likes,
+            default=0,
+        ),
+        Field("review_date", ["a.reviewDate.createdAt.right", "a.reviewDate"]),
+        # stable across scrapes, unlike the position of the review
+        Field(
+            "review_id",
+            "div.review[id]",
+            attribute="id",
+            regex=r"\d+",
+            converter=int,
+            default=MISSING_REVIEW_ID,
+        ),
+    ]
+)
+
+
 def _retrieve_review_rating(book_review_tag):
     """
     Retrieves the rating given by the review
@@ -57,14 +181,7 @@ def _retrieve_review_rating(book_review_tag):
     Returns:
         review rating
     """
-    review_rating = ""
-    if len(book_review_tag.select("span.staticStars.notranslate")) != 1:
-        pass  # havent rated it
-    else:
-        review_rating = book_review_tag.select("span.staticStars.notranslate")[0][
-            "title"
-        ].encode("utf-8")
-    return GOODREADS_REVIEW_RATING[review_rating]
+    return REVIEW_SCHEMA.extract_field(book_review_tag, "review_rating")
 
 
 def _retrieve_review_likes(first_page_book_review_tag):
@@ -77,18 +194,7 @@ def _retrieve_review_likes(first_page_book_review_tag):
     Returns:
         review likes
     """
-    try:
-        likes_text = first_page_book_review_tag.find(
-            "span", class_="likesCount"
-        ).text.encode("utf-8")
-        if "likes" in likes_text:
-            likes = int(likes_text[: -len("likes")])
-        else:
-            likes = int(likes_text[: -len("like")])
-    except AttributeError:
-        Logger.log("info", "BookReviews", "_retrieve_review_likes", "returning 0 likes")
-        likes = 0
-    return likes
+    return REVIEW_SCHEMA.extract_field(first_page_book_review_tag, "review_likes")
 
 
 def _retrieve_review_date(first_page_book_review_tag):
@@ -101,26 +207,37 @@ def _retrieve_review_date(first_page_book_review_tag):
     Returns:
         date when the review was posted
     """
-    if len(first_page_book_review_tag.select("a.reviewDate.createdAt.right")) > 0:
-        return first_page_book_review_tag.select("a.reviewDate.createdAt.right")[0].text
-    else:
-        first_page_book_review_tag.select("a.reviewDate")[0].text
+    return REVIEW_SCHEMA.extract_field(first_page_book_review_tag, "review_date")
+
+
+def _retrieve_review_id(first_page_book_review_tag):
+    """
+    Retrieves the id goodreads gives the review eg, 1001 from review_1001
+    
+    Args:
+        first_page_book_review_tag (bs4) : represents the bs4 instance for a particulat review
+        
+    Returns:
+        int : review id or `MISSING_REVIEW_ID`
+    """
+    return REVIEW_SCHEMA.extract_field(first_page_book_review_tag, "review_id")
 
 
 def _build_review_rating_map(book_review_details, book_review_index, key, value):
     """
-    Build the dict `book_review_details`
+    Sets a detail of the review record at `book_review_index` in `book_review_details`
+    A misspelt `key` raises AttributeError as :class:`Records.Review` is slotted
     
     Args:
         book_review_details (dict) : the book review details
         book_review_index (int) : counter variable for the books
-        key (str) : key used in dict `book_review_details`
-        value (str) : value used in dict `book_review_details`
+        key (str) : detail of :class:`Records.Review` to set
+        value (str) : value of the detail
         
     Returns:
         details of the reviews for a book
     """
-    book_review_details[book_review_index][key] = value
+    setattr(book_review_details[book_review_index], key, value)
     return book_review_details
 
 
@@ -133,6 +250,9 @@ def _retrieve_book_review_details_per_page(
     - rating of the book by the review
     - likes on the review
     - date of the review
+    - id of the review
+    All four are extracted in one pass over each review with `REVIEW_SCHEMA`
+    Every rated review is stored as a :class:`Records.Review`, unrated ones are skipped
         
     Args:
         book_review_details (dict) : the book review details
@@ -147,105 +267,303 @@ def _retrieve_book_review_details_per_page(
         "div.friendReviews.elementListBrown"
     )
     for first_page_book_review_tag in first_page_book_review_tags:
-        book_review_details[book_review_index] = {}
-        review_rating = _retrieve_review_rating(first_page_book_review_tag)
-        review_likes = _retrieve_review_likes(first_page_book_review_tag)
-        review_date = _retrieve_review_date(first_page_book_review_tag)
-        if review_rating != 0:
-            book_review_details = _build_review_rating_map(
-                book_review_details, book_review_index, "review_likes", review_likes
-            )
-            book_review_details = _build_review_rating_map(
-                book_review_details, book_review_index, "review_rating", review_rating
-            )
-            book_review_details = _build_review_rating_map(
-                book_review_details, book_review_index, "review_date", review_date
-            )
+        review_fields = REVIEW_SCHEMA.extract(first_page_book_review_tag)
+        if review_fields["review_rating"] != 0:
+            book_review_details[book_review_index] = Review()
+            for key in Review.__slots__:
+                book_review_details = _build_review_rating_map(
+                    book_review_details, book_review_index, key, review_fields[key]
+                )
             book_review_index += 1
 
     return book_review_details, book_review_index
 
 
-def retrieve_book_review_details(book_url, new_book):
+def _get_navigator(fetch_backend):
+    """
+    Picks the module used to fetch the review pages
+    
+    Args:
+        fetch_backend (str) : `FETCH_BACKEND_SELENIUM` to click through the pages in headless chrome
+        or `FETCH_BACKEND_HTTP` to call the review pagination endpoint directly
+        
+    Returns:
+        :mod:`SiteNavigator` or :mod:`HttpNavigator`
+    """
+    if fetch_backend == FETCH_BACKEND_SELENIUM:
+        return SiteNavigator
+    elif fetch_backend == FETCH_BACKEND_HTTP:
+        return HttpNavigator
+    else:
+        raise ValueError("Unknown fetch backend " + repr(fetch_backend))
+
+
+def _load_known_reviews(book_name):
+    """
+    Loads the reviews saved by the latest scrape of a book from :mod:`FileUtil.Catalog`
+    
+    Args:
+        book_name (str) : name of the book
+        
+    Returns:
+        numpy structured array : known reviews, empty if the book was not scraped before
+        or its reviews were saved without review ids
+    """
+    try:
+        known_reviews = load_latest_reviews(REVIEW_SNAPSHOT_NAME, "Data/" + book_name)
+    except IOError:
+        return np.empty(0, dtype=REVIEW_DTYPE)
+    if (known_reviews["review_id"] == MISSING_REVIEW_ID).any():
+        Logger.log(
+            "info",
+            "BookReviews",
+            "_load_known_reviews",
+            "Reviews of " + book_name + " were saved without ids, scraping all pages",
+        )
+        return np.empty(0, dtype=REVIEW_DTYPE)
+    return known_reviews
+
+
+def _is_full_scrape_due(book_name):
+    """
+    Checks whether every review page of a book has to be scraped again even when
+    scraping incrementally, ie, the book was never fully scraped or not in the last
+    `INCREMENTAL_FULL_REFRESH_DAYS` days. An incremental scrape never revisits the older
+    pages so their likes, edits and deleted reviews are only picked up by a full one
+    
+    Args:
+        book_name (str) : name of the book
+        
+    Returns:
+        bool flag indicating whether the book is due a full scrape
+    """
+    full_scrape_day = last_full_scrape_on(REVIEW_SNAPSHOT_NAME, "Data/" + book_name)
+    if full_scrape_day == None:
+        return True
+    full_scrape_age = datetime.now() - datetime.strptime(full_scrape_day, "%Y-%m-%d")
+    return full_scrape_age.days >= INCREMENTAL_FULL_REFRESH_DAYS
+
+
+def _is_page_known(page_review_details, known_review_ids):
+    """
+    Checks whether every rated review on a page was already scraped
+    
+    Args:
+        page_review_details (dict) : review details of one page
+        known_review_ids (set) : ids of the known reviews
+        
+    Returns:
+        bool flag indicating whether the page holds rated reviews and all of them are known
+    """
+    page_review_ids = [review.review_id for review in page_review_details.values()]
+    return len(page_review_ids) > 0 and all(
+        review_id in known_review_ids for review_id in page_review_ids
+    )
+
+
+def _merge_known_reviews(scraped_reviews, known_reviews):
+    """
+    Merges the reviews of an incremental scrape into the known ones
+    Reviews scraped again replace their known version, eg, with more likes
+    
+    Args:
+        scraped_reviews (numpy structured array) : reviews on the pages scraped, newest first
+        known_reviews (numpy structured array) : reviews saved by the latest scrape
+        
+    Returns:
+        numpy structured array : scraped reviews followed by the known ones not scraped again
+    """
+    not_scraped_again = np.isin(
+        known_reviews["review_id"], scraped_reviews["review_id"], invert=True
+    )
+    return np.concatenate([scraped_reviews, known_reviews[not_scraped_again]])
+
+
+def _log_live_ratings(rating_aggregator, page_number, page_review_details):
+    """
+    Adds the reviews of a page to the aggregator and logs the ratings so far
+
+    Args:
+        rating_aggregator (RatingAggregator) : ratings of the pages before this one
+        page_number (int) : review page the reviews were scraped from
+        page_review_details (dict) : review details of that page only
+    """
+    rating_aggregator.add_page(page_review_details)
+    if rating_aggregator.review_count > 0:
+        Logger.log(
+            "debug",
+            "BookReviews",
+            "_log_live_ratings",
+            "After page "
+            + str(page_number)
+            + " - "
+            + str(rating_aggregator.review_count)
+            + " reviews, avg rating -simple- "
+            + str(rating_aggregator.simple_average())
+            + ", BAR "
+            + str(rating_aggregator.bayesian_adj_rating()),
+        )
+
+
+def retrieve_book_review_details(
+    book_url,
+    new_book,
+    fetch_backend=FETCH_BACKEND_SELENIUM,
+    resume=False,
+    incremental=False,
+):
     """
     Main entry function into this file's code
     Also handles the progress bar
     Basically this function scrapes review data from the first page and then visits
     each of the review pages and scrapes review data from them
     
+    The reviews of every page are appended to the review stream of the book via
+    :mod:`FileUtil.ReviewStream` as soon as the page is parsed, only their typed columns
+    are kept in memory. When `resume` is set and the book has a review stream, scraping
+    continues from the page after the last one in the stream instead of the first page
+    
+    When `incremental` is set and the book was scraped before, the pages are walked
+    newest reviews first and scraping stops after the first page whose reviews are all
+    known, the new reviews are then merged into the known ones with `_merge_known_reviews`.
+    Only :mod:`HttpNavigator` can order the pages, with selenium, the default backend,
+    every page is scraped. Callers check `_is_full_scrape_due` to scrape every page now and then
+    
+    The simple average and BAR of the reviews scraped so far are kept by a
+    :class:`RatingAggregator.RatingAggregator` fed page by page and logged after every page
+    
     Args:
         book_url (str) : URL of the book
         new_book (bool) : indicates whether its a new book or not
+        fetch_backend (str) : backend used to fetch the review pages, see `_get_navigator`
+        resume (bool) : continue from the review stream of an earlier attempt
+        incremental (bool) : only scrape the reviews added since the book was last scraped
         
     Returns:
-        review details of the book
+        numpy structured array : review details of the book, see :mod:`FileUtil.ColumnarReviews`
     """
+    navigator = _get_navigator(fetch_backend)
+    book_name = extract_book_name_from_root_url(book_url)
     Logger.log(
         "info",
         "BookReviews",
         "retrieve_book_review_details",
         "Book Review Scraping started...",
     )
-    book_review_details = {}
-    book_review_index = 0
-    # first for the first page
-    Logger.log(
-        "info",
-        "BookReviews",
-        "retrieve_book_review_details",
-        "Scraping review data from first page started...",
-    )
-    root_book_review_html = get_html_code_for_first_page(book_url, new_book)
-    new_book = False
-    root_book_review_tags = _create_book_review_scraper_from_source(
-        root_book_review_html
-    )
-    book_review_details, book_review_index = _retrieve_book_review_details_per_page(
-        book_review_details, root_book_review_tags, book_review_index
-    )
-    Logger.log(
-        "info",
-        "BookReviews",
-        "retrieve_book_review_details",
-        "Scraping review data from first page done...",
-    )
-    Logger.log(
-        "info",
-        "BookReviews",
-        "retrieve_book_review_details",
-        "Scraping review data from other pages...",
-    )
-    is_next_page_there = True
-
-    # progress bar code
-    # setup toolbar
-    sys.stdout.write("[")
-    sys.stdout.flush()
-
-    while True:
-        # print('Scraping review data from page started...')
-        is_next_page_there, html_source, current_page = get_html_code_for_other_pages(
-            book_url
+    known_reviews = np.empty(0, dtype=REVIEW_DTYPE)
+    if incremental and fetch_backend != FETCH_BACKEND_HTTP:
+        Logger.log(
+            "info",
+            "BookReviews",
+            "retrieve_book_review_details",
+            "Only the http backend scrapes incrementally, scraping all pages",
         )
-        if is_next_page_there == False:
-            break
+    elif incremental:
+        known_reviews = _load_known_reviews(book_name)
+    sort_order = None
+    known_review_ids = set()
+    if len(known_reviews) > 0:
+        sort_order = REVIEW_SORT_NEWEST
+        known_review_ids = set(known_reviews["review_id"].tolist())
+    is_page_known = False
+    review_stream = ReviewStreamWriter(book_name, resume)
+    rating_aggregator = RatingAggregator()
+    try:
+        rating_aggregator.add_columns(review_stream.columns())
+        book_review_index = review_stream.review_count
+        page_number = review_stream.last_page
+        if page_number > 0:
+            Logger.log(
+                "info",
+                "BookReviews",
+                "retrieve_book_review_details",
+                "Resuming after review page " + str(page_number) + "...",
+            )
+            if sort_order != None:
+                navigator.resume_from_page(book_url, page_number, sort_order)
+            else:
+                navigator.resume_from_page(book_url, page_number)
         else:
-            book_review_scraper_per_page = _create_book_review_scraper_from_source(
-                html_source
+            page_number = 1
+            # first for the first page
+            Logger.log(
+                "info",
+                "BookReviews",
+                "retrieve_book_review_details",
+                "Scraping review data from first page started...",
             )
-            root_book_review_tags = book_review_scraper_per_page.find(
-                "div", attrs={"id": "bookReviews"}
+            if sort_order != None:
+                root_book_review_html = navigator.get_html_code_for_first_page(
+                    book_url, new_book, sort_order
+                )
+            else:
+                root_book_review_html = navigator.get_html_code_for_first_page(
+                    book_url, new_book
+                )
+            new_book = False
+            root_book_review_tags = _create_book_review_scraper_from_source(
+                root_book_review_html
             )
-            # for other pages
             (
-                book_review_details,
+                page_review_details,
                 book_review_index,
             ) = _retrieve_book_review_details_per_page(
-                book_review_details, root_book_review_tags, book_review_index
+                {}, root_book_review_tags, book_review_index
+            )
+            review_stream.write_page(page_number, page_review_details)
+            is_page_known = _is_page_known(page_review_details, known_review_ids)
+            _log_live_ratings(rating_aggregator, page_number, page_review_details)
+            Logger.log(
+                "info",
+                "BookReviews",
+                "retrieve_book_review_details",
+                "Scraping review data from first page done...",
             )
-        sys.stdout.write("###")
+        Logger.log(
+            "info",
+            "BookReviews",
+            "retrieve_book_review_details",
+            "Scraping review data from other pages...",
+        )
+        is_next_page_there = True
+
+        # progress bar code
+        # setup toolbar
+        sys.stdout.write("[")
         sys.stdout.flush()
-        # print('Scraping review data from page done...\n')
+
+        while not is_page_known:
+            # print('Scraping review data from page started...')
+            (
+                is_next_page_there,
+                html_source,
+                current_page,
+            ) = navigator.get_html_code_for_other_pages(book_url)
+            if is_next_page_there == False:
+                break
+            else:
+                book_review_scraper_per_page = _create_book_review_scraper_from_source(
+                    html_source, REVIEW_PARSE_SUBTREE_ONLY
+                )
+                root_book_review_tags = book_review_scraper_per_page.find(
+                    "div", attrs={"id": "bookReviews"}
+                )
+                # for other pages
+                (
+                    page_review_details,
+                    book_review_index,
+                ) = _retrieve_book_review_details_per_page(
+                    {}, root_book_review_tags, book_review_index
+                )
+                page_number += 1
+                review_stream.write_page(page_number, page_review_details)
+                is_page_known = _is_page_known(page_review_details, known_review_ids)
+                _log_live_ratings(rating_aggregator, page_number, page_review_details)
+            sys.stdout.write("###")
+            sys.stdout.flush()
+            # print('Scraping review data from page done...\n')
+    finally:
+        review_stream.close()
 
     sys.stdout.write("]\n")  # this ends the progress bar
     Logger.log(
@@ -254,7 +572,19 @@ def retrieve_book_review_details(book_url, new_book):
         "retrieve_book_review_details",
         "Book Review Scraping stopped...",
     )
-    return book_review_details
+    if sort_order != None:
+        Logger.log(
+            "info",
+            "BookReviews",
+            "retrieve_book_review_details",
+            "Scraped "
+            + str(page_number)
+            + " review pages of "
+            + book_name
+            + " incrementally",
+        )
+        return _merge_known_reviews(review_stream.columns(), known_reviews)
+    return review_stream.columns()
 
 
 if __name__ == "__main__":
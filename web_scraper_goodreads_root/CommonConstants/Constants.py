@@ -18,3 +18,99 @@ FAILURE_THRESHOLD = 5
 
 # use for debugging a particular book
 ROOT_URL = "https://www.goodreads.com/book/show/6148028-catching-fire"
+
+# backends used by BookReviews to fetch the review pages of a book
+FETCH_BACKEND_SELENIUM = "selenium"
+FETCH_BACKEND_HTTP = "http"
+
+# seconds to wait on a plain HTTP fetch, mirrors the WebDriverWait used for selenium
+HTTP_TIMEOUT = 20
+
+HTTP_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:66.0) Gecko/20100101 Firefox/66.0"
+}
+
+# number of books scraped at the same time by MainBookScraper
+SCRAPER_WORKERS = 1
+
+# maximum number of headless chrome instances kept by SiteNavigator
+DRIVER_POOL_SIZE = 4
+
+# review pages a chrome instance visits before it is replaced with a fresh one
+DRIVER_RECYCLE_AFTER_PAGES = 500
+
+# maximum number of shelf pages GenreScraper fetches at the same time
+SHELF_CRAWL_CONCURRENCY = 4
+
+# on disk cache of fetched shelf and review pages, see FileUtil.ResponseCache
+RESPONSE_CACHE_DIRECTORY = "Cache"
+RESPONSE_CACHE_TTL = 6 * 60 * 60  # seconds
+RESPONSE_CACHE_MAX_SIZE = 500 * 1024 * 1024  # bytes
+# re-run from the cache alone, eg, after changing the parsers
+RESPONSE_CACHE_ONLY = False
+
+# review streams of the books being scraped, see FileUtil.ReviewStream
+CHECKPOINT_DIRECTORY = "Checkpoints"
+
+# throttling of requests to goodreads.com, see RequestScheduler
+SCHEDULER_RATE = 2.0  # requests per second per host
+SCHEDULER_BURST = 4
+SCHEDULER_INITIAL_CONCURRENCY = 2
+SCHEDULER_MAX_CONCURRENCY = 8
+SCHEDULER_BACKOFF_BASE = 1.0  # seconds
+SCHEDULER_BACKOFF_MAX = 60.0  # seconds
+# retries done by the scheduler itself before the error reaches the caller
+SCHEDULER_RETRIES = 2
+
+# parser used by BookReviews, falls back to html.parser when lxml is not installed
+REVIEW_PARSER_BACKEND = "lxml"
+# parse only the bookReviews div of a review page
+REVIEW_PARSE_SUBTREE_ONLY = True
+
+# SQLite catalog of books, genres, scrape runs and reviews, see FileUtil.Catalog
+CATALOG_DATABASE = "Data/catalog.sqlite3"
+
+# compression of the files saved by FileUtil.FilePicking and of the pickled snapshots of
+# FileUtil.Catalog eg, book lists, none, gzip, zstd or lz4. Catalog reviews are rows, never compressed
+PICKLE_CODEC = "none"
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+# review runs of the catalog saved as changes since the previous run, see FileUtil.Catalog
+# a run is saved whole again once this many runs build on the same base
+REVIEW_DELTA_CHAIN_LIMIT = 30
+# or once more than this share of the reviews changed
+REVIEW_DELTA_MAX_SHARE = 0.5
+
+# review order an incremental scrape walks the review pages in, see BookReviews
+REVIEW_SORT_NEWEST = "newest"
+# rescrape books scraped before newest reviews first and stop at the known ones,
+# only with the http backend, selenium always scrapes every review page
+INCREMENTAL_SCRAPE = True
+# days after which an incremental scrape is replaced by a full one so likes, edits and
+# deleted reviews of the older pages are picked up again
+INCREMENTAL_FULL_REFRESH_DAYS = 7
+
+# books whose reviews FileUtil.BookCatalog keeps open
+BOOK_CATALOG_CACHE_SIZE = 16
+
+# books rated at the same time by review_rating_calculation and how many a worker takes at a time
+RATING_WORKERS = 1
+RATING_CHUNK_SIZE = 4
+
+# rating models of RatingEngine
+# standard deviations of the wilson lower bound, 1.96 for 95% confidence
+WILSON_Z = 1.96
+# ratings counted as positive by the wilson lower bound
+WILSON_POSITIVE_RATING = 4
+# pseudo ratings of each star from 1 to 5 added by the dirichlet mean
+DIRICHLET_PRIOR = [2, 2, 2, 2, 2]
+
+# ratings of review_rating_calculation memoized per digest of the reviews of a book, see FileUtil.RatingMemo
+RATING_MEMO_PATH = "Cache/rating_memo.pkl"
+# a hit skips reading the review array, see python -m Benchmarks.ProcessReviewsBenchmark --memo
+RATING_MEMO_ENABLED = True
+# memoized ratings not used for this many days are dropped
+RATING_MEMO_MAX_AGE_DAYS = 30
+# most memoized ratings kept, the ones used last are kept
+RATING_MEMO_MAX_ENTRIES = 10000
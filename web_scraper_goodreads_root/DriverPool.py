@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: DriverPool
+    :synopsis: Bounded pool of selenium drivers shared between books and scraping threads
+
+.. moduleauthor:: DivyenduDutta
+
+Starting chrome is the slowest part of scraping a short book, so drivers are
+kept warm in this pool and handed from one book to the next.
+
+- A driver is taken with `checkout()` and given back with `checkin(driver, pages_visited)`
+- Drivers are health checked when they are given back and when they are taken, outside the lock
+  as the check and quitting a driver wait on the browser
+- A driver which has visited `max_pages_per_driver` pages is recycled ie, quit and replaced
+- `close_all()` quits every driver, it is called at exit for drivers still left over
+"""
+import threading
+from YALogger.custom_logger import Logger
+
+
+class DriverPool(object):
+    """
+    Bounded pool of selenium drivers
+
+    Args:
+        driver_factory (function) : creates a new selenium driver
+        max_size (int) : maximum number of drivers alive at the same time
+        max_pages_per_driver (int) : pages a driver visits before it is recycled
+    """
+
+    def __init__(self, driver_factory, max_size, max_pages_per_driver):
+        self.driver_factory = driver_factory
+        self.max_size = max_size
+        self.max_pages_per_driver = max_pages_per_driver
+        self._idle_drivers = []
+        self._pages_visited = {}  # id of driver to pages visited by it
+        self._live_drivers = {}  # id of driver to driver, idle or checked out
+        self._drivers_starting = 0
+        self._drivers_to_quit = set()  # ids of checked out drivers to quit on checkin
+        self._condition = threading.Condition()
+
+    def checkout(self):
+        """
+        Takes a healthy driver from the pool, creating one if the pool is not full
+        Blocks till a driver is checked in when all `max_size` drivers are in use
+        The health check talks to the browser so it runs outside the lock, the driver
+        is already off the idle list then so no other thread can take it
+
+        Returns:
+            selenium driver
+        """
+        while True:
+            with self._condition:
+                while (
+                    not self._idle_drivers
+                    and len(self._live_drivers) + self._drivers_starting >= self.max_size
+                ):
+                    self._condition.wait()
+                if not self._idle_drivers:
+                    # reserve the slot and start chrome outside the lock
+                    self._drivers_starting += 1
+                    break
+                driver = self._idle_drivers.pop()
+            if self._is_healthy(driver):
+                return driver
+            self._quit(driver)
+        return self._start_driver()
+
+    def checkin(self, driver, pages_visited=0):
+        """
+        Gives a driver back to the pool
+        The driver is quit instead if it is unhealthy or has visited too many pages
+        The health check runs outside the lock, like in `checkout()`
+
+        Args:
+            driver : selenium driver taken via `checkout()`
+            pages_visited (int) : pages visited by the driver since it was taken
+        """
+        with self._condition:
+            if id(driver) not in self._live_drivers:
+                return
+            self._pages_visited[id(driver)] += pages_visited
+            if self._pages_visited[id(driver)] >= self.max_pages_per_driver:
+                Logger.log(
+                    "info",
+                    "DriverPool",
+                    "checkin",
+                    "Recycling selenium driver after "
+                    + str(self._pages_visited[id(driver)])
+                    + " pages",
+                )
+                is_reusable = False
+            else:
+                is_reusable = id(driver) not in self._drivers_to_quit
+        if is_reusable and self._is_healthy(driver):
+            with self._condition:
+                # close_all may have run during the health check
+                if (
+                    id(driver) in self._live_drivers
+                    and id(driver) not in self._drivers_to_quit
+                ):
+                    self._idle_drivers.append(driver)
+                    self._condition.notify()
+                    return
+        self._quit(driver)
+
+    def discard(self, driver):
+        """
+        Quits a checked out driver which should not be reused
+
+        Args:
+            driver : selenium driver taken via `checkout()`
+        """
+        self._quit(driver)
+
+    def close_all(self, include_checked_out=False):
+        """
+        Quits all the idle drivers in the pool, checked out ones are quit when they are checked in
+        The pool can still be used afterwards, new drivers are created as needed
+
+        Args:
+            include_checked_out (bool) : quit the checked out drivers right away too, used at exit
+        """
+        with self._condition:
+            drivers = self._idle_drivers
+            self._idle_drivers = []
+            if include_checked_out:
+                drivers = list(self._live_drivers.values())
+            else:
+                idle_driver_ids = set(id(driver) for driver in drivers)
+                self._drivers_to_quit.update(
+                    driver_id
+                    for driver_id in self._live_drivers
+                    if driver_id not in idle_driver_ids
+                )
+        for driver in drivers:
+            self._quit(driver)
+
+    def _is_healthy(self, driver):
+        """
+        Checks whether the browser behind the driver still responds
+
+        Args:
+            driver : selenium driver
+
+        Returns:
+            bool flag indicating whether the driver can be used or not
+        """
+        try:
+            driver.current_url
+            return True
+        except Exception:
+            return False
+
+    def _start_driver(self):
+        """
+        Creates a driver in the slot reserved by `checkout()`, to be called without the lock
+
+        Returns:
+            selenium driver
+        """
+        driver = None
+        try:
+            driver = self.driver_factory()
+        finally:
+            with self._condition:
+                self._drivers_starting -= 1
+                if driver != None:
+                    self._live_drivers[id(driver)] = driver
+                    self._pages_visited[id(driver)] = 0
+                self._condition.notify()
+        Logger.log("info", "DriverPool", "checkout", "Created new selenium driver")
+        return driver
+
+    def _quit(self, driver):
+        """
+        Forgets about the driver and quits its browser, to be called without the lock
+        as quitting waits on the browser. A driver already forgotten is left alone
+
+        Args:
+            driver : selenium driver
+        """
+        with self._condition:
+            is_live = self._live_drivers.pop(id(driver), None) != None
+            self._pages_visited.pop(id(driver), None)
+            self._drivers_to_quit.discard(id(driver))
+            self._condition.notify_all()
+        if not is_live:
+            return
+        try:
+            driver.quit()
+        except Exception as e:
+            Logger.log(
+                "error", "DriverPool", "_quit", "Could not quit driver -->" + repr(e)
+            )
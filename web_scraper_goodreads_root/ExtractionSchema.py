@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: ExtractionSchema
+    :synopsis: Declarative description of the fields scraped from a book or review block
+
+.. moduleauthor:: DivyenduDutta
+
+A `Field` says where a value sits in a block and how to clean it up:
+
+1. the first tag matching one of its CSS `selectors` (tried in order)
+2. the tag's `attribute` or else its first piece of text, or just True when `presence` is set
+3. the first match of `regex` in that value, `regex_group` picks the group
+4. `converter` applied to the result
+
+`default` is returned whenever a step finds nothing. An `ExtractionSchema` compiles
+the selectors and regexes of its fields once, and extracts all of them from a block
+in one pass, selecting a tag only once even when several fields read from it.
+Setting `timed` on a schema adds up the time spent on each field in `field_timings`.
+"""
+import re
+import time
+
+try:
+    import soupsieve
+except ImportError:
+    # older bs4 releases select without soupsieve
+    soupsieve = None
+
+try:
+    text_type = unicode
+except NameError:
+    text_type = str
+
+
+def _compile_selector(selector):
+    """
+    Compiles a CSS selector into a function returning the first matching tag
+
+    Args:
+        selector (str) : CSS selector
+
+    Returns:
+        function : takes a bs4 tag and returns the first match or None
+    """
+    if soupsieve != None:
+        return soupsieve.compile(selector).select_one
+
+    def select_one(tag):
+        matches = tag.select(selector)
+        return matches[0] if matches else None
+
+    return select_one
+
+
+class Field(object):
+    """
+    A value to extract from a block
+
+    Args:
+        name (str) : key of the value in the extracted dict
+        selectors (list) : CSS selectors tried in order, a single selector can be passed as a str
+        attribute (str) : attribute to read instead of the text of the tag
+        presence (bool) : the value is True when a tag matches
+        regex (str) : regular expression the value is searched with
+        regex_group (int) : group of the match to keep
+        converter (function) : applied to the value last
+        default : value when nothing is found
+    """
+
+    def __init__(
+        self,
+        name,
+        selectors,
+        attribute=None,
+        presence=False,
+        regex=None,
+        regex_group=0,
+        converter=None,
+        default=None,
+    ):
+        if not isinstance(selectors, (list, tuple)):
+            selectors = [selectors]
+        self.name = name
+        self.selectors = list(selectors)
+        self.attribute = attribute
+        self.presence = presence
+        self.regex = re.compile(regex) if regex != None else None
+        self.regex_group = regex_group
+        self.converter = converter
+        self.default = default
+
+    def clean(self, tag):
+        """
+        Reads the value from the tag the selectors matched and cleans it up
+
+        Args:
+            tag (bs4) : tag matched by the selectors or None
+
+        Returns:
+            value of the field
+        """
+        if tag == None:
+            return self.default
+        if self.presence:
+            value = True
+        elif self.attribute != None:
+            value = tag.get(self.attribute)
+        else:
+            value = tag.find(string=True)
+            if value != None:
+                # a NavigableString keeps its whole tree alive and pickles it along
+                value = text_type(value)
+        if value == None:
+            return self.default
+        if self.regex != None:
+            match = self.regex.search(value)
+            if match == None:
+                return self.default
+            value = match.group(self.regex_group)
+        if self.converter != None:
+            value = self.converter(value)
+        return value
+
+
+class ExtractionSchema(object):
+    """
+    Fields extracted together from a block
+
+    Args:
+        fields (list) : `Field` objects
+    """
+
+    def __init__(self, fields):
+        self.fields = list(fields)
+        self.fields_by_name = dict((field.name, field) for field in self.fields)
+        self._compiled_selectors = {}
+        for field in self.fields:
+            for selector in field.selectors:
+                if selector not in self._compiled_selectors:
+                    self._compiled_selectors[selector] = _compile_selector(selector)
+        self.timed = False
+        self.field_timings = {}
+
+    def extract(self, block):
+        """
+        Extracts every field from a block
+
+        Args:
+            block (bs4) : book or review block
+
+        Returns:
+            dict : field name to value
+        """
+        matched_tags = {}  # selector to tag, so each selector runs once per block
+        values = {}
+        for field in self.fields:
+            if self.timed:
+                start = time.time()
+            values[field.name] = field.clean(
+                self._first_match(block, field, matched_tags)
+            )
+            if self.timed:
+                self._add_timing(field.name, time.time() - start)
+        return values
+
+    def extract_field(self, block, name):
+        """
+        Extracts a single field from a block
+
+        Args:
+            block (bs4) : book or review block
+            name (str) : name of the field
+
+        Returns:
+            value of the field
+        """
+        field = self.fields_by_name[name]
+        if self.timed:
+            start = time.time()
+        value = field.clean(self._first_match(block, field, {}))
+        if self.timed:
+            self._add_timing(name, time.time() - start)
+        return value
+
+    def reset_timings(self):
+        """
+        Clears `field_timings`
+        """
+        self.field_timings = {}
+
+    def _first_match(self, block, field, matched_tags):
+        """
+        Finds the first tag matching the selectors of a field
+
+        Args:
+            block (bs4) : book or review block
+            field (Field) : field being extracted
+            matched_tags (dict) : selector to tag matched earlier in the same block
+
+        Returns:
+            bs4 tag or None
+        """
+        for selector in field.selectors:
+            if selector not in matched_tags:
+                matched_tags[selector] = self._compiled_selectors[selector](block)
+            if matched_tags[selector] != None:
+                return matched_tags[selector]
+        return None
+
+    def _add_timing(self, name, seconds):
+        """
+        Adds up the calls and seconds spent on a field
+
+        Args:
+            name (str) : name of the field
+            seconds (float) : time spent extracting it once
+        """
+        calls, total_seconds = self.field_timings.get(name, (0, 0.0))
+        self.field_timings[name] = (calls + 1, total_seconds + seconds)
@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: BookCatalog
+    :synopsis: Lazy iteration over the books in the catalog with their reviews opened on demand
+
+.. moduleauthor:: DivyenduDutta
+
+`BookCatalog.books` goes over the books of :mod:`FileUtil.Catalog` as `BookEntry`
+objects, filtered in SQL so books that dont match are never read:
+
+- `genre` : books on the book list of the genre, in the order of the list
+- `listed_on` : with `genre`, books on the list saved that day eg, today's list
+- `as_of` : books whose reviews were scraped on or before that day, the reviews are read as of then
+- `min_reviews` : books with at least that many reviews
+
+Only the book details, review counts, the time the reviews were scraped at and the digest
+of their likes and ratings are read while iterating, the digest identifies the content of
+the reviews eg, to memoize their ratings. The reviews of a book are read when
+`BookEntry.reviews` is called, the latest ones from the memory mapped review array of
+:mod:`FileUtil.ReviewArrays`. The reviews of the last
+`BOOK_CATALOG_CACHE_SIZE` books opened are kept, so going over the same books again
+does not read them again.
+
+- `BookEntry.reviews()`
+- `BookCatalog.books(genre, listed_on, as_of, min_reviews)`
+- `BookCatalog.reviews(book_name, as_of)`
+- `BookCatalog.forget(book_name)`
+"""
+import threading
+from collections import OrderedDict
+from CommonConstants.Constants import BOOK_CATALOG_CACHE_SIZE
+from FileUtil.Catalog import REVIEW_SNAPSHOT_NAME, catalog
+from FileUtil.ReviewArrays import save_review_array, open_review_array
+from Records import Book
+
+BOOK_COLUMNS = [
+    "title",
+    "book_URL",
+    "book_img_URL",
+    "author_name",
+    "author_URL",
+    "goodreads_author",
+    "shelved",
+    "avg_rating",
+    "number_of_ratings",
+    "published_year",
+]
+
+
+class BookEntry(object):
+    """
+    A book found by `BookCatalog.books`, its reviews are read on demand
+
+    Args:
+        book_name (str) : name of the book as in its directory
+        book (Book) : details of the book
+        review_count (int) : number of reviews of the book or None if they were never scraped
+        as_of (str) : YYYY-MM-DD day the reviews are read as of, the latest ones when None
+        book_catalog (BookCatalog) : catalog the book was found in
+        shelf_rank (int) : place of the book in the book list of the genre it was found by, from 0,
+            None when found without a genre
+        scraped_at (float) : seconds since the epoch the reviews read were scraped at or None
+        review_digest (str) : digest of the likes and ratings of the reviews read or None,
+            see :func:`FileUtil.Catalog._review_digest`
+    """
+
+    __slots__ = (
+        "book_name",
+        "book",
+        "review_count",
+        "as_of",
+        "book_catalog",
+        "shelf_rank",
+        "scraped_at",
+        "review_digest",
+    )
+
+    def __init__(
+        self,
+        book_name,
+        book,
+        review_count,
+        as_of,
+        book_catalog,
+        shelf_rank=None,
+        scraped_at=None,
+        review_digest=None,
+    ):
+        self.book_name = book_name
+        self.book = book
+        self.review_count = review_count
+        self.as_of = as_of
+        self.book_catalog = book_catalog
+        self.shelf_rank = shelf_rank
+        self.scraped_at = scraped_at
+        self.review_digest = review_digest
+
+    def reviews(self):
+        """
+        Returns:
+            numpy structured array : reviews of the book, see :mod:`FileUtil.ColumnarReviews`
+        """
+        return self.book_catalog.reviews(self.book_name, self.as_of)
+
+
+class BookCatalog(object):
+    """
+    Books and reviews of a :class:`FileUtil.Catalog.Catalog`
+
+    Args:
+        catalog (Catalog) : catalog the books are read from
+        cache_size (int) : number of books whose reviews are kept
+    """
+
+    def __init__(self, catalog, cache_size=BOOK_CATALOG_CACHE_SIZE):
+        self.catalog = catalog
+        self.cache_size = cache_size
+        self._open_reviews = OrderedDict()  # (book name, as of) to reviews
+        self._lock = threading.Lock()
+
+    def books(self, genre=None, listed_on=None, as_of=None, min_reviews=None):
+        """
+        Finds the books matching all the filters given
+
+        Args:
+            genre (str) : genre the books are listed under eg, science-fiction
+            listed_on (str) : YYYY-MM-DD day of the book list of `genre`
+            as_of (str) : YYYY-MM-DD day the reviews were scraped on or before
+            min_reviews (int) : least number of reviews
+
+        Returns:
+            generator : `BookEntry` of each book, by shelf rank ie, in the order of the book list when `genre` is given
+        """
+        # a column of the latest review run of the book as of the day
+        review_run_query = (
+            "SELECT r.{column} FROM scrape_runs r"
+            " WHERE r.directory = 'Data/' || b.book_name AND r.name = ?"
+        )
+        review_run_parameters = [REVIEW_SNAPSHOT_NAME]
+        if as_of != None:
+            review_run_query += " AND r.scraped_on <= ?"
+            review_run_parameters.append(as_of)
+        review_run_query += " ORDER BY r.scraped_at DESC LIMIT 1"
+        parameters = review_run_parameters * 3
+
+        shelf_rank_column = "NULL"
+        if genre != None:
+            shelf_rank_column = "bg.shelf_rank"
+        query = (
+            "SELECT b.book_name, "
+            + ", ".join("b." + column for column in BOOK_COLUMNS)
+            + ", "
+            + shelf_rank_column
+            + " AS shelf_rank, ("
+            + review_run_query.format(column="scraped_at")
+            + ") AS scraped_at, ("
+            + review_run_query.format(column="review_digest")
+            + ") AS review_digest, ("
+            + review_run_query.format(column="review_count")
+            + ") AS review_count FROM books b"
+        )
+        order = " ORDER BY b.book_id"
+        if genre != None:
+            query += (
+                " JOIN book_genres bg ON bg.book_id = b.book_id"
+                " JOIN genres g ON g.genre_id = bg.genre_id AND g.genre = ?"
+            )
+            parameters.append(genre)
+            if listed_on != None:
+                query += " WHERE bg.listed_on = ?"
+                parameters.append(listed_on)
+            order = " ORDER BY bg.shelf_rank, b.book_id"
+        query = "SELECT * FROM (" + query + order + ")"
+        if as_of != None or min_reviews != None:
+            query += " WHERE review_count >= ?"
+            parameters.append(min_reviews or 0)
+
+        with self.catalog._lock:
+            rows = self.catalog._connect().execute(query, parameters).fetchall()
+        for row in rows:
+            book_details = dict(zip(BOOK_COLUMNS, row[1:-4]))
+            book_details["book_name"] = book_details.pop("title")
+            if book_details["goodreads_author"] != None:
+                book_details["goodreads_author"] = bool(book_details["goodreads_author"])
+            yield BookEntry(
+                row[0],
+                Book(**book_details),
+                row[-1],
+                as_of,
+                self,
+                shelf_rank=row[-4],
+                scraped_at=row[-3],
+                review_digest=row[-2],
+            )
+
+    def reviews(self, book_name, as_of=None):
+        """
+        Reads the reviews of a book, or takes them from the books opened recently
+
+        Args:
+            book_name (str) : name of the book as in its directory
+            as_of (str) : YYYY-MM-DD day to read the reviews as of, the latest ones when None
+
+        Returns:
+            numpy structured array : reviews of the book, see :mod:`FileUtil.ColumnarReviews`
+        """
+        cache_key = (book_name, as_of)
+        with self._lock:
+            if cache_key in self._open_reviews:
+                reviews = self._open_reviews.pop(cache_key)
+                self._open_reviews[cache_key] = reviews  # now the most recent
+                return reviews
+        if as_of == None:
+            reviews = self._open_latest_reviews(book_name)
+        else:
+            reviews = self.catalog.load_reviews_as_of(
+                REVIEW_SNAPSHOT_NAME, "Data/" + book_name, as_of
+            )
+        with self._lock:
+            self._open_reviews[cache_key] = reviews
+            while len(self._open_reviews) > self.cache_size:
+                self._open_reviews.popitem(last=False)
+        return reviews
+
+    def forget(self, book_name):
+        """
+        Drops the reviews of a book kept open, to be called once the book is saved again
+
+        Args:
+            book_name (str) : name of the book as in its directory
+        """
+        with self._lock:
+            for cache_key in list(self._open_reviews):
+                if cache_key[0] == book_name:
+                    del self._open_reviews[cache_key]
+
+    def _open_latest_reviews(self, book_name):
+        """
+        Opens the review array of a book - :mod:`FileUtil.ReviewArrays`
+        Books saved before review arrays existed, or whose array was saved before their
+        latest snapshot in the catalog, have theirs written from the catalog first
+
+        Args:
+            book_name (str) : name of the book as in its directory
+
+        Returns:
+            numpy structured array : memory mapped reviews of the book
+        """
+        scraped_at = self.catalog.last_scraped_at(
+            REVIEW_SNAPSHOT_NAME, "Data/" + book_name
+        )
+        try:
+            return open_review_array(book_name, saved_after=scraped_at)
+        except IOError:
+            save_review_array(
+                self.catalog.load_latest_reviews(
+                    REVIEW_SNAPSHOT_NAME, "Data/" + book_name
+                ),
+                book_name,
+            )
+            return open_review_array(book_name)
+
+
+# books of the catalog used in place of the Data folder tree
+book_catalog = BookCatalog(catalog)
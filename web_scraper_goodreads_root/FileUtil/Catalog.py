@@ -0,0 +1,1146 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: Catalog
+    :synopsis: SQLite store of the books, genres, scrape runs and reviews in place of the Data folder tree
+
+.. moduleauthor:: DivyenduDutta
+
+Every object saved is a row of `scrape_runs` keyed by the `name` and `directory` the
+:mod:`FileUtil.FilePicking` functions took, eg, ("book_review_details", "Data/Dune"),
+and the day it was saved on. Reviews are stored as rows with the same typed columns
+as :mod:`FileUtil.ColumnarReviews`, other objects are pickled into the scrape run, compressed
+with `PICKLE_CODEC` like the files of :mod:`FileUtil.FilePicking`. The book list is also indexed into `books`, `genres`
+and `book_genres` so books can be queried on their own, with the place of each book in
+the list and the day of the list as `shelf_rank` and `listed_on`. Every review run keeps
+its `review_count`, so :mod:`FileUtil.BookCatalog` can filter books without reading reviews,
+whether it was `incremental` ie, only the newest review pages were scraped, so
+`Catalog.last_full_scrape_on` tells when every review of a book was last scraped, and the
+`review_digest` of its likes and ratings, so ratings can be memoized per content of the
+reviews without reading them, see :mod:`FileUtil.RatingMemo`.
+
+Reviews that all carry a goodreads review id are stored as deltas in `review_deltas`.
+The first run of a book is a base holding every review, each later run only holds the
+reviews added or changed since the run before it, plus a removed row for every review
+that went away. `base_run_id` of a run points at the base it builds on. A run is
+materialized by taking the last row of every review id over its base and the deltas
+up to it, so reading a book as of any day is a single indexed query. Once a chain
+reaches `REVIEW_DELTA_CHAIN_LIMIT` runs, or a run changed more than
+`REVIEW_DELTA_MAX_SHARE` of the reviews, a new base is started. `Catalog.compact_reviews`
+folds the history before a day into one base (``python -m FileUtil.Catalog --compact``).
+Reviews without ids, like the ones imported from old files, are stored whole in `reviews`.
+
+"Latest snapshot of X" and "scraped today?" are answered by indexes on
+(`directory`, `name`, `scraped_at`) and (`directory`, `scraped_on`) instead of globbing
+files and reading ctimes.
+
+The module level functions below work on `catalog` and take the same arguments as
+their namesakes in :mod:`FileUtil.FilePicking`, :mod:`FileUtil.ColumnarReviews` and
+:mod:`HelperUtils`, so switching a caller over is only a change of import.
+Existing `Data` folders are imported with ``python -m FileUtil.Catalog`` run from
+`web_scraper_goodreads_root`, see `Catalog.migrate_data_tree`.
+
+- `Catalog.save_obj(obj, name, directory, json_save_needed, genre)`
+- `Catalog.load_obj(name, directory)`
+- `Catalog.load_latest_obj(name, directory)`
+- `Catalog.save_reviews(book_review_details, name, directory, incremental)`
+- `Catalog.load_reviews(name, directory)`
+- `Catalog.load_latest_reviews(name, directory)`
+- `Catalog.load_reviews_as_of(name, directory, scraped_on)`
+- `Catalog.last_full_scrape_on(name, directory)`
+- `Catalog.last_scraped_at(name, directory)`
+- `Catalog.compact_reviews(before)`
+- `Catalog.data_for_book_exists_current_date(book_data_folder)`
+- `Catalog.migrate_data_tree(data_directory)`
+"""
+from __future__ import print_function
+import os
+import argparse
+import re
+import time
+import glob
+import pickle
+import hashlib
+import sqlite3
+import threading
+from datetime import datetime
+import numpy as np
+from CommonConstants.Constants import (
+    CATALOG_DATABASE,
+    REVIEW_DELTA_CHAIN_LIMIT,
+    REVIEW_DELTA_MAX_SHARE,
+    PICKLE_CODEC,
+)
+from FileUtil.ColumnarReviews import (
+    REVIEW_DTYPE,
+    MISSING_REVIEW_ID,
+    reviews_to_columns,
+    columns_to_reviews,
+    _read_columns,
+)
+from FileUtil.FilePicking import (
+    _read_pickle,
+    _compress,
+    _decompress,
+    _codec_from_data,
+)
+from HelperUtils import extract_book_name_from_root_url
+from Records import as_book
+from YALogger.custom_logger import Logger
+
+REVIEW_SNAPSHOT_NAME = "book_review_details"
+BOOK_LIST_SNAPSHOT_NAME = "sci-fi-books-list"
+BOOK_DETAIL_COLUMNS = [
+    "book_URL",
+    "book_img_URL",
+    "shelved",
+    "avg_rating",
+    "number_of_ratings",
+    "published_year",
+]
+AUTHOR_DETAIL_COLUMNS = ["author_name", "author_URL", "goodreads_author"]
+# files saved by FilePicking and ColumnarReviews eg, book_review_details_2019-10-27.pkl
+# pickles saved with a codec end with its extension eg, .pkl.gz
+DATA_FILE_NAME_REGEX = re.compile(
+    r"^(.+)_(\d\d\d\d-\d\d-\d\d)\.(pkl|npz)(\.gz|\.zst|\.lz4)?$"
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS genres (
+    genre_id INTEGER PRIMARY KEY,
+    genre TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS books (
+    book_id INTEGER PRIMARY KEY,
+    book_name TEXT NOT NULL UNIQUE,
+    book_URL TEXT,
+    book_img_URL TEXT,
+    author_name TEXT,
+    author_URL TEXT,
+    goodreads_author INTEGER,
+    shelved TEXT,
+    avg_rating TEXT,
+    number_of_ratings TEXT,
+    published_year TEXT,
+    title TEXT
+);
+CREATE TABLE IF NOT EXISTS book_genres (
+    book_id INTEGER NOT NULL REFERENCES books (book_id),
+    genre_id INTEGER NOT NULL REFERENCES genres (genre_id),
+    shelf_rank INTEGER,
+    listed_on TEXT,
+    PRIMARY KEY (book_id, genre_id)
+);
+CREATE TABLE IF NOT EXISTS scrape_runs (
+    run_id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    directory TEXT NOT NULL,
+    book_id INTEGER REFERENCES books (book_id),
+    genre_id INTEGER REFERENCES genres (genre_id),
+    scraped_at REAL NOT NULL,
+    scraped_on TEXT NOT NULL,
+    snapshot BLOB,
+    base_run_id INTEGER REFERENCES scrape_runs (run_id),
+    review_count INTEGER,
+    incremental INTEGER NOT NULL DEFAULT 0,
+    review_digest TEXT
+);
+CREATE INDEX IF NOT EXISTS scrape_runs_latest ON scrape_runs (directory, name, scraped_at);
+CREATE INDEX IF NOT EXISTS scrape_runs_day ON scrape_runs (directory, scraped_on);
+CREATE TABLE IF NOT EXISTS reviews (
+    run_id INTEGER NOT NULL REFERENCES scrape_runs (run_id),
+    review_index INTEGER NOT NULL,
+    review_likes INTEGER NOT NULL,
+    review_rating INTEGER NOT NULL,
+    review_date INTEGER NOT NULL,
+    review_id INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (run_id, review_index)
+);
+CREATE TABLE IF NOT EXISTS review_deltas (
+    run_id INTEGER NOT NULL REFERENCES scrape_runs (run_id),
+    review_id INTEGER NOT NULL,
+    review_likes INTEGER NOT NULL,
+    review_rating INTEGER NOT NULL,
+    review_date INTEGER NOT NULL,
+    removed INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (run_id, review_id)
+);
+"""
+# columns added after the first release, added to older databases when opened
+ADDED_COLUMNS = [
+    ("scrape_runs", "base_run_id", "INTEGER REFERENCES scrape_runs (run_id)"),
+    ("reviews", "review_id", "INTEGER NOT NULL DEFAULT 0"),
+    ("scrape_runs", "review_count", "INTEGER"),
+    ("books", "title", "TEXT"),
+    ("book_genres", "shelf_rank", "INTEGER"),
+    ("book_genres", "listed_on", "TEXT"),
+    ("scrape_runs", "incremental", "INTEGER NOT NULL DEFAULT 0"),
+    ("scrape_runs", "review_digest", "TEXT"),
+]
+ADDED_INDEXES = """
+CREATE INDEX IF NOT EXISTS scrape_runs_chain ON scrape_runs (base_run_id, scraped_at);
+CREATE INDEX IF NOT EXISTS book_genres_listing ON book_genres (genre_id, listed_on, shelf_rank);
+"""
+
+
+def _book_name_from_directory(directory):
+    """
+    Args:
+        directory (str) : directory as passed to :func:`FileUtil.FilePicking.save_obj` eg, Data/Dune
+
+    Returns:
+        str : name of the book or None if the directory is not a book directory
+    """
+    directory_parts = directory.strip("/").split("/", 1)
+    if len(directory_parts) == 2 and directory_parts[0] == "Data":
+        return directory_parts[1]
+    return None
+
+
+def _read_snapshot(snapshot):
+    """
+    Args:
+        snapshot (buffer) : pickled snapshot of a scrape run, compressed with any codec or none
+
+    Returns:
+        the unpickled object
+    """
+    data = bytes(snapshot)
+    return pickle.loads(_decompress(data, _codec_from_data(data)))
+
+
+def _has_unique_review_ids(review_columns):
+    """
+    Args:
+        review_columns (numpy structured array) : reviews with `REVIEW_DTYPE`
+
+    Returns:
+        bool : whether every review has its own review id, needed to store them as deltas
+    """
+    review_ids = review_columns["review_id"]
+    return (
+        len(review_ids) > 0
+        and not (review_ids == MISSING_REVIEW_ID).any()
+        and len(np.unique(review_ids)) == len(review_ids)
+    )
+
+
+def _review_digest(reviews):
+    """
+    Digest of the likes and ratings of reviews, the columns the ratings of
+    :mod:`review_rating_calculation` are calculated from. The reviews are sorted first so
+    the same reviews give the same digest in any order eg, as scraped or as materialized
+
+    Args:
+        reviews (numpy structured array) : reviews with `REVIEW_DTYPE`
+
+    Returns:
+        str : hex sha1 of the likes and ratings
+    """
+    review_likes = np.asarray(reviews["review_likes"], dtype="<i8")
+    review_ratings = np.asarray(reviews["review_rating"], dtype="<i8")
+    order = np.lexsort((review_ratings, review_likes))
+    digest = hashlib.sha1(review_likes[order].tobytes())
+    digest.update(review_ratings[order].tobytes())
+    return digest.hexdigest()
+
+
+def _review_delta(previous_reviews, reviews):
+    """
+    Finds what changed between two runs of a book
+
+    Args:
+        previous_reviews (numpy structured array) : reviews of the earlier run sorted by review id
+        reviews (numpy structured array) : reviews of the new run with unique review ids
+
+    Returns:
+        numpy structured array : reviews added or changed since the earlier run
+        numpy array : ids of the reviews no longer there
+    """
+    previous_ids = previous_reviews["review_id"]
+    review_ids = reviews["review_id"]
+    positions = np.searchsorted(previous_ids, review_ids)
+    positions[positions == len(previous_ids)] = 0
+    changed = np.ones(len(reviews), dtype=bool)
+    if len(previous_ids) > 0:
+        matched_reviews = previous_reviews[positions]
+        changed = matched_reviews["review_id"] != review_ids
+        for column_name in ["review_likes", "review_rating", "review_date"]:
+            changed |= matched_reviews[column_name] != reviews[column_name]
+    removed_ids = previous_ids[np.isin(previous_ids, review_ids, invert=True)]
+    return reviews[changed], removed_ids
+
+
+def _fold_review_deltas(rows):
+    """
+    Keeps the last row of every review and drops the removed ones
+
+    Args:
+        rows (list) : review id, likes, rating, date and removed flag of the base and
+        delta rows, ordered by review id and then by run
+
+    Returns:
+        numpy structured array : reviews with `REVIEW_DTYPE` sorted by review id
+    """
+    if len(rows) == 0:
+        return np.empty(0, dtype=REVIEW_DTYPE)
+    removed = np.array([row[4] for row in rows], dtype=bool)
+    reviews = np.array([row[:4] for row in rows], dtype=REVIEW_DTYPE)
+    review_ids = reviews["review_id"]
+    last_of_review = np.append(review_ids[1:] != review_ids[:-1], True)
+    return reviews[last_of_review & ~removed]
+
+
+class Catalog(object):
+    """
+    SQLite store of books, genres, scrape runs and reviews
+    One connection is shared by all threads, calls are serialized by a lock
+
+    Args:
+        database_path (str) : path of the database file relative to the current directory
+    """
+
+    def __init__(self, database_path):
+        self.database_path = database_path
+        self._connection = None  # opened on first use
+        self._lock = threading.RLock()
+
+    def save_obj(self, obj, name, directory, json_save_needed=False, genre=None):
+        """
+        Saves `obj` as the `name` snapshot of `directory` for the current date
+        Review details are stored as review rows, a book list is also indexed into
+        `books` under `genre`, anything else is pickled
+        Like :func:`FileUtil.FilePicking.save_obj` a snapshot already saved today is kept
+
+        Args:
+            obj (python object) : object to save
+            name (str) : name of the snapshot
+            directory (str) : directory the snapshot belongs to
+            json_save_needed (bool) : unused, the database replaces the json copy
+            genre (str) : genre of a book list
+        """
+        with self._lock:
+            self._save_run(obj, name, directory, time.time(), genre)
+
+    def load_obj(self, name, directory):
+        """
+        Loads the `name` snapshot of `directory` saved on the current date
+
+        Args:
+            name (str) : name of the snapshot
+            directory (str) : directory the snapshot belongs to
+
+        Returns:
+            the saved object, review details as a dict
+        """
+        run = self._find_run(name, directory, _today())
+        return self._read_run_obj(run, name, directory)
+
+    def load_latest_obj(self, name, directory):
+        """
+        Loads the latest `name` snapshot of `directory`
+
+        Args:
+            name (str) : name of the snapshot
+            directory (str) : directory the snapshot belongs to
+
+        Returns:
+            the saved object, review details as a dict
+        """
+        run = self._find_run(name, directory)
+        return self._read_run_obj(run, name, directory)
+
+    def save_reviews(self, book_review_details, name, directory, incremental=False):
+        """
+        Saves review details, takes the same arguments as
+        :func:`FileUtil.ColumnarReviews.save_reviews`
+
+        Args:
+            book_review_details (dict or numpy structured array) : review details of the book
+            name (str) : name of the snapshot
+            directory (str) : directory the snapshot belongs to
+            incremental (bool) : only the newest review pages were scraped, the rest merged from the last run
+        """
+        if isinstance(book_review_details, dict):
+            book_review_details = reviews_to_columns(book_review_details)
+        with self._lock:
+            self._save_run(
+                book_review_details,
+                name,
+                directory,
+                time.time(),
+                None,
+                incremental=incremental,
+            )
+
+    def load_reviews(self, name, directory):
+        """
+        Loads the review details saved on the current date
+
+        Args:
+            name (str) : name of the snapshot
+            directory (str) : directory the snapshot belongs to
+
+        Returns:
+            numpy structured array : reviews with :data:`FileUtil.ColumnarReviews.REVIEW_DTYPE`
+        """
+        run = self._find_run(name, directory, _today())
+        return self._read_run_reviews(run, name, directory)
+
+    def load_latest_reviews(self, name, directory):
+        """
+        Loads the latest review details
+
+        Args:
+            name (str) : name of the snapshot
+            directory (str) : directory the snapshot belongs to
+
+        Returns:
+            numpy structured array : reviews with :data:`FileUtil.ColumnarReviews.REVIEW_DTYPE`
+        """
+        run = self._find_run(name, directory)
+        return self._read_run_reviews(run, name, directory)
+
+    def load_reviews_as_of(self, name, directory, scraped_on):
+        """
+        Loads the review details as they were on a day, from the latest run on or before it
+
+        Args:
+            name (str) : name of the snapshot
+            directory (str) : directory the snapshot belongs to
+            scraped_on (str) : YYYY-MM-DD day
+
+        Returns:
+            numpy structured array : reviews with :data:`FileUtil.ColumnarReviews.REVIEW_DTYPE`
+        """
+        run = self._find_run(name, directory, as_of=scraped_on)
+        return self._read_run_reviews(run, name, directory)
+
+    def last_full_scrape_on(self, name, directory):
+        """
+        Finds the day of the latest review run that scraped every review page ie, was not incremental
+
+        Args:
+            name (str) : name of the snapshot
+            directory (str) : directory the snapshot belongs to
+
+        Returns:
+            str : YYYY-MM-DD day of the run or None when every review run was incremental or there is none
+        """
+        with self._lock:
+            row = (
+                self._connect()
+                .execute(
+                    "SELECT scraped_on FROM scrape_runs"
+                    " WHERE directory = ? AND name = ? AND incremental = 0"
+                    " ORDER BY scraped_at DESC LIMIT 1",
+                    (directory.strip("/"), name),
+                )
+                .fetchone()
+            )
+        if row == None:
+            return None
+        return row[0]
+
+    def last_scraped_at(self, name, directory):
+        """
+        Finds the time the latest snapshot was taken at
+
+        Args:
+            name (str) : name of the snapshot
+            directory (str) : directory the snapshot belongs to
+
+        Returns:
+            float : seconds since the epoch of the latest run or None when there is none
+        """
+        with self._lock:
+            row = (
+                self._connect()
+                .execute(
+                    "SELECT MAX(scraped_at) FROM scrape_runs"
+                    " WHERE directory = ? AND name = ?",
+                    (directory.strip("/"), name),
+                )
+                .fetchone()
+            )
+        return row[0]
+
+    def compact_reviews(self, before=None):
+        """
+        Folds the review history of every book up to a day into one base so the deltas
+        before it are dropped. The latest run before `before` becomes a base holding all
+        its reviews and the earlier runs are removed, so the books can no longer be read as
+        of a day before that run. Later runs are kept and build on the new base
+
+        Args:
+            before (str) : YYYY-MM-DD day to keep the history from, everything is folded into
+            the latest run when None
+
+        Returns:
+            int : number of books whose history was compacted
+        """
+        compacted_count = 0
+        with self._lock:
+            connection = self._connect()
+            review_histories = connection.execute(
+                "SELECT DISTINCT directory, name FROM scrape_runs WHERE base_run_id IS NOT NULL"
+            ).fetchall()
+            for directory, name in review_histories:
+                query = (
+                    "SELECT run_id, base_run_id, scraped_at FROM scrape_runs"
+                    " WHERE directory = ? AND name = ? AND base_run_id IS NOT NULL"
+                )
+                parameters = [directory, name]
+                if before != None:
+                    query += " AND scraped_on < ?"
+                    parameters.append(before)
+                run = connection.execute(
+                    query + " ORDER BY scraped_at DESC LIMIT 1", parameters
+                ).fetchone()
+                if run == None:
+                    continue
+                run_id, base_run_id, scraped_at = run
+                folded_run_ids = [
+                    row[0]
+                    for row in connection.execute(
+                        "SELECT run_id FROM scrape_runs WHERE directory = ? AND name = ?"
+                        " AND base_run_id IS NOT NULL AND scraped_at <= ?",
+                        (directory, name, scraped_at),
+                    )
+                ]
+                if base_run_id == run_id and folded_run_ids == [run_id]:
+                    continue  # already a lone base
+                reviews = self._materialize_reviews(connection, base_run_id, scraped_at)
+                with connection:  # one transaction
+                    for folded_run_id in folded_run_ids:
+                        connection.execute(
+                            "DELETE FROM review_deltas WHERE run_id = ?", (folded_run_id,)
+                        )
+                        if folded_run_id != run_id:
+                            connection.execute(
+                                "DELETE FROM scrape_runs WHERE run_id = ?",
+                                (folded_run_id,),
+                            )
+                    connection.execute(
+                        "UPDATE scrape_runs SET base_run_id = ?"
+                        " WHERE run_id = ? OR (base_run_id = ? AND scraped_at > ?)",
+                        (run_id, run_id, base_run_id, scraped_at),
+                    )
+                    self._insert_review_deltas(connection, run_id, reviews)
+                compacted_count += 1
+                Logger.log(
+                    "info",
+                    "Catalog",
+                    "compact_reviews",
+                    "Folded "
+                    + str(len(folded_run_ids))
+                    + " review runs of "
+                    + directory
+                    + " into one base",
+                )
+            # give the freed pages back to the file system
+            connection.execute("VACUUM")
+        return compacted_count
+
+    def data_for_book_exists_current_date(self, book_data_folder):
+        """
+        Checks whether anything was saved for a directory on the current date
+
+        Args:
+            book_data_folder (str) : directory eg, Data/Dune
+
+        Returns:
+            bool flag indicating whether data exists or not
+        """
+        with self._lock:
+            row = (
+                self._connect()
+                .execute(
+                    "SELECT 1 FROM scrape_runs WHERE directory = ? AND scraped_on = ? LIMIT 1",
+                    (book_data_folder.strip("/"), _today()),
+                )
+                .fetchone()
+            )
+        return row != None
+
+    def migrate_data_tree(self, data_directory="Data"):
+        """
+        Imports the files saved by :mod:`FileUtil.FilePicking` and :mod:`FileUtil.ColumnarReviews`
+        under `data_directory`. Each file becomes a scrape run dated from its file name,
+        files whose run is already in the catalog are skipped so it can be run again.
+        The json copies and images are left alone
+
+        Args:
+            data_directory (str) : directory relative to the current directory holding the data
+
+        Returns:
+            int : number of files imported
+        """
+        data_file_paths = glob.glob(os.path.join(data_directory, "*.*")) + glob.glob(
+            os.path.join(data_directory, "*", "*.*")
+        )
+        imported_file_count = 0
+        for data_file_path in sorted(data_file_paths):
+            match = DATA_FILE_NAME_REGEX.match(os.path.basename(data_file_path))
+            if match == None:
+                continue
+            name, scraped_on, extension, codec_extension = match.groups()
+            if extension == "npz" and codec_extension != None:
+                continue
+            directory = os.path.dirname(data_file_path).replace(os.sep, "/")
+            with self._lock:
+                if self._find_run(name, directory, scraped_on, missing_ok=True) != None:
+                    continue
+                if extension == "npz":
+                    obj = _read_columns(data_file_path)
+                else:
+                    obj = _read_pickle(data_file_path)
+                scraped_at = min(
+                    os.path.getmtime(data_file_path),
+                    time.mktime(time.strptime(scraped_on, "%Y-%m-%d")) + 86399,
+                )
+                self._save_run(obj, name, directory, scraped_at, None, scraped_on)
+            imported_file_count += 1
+            Logger.log(
+                "info", "Catalog", "migrate_data_tree", "Imported " + data_file_path
+            )
+        return imported_file_count
+
+    def _connect(self):
+        """
+        Opens the database and creates the tables on first use, to be called with the lock held
+
+        Returns:
+            sqlite3 connection
+        """
+        if self._connection == None:
+            database_directory = os.path.dirname(os.path.abspath(self.database_path))
+            if not os.path.exists(database_directory):
+                os.makedirs(database_directory)
+            self._connection = sqlite3.connect(
+                self.database_path, check_same_thread=False
+            )
+            # book details are utf-8 encoded str on python 2
+            self._connection.text_factory = str
+            self._connection.executescript(SCHEMA)
+            self._add_missing_columns(self._connection)
+            self._connection.executescript(ADDED_INDEXES)
+            self._count_reviews_of_older_runs(self._connection)
+            self._digest_reviews_of_older_runs(self._connection)
+            self._rank_older_book_lists(self._connection)
+            self._remove_non_book_rows(self._connection)
+        return self._connection
+
+    def _add_missing_columns(self, connection):
+        """
+        Adds the columns of `ADDED_COLUMNS` to a database created before them
+
+        Args:
+            connection (sqlite3 connection) : open connection
+        """
+        for table, column, column_definition in ADDED_COLUMNS:
+            table_columns = [
+                row[1] for row in connection.execute("PRAGMA table_info(" + table + ")")
+            ]
+            if column not in table_columns:
+                connection.execute(
+                    "ALTER TABLE " + table + " ADD COLUMN " + column + " " + column_definition
+                )
+
+    def _count_reviews_of_older_runs(self, connection):
+        """
+        Fills `review_count` of the review runs saved before it was added
+
+        Args:
+            connection (sqlite3 connection) : open connection
+        """
+        uncounted_runs = connection.execute(
+            "SELECT run_id, base_run_id, scraped_at FROM scrape_runs"
+            " WHERE review_count IS NULL AND snapshot IS NULL"
+        ).fetchall()
+        with connection:  # one transaction
+            for run_id, base_run_id, scraped_at in uncounted_runs:
+                if base_run_id == None:
+                    review_count = connection.execute(
+                        "SELECT COUNT(*) FROM reviews WHERE run_id = ?", (run_id,)
+                    ).fetchone()[0]
+                else:
+                    review_count = len(
+                        self._materialize_reviews(connection, base_run_id, scraped_at)
+                    )
+                connection.execute(
+                    "UPDATE scrape_runs SET review_count = ? WHERE run_id = ?",
+                    (review_count, run_id),
+                )
+
+    def _digest_reviews_of_older_runs(self, connection):
+        """
+        Fills `review_digest` of the review runs saved before it was added
+
+        Args:
+            connection (sqlite3 connection) : open connection
+        """
+        undigested_runs = connection.execute(
+            "SELECT run_id, base_run_id, scraped_at FROM scrape_runs"
+            " WHERE review_digest IS NULL AND snapshot IS NULL"
+        ).fetchall()
+        with connection:  # one transaction
+            for run_id, base_run_id, scraped_at in undigested_runs:
+                if base_run_id == None:
+                    reviews = np.array(
+                        connection.execute(
+                            "SELECT review_id, review_likes, review_rating, review_date"
+                            " FROM reviews WHERE run_id = ?",
+                            (run_id,),
+                        ).fetchall(),
+                        dtype=REVIEW_DTYPE,
+                    )
+                else:
+                    reviews = self._materialize_reviews(
+                        connection, base_run_id, scraped_at
+                    )
+                connection.execute(
+                    "UPDATE scrape_runs SET review_digest = ? WHERE run_id = ?",
+                    (_review_digest(reviews), run_id),
+                )
+
+    def _remove_non_book_rows(self, connection):
+        """
+        Removes the `books` rows made from directories under Data that hold no reviews,
+        eg, "processed book rating info", by runs saved before only reviews made books
+
+        Args:
+            connection (sqlite3 connection) : open connection
+        """
+        with connection:  # one transaction
+            connection.execute(
+                "UPDATE scrape_runs SET book_id = NULL"
+                " WHERE book_id IS NOT NULL AND name != ? AND snapshot IS NOT NULL",
+                (REVIEW_SNAPSHOT_NAME,),
+            )
+            connection.execute(
+                "DELETE FROM books WHERE book_id NOT IN"
+                " (SELECT book_id FROM book_genres)"
+                " AND book_id NOT IN"
+                " (SELECT book_id FROM scrape_runs WHERE book_id IS NOT NULL)"
+            )
+
+    def _rank_older_book_lists(self, connection):
+        """
+        Fills `shelf_rank` and `listed_on` of the books of a genre indexed before they were added,
+        from the latest book list of the genre
+
+        Args:
+            connection (sqlite3 connection) : open connection
+        """
+        unranked_lists = connection.execute(
+            "SELECT r.genre_id, r.snapshot, r.scraped_on FROM scrape_runs r"
+            " WHERE r.name = ? AND r.genre_id IN"
+            " (SELECT genre_id FROM book_genres WHERE listed_on IS NULL)"
+            " ORDER BY r.scraped_at",
+            (BOOK_LIST_SNAPSHOT_NAME,),
+        ).fetchall()
+        with connection:  # one transaction
+            for genre_id, snapshot, scraped_on in unranked_lists:
+                # later lists of a genre replace the ranks of earlier ones
+                self._index_book_list(
+                    connection, _read_snapshot(snapshot), genre_id, scraped_on
+                )
+
+    def _save_run(
+        self, obj, name, directory, scraped_at, genre, scraped_on=None, incremental=False
+    ):
+        """
+        Writes a scrape run and its reviews or book list, to be called with the lock held
+
+        Args:
+            obj (python object) : object to save
+            name (str) : name of the snapshot
+            directory (str) : directory the snapshot belongs to
+            scraped_at (float) : seconds since the epoch the snapshot was taken at
+            genre (str) : genre of a book list or None
+            scraped_on (str) : YYYY-MM-DD day of the snapshot, the current date by default
+            incremental (bool) : the reviews were scraped incrementally, see `save_reviews`
+        """
+        directory = directory.strip("/")
+        if scraped_on == None:
+            scraped_on = _today()
+        if self._find_run(name, directory, scraped_on, missing_ok=True) != None:
+            Logger.log(
+                "error",
+                "Catalog",
+                "_save_run",
+                directory + "/" + name + " of " + scraped_on + " already exists",
+            )
+            return
+        connection = self._connect()
+        with connection:  # one transaction
+            is_review_details = name == REVIEW_SNAPSHOT_NAME or isinstance(
+                obj, np.ndarray
+            )
+            book_id = None
+            # only reviews make a book, eg, Data/processed book rating info is not one
+            book_name = None
+            if is_review_details:
+                book_name = _book_name_from_directory(directory)
+            if book_name != None:
+                book_id = self._book_id(connection, book_name)
+            genre_id = None
+            if genre != None:
+                genre_id = self._genre_id(connection, genre)
+
+            if is_review_details and isinstance(obj, dict):
+                obj = reviews_to_columns(obj)
+            snapshot = None
+            if not is_review_details:
+                snapshot = sqlite3.Binary(
+                    _compress(pickle.dumps(obj, pickle.HIGHEST_PROTOCOL), PICKLE_CODEC)
+                )
+            run_id = connection.execute(
+                "INSERT INTO scrape_runs (name, directory, book_id, genre_id, scraped_at, scraped_on, snapshot, incremental)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    name,
+                    directory,
+                    book_id,
+                    genre_id,
+                    scraped_at,
+                    scraped_on,
+                    snapshot,
+                    int(incremental),
+                ),
+            ).lastrowid
+
+            if is_review_details:
+                self._save_review_run(
+                    connection, run_id, name, directory, scraped_at, obj
+                )
+            elif name == BOOK_LIST_SNAPSHOT_NAME and isinstance(obj, dict):
+                self._index_book_list(connection, obj, genre_id, scraped_on)
+
+    def _save_review_run(self, connection, run_id, name, directory, scraped_at, reviews):
+        """
+        Writes the reviews of a scrape run as a delta on the previous run of the book,
+        as a new base, or whole in `reviews` when they cannot be keyed by review id
+
+        Args:
+            connection (sqlite3 connection) : connection in a transaction
+            run_id (int) : the scrape run
+            name (str) : name of the snapshot
+            directory (str) : directory the snapshot belongs to
+            scraped_at (float) : seconds since the epoch the run was taken at
+            reviews (numpy structured array) : reviews with `REVIEW_DTYPE`
+        """
+        connection.execute(
+            "UPDATE scrape_runs SET review_count = ?, review_digest = ? WHERE run_id = ?",
+            (len(reviews), _review_digest(reviews), run_id),
+        )
+        previous_run = connection.execute(
+            "SELECT run_id, base_run_id, scraped_at FROM scrape_runs"
+            " WHERE directory = ? AND name = ? AND run_id != ?"
+            " ORDER BY scraped_at DESC LIMIT 1",
+            (directory, name, run_id),
+        ).fetchone()
+        if not _has_unique_review_ids(reviews) or (
+            previous_run != None and previous_run[2] > scraped_at
+        ):
+            # a delta can only go on the latest run
+            connection.executemany(
+                "INSERT INTO reviews (run_id, review_index, review_id, review_likes, review_rating, review_date)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    (run_id, review_index) + review
+                    for review_index, review in enumerate(
+                        zip(
+                            reviews["review_id"].tolist(),
+                            reviews["review_likes"].tolist(),
+                            reviews["review_rating"].tolist(),
+                            reviews["review_date"].tolist(),
+                        )
+                    )
+                ),
+            )
+            return
+
+        base_run_id = run_id
+        if previous_run != None and previous_run[1] != None:
+            previous_run_id, previous_base_run_id, previous_scraped_at = previous_run
+            changed_reviews, removed_ids = _review_delta(
+                self._materialize_reviews(
+                    connection, previous_base_run_id, previous_scraped_at
+                ),
+                reviews,
+            )
+            chain_length = connection.execute(
+                "SELECT COUNT(*) FROM scrape_runs WHERE base_run_id = ?",
+                (previous_base_run_id,),
+            ).fetchone()[0]
+            if (
+                chain_length < REVIEW_DELTA_CHAIN_LIMIT
+                and len(changed_reviews) + len(removed_ids)
+                <= REVIEW_DELTA_MAX_SHARE * len(reviews)
+            ):
+                base_run_id = previous_base_run_id
+                reviews = changed_reviews
+        connection.execute(
+            "UPDATE scrape_runs SET base_run_id = ? WHERE run_id = ?",
+            (base_run_id, run_id),
+        )
+        self._insert_review_deltas(connection, run_id, reviews)
+        if base_run_id != run_id:
+            connection.executemany(
+                "INSERT INTO review_deltas (run_id, review_id, review_likes, review_rating, review_date, removed)"
+                " VALUES (?, ?, 0, 0, 0, 1)",
+                ((run_id, review_id) for review_id in removed_ids.tolist()),
+            )
+
+    def _insert_review_deltas(self, connection, run_id, reviews):
+        """
+        Args:
+            connection (sqlite3 connection) : connection in a transaction
+            run_id (int) : the scrape run
+            reviews (numpy structured array) : reviews added or changed in the run
+        """
+        connection.executemany(
+            "INSERT INTO review_deltas (run_id, review_id, review_likes, review_rating, review_date)"
+            " VALUES (?, ?, ?, ?, ?)",
+            (
+                (run_id,) + review
+                for review in zip(
+                    reviews["review_id"].tolist(),
+                    reviews["review_likes"].tolist(),
+                    reviews["review_rating"].tolist(),
+                    reviews["review_date"].tolist(),
+                )
+            ),
+        )
+
+    def _materialize_reviews(self, connection, base_run_id, scraped_at):
+        """
+        Rebuilds the reviews of a run from its base and the deltas up to it,
+        uses the `scrape_runs_chain` index
+
+        Args:
+            connection (sqlite3 connection) : open connection
+            base_run_id (int) : base of the run
+            scraped_at (float) : seconds since the epoch the run was taken at
+
+        Returns:
+            numpy structured array : reviews with `REVIEW_DTYPE` sorted by review id
+        """
+        rows = connection.execute(
+            "SELECT d.review_id, d.review_likes, d.review_rating, d.review_date, d.removed"
+            " FROM scrape_runs r JOIN review_deltas d ON d.run_id = r.run_id"
+            " WHERE r.base_run_id = ? AND r.scraped_at <= ?"
+            " ORDER BY d.review_id, r.scraped_at",
+            (base_run_id, scraped_at),
+        ).fetchall()
+        return _fold_review_deltas(rows)
+
+    def _index_book_list(self, connection, book_details, genre_id, scraped_on):
+        """
+        Writes the books of a book list built by :func:`GenreScraper.retriveSciFiBookList`
+        to `books` and `book_genres`, where the place of the book in the list and the day
+        of the list are kept as its `shelf_rank` and `listed_on`
+
+        Args:
+            connection (sqlite3 connection) : connection in a transaction
+            book_details (dict) : book details
+            genre_id (int) : genre of the books or None
+            scraped_on (str) : YYYY-MM-DD day of the book list
+        """
+        for book_index in sorted(book_details):
+            book = as_book(book_details[book_index])
+            book_id = self._book_id(
+                connection, extract_book_name_from_root_url(book.book_URL)
+            )
+            connection.execute(
+                "UPDATE books SET "
+                + ", ".join(
+                    column + " = ?"
+                    for column in BOOK_DETAIL_COLUMNS + AUTHOR_DETAIL_COLUMNS
+                )
+                + ", title = ? WHERE book_id = ?",
+                [
+                    getattr(book, column)
+                    for column in BOOK_DETAIL_COLUMNS + AUTHOR_DETAIL_COLUMNS
+                ]
+                + [book.book_name, book_id],
+            )
+            if genre_id != None:
+                connection.execute(
+                    "INSERT OR REPLACE INTO book_genres (book_id, genre_id, shelf_rank, listed_on)"
+                    " VALUES (?, ?, ?, ?)",
+                    (book_id, genre_id, book_index, scraped_on),
+                )
+
+    def _book_id(self, connection, book_name):
+        """
+        Args:
+            connection (sqlite3 connection) : connection in a transaction
+            book_name (str) : name of the book as in its directory
+
+        Returns:
+            int : id of the book, added to `books` if missing
+        """
+        connection.execute(
+            "INSERT OR IGNORE INTO books (book_name) VALUES (?)", (book_name,)
+        )
+        return connection.execute(
+            "SELECT book_id FROM books WHERE book_name = ?", (book_name,)
+        ).fetchone()[0]
+
+    def _genre_id(self, connection, genre):
+        """
+        Args:
+            connection (sqlite3 connection) : connection in a transaction
+            genre (str) : genre eg, science-fiction
+
+        Returns:
+            int : id of the genre, added to `genres` if missing
+        """
+        connection.execute("INSERT OR IGNORE INTO genres (genre) VALUES (?)", (genre,))
+        return connection.execute(
+            "SELECT genre_id FROM genres WHERE genre = ?", (genre,)
+        ).fetchone()[0]
+
+    def _find_run(
+        self, name, directory, scraped_on=None, missing_ok=False, as_of=None
+    ):
+        """
+        Finds the latest scrape run of a snapshot, uses the `scrape_runs_latest` index
+
+        Args:
+            name (str) : name of the snapshot
+            directory (str) : directory the snapshot belongs to
+            scraped_on (str) : YYYY-MM-DD day to look in, any day when None
+            missing_ok (bool) : return None instead of raising IOError when there is no run
+            as_of (str) : YYYY-MM-DD day to look on or before, any day when None
+
+        Returns:
+            tuple : run id, pickled snapshot, base run id and time of the run
+        """
+        directory = directory.strip("/")
+        query = (
+            "SELECT run_id, snapshot, base_run_id, scraped_at FROM scrape_runs"
+            " WHERE directory = ? AND name = ?"
+        )
+        parameters = [directory, name]
+        if scraped_on != None:
+            query += " AND scraped_on = ?"
+            parameters.append(scraped_on)
+        if as_of != None:
+            query += " AND scraped_on <= ?"
+            parameters.append(as_of)
+        query += " ORDER BY scraped_at DESC LIMIT 1"
+        with self._lock:
+            run = self._connect().execute(query, parameters).fetchone()
+        if run == None and not missing_ok:
+            raise IOError(
+                directory
+                + "/"
+                + name
+                + (" of " + scraped_on if scraped_on != None else "")
+                + (" as of " + as_of if as_of != None else "")
+                + " doesnt exist"
+            )
+        return run
+
+    def _read_run_reviews(self, run, name, directory):
+        """
+        Args:
+            run (tuple) : run as found by `_find_run`
+            name (str) : name of the snapshot
+            directory (str) : directory the snapshot belongs to
+
+        Returns:
+            numpy structured array : reviews of the run, in the order they were scraped
+            when stored whole or else sorted by review id
+        """
+        run_id, snapshot, base_run_id, scraped_at = run
+        if snapshot != None:
+            raise IOError(directory + "/" + name + " does not hold reviews")
+        with self._lock:
+            if base_run_id != None:
+                return self._materialize_reviews(
+                    self._connect(), base_run_id, scraped_at
+                )
+            rows = (
+                self._connect()
+                .execute(
+                    "SELECT review_id, review_likes, review_rating, review_date FROM reviews"
+                    " WHERE run_id = ? ORDER BY review_index",
+                    (run_id,),
+                )
+                .fetchall()
+            )
+        return np.array(rows, dtype=REVIEW_DTYPE)
+
+    def _read_run_obj(self, run, name, directory):
+        """
+        Args:
+            run (tuple) : run as found by `_find_run`
+            name (str) : name of the snapshot
+            directory (str) : directory the snapshot belongs to
+
+        Returns:
+            the saved object, review details as a dict
+        """
+        snapshot = run[1]
+        if snapshot == None:
+            return columns_to_reviews(self._read_run_reviews(run, name, directory))
+        return _read_snapshot(snapshot)
+
+
+def _today():
+    """
+    Returns:
+        str : current date as YYYY-MM-DD, the same date used in the file names of :mod:`FileUtil.FilePicking`
+    """
+    return datetime.now().strftime("%Y-%m-%d")
+
+
+# catalog used in place of the Data folder tree
+catalog = Catalog(CATALOG_DATABASE)
+
+save_obj = catalog.save_obj
+load_obj = catalog.load_obj
+load_latest_obj = catalog.load_latest_obj
+save_reviews = catalog.save_reviews
+load_reviews = catalog.load_reviews
+load_latest_reviews = catalog.load_latest_reviews
+load_reviews_as_of = catalog.load_reviews_as_of
+last_full_scrape_on = catalog.last_full_scrape_on
+data_for_book_exists_current_date = catalog.data_for_book_exists_current_date
+
+
+if __name__ == "__main__":
+    argument_parser = argparse.ArgumentParser(
+        description="Imports the Data folder tree into the catalog or compacts its review history"
+    )
+    argument_parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="fold the review deltas of every book into one base",
+    )
+    argument_parser.add_argument(
+        "--before",
+        help="YYYY-MM-DD, with --compact keep the review history from this day on",
+    )
+    arguments = argument_parser.parse_args()
+    Logger.initialize_logger(
+        logger_prop_file_path="./logger.properties", log_file_path="./logs"
+    )
+    if arguments.compact:
+        print(
+            "Compacted the review history of "
+            + str(catalog.compact_reviews(arguments.before))
+            + " books in "
+            + CATALOG_DATABASE
+        )
+    else:
+        print(
+            "Imported "
+            + str(catalog.migrate_data_tree())
+            + " files into "
+            + CATALOG_DATABASE
+        )
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: ColumnarReviews
+    :synopsis: Saves and loads the reviews of a book as typed columns instead of a pickled dict
+
+.. moduleauthor:: DivyenduDutta
+
+The reviews of a book are kept as a numpy structured array with one typed column
+per review detail, saved as `<name>_YYYY-MM-DD.npz` holding one array per column.
+Loading a book reads three flat arrays instead of unpickling a dict per review.
+
+- `review_id` : int64, id goodreads gives the review or `MISSING_REVIEW_ID`
+- `review_likes` : int64
+- `review_rating` : int8
+- `review_date` : int64, seconds since the epoch (UTC midnight) or `MISSING_REVIEW_DATE`
+
+- `_review_date_to_epoch(review_date)`
+- `_epoch_to_review_date(review_date_epoch)`
+- `reviews_to_columns(book_review_details)`
+- `columns_to_reviews(review_columns)`
+- `save_reviews(book_review_details, name, directory)`
+- `load_reviews(name, directory)`
+- `load_latest_reviews(name, directory)`
+"""
+import os
+import glob
+import calendar
+from os import path
+from datetime import datetime
+import numpy as np
+from FileUtil.FilePicking import _prepare_directory, load_latest_obj
+from Records import MISSING_REVIEW_ID, as_review
+from YALogger.custom_logger import Logger
+
+REVIEW_DTYPE = np.dtype(
+    [
+        ("review_id", np.int64),
+        ("review_likes", np.int64),
+        ("review_rating", np.int8),
+        ("review_date", np.int64),
+    ]
+)
+REVIEW_DATE_FORMAT = "%b %d, %Y"  # as shown on goodreads eg, Feb 14, 2016
+MISSING_REVIEW_DATE = np.iinfo(np.int64).min
+COLUMNAR_FILE_EXTENSION = ".npz"
+
+
+def _review_date_to_epoch(review_date):
+    """
+    Args:
+        review_date (str) : date of the review as shown on goodreads or None
+
+    Returns:
+        int : seconds since the epoch or `MISSING_REVIEW_DATE` if the date is missing or unreadable
+    """
+    if review_date == None:
+        return MISSING_REVIEW_DATE
+    try:
+        return calendar.timegm(
+            datetime.strptime(review_date.strip(), REVIEW_DATE_FORMAT).timetuple()
+        )
+    except ValueError:
+        return MISSING_REVIEW_DATE
+
+
+def _epoch_to_review_date(review_date_epoch):
+    """
+    Args:
+        review_date_epoch (int) : seconds since the epoch
+
+    Returns:
+        str : date of the review as shown on goodreads or None if it is missing
+    """
+    if review_date_epoch == MISSING_REVIEW_DATE:
+        return None
+    return datetime.utcfromtimestamp(review_date_epoch).strftime(REVIEW_DATE_FORMAT)
+
+
+def reviews_to_columns(book_review_details):
+    """
+    Converts the review details of a book to a structured array
+    The reviews are kept in the order of their index
+
+    Args:
+        book_review_details (dict) : review details as built by :mod:`BookReviews`, the
+        :class:`Records.Review` values may also be dicts as in older pickles
+
+    Returns:
+        numpy structured array : reviews with `REVIEW_DTYPE`
+    """
+    reviews = [
+        as_review(book_review_details[review_index])
+        for review_index in sorted(book_review_details)
+    ]
+    review_columns = np.empty(len(reviews), dtype=REVIEW_DTYPE)
+    review_columns["review_id"] = [review.review_id for review in reviews]
+    review_columns["review_likes"] = [review.review_likes for review in reviews]
+    review_columns["review_rating"] = [review.review_rating for review in reviews]
+    review_columns["review_date"] = [
+        _review_date_to_epoch(review.review_date) for review in reviews
+    ]
+    return review_columns
+
+
+def columns_to_reviews(review_columns):
+    """
+    Converts a structured array back to the review details dict built by :mod:`BookReviews`
+
+    Args:
+        review_columns (numpy structured array) : reviews with `REVIEW_DTYPE`
+
+    Returns:
+        dict : review details
+    """
+    book_review_details = {}
+    for review_index, (review_id, review_likes, review_rating, review_date) in enumerate(
+        zip(
+            review_columns["review_id"].tolist(),
+            review_columns["review_likes"].tolist(),
+            review_columns["review_rating"].tolist(),
+            review_columns["review_date"].tolist(),
+        )
+    ):
+        book_review_details[review_index] = {
+            "review_id": review_id,
+            "review_likes": review_likes,
+            "review_rating": review_rating,
+            "review_date": _epoch_to_review_date(review_date),
+        }
+    return book_review_details
+
+
+def _read_columns(file_path):
+    """
+    Reads a structured array saved by `save_reviews`
+    Files saved before reviews had ids get `MISSING_REVIEW_ID`
+
+    Args:
+        file_path (str) : path of the .npz file
+
+    Returns:
+        numpy structured array : reviews with `REVIEW_DTYPE`
+    """
+    with np.load(file_path) as columns:
+        review_columns = np.empty(len(columns["review_likes"]), dtype=REVIEW_DTYPE)
+        for column_name in REVIEW_DTYPE.names:
+            if column_name in columns.files:
+                review_columns[column_name] = columns[column_name]
+            else:
+                review_columns[column_name] = MISSING_REVIEW_ID
+    return review_columns
+
+
+def save_reviews(book_review_details, name, directory):
+    """
+    Saves the review details of a book as columns named `name` in dir `directory`
+    The directory is handled the same way as :func:`FileUtil.FilePicking.save_obj`
+
+    Args:
+        book_review_details (dict or numpy structured array) : review details of the book
+        name (str) : name with which to save the .npz file
+        directory (str) : name of the directory where the .npz file is saved
+    """
+    if isinstance(book_review_details, dict):
+        review_columns = reviews_to_columns(book_review_details)
+    else:
+        review_columns = book_review_details
+    directory_path = _prepare_directory(directory)
+    timestamp = datetime.now().strftime("%Y-%m-%d")
+    full_data_file_path = directory_path + name + "_" + timestamp + COLUMNAR_FILE_EXTENSION
+    if path.exists(full_data_file_path) == False:
+        with open(full_data_file_path, "wb") as f:
+            np.savez(
+                f,
+                **dict(
+                    (column_name, review_columns[column_name])
+                    for column_name in REVIEW_DTYPE.names
+                )
+            )
+    else:
+        Logger.log(
+            "error",
+            "ColumnarReviews",
+            "save_reviews",
+            full_data_file_path + " already exists",
+        )
+
+
+def load_reviews(name, directory):
+    """
+    Loads the .npz file named `name` saved today from `directory`
+
+    Args:
+        name (str) : name with which the .npz file was saved
+        directory (str) : name of the directory where the .npz file is saved
+
+    Returns:
+        numpy structured array : reviews with `REVIEW_DTYPE`
+    """
+    directory_path = os.getcwd() + "/" + directory + "/"
+    timestamp = datetime.now().strftime("%Y-%m-%d")
+    full_data_file_path = directory_path + name + "_" + timestamp + COLUMNAR_FILE_EXTENSION
+    if path.exists(full_data_file_path) == True:
+        return _read_columns(full_data_file_path)
+    else:
+        raise IOError(full_data_file_path + " doesnt exist")
+
+
+def load_latest_reviews(name, directory):
+    """
+    Loads the latest .npz file named `name` from a book directory
+    Books scraped before the columnar format are read from their latest .pkl file
+
+    Args:
+        name (str) : name with which the .npz file was saved
+        directory (str) : name of the directory where the .npz file is saved
+
+    Returns:
+        numpy structured array : reviews with `REVIEW_DTYPE`
+    """
+    list_of_files = glob.glob(
+        os.getcwd() + "/" + directory + "/" + name + "_*" + COLUMNAR_FILE_EXTENSION
+    )
+    if len(list_of_files) == 0:
+        return reviews_to_columns(load_latest_obj(name, directory))
+    latest_file = max(list_of_files, key=os.path.getctime)
+    return _read_columns(latest_file)
@@ -5,37 +5,67 @@
 
 .. moduleauthor:: DivyenduDutta
 
-- `save_obj(obj, name, directory )`
+- `_prepare_directory(directory)`
+- `_compress(data, codec)`
+- `_decompress(data, codec)`
+- `_check_codec_installed(codec, codec_module)`
+- `_codec_from_file_path(file_path)`
+- `_codec_from_data(data)`
+- `_find_data_file(file_path_without_codec)`
+- `_write_data_file(data, file_path_without_codec, codec)`
+- `_read_pickle(file_path)`
+- `save_obj(obj, name, directory, json_save_needed, codec)`
 - `load_obj(name, directory )`
 - `load_latest_obj(name, directory)`
 """
 import pickle
 import json
+import zlib
 import os
 import glob
 from os import path
 from datetime import datetime
 import shutil
 from HelperUtils import data_for_book_exists_current_date
+from CommonConstants.Constants import PICKLE_CODEC, GZIP_LEVEL, ZSTD_LEVEL
+from Records import record_to_dict
 from YALogger.custom_logger import Logger
 
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
 
-def save_obj(obj, name, directory, json_save_needed):
+# extension each codec adds after .pkl or .json
+CODEC_EXTENSIONS = {"none": "", "gzip": ".gz", "zstd": ".zst", "lz4": ".lz4"}
+CODEC_PACKAGES = {"zstd": "zstandard", "lz4": "lz4"}
+# first bytes each codec writes, to tell the codec of data saved without a file extension
+CODEC_MAGIC_BYTES = {
+    "gzip": b"\x1f\x8b",
+    "zstd": b"\x28\xb5\x2f\xfd",
+    "lz4": b"\x04\x22\x4d\x18",
+}
+
+
+def _prepare_directory(directory):
     """
     Functions checks if the individual book directory exists as of current date
     If it does'nt exist then it creates it otherwise it deletes the older directory and recreates it
-    Pickles and saves the `obj` with the name `name` in dir `directory`
-    Also saves the data as json in the same folder based on `json_save_needed`
     
     Args:
-        obj (python object) : this is being pickled
-        name (str) : name with which to save the .pkl file
-        directory (str) : name of the directory where the .pkl file is saved
-        json_save_needed (bool) : indicates whether data needs to be saved as json or not
+        directory (str) : name of the directory where the files are saved
+        
+    Returns:
+        str : path of the directory
     """
     directory_path = os.getcwd() + "/" + directory + "/"
     if directory != "Data":
-        if not data_for_book_exists_current_date(directory_path):
+        # relative to the current directory like `directory`
+        if not data_for_book_exists_current_date(directory):
             if not path.exists(directory_path):
                 os.mkdir(directory_path)
             else:
@@ -45,17 +75,175 @@ def save_obj(obj, name, directory, json_save_needed):
     else:
         if not path.exists(directory_path):
             os.mkdir(directory_path)
+    return directory_path
+
+
+def _compress(data, codec):
+    """
+    Compresses pickled or json data with a codec
+    
+    Args:
+        data (bytes) : data to compress
+        codec (str) : one of `CODEC_EXTENSIONS`
+        
+    Returns:
+        bytes : compressed data
+    """
+    if codec == "none":
+        return data
+    elif codec == "gzip":
+        # wbits 31 writes the gzip container so the file opens with gunzip too
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+        return compressor.compress(data) + compressor.flush()
+    elif codec == "zstd":
+        _check_codec_installed(codec, zstandard)
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    elif codec == "lz4":
+        _check_codec_installed(codec, lz4_frame)
+        return lz4_frame.compress(data)
+    raise ValueError("Unknown codec " + str(codec))
+
+
+def _decompress(data, codec):
+    """
+    Decompresses data compressed by `_compress`
+    
+    Args:
+        data (bytes) : compressed data
+        codec (str) : one of `CODEC_EXTENSIONS`
+        
+    Returns:
+        bytes : data
+    """
+    if codec == "none":
+        return data
+    elif codec == "gzip":
+        return zlib.decompress(data, 31)
+    elif codec == "zstd":
+        _check_codec_installed(codec, zstandard)
+        return zstandard.ZstdDecompressor().decompress(data)
+    elif codec == "lz4":
+        _check_codec_installed(codec, lz4_frame)
+        return lz4_frame.decompress(data)
+    raise ValueError("Unknown codec " + str(codec))
+
+
+def _check_codec_installed(codec, codec_module):
+    """
+    Raises ImportError when the package of an optional codec is not installed
+    
+    Args:
+        codec (str) : codec needed
+        codec_module (module) : its module or None if it could not be imported
+    """
+    if codec_module == None:
+        raise ImportError(
+            "codec " + codec + " needs the " + CODEC_PACKAGES[codec] + " package"
+        )
+
+
+def _codec_from_file_path(file_path):
+    """
+    Args:
+        file_path (str) : path of a .pkl or .json file, with the extension of its codec if compressed
+        
+    Returns:
+        str : codec of the file
+    """
+    for codec, codec_extension in CODEC_EXTENSIONS.items():
+        if codec_extension != "" and file_path.endswith(codec_extension):
+            return codec
+    return "none"
+
+
+def _codec_from_data(data):
+    """
+    Args:
+        data (bytes) : data saved by `_compress`, eg, a snapshot of :mod:`FileUtil.Catalog`
+        
+    Returns:
+        str : codec the data was compressed with, "none" for a plain pickle
+    """
+    for codec, magic_bytes in CODEC_MAGIC_BYTES.items():
+        if data[: len(magic_bytes)] == magic_bytes:
+            return codec
+    return "none"
+
+
+def _find_data_file(file_path_without_codec):
+    """
+    Finds the file saved at a path with whichever codec it was saved with
+    
+    Args:
+        file_path_without_codec (str) : path of the file without the codec extension eg, .../name_2019-10-27.pkl
+        
+    Returns:
+        str : path of the file or None if it doesnt exist
+    """
+    for codec_extension in CODEC_EXTENSIONS.values():
+        if path.exists(file_path_without_codec + codec_extension):
+            return file_path_without_codec + codec_extension
+    return None
+
+
+def _write_data_file(data, file_path_without_codec, codec):
+    """
+    Args:
+        data (bytes) : data to write
+        file_path_without_codec (str) : path of the file without the codec extension
+        codec (str) : one of `CODEC_EXTENSIONS`
+    """
+    with open(file_path_without_codec + CODEC_EXTENSIONS[codec], "wb") as f:
+        f.write(_compress(data, codec))
+
+
+def _read_pickle(file_path):
+    """
+    Unpickles a file saved by `save_obj`, the codec is picked from the file extension
+    
+    Args:
+        file_path (str) : path of the .pkl file
+        
+    Returns:
+        the unpickled object
+    """
+    with open(file_path, "rb") as f:
+        return pickle.loads(_decompress(f.read(), _codec_from_file_path(file_path)))
+
+
+def save_obj(obj, name, directory, json_save_needed, codec=PICKLE_CODEC):
+    """
+    Functions checks if the individual book directory exists as of current date
+    If it does'nt exist then it creates it otherwise it deletes the older directory and recreates it
+    Pickles and saves the `obj` with the name `name` in dir `directory`
+    Also saves the data as json in the same folder based on `json_save_needed`
+    Both files are compressed with `codec` which adds its extension eg, .pkl.gz
+    
+    Args:
+        obj (python object) : this is being pickled
+        name (str) : name with which to save the .pkl file
+        directory (str) : name of the directory where the .pkl file is saved
+        json_save_needed (bool) : indicates whether data needs to be saved as json or not
+        codec (str) : none, gzip, zstd or lz4, zstd and lz4 need their packages installed
+    """
+    if codec not in CODEC_EXTENSIONS:
+        raise ValueError("Unknown codec " + str(codec))
+    directory_path = _prepare_directory(directory)
 
     timestamp = datetime.now().strftime("%Y-%m-%d")
     full_data_file_path = directory_path + name + "_" + timestamp + ".pkl"
-    if path.exists(full_data_file_path) == False:
-        with open(full_data_file_path, "wb") as f:
-            pickle.dump(obj, f, pickle.HIGHEST_PROTOCOL)
+    if _find_data_file(full_data_file_path) == None:
+        _write_data_file(
+            pickle.dumps(obj, pickle.HIGHEST_PROTOCOL), full_data_file_path, codec
+        )
         if json_save_needed:
             if type(obj) == dict:
                 full_json_data_file_path = directory_path + name + "_" + timestamp + ".json"
-                with open(full_json_data_file_path, 'w') as fp:
-                    json.dump(obj, fp)
+                _write_data_file(
+                    json.dumps(obj, default=record_to_dict).encode("utf-8"),
+                    full_json_data_file_path,
+                    codec,
+                )
             else:
                Logger.log(
                        "error", "FilePickling", "save_obj", "Data cannot be saved as json as its not a dict"
@@ -69,6 +257,7 @@ def save_obj(obj, name, directory, json_save_needed):
 def load_obj(name, directory):
     """
     Loads the .pkl file named `name` from `directory`
+    The codec it was saved with is detected from its extension
     
     Args:
         name (str) : name with which to load the .pkl file
@@ -77,9 +266,9 @@ def load_obj(name, directory):
     directory_path = os.getcwd() + "/" + directory + "/"
     timestamp = datetime.now().strftime("%Y-%m-%d")
     full_data_file_path = directory_path + name + "_" + timestamp + ".pkl"
-    if path.exists(full_data_file_path) == True:
-        with open(full_data_file_path, "rb") as f:
-            return pickle.load(f)
+    existing_data_file_path = _find_data_file(full_data_file_path)
+    if existing_data_file_path != None:
+        return _read_pickle(existing_data_file_path)
     else:
         raise IOError(full_data_file_path + " doesnt exist")
 
@@ -87,13 +276,16 @@ def load_obj(name, directory):
 def load_latest_obj(name, directory):
     """
     Loads the latest .pkl file from a book directory
+    The codec it was saved with is detected from its extension
     
     Args:
         name (str) : name with which to save the .pkl file
         directory (str) : name of the directory where the .pkl file is saved
     """
-    directory_path = os.getcwd() + "/" + directory + "/*.pkl"  # all pickle files
-    list_of_files = glob.glob(directory_path)
+    directory_path = os.getcwd() + "/" + directory + "/"
+    list_of_files = []
+    for codec_extension in CODEC_EXTENSIONS.values():
+        # all pickle files
+        list_of_files += glob.glob(directory_path + "*.pkl" + codec_extension)
     latest_file = max(list_of_files, key=os.path.getctime)
-    with open(latest_file, "rb") as f:
-        return pickle.load(f)
+    return _read_pickle(latest_file)
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: RatingMemo
+    :synopsis: Ratings of review snapshots keyed by their content so unchanged books are not rated again
+
+.. moduleauthor:: DivyenduDutta
+
+Every review run in the catalog - :mod:`FileUtil.Catalog` carries a digest of the likes
+and ratings of its reviews, computed when it is saved. The memo keeps the ratings keyed by
+that digest and the version of the ratings they were calculated by, so a book whose
+reviews did not change since they were rated is looked up without reading them, even when
+it was scraped again in the meantime eg, by a daily run. Bumping the version leaves every
+earlier rating unused.
+
+All the ratings are pickled to one small file read on first use and written back by
+`save` after the books are rated, not per book. Entries of other versions, entries not
+used for `max_age_days` and the least recently used ones over `max_entries` are dropped
+when it is written. A file that cannot be read is logged and replaced.
+
+- `RatingMemo.get(review_digest)`
+- `RatingMemo.put(book_name, review_digest, book_ratings)`
+- `RatingMemo.save()`
+"""
+import os
+import time
+import pickle
+import threading
+from os import path
+from YALogger.custom_logger import Logger
+
+DAY_SECONDS = 24 * 60 * 60
+
+
+class RatingMemo(object):
+    """
+    Ratings of review snapshots keyed by the digest of their reviews and the version of the ratings
+
+    Args:
+        memo_path (str) : path of the memo file relative to the current directory
+        model_version (int) : version of the ratings, ratings of another version are not used
+        enabled (bool) : when False nothing is read from or written to the memo
+        max_age_days (int) : days an entry is kept after it was last used, kept forever when None
+        max_entries (int) : most entries kept, the ones used last are kept. No limit when None
+    """
+
+    def __init__(
+        self, memo_path, model_version, enabled=True, max_age_days=None, max_entries=None
+    ):
+        self.memo_path = memo_path
+        self.model_version = model_version
+        self.enabled = enabled
+        self.max_age_days = max_age_days
+        self.max_entries = max_entries
+        # (review digest, model version) to book name, time last used and ratings, read on first use
+        self._entries = None
+        self._is_changed = False
+        self._lock = threading.Lock()
+
+    def get(self, review_digest):
+        """
+        Args:
+            review_digest (str) : digest of the reviews, see :func:`FileUtil.Catalog._review_digest`
+
+        Returns:
+            the ratings of the reviews or None if they were not rated before
+        """
+        if not self.enabled or review_digest == None:
+            return None
+        key = (review_digest, self.model_version)
+        with self._lock:
+            entry = self._load().get(key)
+            if entry == None:
+                return None
+            book_name, _, book_ratings = entry
+            self._entries[key] = (book_name, time.time(), book_ratings)
+            self._is_changed = True
+        return book_ratings
+
+    def put(self, book_name, review_digest, book_ratings):
+        """
+        Args:
+            book_name (str) : name of the book as in its directory, kept for logging
+            review_digest (str) : digest of the reviews, see :func:`FileUtil.Catalog._review_digest`
+            book_ratings : ratings of the reviews, has to be picklable
+        """
+        if not self.enabled or review_digest == None:
+            return
+        with self._lock:
+            self._load()[(review_digest, self.model_version)] = (
+                book_name,
+                time.time(),
+                book_ratings,
+            )
+            self._is_changed = True
+
+    def save(self):
+        """
+        Drops the entries due, see `_evict`, and writes the memo to its file
+        if anything changed since it was read
+        """
+        with self._lock:
+            if not self.enabled or self._entries == None:
+                return
+            self._evict(time.time())
+            if not self._is_changed:
+                return
+            memo_directory = path.dirname(path.abspath(self.memo_path))
+            if not path.exists(memo_directory):
+                os.makedirs(memo_directory)
+            temporary_path = self.memo_path + ".tmp"
+            with open(temporary_path, "wb") as f:
+                pickle.dump(self._entries, f, pickle.HIGHEST_PROTOCOL)
+            if path.exists(self.memo_path):
+                # os.rename does not replace an existing file on windows
+                os.remove(self.memo_path)
+            os.rename(temporary_path, self.memo_path)
+            self._is_changed = False
+
+    def _evict(self, now):
+        """
+        Drops the entries of other versions, the ones not used for `max_age_days`
+        and the least recently used ones over `max_entries`, to be called with the lock held
+
+        Args:
+            now (float) : seconds since the epoch the ages are counted to
+        """
+        entry_count = len(self._entries)
+        for key, (_, used_at, _) in list(self._entries.items()):
+            if key[1] != self.model_version or (
+                self.max_age_days != None
+                and now - used_at > self.max_age_days * DAY_SECONDS
+            ):
+                del self._entries[key]
+        if self.max_entries != None and len(self._entries) > self.max_entries:
+            keys_by_use = sorted(
+                self._entries, key=lambda key: self._entries[key][1], reverse=True
+            )
+            for key in keys_by_use[self.max_entries :]:
+                del self._entries[key]
+        if len(self._entries) != entry_count:
+            self._is_changed = True
+            Logger.log(
+                "info",
+                "RatingMemo",
+                "_evict",
+                "Dropped "
+                + str(entry_count - len(self._entries))
+                + " ratings from "
+                + self.memo_path,
+            )
+
+    def _load(self):
+        """
+        Reads the memo file on first use, to be called with the lock held
+
+        Returns:
+            dict : (review digest, model version) to book name, time last used and ratings
+        """
+        if self._entries == None:
+            self._entries = {}
+            try:
+                with open(self.memo_path, "rb") as f:
+                    entries = pickle.load(f)
+                if not isinstance(entries, dict):
+                    raise ValueError("not a rating memo")
+                self._entries = entries
+            except (
+                IOError,
+                OSError,
+                EOFError,
+                pickle.UnpicklingError,
+                ValueError,
+                TypeError,
+                AttributeError,
+                ImportError,
+                IndexError,
+                KeyError,
+            ) as e:
+                if path.exists(self.memo_path):
+                    # written again on the next save
+                    self._is_changed = True
+                    Logger.log(
+                        "error",
+                        "RatingMemo",
+                        "_load",
+                        "Could not read " + self.memo_path + " -->" + repr(e),
+                    )
+        return self._entries
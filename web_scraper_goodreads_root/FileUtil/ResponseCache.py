@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: ResponseCache
+    :synopsis: On disk cache of fetched pages so re-runs dont hit goodreads.com again
+
+.. moduleauthor:: DivyenduDutta
+
+Every entry is pickled to its own file named after the sha1 of the URL and page number.
+The file's modification time is bumped whenever the entry is read so the least recently
+used entries are evicted first once the cache grows above its size limit.
+
+- `ResponseCache.get(url, page_number)`
+- `ResponseCache.put(url, page_number, value)`
+- `ResponseCache.clear()`
+"""
+import os
+import time
+import pickle
+import hashlib
+import threading
+from CommonConstants.Constants import (
+    RESPONSE_CACHE_DIRECTORY,
+    RESPONSE_CACHE_TTL,
+    RESPONSE_CACHE_MAX_SIZE,
+    RESPONSE_CACHE_ONLY,
+)
+from YALogger.custom_logger import Logger
+
+CACHE_FILE_EXTENSION = ".pkl"
+
+
+class CacheMissError(IOError):
+    """
+    Raised in cache only mode when a page has not been cached
+    """
+
+    pass
+
+
+class ResponseCache(object):
+    """
+    Size bounded LRU cache of fetched pages with an expiry time
+
+    Args:
+        cache_directory (str) : directory (relative to the current directory) holding the cache
+        ttl (int) : seconds after which an entry is stale, None to never expire
+        max_size (int) : bytes the cache can take on disk before evicting entries
+        cache_only (bool) : never fetch, a page missing from the cache raises `CacheMissError`
+        enabled (bool) : when False nothing is read from or written to the cache
+    """
+
+    def __init__(
+        self, cache_directory, ttl, max_size, cache_only=False, enabled=True
+    ):
+        self.cache_directory = cache_directory
+        self.ttl = ttl
+        self.max_size = max_size
+        self.cache_only = cache_only
+        self.enabled = enabled
+        self._total_size = None  # counted on first write
+        self._lock = threading.Lock()
+
+    def get(self, url, page_number):
+        """
+        Reads a page from the cache
+
+        Args:
+            url (str) : URL the page was fetched from
+            page_number (int) : page number of the page
+
+        Returns:
+            the cached value or None if it is not cached or has expired
+        """
+        if not self.enabled:
+            return None
+        entry_path = self._entry_path(url, page_number)
+        with self._lock:
+            try:
+                with open(entry_path, "rb") as f:
+                    cached_at, value = pickle.load(f)
+                if self.ttl != None and time.time() - cached_at > self.ttl:
+                    value = None
+                else:
+                    os.utime(entry_path, None)  # mark as recently used
+            except (
+                IOError,
+                OSError,
+                EOFError,
+                pickle.UnpicklingError,
+                ValueError,
+                TypeError,
+                AttributeError,
+                ImportError,
+                IndexError,
+                KeyError,
+            ):
+                # a torn or corrupt entry is fetched again
+                value = None
+        if value == None and self.cache_only:
+            raise CacheMissError(
+                url + " page " + str(page_number) + " is not in the cache"
+            )
+        return value
+
+    def put(self, url, page_number, value):
+        """
+        Writes a page to the cache and evicts the least recently used entries
+        if the cache has grown above `max_size`
+
+        Args:
+            url (str) : URL the page was fetched from
+            page_number (int) : page number of the page
+            value : page to cache, has to be picklable
+        """
+        if not self.enabled:
+            return
+        cache_directory_path = self._cache_directory_path()
+        entry_path = self._entry_path(url, page_number)
+        with self._lock:
+            if not os.path.exists(cache_directory_path):
+                os.makedirs(cache_directory_path)
+            if self._total_size == None:
+                self._total_size = sum(
+                    size for _, size, _ in self._list_entries(cache_directory_path)
+                )
+            if os.path.exists(entry_path):
+                self._total_size -= os.path.getsize(entry_path)
+            with open(entry_path, "wb") as f:
+                pickle.dump((time.time(), value), f, pickle.HIGHEST_PROTOCOL)
+            self._total_size += os.path.getsize(entry_path)
+            if self._total_size > self.max_size:
+                self._evict(cache_directory_path)
+
+    def clear(self):
+        """
+        Removes every entry from the cache
+        """
+        cache_directory_path = self._cache_directory_path()
+        with self._lock:
+            if os.path.exists(cache_directory_path):
+                for _, _, entry_path in self._list_entries(cache_directory_path):
+                    os.remove(entry_path)
+            self._total_size = 0
+
+    def _cache_directory_path(self):
+        """
+        Returns:
+            str : path of the cache directory
+        """
+        return os.getcwd() + "/" + self.cache_directory + "/"
+
+    def _entry_path(self, url, page_number):
+        """
+        Builds the file path of an entry from the sha1 of its URL and page number
+
+        Args:
+            url (str) : URL the page was fetched from
+            page_number (int) : page number of the page
+
+        Returns:
+            str : path of the entry
+        """
+        key = (url + "#" + str(page_number)).encode("utf-8")
+        return (
+            self._cache_directory_path()
+            + hashlib.sha1(key).hexdigest()
+            + CACHE_FILE_EXTENSION
+        )
+
+    def _list_entries(self, cache_directory_path):
+        """
+        Lists the entries of the cache
+
+        Args:
+            cache_directory_path (str) : path of the cache directory
+
+        Returns:
+            list : last used time, size and path of each entry
+        """
+        entries = []
+        for file_name in os.listdir(cache_directory_path):
+            if file_name.endswith(CACHE_FILE_EXTENSION):
+                entry_path = cache_directory_path + file_name
+                entry_stat = os.stat(entry_path)
+                entries.append((entry_stat.st_mtime, entry_stat.st_size, entry_path))
+        return entries
+
+    def _evict(self, cache_directory_path):
+        """
+        Removes the least recently used entries till the cache fits in `max_size`
+        To be called with the lock held
+
+        Args:
+            cache_directory_path (str) : path of the cache directory
+        """
+        entries = sorted(self._list_entries(cache_directory_path))
+        self._total_size = sum(size for _, size, _ in entries)
+        for _, size, entry_path in entries:
+            if self._total_size <= self.max_size:
+                break
+            os.remove(entry_path)
+            self._total_size -= size
+        Logger.log(
+            "info",
+            "ResponseCache",
+            "_evict",
+            "Evicted cache entries, cache size is now " + str(self._total_size),
+        )
+
+
+# cache used by GenreScraper, SiteNavigator and HttpNavigator
+response_cache = ResponseCache(
+    RESPONSE_CACHE_DIRECTORY,
+    RESPONSE_CACHE_TTL,
+    RESPONSE_CACHE_MAX_SIZE,
+    cache_only=RESPONSE_CACHE_ONLY,
+)
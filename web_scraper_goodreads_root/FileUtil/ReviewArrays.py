@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: ReviewArrays
+    :synopsis: Fixed width binary file of the latest reviews of a book, opened as a memory mapped numpy array
+
+.. moduleauthor:: DivyenduDutta
+
+`Data/<book name>/book_review_details.reviews` holds a 24 byte header followed by one
+25 byte record per review with the columns of :data:`FileUtil.ColumnarReviews.REVIEW_DTYPE`,
+little endian and unpadded. Opening it maps the records straight into a read only numpy
+array, nothing is read or decoded till a column is used, so going over hundreds of
+books costs little more than reading their likes and ratings from disk.
+
+The file always holds the latest snapshot of the book, it is replaced whole on every save.
+It is only a read cache of :mod:`FileUtil.Catalog`, which holds the canonical reviews, and
+:meth:`FileUtil.BookCatalog.BookCatalog._open_latest_reviews` writes it again from the
+catalog when it is missing or older than the latest snapshot in the catalog eg, after
+a crash between the two saves or a `migrate_data_tree`. Any map of it kept open has to
+be dropped before it is replaced, windows does not allow replacing a file that is mapped.
+
+- `_review_array_path(book_name)`
+- `save_review_array(book_review_details, book_name)`
+- `open_review_array(book_name, saved_after)`
+"""
+import os
+import time
+from os import path
+import numpy as np
+from FileUtil.ColumnarReviews import REVIEW_DTYPE, reviews_to_columns
+
+REVIEW_ARRAY_FILE_NAME = "book_review_details.reviews"
+REVIEW_ARRAY_MAGIC = b"GRRV"
+REVIEW_ARRAY_VERSION = 2  # 2 added review_id
+HEADER_DTYPE = np.dtype(
+    [
+        ("magic", "S4"),
+        ("version", "<u2"),
+        ("record_size", "<u2"),
+        ("record_count", "<u8"),
+        ("saved_at", "<f8"),  # seconds since the epoch
+    ]
+)
+RECORD_DTYPE = REVIEW_DTYPE.newbyteorder("<")
+
+
+def _review_array_path(book_name):
+    """
+    Args:
+        book_name (str) : name of the book
+
+    Returns:
+        str : path of the review array of the book
+    """
+    return os.getcwd() + "/Data/" + book_name + "/" + REVIEW_ARRAY_FILE_NAME
+
+
+def save_review_array(book_review_details, book_name):
+    """
+    Writes the reviews of a book to its review array, replacing the earlier one
+    The file is written next to it first and moved over it so a reader never sees half a file
+
+    Args:
+        book_review_details (dict or numpy structured array) : review details of the book
+        book_name (str) : name of the book
+    """
+    if isinstance(book_review_details, dict):
+        book_review_details = reviews_to_columns(book_review_details)
+    records = np.asarray(book_review_details, dtype=RECORD_DTYPE)
+    header = np.zeros(1, dtype=HEADER_DTYPE)
+    header["magic"] = REVIEW_ARRAY_MAGIC
+    header["version"] = REVIEW_ARRAY_VERSION
+    header["record_size"] = RECORD_DTYPE.itemsize
+    header["record_count"] = len(records)
+    header["saved_at"] = time.time()
+
+    review_array_path = _review_array_path(book_name)
+    if not path.exists(path.dirname(review_array_path)):
+        os.makedirs(path.dirname(review_array_path))
+    temporary_path = review_array_path + ".tmp"
+    with open(temporary_path, "wb") as f:
+        f.write(header.tobytes())
+        f.write(records.tobytes())
+    if path.exists(review_array_path):
+        # os.rename does not replace an existing file on windows
+        os.remove(review_array_path)
+    os.rename(temporary_path, review_array_path)
+
+
+def open_review_array(book_name, saved_after=None):
+    """
+    Memory maps the review array of a book
+    An array saved before `saved_after` is stale eg, the scraper stopped between saving the
+    reviews to the catalog and to the array, and raises IOError like a missing one
+
+    Args:
+        book_name (str) : name of the book
+        saved_after (float) : seconds since the epoch the array has to be saved at or after,
+            usually when the latest snapshot of the book was taken. Not checked when None
+
+    Returns:
+        numpy structured array : read only view of the reviews with `REVIEW_DTYPE` columns
+    """
+    review_array_path = _review_array_path(book_name)
+    if not path.exists(review_array_path):
+        raise IOError(review_array_path + " doesnt exist")
+    header = np.fromfile(review_array_path, dtype=HEADER_DTYPE, count=1)
+    if (
+        len(header) != 1
+        or header["magic"][0] != REVIEW_ARRAY_MAGIC
+        or header["version"][0] != REVIEW_ARRAY_VERSION
+        or header["record_size"][0] != RECORD_DTYPE.itemsize
+    ):
+        raise IOError(review_array_path + " is not a review array")
+    if saved_after != None and header["saved_at"][0] < saved_after:
+        raise IOError(review_array_path + " is older than the catalog")
+    record_count = int(header["record_count"][0])
+    if record_count == 0:
+        # an empty range cannot be memory mapped
+        return np.empty(0, dtype=RECORD_DTYPE)
+    return np.memmap(
+        review_array_path,
+        dtype=RECORD_DTYPE,
+        mode="r",
+        offset=HEADER_DTYPE.itemsize,
+        shape=(record_count,),
+    )
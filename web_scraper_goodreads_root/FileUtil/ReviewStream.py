@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: ReviewStream
+    :synopsis: Append only NDJSON file the reviews of a book are written to page by page while scraping
+
+.. moduleauthor:: DivyenduDutta
+
+Every review is one JSON line of `Checkpoints/<book name>.ndjson` and every page ends
+with a `page_end` line, so the file doubles as the checkpoint a retry resumes from.
+Only the pages with their `page_end` line are read back, anything written after the
+last one is cut off before appending again.
+
+The writer keeps the reviews in memory only as the typed columns of
+:mod:`FileUtil.ColumnarReviews`, a few bytes per review, instead of a dict per review.
+
+- `_review_stream_path(book_name)`
+- `ReviewStreamWriter.write_page(page_number, page_review_details)`
+- `ReviewStreamWriter.columns()`
+- `ReviewStreamWriter.close()`
+- `remove_review_stream(book_name)`
+"""
+import os
+import json
+from os import path
+import numpy as np
+from CommonConstants.Constants import CHECKPOINT_DIRECTORY
+from FileUtil.ColumnarReviews import REVIEW_DTYPE, reviews_to_columns
+from Records import as_review
+from YALogger.custom_logger import Logger
+
+STREAM_FILE_EXTENSION = ".ndjson"
+
+
+def _review_stream_path(book_name):
+    """
+    Args:
+        book_name (str) : name of the book
+
+    Returns:
+        str : path of the review stream of the book
+    """
+    return (
+        os.getcwd()
+        + "/"
+        + CHECKPOINT_DIRECTORY
+        + "/"
+        + book_name
+        + STREAM_FILE_EXTENSION
+    )
+
+
+class ReviewStreamWriter(object):
+    """
+    Writes the reviews of a book to its review stream a page at a time
+
+    Args:
+        book_name (str) : name of the book
+        resume (bool) : keep the pages already in the stream, otherwise the stream is started over
+    """
+
+    def __init__(self, book_name, resume=False):
+        self.book_name = book_name
+        self.stream_path = _review_stream_path(book_name)
+        self.last_page = 0  # last page written completely
+        self.review_count = 0
+        self._page_columns = []  # typed columns of each page
+        stream_directory = path.dirname(self.stream_path)
+        if not path.exists(stream_directory):
+            os.makedirs(stream_directory)
+        if resume and path.exists(self.stream_path):
+            self._read_complete_pages()
+        elif path.exists(self.stream_path):
+            os.remove(self.stream_path)
+        self._stream_file = open(self.stream_path, "ab")
+
+    def write_page(self, page_number, page_review_details):
+        """
+        Appends the reviews of a page followed by its `page_end` line
+
+        Args:
+            page_number (int) : review page the reviews were scraped from
+            page_review_details (dict) : review details of that page only as built by
+            :func:`BookReviews._retrieve_book_review_details_per_page`, reviews without
+            a rating are skipped
+        """
+        page_reviews = [
+            as_review(page_review_details[review_index])
+            for review_index in sorted(page_review_details)
+        ]
+        page_reviews = [review for review in page_reviews if review.review_rating != 0]
+        lines = []
+        for review in page_reviews:
+            review_line = review.to_dict()
+            review_line["page"] = page_number
+            lines.append(json.dumps(review_line, sort_keys=True))
+        lines.append(
+            json.dumps(
+                {
+                    "page_end": page_number,
+                    "review_count": self.review_count + len(page_reviews),
+                },
+                sort_keys=True,
+            )
+        )
+        self._stream_file.write(("\n".join(lines) + "\n").encode("utf-8"))
+        self._stream_file.flush()
+        self._page_columns.append(
+            reviews_to_columns(dict(enumerate(page_reviews)))
+        )
+        self.last_page = page_number
+        self.review_count += len(page_reviews)
+
+    def columns(self):
+        """
+        Returns:
+            numpy structured array : reviews written so far with
+            :data:`FileUtil.ColumnarReviews.REVIEW_DTYPE`
+        """
+        if len(self._page_columns) == 0:
+            return np.empty(0, dtype=REVIEW_DTYPE)
+        if len(self._page_columns) > 1:
+            # merged once so repeated calls dont copy again
+            self._page_columns = [np.concatenate(self._page_columns)]
+        return self._page_columns[0]
+
+    def close(self):
+        """
+        Closes the stream, it stays on disk till `remove_review_stream` is called
+        """
+        self._stream_file.close()
+
+    def _read_complete_pages(self):
+        """
+        Reads back the pages written completely by an earlier attempt and
+        cuts off anything written after the last `page_end` line
+        """
+        page_reviews = []
+        complete_size = 0
+        read_size = 0
+        with open(self.stream_path, "rb") as f:
+            for line in f:
+                read_size += len(line)
+                try:
+                    record = json.loads(line.decode("utf-8"))
+                except ValueError:
+                    break  # line was being written when the scraper stopped
+                if "page_end" in record:
+                    self._page_columns.append(
+                        reviews_to_columns(dict(enumerate(page_reviews)))
+                    )
+                    page_reviews = []
+                    self.last_page = record["page_end"]
+                    self.review_count = record["review_count"]
+                    complete_size = read_size
+                else:
+                    del record["page"]
+                    page_reviews.append(record)
+        with open(self.stream_path, "ab") as f:
+            f.truncate(complete_size)
+        Logger.log(
+            "info",
+            "ReviewStream",
+            "_read_complete_pages",
+            "Read "
+            + str(self.last_page)
+            + " review pages of "
+            + self.book_name
+            + " from its review stream",
+        )
+
+
+def remove_review_stream(book_name):
+    """
+    Removes the review stream of a book, done once the book is saved
+
+    Args:
+        book_name (str) : name of the book
+    """
+    stream_path = _review_stream_path(book_name)
+    if path.exists(stream_path):
+        os.remove(stream_path)
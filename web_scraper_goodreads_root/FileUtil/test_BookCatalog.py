@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: test_BookCatalog
+    :synopsis: Regression tests of the filters of BookCatalog and of the reviews it keeps open
+
+.. moduleauthor:: DivyenduDutta
+
+The books are saved to a catalog and review arrays in a temporary current directory.
+Reads of the reviews are counted by wrapping `_open_latest_reviews` of the book catalog.
+
+Run from `web_scraper_goodreads_root` with ``python -m pytest FileUtil/test_BookCatalog.py``
+or ``python -m unittest FileUtil.test_BookCatalog``.
+"""
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from FileUtil.Catalog import (
+    Catalog,
+    REVIEW_SNAPSHOT_NAME,
+    BOOK_LIST_SNAPSHOT_NAME,
+    _today,
+)
+from FileUtil.BookCatalog import BookCatalog
+from FileUtil.ColumnarReviews import REVIEW_DTYPE
+from Records import Book
+
+GENRE = "science-fiction"
+BOOK_NAMES = ["1_Dune", "2_Hyperion", "3_Solaris", "4_Ubik"]
+REVIEW_COUNTS = [3, 5, 0, 2]
+
+
+def _build_reviews(review_count, review_likes=0):
+    """
+    Args:
+        review_count (int) : number of reviews
+        review_likes (int) : likes of every review
+
+    Returns:
+        numpy structured array : reviews with `REVIEW_DTYPE`
+    """
+    reviews = np.zeros(review_count, dtype=REVIEW_DTYPE)
+    reviews["review_id"] = np.arange(1, review_count + 1)
+    reviews["review_likes"] = review_likes
+    reviews["review_rating"] = 4
+    reviews["review_date"] = 1570000000
+    return reviews
+
+
+class BookCatalogTest(unittest.TestCase):
+    def setUp(self):
+        self.working_directory = os.getcwd()
+        # review arrays are written under the current directory
+        self.data_directory = tempfile.mkdtemp()
+        os.chdir(self.data_directory)
+        self.catalog = Catalog(os.path.join("Data", "catalog.sqlite3"))
+        book_details = {}
+        for book_index, book_name in enumerate(BOOK_NAMES):
+            book_details[book_index] = Book(
+                book_name=book_name.split("_")[1],
+                book_URL="https://www.goodreads.com/book/show/"
+                + book_name.replace("_", "."),
+            )
+            if REVIEW_COUNTS[book_index] > 0:
+                self.catalog.save_reviews(
+                    _build_reviews(REVIEW_COUNTS[book_index]),
+                    REVIEW_SNAPSHOT_NAME,
+                    "Data/" + book_name,
+                )
+        self.catalog.save_obj(
+            book_details, BOOK_LIST_SNAPSHOT_NAME, "Data", genre=GENRE
+        )
+        self.opened_book_names = []
+
+    def tearDown(self):
+        if self.catalog._connection != None:
+            self.catalog._connection.close()
+        os.chdir(self.working_directory)
+        shutil.rmtree(self.data_directory, ignore_errors=True)
+
+    def _build_book_catalog(self, cache_size):
+        """
+        Returns:
+            BookCatalog : book catalog recording the books whose reviews it reads
+        """
+        book_catalog = BookCatalog(self.catalog, cache_size=cache_size)
+        open_latest_reviews = book_catalog._open_latest_reviews
+
+        def _open_latest_reviews(book_name):
+            self.opened_book_names.append(book_name)
+            return open_latest_reviews(book_name)
+
+        book_catalog._open_latest_reviews = _open_latest_reviews
+        return book_catalog
+
+    def test_books_of_a_genre(self):
+        book_entries = list(
+            self._build_book_catalog(2).books(genre=GENRE, listed_on=_today())
+        )
+        self.assertEqual(
+            [book_entry.book_name for book_entry in book_entries], BOOK_NAMES
+        )
+        self.assertEqual(
+            [book_entry.shelf_rank for book_entry in book_entries], [0, 1, 2, 3]
+        )
+        self.assertEqual(
+            [book_entry.review_count for book_entry in book_entries],
+            [3, 5, None, 2],
+        )
+        self.assertEqual(book_entries[1].book.book_name, "Hyperion")
+        self.assertEqual(list(self._build_book_catalog(2).books(genre="fantasy")), [])
+        self.assertEqual(self.opened_book_names, [])
+
+    def test_books_with_enough_reviews(self):
+        self.assertEqual(
+            [
+                book_entry.book_name
+                for book_entry in self._build_book_catalog(2).books(min_reviews=3)
+            ],
+            ["1_Dune", "2_Hyperion"],
+        )
+
+    def test_reviews_are_read_once(self):
+        book_catalog = self._build_book_catalog(2)
+        for _ in range(3):
+            book_entry = next(book_catalog.books(min_reviews=1))
+            self.assertEqual(len(book_entry.reviews()), REVIEW_COUNTS[0])
+        self.assertEqual(self.opened_book_names, ["1_Dune"])
+
+    def test_least_recently_used_book_is_dropped(self):
+        book_catalog = self._build_book_catalog(2)
+        for book_name in ["1_Dune", "2_Hyperion", "1_Dune", "4_Ubik", "1_Dune"]:
+            book_catalog.reviews(book_name)
+        # Hyperion was used least recently when Ubik was opened
+        self.assertEqual(self.opened_book_names, ["1_Dune", "2_Hyperion", "4_Ubik"])
+        book_catalog.reviews("2_Hyperion")
+        self.assertEqual(self.opened_book_names[-1], "2_Hyperion")
+        self.assertEqual(
+            list(book_catalog._open_reviews),
+            [("1_Dune", None), ("2_Hyperion", None)],
+        )
+
+    def test_nothing_is_kept_without_a_cache(self):
+        book_catalog = self._build_book_catalog(0)
+        book_catalog.reviews("1_Dune")
+        book_catalog.reviews("1_Dune")
+        self.assertEqual(self.opened_book_names, ["1_Dune", "1_Dune"])
+        self.assertEqual(len(book_catalog._open_reviews), 0)
+
+    def test_reviews_as_of_a_day_are_kept_apart(self):
+        book_catalog = self._build_book_catalog(4)
+        latest_reviews = book_catalog.reviews("1_Dune")
+        reviews_as_of_today = book_catalog.reviews("1_Dune", _today())
+        self.assertIsNot(reviews_as_of_today, latest_reviews)
+        self.assertIs(book_catalog.reviews("1_Dune", _today()), reviews_as_of_today)
+        self.assertEqual(reviews_as_of_today.tolist(), latest_reviews.tolist())
+        self.assertEqual(len(self.opened_book_names), 1)
+
+    def test_forgotten_book_is_read_again(self):
+        book_catalog = self._build_book_catalog(4)
+        book_catalog.reviews("1_Dune")
+        book_catalog.reviews("1_Dune", _today())
+        book_catalog.reviews("2_Hyperion")
+        # scraped again later the same day, in place of the first run
+        with self.catalog._connect() as connection:
+            connection.execute(
+                "DELETE FROM review_deltas WHERE run_id IN"
+                " (SELECT run_id FROM scrape_runs WHERE directory = 'Data/1_Dune')"
+            )
+            connection.execute(
+                "DELETE FROM scrape_runs WHERE directory = 'Data/1_Dune'"
+            )
+        self.catalog.save_reviews(
+            _build_reviews(4, review_likes=7), REVIEW_SNAPSHOT_NAME, "Data/1_Dune"
+        )
+        book_catalog.forget("1_Dune")
+
+        self.assertEqual(list(book_catalog._open_reviews), [("2_Hyperion", None)])
+        self.assertEqual(
+            book_catalog.reviews("1_Dune").tolist(),
+            _build_reviews(4, review_likes=7).tolist(),
+        )
+        self.assertEqual(self.opened_book_names, ["1_Dune", "2_Hyperion", "1_Dune"])
+
+
+if __name__ == "__main__":
+    unittest.main()
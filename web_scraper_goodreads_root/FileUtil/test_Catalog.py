@@ -0,0 +1,383 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: test_Catalog
+    :synopsis: Regression tests of the snapshots, migration, review deltas, review digests, compaction and as of reads of FileUtil.Catalog
+
+.. moduleauthor:: DivyenduDutta
+
+Run from `web_scraper_goodreads_root` with ``python -m pytest FileUtil/test_Catalog.py``
+or ``python -m unittest FileUtil.test_Catalog``.
+"""
+import os
+import time
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from FileUtil import FilePicking, ColumnarReviews
+from FileUtil.Catalog import Catalog, REVIEW_SNAPSHOT_NAME, _today
+from FileUtil.ColumnarReviews import REVIEW_DTYPE, columns_to_reviews
+from Records import Review
+
+BOOK_DIRECTORY = "Data/1_Dune"
+PROCESSED_DIRECTORY = "Data/processed book rating info"
+DAY_SECONDS = 24 * 60 * 60
+
+
+def _build_reviews(review_ids, review_likes, review_rating=4):
+    """
+    Args:
+        review_ids (list) : goodreads ids of the reviews
+        review_likes (list) : likes of each review
+        review_rating (int) : rating of every review
+
+    Returns:
+        numpy structured array : reviews with `REVIEW_DTYPE`
+    """
+    reviews = np.zeros(len(review_ids), dtype=REVIEW_DTYPE)
+    reviews["review_id"] = review_ids
+    reviews["review_likes"] = review_likes
+    reviews["review_rating"] = review_rating
+    reviews["review_date"] = 1570000000
+    return reviews
+
+
+class CatalogReviewHistoryTest(unittest.TestCase):
+    def setUp(self):
+        self.catalog_directory = tempfile.mkdtemp()
+        self.catalog = Catalog(os.path.join(self.catalog_directory, "catalog.sqlite3"))
+        self.first_scraped_at = time.time() - 10 * DAY_SECONDS
+
+    def tearDown(self):
+        if self.catalog._connection != None:
+            self.catalog._connection.close()
+        shutil.rmtree(self.catalog_directory, ignore_errors=True)
+
+    def _save_reviews_on_day(self, reviews, day_index):
+        """
+        Saves the reviews as the run of the `day_index`-th day after the first run
+        """
+        scraped_at = self.first_scraped_at + day_index * DAY_SECONDS
+        scraped_on = time.strftime("%Y-%m-%d", time.localtime(scraped_at))
+        with self.catalog._lock:
+            self.catalog._save_run(
+                reviews,
+                REVIEW_SNAPSHOT_NAME,
+                BOOK_DIRECTORY,
+                scraped_at,
+                None,
+                scraped_on,
+            )
+        return scraped_on
+
+    def _review_runs(self):
+        """
+        Returns:
+            list : run id, base run id and number of delta rows of every review run, oldest first
+        """
+        return (
+            self.catalog._connect()
+            .execute(
+                "SELECT r.run_id, r.base_run_id,"
+                " (SELECT COUNT(*) FROM review_deltas d WHERE d.run_id = r.run_id)"
+                " FROM scrape_runs r WHERE r.name = ? ORDER BY r.scraped_at",
+                (REVIEW_SNAPSHOT_NAME,),
+            )
+            .fetchall()
+        )
+
+    def assertSameReviews(self, reviews, expected_reviews):
+        expected_reviews = np.sort(expected_reviews, order="review_id")
+        self.assertEqual(reviews.tolist(), expected_reviews.tolist())
+
+    def test_later_run_only_stores_what_changed(self):
+        first_reviews = _build_reviews([1, 2, 3, 4, 5, 6], [0, 1, 2, 3, 4, 5])
+        # review 2 got a like, review 6 was deleted and review 7 was added
+        second_reviews = _build_reviews([7, 1, 2, 3, 4, 5], [0, 0, 9, 2, 3, 4])
+        self._save_reviews_on_day(first_reviews, 0)
+        self._save_reviews_on_day(second_reviews, 1)
+
+        (first_run_id, first_base_run_id, first_row_count), (
+            second_run_id,
+            second_base_run_id,
+            second_row_count,
+        ) = self._review_runs()
+        self.assertEqual(first_base_run_id, first_run_id)
+        self.assertEqual(first_row_count, 6)
+        self.assertEqual(second_base_run_id, first_run_id)
+        self.assertEqual(second_row_count, 3)  # changed, added and removed
+        self.assertSameReviews(
+            self.catalog.load_latest_reviews(REVIEW_SNAPSHOT_NAME, BOOK_DIRECTORY),
+            second_reviews,
+        )
+
+    def test_run_changing_most_reviews_starts_a_new_base(self):
+        self._save_reviews_on_day(_build_reviews([1, 2, 3, 4], [0, 1, 2, 3]), 0)
+        self._save_reviews_on_day(_build_reviews([1, 2, 3, 4], [5, 6, 7, 8]), 1)
+
+        second_run_id, second_base_run_id, second_row_count = self._review_runs()[1]
+        self.assertEqual(second_base_run_id, second_run_id)
+        self.assertEqual(second_row_count, 4)
+
+    def test_reviews_read_as_of_a_day(self):
+        first_reviews = _build_reviews([1, 2, 3, 4], [0, 1, 2, 3])
+        second_reviews = _build_reviews([1, 2, 3, 4, 5], [0, 1, 2, 4, 0])
+        first_day = self._save_reviews_on_day(first_reviews, 0)
+        self._save_reviews_on_day(second_reviews, 2)
+        day_between = time.strftime(
+            "%Y-%m-%d", time.localtime(self.first_scraped_at + DAY_SECONDS)
+        )
+        day_before = time.strftime(
+            "%Y-%m-%d", time.localtime(self.first_scraped_at - DAY_SECONDS)
+        )
+
+        self.assertSameReviews(
+            self.catalog.load_reviews_as_of(
+                REVIEW_SNAPSHOT_NAME, BOOK_DIRECTORY, first_day
+            ),
+            first_reviews,
+        )
+        self.assertSameReviews(
+            self.catalog.load_reviews_as_of(
+                REVIEW_SNAPSHOT_NAME, BOOK_DIRECTORY, day_between
+            ),
+            first_reviews,
+        )
+        self.assertSameReviews(
+            self.catalog.load_latest_reviews(REVIEW_SNAPSHOT_NAME, BOOK_DIRECTORY),
+            second_reviews,
+        )
+        self.assertRaises(
+            IOError,
+            self.catalog.load_reviews_as_of,
+            REVIEW_SNAPSHOT_NAME,
+            BOOK_DIRECTORY,
+            day_before,
+        )
+
+    def _review_digests(self):
+        """
+        Returns:
+            list : review digest of every review run, oldest first
+        """
+        return [
+            row[0]
+            for row in self.catalog._connect().execute(
+                "SELECT review_digest FROM scrape_runs WHERE name = ? ORDER BY scraped_at",
+                (REVIEW_SNAPSHOT_NAME,),
+            )
+        ]
+
+    def test_review_digest_only_changes_with_likes_and_ratings(self):
+        reviews = _build_reviews([1, 2, 3, 4], [0, 1, 2, 3])
+        self._save_reviews_on_day(reviews, 0)
+        # scraped again in another order with other dates
+        rescraped_reviews = reviews[::-1].copy()
+        rescraped_reviews["review_date"] += DAY_SECONDS
+        self._save_reviews_on_day(rescraped_reviews, 1)
+        self._save_reviews_on_day(_build_reviews([1, 2, 3, 4], [0, 1, 2, 4]), 2)
+
+        review_digests = self._review_digests()
+        self.assertEqual(review_digests[0], review_digests[1])
+        self.assertNotEqual(review_digests[1], review_digests[2])
+
+    def test_review_digest_of_older_runs_is_filled(self):
+        self._save_reviews_on_day(_build_reviews([1, 2, 3, 4], [0, 1, 2, 3]), 0)
+        self._save_reviews_on_day(_build_reviews([1, 2, 3, 4, 5], [0, 1, 2, 3, 1]), 1)
+        review_digests = self._review_digests()
+        with self.catalog._connect() as connection:
+            connection.execute("UPDATE scrape_runs SET review_digest = NULL")
+        self.catalog._connection.close()
+        self.catalog._connection = None
+        self.assertEqual(self._review_digests(), review_digests)
+
+    def test_compaction_folds_the_history_before_a_day(self):
+        first_reviews = _build_reviews([1, 2, 3, 4], [0, 1, 2, 3])
+        second_reviews = _build_reviews([1, 2, 3, 4, 5], [0, 1, 2, 4, 0])
+        third_reviews = _build_reviews([1, 2, 3, 4, 5, 6], [0, 1, 2, 4, 1, 0])
+        first_day = self._save_reviews_on_day(first_reviews, 0)
+        second_day = self._save_reviews_on_day(second_reviews, 1)
+        third_day = self._save_reviews_on_day(third_reviews, 2)
+
+        self.assertEqual(self.catalog.compact_reviews(before=third_day), 1)
+
+        review_runs = self._review_runs()
+        self.assertEqual(len(review_runs), 2)
+        (second_run_id, second_base_run_id, second_row_count), (
+            _,
+            third_base_run_id,
+            _,
+        ) = review_runs
+        self.assertEqual(second_base_run_id, second_run_id)
+        self.assertEqual(second_row_count, len(second_reviews))
+        self.assertEqual(third_base_run_id, second_run_id)
+        self.assertRaises(
+            IOError,
+            self.catalog.load_reviews_as_of,
+            REVIEW_SNAPSHOT_NAME,
+            BOOK_DIRECTORY,
+            first_day,
+        )
+        self.assertSameReviews(
+            self.catalog.load_reviews_as_of(
+                REVIEW_SNAPSHOT_NAME, BOOK_DIRECTORY, second_day
+            ),
+            second_reviews,
+        )
+        self.assertSameReviews(
+            self.catalog.load_latest_reviews(REVIEW_SNAPSHOT_NAME, BOOK_DIRECTORY),
+            third_reviews,
+        )
+        # nothing left to fold
+        self.assertEqual(self.catalog.compact_reviews(before=third_day), 0)
+
+
+class CatalogSnapshotTest(unittest.TestCase):
+    def setUp(self):
+        self.working_directory = os.getcwd()
+        # migrated files are read from Data under the current directory
+        self.data_directory = tempfile.mkdtemp()
+        os.chdir(self.data_directory)
+        os.mkdir("Data")
+        self.catalog = Catalog("catalog.sqlite3")
+
+    def tearDown(self):
+        if self.catalog._connection != None:
+            self.catalog._connection.close()
+        os.chdir(self.working_directory)
+        shutil.rmtree(self.data_directory, ignore_errors=True)
+
+    def _reopen(self):
+        """
+        Closes the database so the next call opens it again like a new run
+        """
+        self.catalog._connection.close()
+        self.catalog._connection = None
+
+    def _book_names(self):
+        return [
+            row[0]
+            for row in self.catalog._connect().execute(
+                "SELECT book_name FROM books ORDER BY book_name"
+            )
+        ]
+
+    def test_object_round_trip(self):
+        book_ratings = {"1_Dune": (4.25, 4.5)}
+        self.catalog.save_obj(book_ratings, "book_ratings", PROCESSED_DIRECTORY, True)
+        # like FilePicking a snapshot already saved today is kept
+        self.catalog.save_obj({}, "book_ratings", PROCESSED_DIRECTORY)
+        self.assertEqual(
+            self.catalog.load_obj("book_ratings", PROCESSED_DIRECTORY), book_ratings
+        )
+        self.assertEqual(
+            self.catalog.load_latest_obj("book_ratings", PROCESSED_DIRECTORY + "/"),
+            book_ratings,
+        )
+        self.assertRaises(
+            IOError, self.catalog.load_latest_obj, "book_ratings", BOOK_DIRECTORY
+        )
+        self.assertRaises(
+            IOError, self.catalog.load_reviews, "book_ratings", PROCESSED_DIRECTORY
+        )
+
+    def test_reviews_without_ids_keep_their_order(self):
+        book_review_details = {
+            0: Review(review_likes=3, review_rating=5, review_date="Feb 14, 2016"),
+            1: {"review_likes": 0, "review_rating": 1, "review_date": None},
+            2: Review(review_likes=9, review_rating=4),
+        }
+        self.catalog.save_reviews(
+            book_review_details, REVIEW_SNAPSHOT_NAME, BOOK_DIRECTORY
+        )
+        reviews = self.catalog.load_reviews(REVIEW_SNAPSHOT_NAME, BOOK_DIRECTORY)
+        self.assertEqual(reviews["review_likes"].tolist(), [3, 0, 9])
+        self.assertEqual(
+            self.catalog.load_obj(REVIEW_SNAPSHOT_NAME, BOOK_DIRECTORY),
+            columns_to_reviews(reviews),
+        )
+
+    def test_data_for_book_exists_current_date(self):
+        self.assertFalse(self.catalog.data_for_book_exists_current_date(BOOK_DIRECTORY))
+        self.catalog.save_reviews(
+            _build_reviews([1, 2], [0, 1]), REVIEW_SNAPSHOT_NAME, BOOK_DIRECTORY
+        )
+        for book_data_folder in [
+            BOOK_DIRECTORY,
+            BOOK_DIRECTORY + "/",
+            "/" + BOOK_DIRECTORY,
+        ]:
+            self.assertTrue(
+                self.catalog.data_for_book_exists_current_date(book_data_folder)
+            )
+        self.assertFalse(self.catalog.data_for_book_exists_current_date("Data/2_Emma"))
+        # only runs of an earlier day
+        with self.catalog._connect() as connection:
+            connection.execute("UPDATE scrape_runs SET scraped_on = '2019-10-27'")
+        self.assertFalse(self.catalog.data_for_book_exists_current_date(BOOK_DIRECTORY))
+
+    def test_migrate_data_tree(self):
+        reviews = _build_reviews([1, 2, 3], [0, 1, 2])
+        # midnight, as the dates of the pickled dicts are days
+        reviews["review_date"] = 1569974400
+        ColumnarReviews.save_reviews(reviews, REVIEW_SNAPSHOT_NAME, BOOK_DIRECTORY)
+        FilePicking.save_obj(
+            columns_to_reviews(reviews[:2]), REVIEW_SNAPSHOT_NAME, "Data/2_Emma", True
+        )
+        FilePicking.save_obj({"1_Dune": (4.0, 4.0)}, "book_ratings", "Data", False)
+        # saved on an earlier day
+        os.rename(
+            "Data/book_ratings_" + _today() + ".pkl", "Data/book_ratings_2019-10-27.pkl"
+        )
+
+        self.assertEqual(self.catalog.migrate_data_tree(), 3)
+        self.assertEqual(
+            self.catalog.load_reviews(REVIEW_SNAPSHOT_NAME, BOOK_DIRECTORY).tolist(),
+            reviews.tolist(),
+        )
+        self.assertEqual(
+            self.catalog.load_latest_reviews(
+                REVIEW_SNAPSHOT_NAME, "Data/2_Emma"
+            ).tolist(),
+            reviews[:2].tolist(),
+        )
+        self.assertEqual(
+            self.catalog.load_latest_obj("book_ratings", "Data"), {"1_Dune": (4.0, 4.0)}
+        )
+        self.assertEqual(
+            self.catalog._find_run("book_ratings", "Data", "2019-10-27")[0],
+            self.catalog._find_run("book_ratings", "Data")[0],
+        )
+        self.assertFalse(self.catalog.data_for_book_exists_current_date("Data"))
+        self.assertEqual(self._book_names(), ["1_Dune", "2_Emma"])
+        # the json copy is left alone and nothing is imported twice
+        self.assertEqual(self.catalog.migrate_data_tree(), 0)
+
+    def test_only_reviews_make_a_book(self):
+        self.catalog.save_obj(
+            {"1_Dune": (4.0, 4.0)}, "book_ratings", PROCESSED_DIRECTORY
+        )
+        self.catalog.save_reviews(
+            _build_reviews([1, 2], [0, 1]), REVIEW_SNAPSHOT_NAME, BOOK_DIRECTORY
+        )
+        self.assertEqual(self._book_names(), ["1_Dune"])
+
+    def test_non_book_rows_of_older_runs_are_removed(self):
+        self.catalog.save_obj(
+            {"1_Dune": (4.0, 4.0)}, "book_ratings", PROCESSED_DIRECTORY
+        )
+        # as saved before only reviews made books
+        with self.catalog._connect() as connection:
+            book_id = self.catalog._book_id(connection, "processed book rating info")
+            connection.execute("UPDATE scrape_runs SET book_id = ?", (book_id,))
+        self.assertEqual(self._book_names(), ["processed book rating info"])
+        self._reopen()
+        self.assertEqual(self._book_names(), [])
+        self.assertEqual(
+            self.catalog.load_obj("book_ratings", PROCESSED_DIRECTORY),
+            {"1_Dune": (4.0, 4.0)},
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
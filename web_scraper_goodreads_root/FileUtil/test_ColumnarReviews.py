@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: test_ColumnarReviews
+    :synopsis: Regression tests of converting reviews to typed columns and saving them as .npz files
+
+.. moduleauthor:: DivyenduDutta
+
+Run from `web_scraper_goodreads_root` with ``python -m pytest FileUtil/test_ColumnarReviews.py``
+or ``python -m unittest FileUtil.test_ColumnarReviews``.
+"""
+import os
+import glob
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from FileUtil.FilePicking import save_obj
+from FileUtil.ColumnarReviews import (
+    REVIEW_DTYPE,
+    MISSING_REVIEW_DATE,
+    COLUMNAR_FILE_EXTENSION,
+    _review_date_to_epoch,
+    _epoch_to_review_date,
+    reviews_to_columns,
+    columns_to_reviews,
+    save_reviews,
+    load_reviews,
+    load_latest_reviews,
+)
+from Records import Review, MISSING_REVIEW_ID
+
+BOOK_DIRECTORY = "Data/1_Dune"
+REVIEW_NAME = "1_Dune_reviews"
+
+
+def _build_book_review_details():
+    """
+    Returns:
+        dict : review details as built by :mod:`BookReviews`, one review without a date,
+        one as a dict like in older pickles and one saved before reviews had ids
+    """
+    return {
+        0: Review(
+            review_id=11, review_likes=1024, review_rating=5, review_date="Feb 14, 2016"
+        ),
+        1: Review(review_id=12, review_likes=0, review_rating=1),
+        2: {"review_likes": 3, "review_rating": 4, "review_date": "Dec 31, 2019"},
+        3: Review(
+            review_id=14, review_likes=7, review_rating=3, review_date="Jan 01, 2008"
+        ),
+    }
+
+
+class ColumnarReviewsTest(unittest.TestCase):
+    def setUp(self):
+        self.working_directory = os.getcwd()
+        # the .npz and .pkl files are written under the current directory
+        self.data_directory = tempfile.mkdtemp()
+        os.chdir(self.data_directory)
+        os.mkdir("Data")
+
+    def tearDown(self):
+        os.chdir(self.working_directory)
+        shutil.rmtree(self.data_directory, ignore_errors=True)
+
+    def test_review_dates(self):
+        review_date_epoch = _review_date_to_epoch("Feb 14, 2016")
+        self.assertEqual(review_date_epoch, 1455408000)
+        self.assertEqual(_epoch_to_review_date(review_date_epoch), "Feb 14, 2016")
+        self.assertEqual(_review_date_to_epoch(" Feb 14, 2016\n"), review_date_epoch)
+        for review_date in [None, "", "yesterday"]:
+            self.assertEqual(_review_date_to_epoch(review_date), MISSING_REVIEW_DATE)
+        self.assertEqual(_epoch_to_review_date(MISSING_REVIEW_DATE), None)
+
+    def test_columns(self):
+        review_columns = reviews_to_columns(_build_book_review_details())
+        self.assertEqual(review_columns.dtype, REVIEW_DTYPE)
+        self.assertEqual(
+            review_columns["review_id"].tolist(), [11, 12, MISSING_REVIEW_ID, 14]
+        )
+        self.assertEqual(review_columns["review_likes"].tolist(), [1024, 0, 3, 7])
+        self.assertEqual(review_columns["review_rating"].tolist(), [5, 1, 4, 3])
+        self.assertEqual(review_columns["review_date"][1], MISSING_REVIEW_DATE)
+
+    def test_columns_keep_the_order_of_the_review_index(self):
+        book_review_details = _build_book_review_details()
+        shuffled_review_details = {}
+        for review_index in [3, 0, 2, 1]:
+            shuffled_review_details[review_index * 10] = book_review_details[
+                review_index
+            ]
+        self.assertEqual(
+            reviews_to_columns(shuffled_review_details).tolist(),
+            reviews_to_columns(book_review_details).tolist(),
+        )
+
+    def test_round_trip(self):
+        book_review_details = _build_book_review_details()
+        expected_review_details = {}
+        for review_index, review in book_review_details.items():
+            review = Review.from_dict(review) if isinstance(review, dict) else review
+            expected_review_details[review_index] = dict(
+                (key, getattr(review, key)) for key in Review.__slots__
+            )
+        self.assertEqual(
+            columns_to_reviews(reviews_to_columns(book_review_details)),
+            expected_review_details,
+        )
+        self.assertEqual(reviews_to_columns({}).tolist(), [])
+        self.assertEqual(columns_to_reviews(np.empty(0, dtype=REVIEW_DTYPE)), {})
+
+    def test_save_and_load(self):
+        review_columns = reviews_to_columns(_build_book_review_details())
+        save_reviews(_build_book_review_details(), REVIEW_NAME, BOOK_DIRECTORY)
+        self.assertEqual(
+            load_reviews(REVIEW_NAME, BOOK_DIRECTORY).tolist(), review_columns.tolist()
+        )
+        self.assertEqual(
+            load_latest_reviews(REVIEW_NAME, BOOK_DIRECTORY).tolist(),
+            review_columns.tolist(),
+        )
+
+    def test_save_keeps_the_first_snapshot_of_the_day(self):
+        review_columns = reviews_to_columns(_build_book_review_details())
+        save_reviews(review_columns, REVIEW_NAME, BOOK_DIRECTORY)
+        save_reviews(review_columns[:1], REVIEW_NAME, BOOK_DIRECTORY)
+        self.assertEqual(
+            load_reviews(REVIEW_NAME, BOOK_DIRECTORY).tolist(), review_columns.tolist()
+        )
+
+    def test_file_without_review_ids(self):
+        review_columns = reviews_to_columns(_build_book_review_details())
+        save_reviews(review_columns, REVIEW_NAME, BOOK_DIRECTORY)
+        (file_path,) = glob.glob(BOOK_DIRECTORY + "/*" + COLUMNAR_FILE_EXTENSION)
+        # as saved before reviews had ids
+        with open(file_path, "wb") as f:
+            np.savez(
+                f,
+                review_likes=review_columns["review_likes"],
+                review_rating=review_columns["review_rating"],
+                review_date=review_columns["review_date"],
+            )
+        loaded_columns = load_reviews(REVIEW_NAME, BOOK_DIRECTORY)
+        self.assertEqual(loaded_columns["review_id"].tolist(), [MISSING_REVIEW_ID] * 4)
+        self.assertEqual(
+            loaded_columns["review_likes"].tolist(),
+            review_columns["review_likes"].tolist(),
+        )
+
+    def test_book_scraped_before_columns_is_read_from_its_pickle(self):
+        save_obj(_build_book_review_details(), REVIEW_NAME, BOOK_DIRECTORY, False)
+        self.assertEqual(
+            load_latest_reviews(REVIEW_NAME, BOOK_DIRECTORY).tolist(),
+            reviews_to_columns(_build_book_review_details()).tolist(),
+        )
+
+    def test_missing_snapshot(self):
+        self.assertRaises(IOError, load_reviews, REVIEW_NAME, BOOK_DIRECTORY)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: test_FilePicking
+    :synopsis: Regression tests of compressing pickles and telling their codec from the file extension or the data
+
+.. moduleauthor:: DivyenduDutta
+
+zstd and lz4 are only tested when their packages are installed.
+
+Run from `web_scraper_goodreads_root` with ``python -m pytest FileUtil/test_FilePicking.py``
+or ``python -m unittest FileUtil.test_FilePicking``.
+"""
+import os
+import gzip
+import json
+import pickle
+import shutil
+import tempfile
+import unittest
+from FileUtil import FilePicking
+from FileUtil.FilePicking import (
+    CODEC_EXTENSIONS,
+    _compress,
+    _decompress,
+    _check_codec_installed,
+    _codec_from_file_path,
+    _codec_from_data,
+    save_obj,
+    load_obj,
+    load_latest_obj,
+)
+from FileUtil.Catalog import _read_snapshot, _today
+from Records import Review
+
+BOOK_DIRECTORY = "Data/1_Dune"
+
+
+def _installed_codecs():
+    """
+    Returns:
+        list : codecs whose packages are installed
+    """
+    codecs = ["none", "gzip"]
+    if FilePicking.zstandard != None:
+        codecs.append("zstd")
+    if FilePicking.lz4_frame != None:
+        codecs.append("lz4")
+    return codecs
+
+
+def _build_book_review_details():
+    return {
+        0: Review(review_id=11, review_likes=3, review_rating=5),
+        1: Review(review_id=12, review_likes=0, review_rating=2),
+    }
+
+
+class CodecTest(unittest.TestCase):
+    def test_round_trip_and_sniffing(self):
+        data = pickle.dumps(_build_book_review_details(), pickle.HIGHEST_PROTOCOL) * 20
+        for codec in _installed_codecs():
+            compressed_data = _compress(data, codec)
+            self.assertEqual(_codec_from_data(compressed_data), codec)
+            self.assertEqual(_decompress(compressed_data, codec), data)
+            if codec != "none":
+                self.assertTrue(len(compressed_data) < len(data), codec)
+
+    def test_plain_pickles_are_not_mistaken_for_a_codec(self):
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            for obj in [_build_book_review_details(), {}, [], "", 0, None]:
+                self.assertEqual(
+                    _codec_from_data(pickle.dumps(obj, protocol)),
+                    "none",
+                    repr(obj) + " protocol " + str(protocol),
+                )
+        self.assertEqual(_codec_from_data(b""), "none")
+
+    def test_catalog_snapshots_of_any_codec_are_read(self):
+        # snapshots saved before PICKLE_CODEC was changed keep their codec
+        for codec in _installed_codecs():
+            snapshot = _compress(
+                pickle.dumps({"1_Dune": (4.0, 4.5)}, pickle.HIGHEST_PROTOCOL), codec
+            )
+            self.assertEqual(_read_snapshot(snapshot), {"1_Dune": (4.0, 4.5)})
+
+    def test_codec_from_file_path(self):
+        for codec, codec_extension in CODEC_EXTENSIONS.items():
+            file_path = "Data/1_Dune/reviews_2019-10-27.pkl" + codec_extension
+            self.assertEqual(_codec_from_file_path(file_path), codec)
+
+    def test_unknown_and_missing_codecs(self):
+        self.assertRaises(ValueError, _compress, b"data", "bzip2")
+        self.assertRaises(ValueError, _decompress, b"data", "bzip2")
+        self.assertRaises(ImportError, _check_codec_installed, "zstd", None)
+
+
+class SaveObjTest(unittest.TestCase):
+    def setUp(self):
+        self.working_directory = os.getcwd()
+        # the files are written under the current directory
+        self.data_directory = tempfile.mkdtemp()
+        os.chdir(self.data_directory)
+        os.mkdir("Data")
+
+    def tearDown(self):
+        os.chdir(self.working_directory)
+        shutil.rmtree(self.data_directory, ignore_errors=True)
+
+    def test_every_codec_round_trips(self):
+        for codec in _installed_codecs():
+            book_directory = BOOK_DIRECTORY + "_" + codec
+            save_obj(
+                _build_book_review_details(), "reviews", book_directory, True, codec
+            )
+            file_path = book_directory + "/reviews_" + _today() + ".pkl"
+            self.assertTrue(os.path.exists(file_path + CODEC_EXTENSIONS[codec]), codec)
+            self.assertEqual(
+                load_obj("reviews", book_directory), _build_book_review_details()
+            )
+            self.assertEqual(
+                load_latest_obj("reviews", book_directory), _build_book_review_details()
+            )
+
+    def test_gzip_files_open_with_gunzip(self):
+        save_obj(_build_book_review_details(), "reviews", BOOK_DIRECTORY, True, "gzip")
+        file_path = BOOK_DIRECTORY + "/reviews_" + _today()
+        with gzip.open(file_path + ".pkl.gz", "rb") as f:
+            self.assertEqual(pickle.loads(f.read()), _build_book_review_details())
+        with gzip.open(file_path + ".json.gz", "rb") as f:
+            self.assertEqual(
+                json.loads(f.read().decode("utf-8"))["0"],
+                {
+                    "review_id": 11,
+                    "review_likes": 3,
+                    "review_rating": 5,
+                    "review_date": None,
+                },
+            )
+
+    def test_file_saved_today_with_another_codec_is_kept(self):
+        save_obj(_build_book_review_details(), "reviews", BOOK_DIRECTORY, False, "gzip")
+        save_obj({}, "reviews", BOOK_DIRECTORY, False, "none")
+        self.assertEqual(
+            sorted(os.listdir(BOOK_DIRECTORY)), ["reviews_" + _today() + ".pkl.gz"]
+        )
+        self.assertEqual(
+            load_obj("reviews", BOOK_DIRECTORY), _build_book_review_details()
+        )
+
+    def test_unknown_codec_saves_nothing(self):
+        self.assertRaises(
+            ValueError, save_obj, {}, "reviews", BOOK_DIRECTORY, False, "bzip2"
+        )
+        self.assertFalse(os.path.exists(BOOK_DIRECTORY))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: test_ResponseCache
+    :synopsis: Regression tests of the expiry and the least recently used eviction of the response cache
+
+.. moduleauthor:: DivyenduDutta
+
+The entries' cached and last used times are set on their files so no test waits on the clock.
+
+Run from `web_scraper_goodreads_root` with ``python -m pytest FileUtil/test_ResponseCache.py``
+or ``python -m unittest FileUtil.test_ResponseCache``.
+"""
+import os
+import time
+import pickle
+import shutil
+import tempfile
+import unittest
+from FileUtil.ResponseCache import ResponseCache, CacheMissError
+
+CACHE_DIRECTORY = "Cache"
+BOOK_URL = "https://www.goodreads.com/book/show/234225.Dune"
+TTL = 60 * 60
+# every entry takes a little over a kilobyte so two fit in the cache
+PAGE = b"<html>" + b"x" * 1000 + b"</html>"
+MAX_SIZE = 2500
+
+
+class ResponseCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.working_directory = os.getcwd()
+        # the cache directory is relative to the current directory
+        self.cache_parent_directory = tempfile.mkdtemp()
+        os.chdir(self.cache_parent_directory)
+        self.response_cache = ResponseCache(CACHE_DIRECTORY, TTL, MAX_SIZE)
+
+    def tearDown(self):
+        os.chdir(self.working_directory)
+        shutil.rmtree(self.cache_parent_directory, ignore_errors=True)
+
+    def _set_cached_at(self, page_number, cached_at):
+        """
+        Rewrites an entry as if it was cached at `cached_at`
+        """
+        entry_path = self.response_cache._entry_path(BOOK_URL, page_number)
+        with open(entry_path, "rb") as f:
+            _, value = pickle.load(f)
+        with open(entry_path, "wb") as f:
+            pickle.dump((cached_at, value), f, pickle.HIGHEST_PROTOCOL)
+
+    def _set_used_at(self, page_number, used_at):
+        entry_path = self.response_cache._entry_path(BOOK_URL, page_number)
+        os.utime(entry_path, (used_at, used_at))
+
+    def test_round_trip(self):
+        self.assertEqual(self.response_cache.get(BOOK_URL, 1), None)
+        self.response_cache.put(BOOK_URL, 1, PAGE)
+        self.response_cache.put(BOOK_URL, 2, b"page 2")
+        self.assertEqual(self.response_cache.get(BOOK_URL, 1), PAGE)
+        self.assertEqual(self.response_cache.get(BOOK_URL, 2), b"page 2")
+        # another cache on the same directory reads the same entries
+        self.assertEqual(
+            ResponseCache(CACHE_DIRECTORY, TTL, MAX_SIZE).get(BOOK_URL, 1), PAGE
+        )
+
+    def test_expired_entry_is_not_used(self):
+        self.response_cache.put(BOOK_URL, 1, PAGE)
+        self._set_cached_at(1, time.time() - TTL + 60)
+        self.assertEqual(self.response_cache.get(BOOK_URL, 1), PAGE)
+        self._set_cached_at(1, time.time() - TTL - 60)
+        self.assertEqual(self.response_cache.get(BOOK_URL, 1), None)
+        # fetched again
+        self.response_cache.put(BOOK_URL, 1, PAGE)
+        self.assertEqual(self.response_cache.get(BOOK_URL, 1), PAGE)
+
+    def test_entries_without_ttl_never_expire(self):
+        response_cache = ResponseCache(CACHE_DIRECTORY, None, MAX_SIZE)
+        response_cache.put(BOOK_URL, 1, PAGE)
+        self._set_cached_at(1, 0)
+        self.assertEqual(response_cache.get(BOOK_URL, 1), PAGE)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        now = time.time()
+        self.response_cache.put(BOOK_URL, 1, PAGE)
+        self.response_cache.put(BOOK_URL, 2, PAGE)
+        self._set_used_at(1, now - 200)
+        self._set_used_at(2, now - 100)
+        # reading page 1 makes page 2 the least recently used
+        self.assertEqual(self.response_cache.get(BOOK_URL, 1), PAGE)
+        self.response_cache.put(BOOK_URL, 3, PAGE)
+        self.assertEqual(
+            [
+                self.response_cache.get(BOOK_URL, page_number)
+                for page_number in range(1, 4)
+            ],
+            [PAGE, None, PAGE],
+        )
+        self.assertTrue(self.response_cache._total_size <= MAX_SIZE)
+
+    def test_rewriting_an_entry_does_not_evict(self):
+        self.response_cache.put(BOOK_URL, 1, PAGE)
+        self.response_cache.put(BOOK_URL, 2, PAGE)
+        for _ in range(3):
+            self.response_cache.put(BOOK_URL, 2, PAGE)
+        self.assertEqual(self.response_cache.get(BOOK_URL, 1), PAGE)
+        self.assertEqual(self.response_cache.get(BOOK_URL, 2), PAGE)
+
+    def test_corrupt_entry_is_a_miss(self):
+        self.response_cache.put(BOOK_URL, 1, PAGE)
+        with open(self.response_cache._entry_path(BOOK_URL, 1), "wb") as f:
+            f.write(b"not a page")
+        self.assertEqual(self.response_cache.get(BOOK_URL, 1), None)
+
+    def test_cache_only_raises_on_miss(self):
+        response_cache = ResponseCache(CACHE_DIRECTORY, TTL, MAX_SIZE, cache_only=True)
+        self.assertRaises(CacheMissError, response_cache.get, BOOK_URL, 1)
+        response_cache.put(BOOK_URL, 1, PAGE)
+        self.assertEqual(response_cache.get(BOOK_URL, 1), PAGE)
+
+    def test_disabled_cache_keeps_nothing(self):
+        response_cache = ResponseCache(CACHE_DIRECTORY, TTL, MAX_SIZE, enabled=False)
+        response_cache.put(BOOK_URL, 1, PAGE)
+        self.assertFalse(os.path.exists(CACHE_DIRECTORY))
+        self.assertEqual(response_cache.get(BOOK_URL, 1), None)
+
+    def test_clear(self):
+        self.response_cache.put(BOOK_URL, 1, PAGE)
+        self.response_cache.clear()
+        self.assertEqual(os.listdir(CACHE_DIRECTORY), [])
+        self.assertEqual(self.response_cache.get(BOOK_URL, 1), None)
+
+
+if __name__ == "__main__":
+    unittest.main()
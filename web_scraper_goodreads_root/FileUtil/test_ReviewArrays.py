@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: test_ReviewArrays
+    :synopsis: Regression tests of the review arrays and of falling back to the catalog when they are stale
+
+.. moduleauthor:: DivyenduDutta
+
+Run from `web_scraper_goodreads_root` with ``python -m pytest FileUtil/test_ReviewArrays.py``
+or ``python -m unittest FileUtil.test_ReviewArrays``.
+"""
+import os
+import time
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from FileUtil.Catalog import Catalog, REVIEW_SNAPSHOT_NAME
+from FileUtil.BookCatalog import BookCatalog
+from FileUtil.ColumnarReviews import REVIEW_DTYPE
+from FileUtil.ReviewArrays import (
+    HEADER_DTYPE,
+    REVIEW_ARRAY_MAGIC,
+    _review_array_path,
+    save_review_array,
+    open_review_array,
+)
+
+BOOK_NAME = "1_Dune"
+
+
+def _build_reviews(review_count, review_rating=4):
+    """
+    Args:
+        review_count (int) : number of reviews
+        review_rating (int) : rating of every review
+
+    Returns:
+        numpy structured array : reviews with `REVIEW_DTYPE`
+    """
+    reviews = np.zeros(review_count, dtype=REVIEW_DTYPE)
+    reviews["review_id"] = np.arange(1, review_count + 1)
+    reviews["review_likes"] = np.arange(review_count)
+    reviews["review_rating"] = review_rating
+    reviews["review_date"] = 1570000000
+    return reviews
+
+
+class ReviewArrayTest(unittest.TestCase):
+    def setUp(self):
+        self.working_directory = os.getcwd()
+        # review arrays are written under the current directory
+        self.data_directory = tempfile.mkdtemp()
+        os.chdir(self.data_directory)
+
+    def tearDown(self):
+        os.chdir(self.working_directory)
+        shutil.rmtree(self.data_directory, ignore_errors=True)
+
+    def test_round_trip(self):
+        reviews = _build_reviews(7)
+        save_review_array(reviews, BOOK_NAME)
+        self.assertEqual(open_review_array(BOOK_NAME).tolist(), reviews.tolist())
+
+    def test_header(self):
+        saved_after = time.time()
+        save_review_array(_build_reviews(7), BOOK_NAME)
+        review_array_path = _review_array_path(BOOK_NAME)
+        header = np.fromfile(review_array_path, dtype=HEADER_DTYPE, count=1)
+        self.assertEqual(header["magic"][0], REVIEW_ARRAY_MAGIC)
+        self.assertEqual(header["record_count"][0], 7)
+        self.assertTrue(saved_after <= header["saved_at"][0] <= time.time())
+        self.assertEqual(
+            os.path.getsize(review_array_path),
+            HEADER_DTYPE.itemsize + 7 * header["record_size"][0],
+        )
+
+    def test_save_replaces_the_array_whole(self):
+        save_review_array(_build_reviews(7), BOOK_NAME)
+        reviews = _build_reviews(3, review_rating=5)
+        save_review_array(reviews, BOOK_NAME)
+        self.assertEqual(open_review_array(BOOK_NAME).tolist(), reviews.tolist())
+        self.assertFalse(os.path.exists(_review_array_path(BOOK_NAME) + ".tmp"))
+
+    def test_empty_array(self):
+        save_review_array(_build_reviews(0), BOOK_NAME)
+        self.assertEqual(len(open_review_array(BOOK_NAME)), 0)
+
+    def test_missing_or_foreign_file_raises(self):
+        self.assertRaises(IOError, open_review_array, BOOK_NAME)
+        save_review_array(_build_reviews(1), BOOK_NAME)
+        with open(_review_array_path(BOOK_NAME), "wb") as f:
+            f.write(b"not a review array at all")
+        self.assertRaises(IOError, open_review_array, BOOK_NAME)
+
+    def test_array_saved_before_raises(self):
+        save_review_array(_build_reviews(7), BOOK_NAME)
+        self.assertEqual(
+            len(open_review_array(BOOK_NAME, saved_after=time.time() - 60)), 7
+        )
+        self.assertRaises(
+            IOError, open_review_array, BOOK_NAME, saved_after=time.time() + 60
+        )
+
+
+class StaleReviewArrayTest(unittest.TestCase):
+    def setUp(self):
+        self.working_directory = os.getcwd()
+        self.data_directory = tempfile.mkdtemp()
+        os.chdir(self.data_directory)
+        self.catalog = Catalog(os.path.join(self.data_directory, "catalog.sqlite3"))
+        self.book_catalog = BookCatalog(self.catalog)
+
+    def tearDown(self):
+        if self.catalog._connection != None:
+            self.catalog._connection.close()
+        os.chdir(self.working_directory)
+        shutil.rmtree(self.data_directory, ignore_errors=True)
+
+    def _save_catalog_reviews(self, reviews, scraped_at):
+        with self.catalog._lock:
+            self.catalog._save_run(
+                reviews, REVIEW_SNAPSHOT_NAME, "Data/" + BOOK_NAME, scraped_at, None
+            )
+
+    def test_array_saved_after_the_catalog_is_read(self):
+        self._save_catalog_reviews(_build_reviews(7), time.time() - 60)
+        # differs from the catalog so it shows where the reviews came from
+        array_reviews = _build_reviews(3, review_rating=5)
+        save_review_array(array_reviews, BOOK_NAME)
+        self.assertEqual(
+            self.book_catalog.reviews(BOOK_NAME).tolist(), array_reviews.tolist()
+        )
+
+    def test_missing_array_is_written_from_the_catalog(self):
+        catalog_reviews = _build_reviews(7)
+        self._save_catalog_reviews(catalog_reviews, time.time() - 60)
+        self.assertEqual(
+            self.book_catalog.reviews(BOOK_NAME).tolist(), catalog_reviews.tolist()
+        )
+        self.assertEqual(
+            open_review_array(BOOK_NAME).tolist(), catalog_reviews.tolist()
+        )
+
+    def test_stale_array_is_written_again_from_the_catalog(self):
+        # the scraper stopped after the catalog save of a later run
+        save_review_array(_build_reviews(3, review_rating=5), BOOK_NAME)
+        catalog_reviews = _build_reviews(7)
+        self._save_catalog_reviews(catalog_reviews, time.time() + 60)
+        self.assertEqual(
+            self.book_catalog.reviews(BOOK_NAME).tolist(), catalog_reviews.tolist()
+        )
+        self.assertEqual(
+            open_review_array(BOOK_NAME).tolist(), catalog_reviews.tolist()
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: test_ReviewStream
+    :synopsis: Regression tests of resuming from a review stream whose last page was torn off
+
+.. moduleauthor:: DivyenduDutta
+
+The review streams are written under a temporary current directory. The last test
+scrapes the fixture book from :mod:`FixtureServer` with the http backend, tears its
+stream in the middle of the second page and scrapes it again from there.
+
+Run from `web_scraper_goodreads_root` with ``python -m pytest FileUtil/test_ReviewStream.py``
+or ``python -m unittest FileUtil.test_ReviewStream``.
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from BookReviews import retrieve_book_review_details
+from FixtureServer import start_fixture_server, stop_fixture_server
+from FileUtil.ColumnarReviews import reviews_to_columns
+from FileUtil.ReviewStream import (
+    ReviewStreamWriter,
+    _review_stream_path,
+    remove_review_stream,
+)
+from HelperUtils import extract_book_name_from_root_url
+from Records import Review
+from CommonConstants.Constants import FETCH_BACKEND_HTTP
+
+BOOK_NAME = "1_Dune"
+FIXTURE_BOOK_ID = "1-fixture-book"
+
+
+def _build_page_review_details(first_review_id, review_count):
+    """
+    Args:
+        first_review_id (int) : id of the first review of the page
+        review_count (int) : number of reviews on the page, every third one is unrated
+
+    Returns:
+        dict : review details of the page as built by
+        :func:`BookReviews._retrieve_book_review_details_per_page`
+    """
+    page_review_details = {}
+    for review_index in range(review_count):
+        page_review_details[review_index] = Review(
+            review_id=first_review_id + review_index,
+            review_likes=review_index,
+            review_rating=0 if review_index % 3 == 2 else 1 + review_index % 5,
+            review_date="Feb 14, 2016",
+        )
+    return page_review_details
+
+
+def _rated_columns(page_review_details_list):
+    """
+    Returns:
+        list : the rated reviews of every page in order, as tuples of their columns
+    """
+    rated_reviews = {}
+    for page_review_details in page_review_details_list:
+        for review_index in sorted(page_review_details):
+            review = page_review_details[review_index]
+            if review.review_rating != 0:
+                rated_reviews[len(rated_reviews)] = review
+    return reviews_to_columns(rated_reviews).tolist()
+
+
+class ReviewStreamTest(unittest.TestCase):
+    def setUp(self):
+        self.working_directory = os.getcwd()
+        # the checkpoint directory is relative to the current directory
+        self.stream_directory = tempfile.mkdtemp()
+        os.chdir(self.stream_directory)
+        self.pages = [
+            _build_page_review_details(page_index * 100, 6) for page_index in range(3)
+        ]
+
+    def tearDown(self):
+        os.chdir(self.working_directory)
+        shutil.rmtree(self.stream_directory, ignore_errors=True)
+
+    def _write_pages(self, pages, resume=False):
+        review_stream = ReviewStreamWriter(BOOK_NAME, resume)
+        for page_review_details in pages:
+            review_stream.write_page(review_stream.last_page + 1, page_review_details)
+        review_stream.close()
+        return review_stream
+
+    def _stream_size(self):
+        return os.path.getsize(_review_stream_path(BOOK_NAME))
+
+    def test_complete_pages_are_resumed(self):
+        self._write_pages(self.pages[:2])
+        review_stream = ReviewStreamWriter(BOOK_NAME, resume=True)
+        review_stream.close()
+        self.assertEqual(review_stream.last_page, 2)
+        self.assertEqual(review_stream.review_count, 8)
+        self.assertEqual(
+            review_stream.columns().tolist(), _rated_columns(self.pages[:2])
+        )
+
+    def test_torn_tail_is_cut_off(self):
+        self._write_pages(self.pages[:1])
+        complete_size = self._stream_size()
+        self._write_pages(self.pages[1:2], resume=True)
+        # the scraper stopped in the middle of a review line of page 2
+        with open(_review_stream_path(BOOK_NAME), "ab") as f:
+            f.truncate(complete_size + 30)
+
+        review_stream = self._write_pages(self.pages[1:], resume=True)
+        self.assertEqual(review_stream.last_page, 3)
+        self.assertEqual(review_stream.columns().tolist(), _rated_columns(self.pages))
+        # read back the same from the file
+        review_stream = ReviewStreamWriter(BOOK_NAME, resume=True)
+        review_stream.close()
+        self.assertEqual(review_stream.columns().tolist(), _rated_columns(self.pages))
+
+    def test_page_without_its_end_is_dropped(self):
+        self._write_pages(self.pages[:2])
+        with open(_review_stream_path(BOOK_NAME), "rb") as f:
+            lines = f.readlines()
+        # every review of page 2 written, its page_end line not
+        with open(_review_stream_path(BOOK_NAME), "wb") as f:
+            f.write(b"".join(lines[:-1]))
+
+        review_stream = ReviewStreamWriter(BOOK_NAME, resume=True)
+        review_stream.close()
+        self.assertEqual(review_stream.last_page, 1)
+        self.assertEqual(
+            review_stream.columns().tolist(), _rated_columns(self.pages[:1])
+        )
+        self.assertEqual(self._stream_size(), len(b"".join(lines[:5])))
+
+    def test_stream_without_a_complete_page(self):
+        self._write_pages(self.pages[:1])
+        with open(_review_stream_path(BOOK_NAME), "ab") as f:
+            f.truncate(20)
+        review_stream = ReviewStreamWriter(BOOK_NAME, resume=True)
+        review_stream.close()
+        self.assertEqual(review_stream.last_page, 0)
+        self.assertEqual(len(review_stream.columns()), 0)
+        self.assertEqual(self._stream_size(), 0)
+
+    def test_without_resume_the_stream_starts_over(self):
+        self._write_pages(self.pages[:2])
+        review_stream = self._write_pages(self.pages[2:])
+        self.assertEqual(review_stream.last_page, 1)
+        self.assertEqual(
+            review_stream.columns().tolist(), _rated_columns(self.pages[2:])
+        )
+        remove_review_stream(BOOK_NAME)
+        self.assertFalse(os.path.exists(_review_stream_path(BOOK_NAME)))
+        remove_review_stream(BOOK_NAME)
+
+    def test_scrape_resumes_after_the_torn_page(self):
+        server, base_url = start_fixture_server()
+        try:
+            book_url = base_url + "/book/show/" + FIXTURE_BOOK_ID
+            reviews = retrieve_book_review_details(
+                book_url, True, fetch_backend=FETCH_BACKEND_HTTP
+            )
+            stream_path = _review_stream_path(extract_book_name_from_root_url(book_url))
+            with open(stream_path, "rb") as f:
+                lines = f.readlines()
+            page_end_indexes = [
+                line_index
+                for line_index, line in enumerate(lines)
+                if b'"page_end"' in line
+            ]
+            # page 1 and half a review of page 2
+            with open(stream_path, "wb") as f:
+                f.write(b"".join(lines[: page_end_indexes[0] + 1]))
+                f.write(lines[page_end_indexes[0] + 1][:25])
+
+            resumed_reviews = retrieve_book_review_details(
+                book_url, False, fetch_backend=FETCH_BACKEND_HTTP, resume=True
+            )
+        finally:
+            stop_fixture_server(server)
+        self.assertEqual(len(page_end_indexes), 3)
+        self.assertEqual(resumed_reviews.tolist(), reviews.tolist())
+        with open(stream_path, "rb") as f:
+            self.assertEqual(f.read(), b"".join(lines))
+
+
+if __name__ == "__main__":
+    unittest.main()
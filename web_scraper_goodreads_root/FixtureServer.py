@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: FixtureServer
+    :synopsis: Local goodreads look alike serving saved review pages so the fetch backends can be run offline
+
+.. moduleauthor:: DivyenduDutta
+
+Serves the review pages saved under `Fixtures/<book id>/reviews_page_<n>.html`:
+
+- ``/book/show/<book id>`` returns the book page with the first review page in the `bookReviews` div
+- ``/book/reviews/<book id>?page=<n>`` returns the ``Element.update()`` javascript when called via
+  Ajax (like :mod:`HttpNavigator` does) and a full book page with review page `n` otherwise
+  (like chrome does when following the `next_page` link)
+
+Functions:
+
+- `_read_fixture(book_id, page_number)`
+- `_build_book_page(review_html)`
+- `_build_ajax_response(review_html)`
+- `start_fixture_server(port)`
+- `stop_fixture_server(server)`
+- `compare_fetch_backends(book_url)`
+"""
+import os
+import json
+import threading
+from CommonConstants.Constants import FETCH_BACKEND_SELENIUM, FETCH_BACKEND_HTTP
+
+try:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from urlparse import urlparse, parse_qs
+except ImportError:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from urllib.parse import urlparse, parse_qs
+
+FIXTURE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Fixtures")
+BOOK_PAGE_TEMPLATE = "book_show_template.html"
+REVIEWS_PLACEHOLDER = "<!-- REVIEWS -->"
+
+
+def _read_fixture(book_id, page_number):
+    """
+    Reads the saved HTML of a review page
+
+    Args:
+        book_id (str) : book id as used in the goodreads URL eg, 1-fixture-book
+        page_number (int) : review page to read
+
+    Returns:
+        str : html code of the review page or None if its not saved
+    """
+    fixture_path = os.path.join(
+        FIXTURE_DIRECTORY, book_id, "reviews_page_" + str(page_number) + ".html"
+    )
+    if not os.path.exists(fixture_path):
+        return None
+    with open(fixture_path, "rb") as f:
+        return f.read().decode("utf-8")
+
+
+def _build_book_page(review_html):
+    """
+    Puts the review HTML in the `bookReviews` div of the book page template
+
+    Args:
+        review_html (str) : html code of the review page
+
+    Returns:
+        str : html code of the whole book page
+    """
+    with open(os.path.join(FIXTURE_DIRECTORY, BOOK_PAGE_TEMPLATE), "rb") as f:
+        template = f.read().decode("utf-8")
+    return template.replace(REVIEWS_PLACEHOLDER, review_html)
+
+
+def _build_ajax_response(review_html):
+    """
+    Wraps the review HTML the way the goodreads review pagination endpoint does
+
+    Args:
+        review_html (str) : html code of the review page
+
+    Returns:
+        str : javascript updating the `reviews` element
+    """
+    return 'Element.update("reviews", ' + json.dumps(review_html) + ");\n"
+
+
+class FixtureRequestHandler(BaseHTTPRequestHandler):
+    """
+    Request handler serving the book page and review pages from `FIXTURE_DIRECTORY`
+    """
+
+    def do_GET(self):
+        parsed_url = urlparse(self.path)
+        path_parts = parsed_url.path.strip("/").split("/")
+        if len(path_parts) != 3 or path_parts[0] != "book":
+            return self._send(404, "text/plain", "Not found")
+        book_id = path_parts[2]
+        if path_parts[1] == "show":
+            page_number = 1
+        elif path_parts[1] == "reviews":
+            page_number = int(parse_qs(parsed_url.query).get("page", ["1"])[0])
+        else:
+            return self._send(404, "text/plain", "Not found")
+
+        review_html = _read_fixture(book_id, page_number)
+        if review_html == None:
+            return self._send(404, "text/plain", "Not found")
+        if self.headers.get("X-Requested-With") == "XMLHttpRequest":
+            return self._send(
+                200, "text/javascript", _build_ajax_response(review_html)
+            )
+        return self._send(200, "text/html", _build_book_page(review_html))
+
+    def _send(self, status, content_type, body):
+        body = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type + "; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # keep the console clean, the scrapers log what they fetch
+        pass
+
+
+def start_fixture_server(port=0):
+    """
+    Starts the fixture server on localhost in a background thread
+
+    Args:
+        port (int) : port to listen on, 0 picks a free one
+
+    Returns:
+        the server and its base URL eg, http://127.0.0.1:8000
+    """
+    server = HTTPServer(("127.0.0.1", port), FixtureRequestHandler)
+    server_thread = threading.Thread(target=server.serve_forever)
+    server_thread.daemon = True
+    server_thread.start()
+    return server, "http://127.0.0.1:" + str(server.server_address[1])
+
+
+def stop_fixture_server(server):
+    """
+    Stops a server started with `start_fixture_server`
+
+    Args:
+        server : server returned by `start_fixture_server`
+    """
+    server.shutdown()
+    server.server_close()
+
+
+def compare_fetch_backends(book_url):
+    """
+    Scrapes the same book with the selenium and the http backend
+    and checks that both produce the same review details
+
+    Args:
+        book_url (str) : URL of the book, usually on the fixture server
+
+    Returns:
+        bool flag indicating whether both backends produced the same review details
+    """
+    from BookReviews import retrieve_book_review_details
+
+    selenium_review_details = retrieve_book_review_details(
+        book_url, True, fetch_backend=FETCH_BACKEND_SELENIUM
+    )
+    http_review_details = retrieve_book_review_details(
+        book_url, True, fetch_backend=FETCH_BACKEND_HTTP
+    )
+    # review details are numpy structured arrays, compared row by row
+    return selenium_review_details.tolist() == http_review_details.tolist()
+
+
+if __name__ == "__main__":
+    server = HTTPServer(("127.0.0.1", 8000), FixtureRequestHandler)
+    print("Serving fixtures on http://127.0.0.1:8000/book/show/1-fixture-book")
+    server.serve_forever()
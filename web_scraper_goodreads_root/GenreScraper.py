@@ -6,51 +6,109 @@
 
 Functions:
     
-- `_create_main_parser(genre)`
+- `_create_main_parser(genre, page_number)`
+- `_crawl_shelf_pages(genre, number_of_pages, max_concurrency)`
 - `_build_book_details_map((sci_fi_book_details, book_index, book_details))`
-- `_retrieve_book_name(book_block, class_name)`
+- `_convert_book_URL(href)`
+- `_build_author_details(book_fields)`
+- `_retrieve_book_name(book_block)`
 - `_retrieve_book_URL_and_image_URL(book_block)`
-- `_retrieve_author_name(book_block, class_name)`
+- `_retrieve_author_name(book_block)`
 - `_retrieve_number_of_times_shelved(book_block)`
 - `_retrieve_rating_published_details(book_block)`
-- `retriveSciFiBookList(genre)`
+- `_retrieve_book_details(book_block)`
+- `retriveSciFiBookList(genre, number_of_pages, max_concurrency)`
 
 """
 import requests
 from bs4 import BeautifulSoup
-import re
 import pprint
-from FileUtil.FilePicking import save_obj, load_obj
+from functools import partial
+from multiprocessing.pool import ThreadPool
+from FileUtil.Catalog import save_obj, load_obj
+from ExtractionSchema import ExtractionSchema, Field
+from Records import Book
+from FileUtil.ResponseCache import response_cache
+from RequestScheduler import request_scheduler
+from CommonConstants.Constants import (
+    SHELF_CRAWL_CONCURRENCY,
+    HTTP_TIMEOUT,
+    SCHEDULER_RETRIES,
+)
 from YALogger.custom_logger import Logger
 
 
-def _create_main_parser(genre):
+def _create_main_parser(genre, page_number=1):
     """
     Creates the bs4 parser from the goodreads URL. This is to scrape details
     of most popular books in a genre
+    The page is read from :data:`FileUtil.ResponseCache.response_cache` when it has been fetched recently
+    otherwise it is fetched via :data:`RequestScheduler.request_scheduler`
     
     
     Args:
         genre (str) : Genre to scrape book details
+        page_number (int) : shelf page to scrape
         
     Returns:
         bs4 object : parser
     """
     urlToScrape = "https://www.goodreads.com/shelf/show/" + genre
+    if page_number > 1:
+        urlToScrape += "?page=" + str(page_number)
     Logger.log(
         "info",
         "GenreScraper",
         "_create_main_parser",
-        "Scraping details of " + genre + " genre",
+        "Scraping details of " + genre + " genre page " + str(page_number),
     )
-    page = requests.get(urlToScrape)
-    soup = BeautifulSoup(page.text, "html.parser")
+    page_text = response_cache.get(urlToScrape, page_number)
+    if page_text == None:
+        page = request_scheduler.call(
+            urlToScrape,
+            partial(requests.get, urlToScrape, timeout=HTTP_TIMEOUT),
+            retries=SCHEDULER_RETRIES,
+            retry_on=(requests.exceptions.Timeout, requests.exceptions.ConnectionError),
+        )
+        page_text = page.text
+        if page.ok:
+            response_cache.put(urlToScrape, page_number, page_text)
+    soup = BeautifulSoup(page_text, "html.parser")
     return soup
 
 
+def _crawl_shelf_pages(genre, number_of_pages, max_concurrency):
+    """
+    Creates the bs4 parsers for shelf pages 1 to `number_of_pages` of a genre
+    The pages are fetched at the same time by a pool of threads, at most
+    `max_concurrency` of them at once
+    
+    Args:
+        genre (str) : Genre to scrape book details
+        number_of_pages (int) : number of shelf pages to scrape
+        max_concurrency (int) : maximum number of shelf pages fetched at once
+        
+    Returns:
+        list : bs4 parsers in page order
+    """
+    if number_of_pages <= 1 or max_concurrency <= 1:
+        return [
+            _create_main_parser(genre, page_number)
+            for page_number in range(1, number_of_pages + 1)
+        ]
+    pool = ThreadPool(min(max_concurrency, number_of_pages))
+    try:
+        return pool.map(
+            partial(_create_main_parser, genre), range(1, number_of_pages + 1), 1
+        )
+    finally:
+        pool.close()
+        pool.join()
+
+
 def _build_book_details_map(sci_fi_book_details, book_index, book_details):
     """
-    Build the dictionary containing the details of the book.
+    Stores the details of the book as a :class:`Records.Book` in the dictionary of books.
     This is then further pickled for persistent storage
     
     
@@ -63,31 +121,103 @@ def _build_book_details_map(sci_fi_book_details, book_index, book_details):
     Returns:
         dict : book details
     """
-    sci_fi_book_details[book_index]["book_name"] = book_details[0]
-    sci_fi_book_details[book_index]["book_URL"] = book_details[1]
-    sci_fi_book_details[book_index]["book_img_URL"] = book_details[2]
-    sci_fi_book_details[book_index]["author"] = book_details[3]
-    sci_fi_book_details[book_index]["shelved"] = book_details[4]
-    sci_fi_book_details[book_index]["avg_rating"] = book_details[5]
-    sci_fi_book_details[book_index]["number_of_ratings"] = book_details[6]
-    sci_fi_book_details[book_index]["published_year"] = book_details[7]
+    author_details = book_details[3]
+    sci_fi_book_details[book_index] = Book(
+        book_name=book_details[0],
+        book_URL=book_details[1],
+        book_img_URL=book_details[2],
+        author_name=author_details["author_name"],
+        author_URL=author_details["author_URL"],
+        goodreads_author=author_details["goodreads_author"],
+        shelved=book_details[4],
+        avg_rating=book_details[5],
+        number_of_ratings=book_details[6],
+        published_year=book_details[7],
+    )
     return sci_fi_book_details
 
 
-def _retrieve_book_name(book_block, class_name):
+def _convert_book_URL(href):
+    """
+    Args:
+        href (str) : link to the book relative to goodreads.com
+        
+    Returns:
+        str : absolute book URL
+    """
+    return "https://www.goodreads.com" + href
+
+
+# fields scraped from every book block on a shelf page
+BOOK_SCHEMA = ExtractionSchema(
+    [
+        Field("book_name", "a.bookTitle"),
+        # leftAlignedImage links to the book URL and image itself
+        Field(
+            "book_URL", "a.leftAlignedImage", attribute="href", converter=_convert_book_URL
+        ),
+        Field("book_img_URL", "a.leftAlignedImage img", attribute="src"),
+        Field("author_name", "div.authorName__container a.authorName span"),
+        Field(
+            "author_URL", "div.authorName__container a.authorName", attribute="href"
+        ),
+        Field(
+            "goodreads_author",
+            "div.authorName__container span.greyText",
+            presence=True,
+            default=False,
+        ),
+        Field("shelved", "a.smallText", regex=r"\d+", default=0),
+        Field(
+            "avg_rating",
+            "span.greyText.smallText",
+            regex=r"avg rating (\d+.\d+)",
+            regex_group=1,
+        ),
+        Field(
+            "number_of_ratings",
+            "span.greyText.smallText",
+            regex=r"(\d+,\d+) ratings",
+            regex_group=1,
+        ),
+        Field(
+            "published_year",
+            "span.greyText.smallText",
+            regex=r"published (\d\d\d\d)",
+            regex_group=1,
+        ),
+    ]
+)
+
+
+def _build_author_details(book_fields):
+    """
+    Builds the author details of a book from the fields extracted with `BOOK_SCHEMA`
+    
+    Args:
+        book_fields (dict) : fields extracted from the book block
+        
+    Returns:
+        dict : author details
+    """
+    author_details = {}
+    author_details["author_name"] = book_fields["author_name"]
+    author_details["author_URL"] = book_fields["author_URL"]
+    author_details["goodreads_author"] = book_fields["goodreads_author"]
+    return author_details
+
+
+def _retrieve_book_name(book_block):
     """
     Finds the book name which is in a link <a> tag
     
     Args:
         book_block (bs4) : represents the bs4 for an individual book on the webpage
-        class_name (str) : the CSS class name needed to extract the book name
         
     Returns:
         str : name of the book
     """
-    book_name_link_tag = book_block.find("a", class_=class_name)
-    if book_name_link_tag != None:
-        return book_name_link_tag.find(text=True).encode("utf-8")
+    return BOOK_SCHEMA.extract_field(book_block, "book_name")
 
 
 def _retrieve_book_URL_and_image_URL(book_block):
@@ -101,16 +231,13 @@ def _retrieve_book_URL_and_image_URL(book_block):
     Returns:
         list : book url and book image url
     """
-    # leftAlignedImage links to the book URL and image itself
-    book_URL_link_tag = book_block.find("a", class_="leftAlignedImage")
-    book_url = "https://www.goodreads.com" + book_URL_link_tag["href"].encode(
-        "utf-8"
-    )  # can just do this to get value of an attribute
-    book_img_url = book_URL_link_tag.find("img")["src"].encode("utf-8")
-    return [book_url, book_img_url]
+    return [
+        BOOK_SCHEMA.extract_field(book_block, "book_URL"),
+        BOOK_SCHEMA.extract_field(book_block, "book_img_URL"),
+    ]
 
 
-def _retrieve_author_name(book_block, class_name):
+def _retrieve_author_name(book_block):
     """
     Finds the author details of the book
     Author details are:
@@ -120,29 +247,14 @@ def _retrieve_author_name(book_block, class_name):
     
     Args:
        book_block (bs4) : represents the bs4 for an individual book on the webpage
-       class_name (str) : the CSS class name needed to extract the book name
        
     Returns:
         list : author details
     """
-    author_name_div_tag = book_block.find("div", class_=class_name)
-    author_name_link_tag = author_name_div_tag.find("a", class_="authorName")
-    author_details = {}
-
-    author_name = author_name_link_tag.find("span").find(text=True).encode("utf-8")
-    author_URL = author_name_link_tag["href"].encode("utf-8")
-
-    goodreads_author_tag = author_name_div_tag.find("span", class_="greyText")
-    if goodreads_author_tag != None:
-        is_author_goodreads = True
-    else:
-        is_author_goodreads = False
-
-    author_details["author_name"] = author_name
-    author_details["author_URL"] = author_URL
-    author_details["goodreads_author"] = is_author_goodreads
-
-    return author_details
+    book_fields = {}
+    for name in ["author_name", "author_URL", "goodreads_author"]:
+        book_fields[name] = BOOK_SCHEMA.extract_field(book_block, name)
+    return _build_author_details(book_fields)
 
 
 def _retrieve_number_of_times_shelved(book_block):
@@ -156,17 +268,7 @@ def _retrieve_number_of_times_shelved(book_block):
     Returns:
         int : number of times shelved
     """
-    shelf_link_tag = book_block.find("a", class_="smallText")
-    if shelf_link_tag != None:
-        shelf_text = shelf_link_tag.find(text=True)
-        shelvedRegex = re.compile(r"\d+")
-        number_of_times_shelved = (
-            shelvedRegex.search(shelf_text).group().encode("utf-8")
-        )
-    else:
-        number_of_times_shelved = 0
-
-    return number_of_times_shelved
+    return BOOK_SCHEMA.extract_field(book_block, "shelved")
 
 
 def _retrieve_rating_published_details(book_block):
@@ -176,6 +278,7 @@ def _retrieve_rating_published_details(book_block):
     -average rating
     -number of ratings
     -year the book was published
+    Details missing from the book block are None
         
     Args:
         book_block (bs4) : represents the bs4 for an individual book on the webpage
@@ -183,38 +286,53 @@ def _retrieve_rating_published_details(book_block):
     Returns:
         list : rating details
     """
-    rating_published_span_tag = book_block.select("span.greyText.smallText")[0]
-    rating_published_text = rating_published_span_tag.find(text=True).encode("utf-8")
-    # Avg Rating
-    ratingRegex = re.compile(r"avg rating \d+.\d+")
-    avg_rating = ratingRegex.search(rating_published_text).group().split(" ")[2]
-
-    # number of ratings
-    numberofratingsRegex = re.compile(r"\d+,\d+ ratings")
-    number_of_ratings = (
-        numberofratingsRegex.search(rating_published_text).group().split(" ")[0]
-    )
-
-    # published year
-    yearPublishedRegex = re.compile(r"published \d\d\d\d")
-    published_year = (
-        yearPublishedRegex.search(rating_published_text).group().split(" ")[1]
-    )
+    return [
+        BOOK_SCHEMA.extract_field(book_block, name)
+        for name in ["avg_rating", "number_of_ratings", "published_year"]
+    ]
 
-    return [avg_rating, number_of_ratings, published_year]
 
-
-def retriveSciFiBookList(genre):
+def _retrieve_book_details(book_block):
+    """
+    Retrieves all the details of a book in one pass over its book block with `BOOK_SCHEMA`
+    
+    Args:
+        book_block (bs4) : represents the bs4 for an individual book on the webpage
+        
+    Returns:
+        list : book details in the order `_build_book_details_map` expects or
+        None if the block has no book name ie, is not a book
+    """
+    book_fields = BOOK_SCHEMA.extract(book_block)
+    if book_fields["book_name"] == None:
+        return None
+    return [
+        book_fields["book_name"],
+        book_fields["book_URL"],
+        book_fields["book_img_URL"],
+        _build_author_details(book_fields),
+        book_fields["shelved"],
+        book_fields["avg_rating"],
+        book_fields["number_of_ratings"],
+        book_fields["published_year"],
+    ]
+
+
+def retriveSciFiBookList(
+    genre, number_of_pages=1, max_concurrency=SHELF_CRAWL_CONCURRENCY
+):
     """
     Main entry into `GenreScraper`
     This function does the following:
-        1. Creates the bs4 parser - `_create_main_parser(genre)`
+        1. Creates the bs4 parsers for the shelf pages - `_crawl_shelf_pages(genre, number_of_pages, max_concurrency)`
         2. Gets a list of bs4 for each of the books
-        3. Loops through each book, retrives the book details and stores in dict
-           `sci_fi_book_details`
+        3. Loops through each book, retrives the book details - `_retrieve_book_details(book_block)`
+           and stores in dict `sci_fi_book_details`. A book listed on more than one page is stored once
            
     Args:
         genre (str) : genre to scrape details about
+        number_of_pages (int) : number of shelf pages to scrape
+        max_concurrency (int) : maximum number of shelf pages fetched at once
         
     Returns:
         dict : book details from a particular genre
@@ -224,48 +342,39 @@ def retriveSciFiBookList(genre):
     )
     # root_book_blocks = soup.findAll(attrs={'id' : re.compile("^bookCover")})
     # get the html blocks which lists books
-    soup = _create_main_parser(genre)
-    root_book_blocks = soup.findAll("div", class_="elementList")
+    soups = _crawl_shelf_pages(genre, number_of_pages, max_concurrency)
     sci_fi_book_details = {}  # main map of book details
+    book_URLs_seen = set()
 
     # print(type(root_book_blocks))
     book_index = 0
-    for book_block in root_book_blocks:
-        # get the name of the book
-        book_name = _retrieve_book_name(book_block, "bookTitle")
-        if book_name != None:
-            sci_fi_book_details[book_index] = {}
-            book_details = []  # add book details to this list
-            book_details.append(book_name)
-
-            # get the URL for the book
-            book_URL_and_img_URL = _retrieve_book_URL_and_image_URL(book_block)
-            book_details.append(book_URL_and_img_URL[0])
-            book_details.append(book_URL_and_img_URL[1])
-
-            # get the author name
-            author_details = _retrieve_author_name(book_block, "authorName__container")
-            book_details.append(author_details)
-
-            # get number of times shelved
-            number_of_times_shelved = _retrieve_number_of_times_shelved(book_block)
-            book_details.append(number_of_times_shelved)
-
-            # get rating and published date
-            rating_published_details = _retrieve_rating_published_details(book_block)
-            book_details.append(rating_published_details[0])
-            book_details.append(rating_published_details[1])
-            book_details.append(rating_published_details[2])
-
-            sci_fi_book_details = _build_book_details_map(
-                sci_fi_book_details, book_index, book_details
-            )
-
-            book_index += 1
-        else:
-            Logger.log(
-                "error", "GenreScraper", "retriveSciFiBookList", "No book name. No book"
-            )
+    for soup in soups:
+        root_book_blocks = soup.findAll("div", class_="elementList")
+        for book_block in root_book_blocks:
+            book_details = _retrieve_book_details(book_block)
+            if book_details != None:
+                if book_details[1] in book_URLs_seen:
+                    Logger.log(
+                        "info",
+                        "GenreScraper",
+                        "retriveSciFiBookList",
+                        "Book already listed on an earlier page",
+                    )
+                    continue
+                book_URLs_seen.add(book_details[1])
+
+                sci_fi_book_details = _build_book_details_map(
+                    sci_fi_book_details, book_index, book_details
+                )
+
+                book_index += 1
+            else:
+                Logger.log(
+                    "error",
+                    "GenreScraper",
+                    "retriveSciFiBookList",
+                    "No book name. No book",
+                )
 
     # pp = pprint.PrettyPrinter(indent=4)
     # print(pp.pprint(sci_fi_book_details))
@@ -277,7 +386,7 @@ if __name__ == "__main__":
     # executed when invoked directly
     genre = "science-fiction"
     sci_fi_book_details = retriveSciFiBookList(genre)
-    save_obj(sci_fi_book_details, "sci-fi-books-list", "Data", False)
+    save_obj(sci_fi_book_details, "sci-fi-books-list", "Data", False, genre=genre)
 
     sci_fi_list = load_obj("sci-fi-books-list", "Data")
     print(sci_fi_list)
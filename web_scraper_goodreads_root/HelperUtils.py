@@ -28,6 +28,7 @@ def check_if_file_exists_otherwise_handle(file_path):
     """
     This function checks if the path file exists in the path
     If it doesnt then returns false and if it exists then deletes it and returns true
+    The directory of the file is created if missing so the file can be written
     
     Args:
         file_path (str) : path of the file to check
@@ -36,6 +37,8 @@ def check_if_file_exists_otherwise_handle(file_path):
         bool flag indicating whether file exists or not
     """
     full_file_path = os.getcwd() + "/" + file_path
+    if not path.exists(path.dirname(full_file_path)):
+        os.makedirs(path.dirname(full_file_path))
     if path.exists(full_file_path):
         file_exists = True
         Logger.log(
@@ -0,0 +1,289 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: HttpNavigator
+    :synopsis: Browserless alternative to SiteNavigator which fetches review pages over plain HTTP
+
+.. moduleauthor:: DivyenduDutta
+
+Clicking on a review page at the bottom of a book page makes an Ajax call to
+``/book/reviews/<book id>?page=<n>`` which returns a javascript ``Element.update()``
+call holding the HTML of the reviews. This module calls that endpoint directly
+instead of driving a browser, and returns the same values as :mod:`SiteNavigator`.
+The endpoint also takes a ``sort`` order, eg, `REVIEW_SORT_NEWEST` for the newest reviews
+first, in which case the first page is fetched from it too.
+
+Functions:
+
+- `_build_review_page_url(root_url, page_number, sort_order)`
+- `_extract_review_html_from_ajax_response(ajax_response)`
+- `_is_next_page_present(review_html)`
+- `_create_session()`
+- `_fetch_review_page(review_page_url, page_number)`
+- `get_html_code_for_first_page(root_url, new_book, sort_order)`
+- `get_html_code_for_other_pages(root_url)`
+- `resume_from_page(root_url, page_number, sort_order)`
+"""
+import re
+import json
+import threading
+import requests
+from functools import partial
+from bs4 import BeautifulSoup
+from CommonConstants.Constants import HTTP_TIMEOUT, HTTP_HEADERS, SCHEDULER_RETRIES
+from FileUtil.ResponseCache import response_cache
+from RequestScheduler import request_scheduler
+from YALogger.custom_logger import Logger
+
+try:
+    from urlparse import urlparse
+except ImportError:
+    from urllib.parse import urlparse
+
+# http session and the last review page fetched for the book, kept per thread
+# so that each scraping worker has its own session
+navigator_state = threading.local()
+
+AJAX_HEADERS = {
+    "X-Requested-With": "XMLHttpRequest",
+    "Accept": "text/javascript, text/html, application/xml, text/xml, */*",
+}
+
+# timeouts and dropped connections are retried by the request scheduler
+RETRYABLE_EXCEPTIONS = (
+    requests.exceptions.Timeout,
+    requests.exceptions.ConnectionError,
+)
+
+AJAX_RESPONSE_REGEX = re.compile(
+    r'Element\.update\(\s*"reviews"\s*,\s*("(?:[^"\\]|\\.)*")\s*\)', re.DOTALL
+)
+
+
+def _build_review_page_url(root_url, page_number, sort_order=None):
+    """
+    Builds the URL of the Ajax endpoint which serves a review page of a book
+
+    Args:
+        root_url (str) : URL of the book eg, https://www.goodreads.com/book/show/6148028-catching-fire
+        page_number (int) : review page to fetch
+        sort_order (str) : order of the reviews eg, `REVIEW_SORT_NEWEST`, the default order when None
+
+    Returns:
+        str : URL of the review page
+    """
+    parsed_url = urlparse(root_url)
+    book_id = parsed_url.path.rstrip("/").split("/")[-1]
+    review_page_url = "%s://%s/book/reviews/%s?page=%d&hide_last_page=true" % (
+        parsed_url.scheme,
+        parsed_url.netloc,
+        book_id,
+        page_number,
+    )
+    if sort_order != None:
+        review_page_url += "&sort=" + sort_order
+    return review_page_url
+
+
+def _extract_review_html_from_ajax_response(ajax_response):
+    """
+    Pulls the review HTML out of the ``Element.update("reviews", "...")`` javascript
+    returned by the Ajax endpoint
+
+    Args:
+        ajax_response (str) : javascript returned by the review endpoint
+
+    Returns:
+        str : html code of the reviews or None if the response is not understood
+    """
+    match = AJAX_RESPONSE_REGEX.search(ajax_response)
+    if match == None:
+        return None
+    # the argument is a javascript string literal, which is json apart from \'
+    return json.loads(match.group(1).replace("\\'", "'"))
+
+
+def _is_next_page_present(review_html):
+    """
+    Checks whether the pagination in the review HTML links to another page
+    The last page renders `next_page` as a <span> instead of a link
+
+    Args:
+        review_html (str) : html code of the reviews
+
+    Returns:
+        bool flag indicating whether there is a next page or not
+    """
+    soup = BeautifulSoup(review_html, "html.parser")
+    return soup.find("a", class_="next_page") != None
+
+
+def _create_session():
+    """
+    Starts a new http session for the current thread
+
+    Returns:
+        requests session
+    """
+    session = requests.Session()
+    session.headers.update(HTTP_HEADERS)
+    navigator_state.session = session
+    return session
+
+
+def _fetch_review_page(review_page_url, page_number):
+    """
+    Fetches a review page from the Ajax endpoint, or from
+    :data:`FileUtil.ResponseCache.response_cache` when it has been fetched recently
+
+    Args:
+        review_page_url (str) : URL of the review page, see `_build_review_page_url`
+        page_number (int) : review page fetched
+
+    Returns:
+        str : html code of the reviews or None if the response is not understood
+    """
+    review_html = response_cache.get(review_page_url, page_number)
+    if review_html == None:
+        page = request_scheduler.call(
+            review_page_url,
+            partial(
+                navigator_state.session.get,
+                review_page_url,
+                headers=AJAX_HEADERS,
+                timeout=HTTP_TIMEOUT,
+            ),
+            retries=SCHEDULER_RETRIES,
+            retry_on=RETRYABLE_EXCEPTIONS,
+        )
+        page.raise_for_status()
+        review_html = _extract_review_html_from_ajax_response(page.text)
+        if review_html == None:
+            Logger.log(
+                "error",
+                "HttpNavigator",
+                "_fetch_review_page",
+                "WARNING: Could not read reviews from " + review_page_url,
+            )
+            return None
+        response_cache.put(review_page_url, page_number, review_html)
+    return review_html
+
+
+def get_html_code_for_first_page(root_url, new_book, sort_order=None):
+    """
+    Fetches the book page and returns the HTML code for the book review part
+    The `new_book` indicator resets the http session and the page counter for every book
+    Each thread gets its own http session. Pages are read from
+    :data:`FileUtil.ResponseCache.response_cache` when they have been fetched recently
+    With a `sort_order` the first page comes from the Ajax endpoint in that order and
+    so do the pages after it
+
+    Args:
+        root_url (str) : URL of the book
+        new_book (bool) : indicates whether its a new book or not
+        sort_order (str) : order of the reviews eg, `REVIEW_SORT_NEWEST`, the default order when None
+
+    Returns:
+        html code of the book reviews
+    """
+    session = getattr(navigator_state, "session", None)
+    if new_book or session == None:
+        Logger.log(
+            "info",
+            "HttpNavigator",
+            "get_html_code_for_first_page",
+            "Creating http session for first page",
+        )
+        session = _create_session()
+    navigator_state.current_page = 1
+    navigator_state.is_next_page_present = False
+    navigator_state.sort_order = sort_order
+    if sort_order != None:
+        first_page = _fetch_review_page(
+            _build_review_page_url(root_url, 1, sort_order), 1
+        )
+        if first_page == None:
+            return None
+        navigator_state.is_next_page_present = _is_next_page_present(first_page)
+        return first_page
+    first_page = response_cache.get(root_url, 1)
+    if first_page == None:
+        page = request_scheduler.call(
+            root_url,
+            partial(session.get, root_url, timeout=HTTP_TIMEOUT),
+            retries=SCHEDULER_RETRIES,
+            retry_on=RETRYABLE_EXCEPTIONS,
+        )
+        page.raise_for_status()
+        book_reviews_tag = BeautifulSoup(page.text, "html.parser").find(
+            "div", attrs={"id": "bookReviews"}
+        )
+        if book_reviews_tag == None:
+            Logger.log(
+                "error",
+                "HttpNavigator",
+                "get_html_code_for_first_page",
+                "WARNING: There is no review section!",
+            )
+            return None
+        first_page = book_reviews_tag.decode_contents()
+        response_cache.put(root_url, 1, first_page)
+    navigator_state.is_next_page_present = _is_next_page_present(first_page)
+    return first_page
+
+
+def get_html_code_for_other_pages(root_url):
+    """
+    Fetches the next review page straight from the Ajax endpoint
+    Returns the same values as :func:`SiteNavigator.get_html_code_for_other_pages` ie,
+    whether there was a next page, html code which contains the `bookReviews` div and
+    the number of the page fetched
+
+    Args:
+        root_url (str) : URL of the book
+
+    Returns:
+        html code of the book reviews
+    """
+    if getattr(navigator_state, "session", None) == None:
+        # other pages cant be reached without the first page
+        get_html_code_for_first_page(root_url, True)
+    if not navigator_state.is_next_page_present:
+        return False, None, None
+
+    page_number = navigator_state.current_page + 1
+    review_page_url = _build_review_page_url(
+        root_url, page_number, getattr(navigator_state, "sort_order", None)
+    )
+    review_html = _fetch_review_page(review_page_url, page_number)
+    if review_html == None:
+        navigator_state.is_next_page_present = False
+        return False, None, None
+
+    navigator_state.current_page += 1
+    navigator_state.is_next_page_present = _is_next_page_present(review_html)
+    # wrap it the same way it sits in the book page so callers can find the div
+    html_source = '<div id="bookReviews">' + review_html + "</div>"
+    # utf-8 encoded like the page number selenium reads off the page
+    return True, html_source, str(navigator_state.current_page).encode("utf-8")
+
+
+def resume_from_page(root_url, page_number, sort_order=None):
+    """
+    Starts a book afresh but makes the next `get_html_code_for_other_pages` call return
+    review page `page_number` + 1, used to resume a book from a checkpoint
+    
+    Args:
+        root_url (str) : URL of the book
+        page_number (int) : last review page already scraped
+        sort_order (str) : order the earlier pages were scraped in, the default order when None
+    """
+    _create_session()
+    navigator_state.sort_order = sort_order
+    navigator_state.current_page = page_number
+    # a checkpointed page is only left unfinished when there was a page after it
+    navigator_state.is_next_page_present = True
+
+
+if __name__ == "__main__":
+    pass
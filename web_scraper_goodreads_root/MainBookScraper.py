@@ -7,16 +7,36 @@
 
 Functions:
     
-- `generate_book_review_images()` : Scrapes goodreads.com for reviews and visualizes data
+- `_scrape_book(book_url, fetch_backend, incremental)` : Scrapes, saves and visualizes reviews of one book
+- `generate_book_review_images(genre, fetch_backend, workers, incremental)` : Scrapes goodreads.com for reviews and visualizes data
 """
+import threading
+from functools import partial
+from multiprocessing.pool import ThreadPool
 from GenreScraper import retriveSciFiBookList
-from FileUtil.FilePicking import save_obj, load_latest_obj
-from BookReviews import retrieve_book_review_details
+from FileUtil.Catalog import (
+    save_obj,
+    save_reviews,
+    data_for_book_exists_current_date,
+    _today,
+)
+from FileUtil.BookCatalog import book_catalog
+from BookReviews import retrieve_book_review_details, _is_full_scrape_due
+from FileUtil.ResponseCache import CacheMissError
+from FileUtil.ReviewStream import remove_review_stream
+from FileUtil.ReviewArrays import save_review_array
+from SiteNavigator import driver_pool, release_driver
 from HelperUtils import extract_book_name_from_root_url
 from book_review_visualization import visualize_and_save_review_information
-from HelperUtils import data_for_book_exists_current_date
 from selenium.common.exceptions import TimeoutException
-from CommonConstants.Constants import FAILURE_THRESHOLD
+from requests.exceptions import RequestException
+from CommonConstants.Constants import (
+    FAILURE_THRESHOLD,
+    FETCH_BACKEND_SELENIUM,
+    FETCH_BACKEND_HTTP,
+    SCRAPER_WORKERS,
+    INCREMENTAL_SCRAPE,
+)
 from YALogger.custom_logger import Logger
 
 # initailize the YALogger
@@ -24,119 +44,200 @@ Logger.initialize_logger(
     logger_prop_file_path=".\logger.properties", log_file_path="./logs"
 )
 
+# matplotlib keeps global state so only one book is visualized at a time
+visualization_lock = threading.Lock()
 
-def generate_book_review_images(genre):
+
+def _scrape_book(book_url, fetch_backend, incremental=INCREMENTAL_SCRAPE):
     """
-    Does the following:
+    Does the following for one book:
         
-        1. Scrapes goodreads.com to get list of most popular book & details for input `genre`
-        2. Saves details to pickle file
-        3. Loads the latest pickle file data
-        4. Loops through the book list to:
-            - extract book name from book URL
-            - scrape book review details 
-            - save details to pickle file
-            - load latest pickle file data
-            - visualize review likes data
-        
-        Args:
-            genre (str): book genre to process
+        - extract book name from book URL
+        - scrape book review details 
+        - save details to the catalog - :mod:`FileUtil.Catalog` and the review array - :mod:`FileUtil.ReviewArrays`
+        - visualize review likes data straight from the scraped details
+    
+    The reviews of a book are kept in three places, only the catalog is canonical:
+    
+        - :mod:`FileUtil.Catalog` : every snapshot of the reviews, what all reads fall back to
+        - :mod:`FileUtil.ReviewStream` : checkpoint a retry resumes from, removed once the catalog has the reviews
+        - :mod:`FileUtil.ReviewArrays` : read cache of the latest snapshot, written again from the catalog when missing
+    
+    Every call keeps its own failure count so books scraped in parallel
+    dont use up each others retries. A retry resumes from the last review page
+    in the review stream written by :mod:`BookReviews` instead of starting over.
+    The selenium driver is always given back to :data:`SiteNavigator.driver_pool` at the end
+    
+    `incremental` only applies to the http backend, and a book not fully scraped in the last
+    `INCREMENTAL_FULL_REFRESH_DAYS` days is fully scraped anyway, see :func:`BookReviews._is_full_scrape_due`
+    
+    Args:
+        book_url (str): URL of the book
+        fetch_backend (str): backend used to fetch review pages, see :mod:`BookReviews`
+        incremental (bool): only scrape the reviews added since the book was last scraped
         
-    .. note:: When there is a timeout exception during scraping, `generate_book_review_images` 
-              function will retry upto `FAILURE_THRESHOLD` from :mod:`web_scraper_goodreads_root.CommonConstants.Constants` times before skipping the book
+    Returns:
+        bool flag indicating whether the book was processed or skipped after too many failures
     """
-    # Run the genre scraper and retrive book details for that genre
-    sci_fi_book_details = retriveSciFiBookList(genre)
-    # print('*'*15)
-    # Save the details to pkl file
-    save_obj(sci_fi_book_details, "sci-fi-books-list", "Data", True)
-    # Read the latest pickle file
-    sci_fi_list = load_latest_obj("sci-fi-books-list", "Data")
-    book_index = 0
+    book_name = extract_book_name_from_root_url(book_url)
     failure_threshold_index = 0
-    while True:
-        try:
-            while book_index < len(sci_fi_list):
-                book_url = sci_fi_list[book_index]["book_URL"]
-                # get the review details for the book
-                book_name = extract_book_name_from_root_url(book_url)
-                # print('*'*15)
+    # decided once so a retry resumes the scrape in the mode it was started in
+    incremental = (
+        incremental
+        and fetch_backend == FETCH_BACKEND_HTTP
+        and not _is_full_scrape_due(book_name)
+    )
+    try:
+        while True:
+            try:
                 Logger.log(
                     "info",
                     "MainBookScraper",
-                    "generate_book_review_images",
+                    "_scrape_book",
                     "Processing " + book_name + " book",
                 )
                 if not data_for_book_exists_current_date("Data/" + book_name):
-                    # Iterate through each book in the genre
+                    # a retry continues from the last review page checkpointed
                     book_review_details = retrieve_book_review_details(
-                        book_url, new_book=True
+                        book_url,
+                        new_book=True,
+                        fetch_backend=fetch_backend,
+                        resume=failure_threshold_index > 0,
+                        incremental=incremental,
                     )
 
-                    # save the book details
-                    save_obj(
+                    # save the book details, the catalog holds the canonical copy
+                    save_reviews(
                         book_review_details,
                         "book_review_details",
                         "Data/" + book_name,
-                        True,
-                    )
-                    # load the latest pkl file having review details
-                    book_review = load_latest_obj(
-                        "book_review_details", "Data/" + book_name
+                        incremental,
                     )
+                    # the open memory map has to go before its file is replaced on windows
+                    book_catalog.forget(book_name)
+                    save_review_array(book_review_details, book_name)
+                    remove_review_stream(book_name)
 
                     # Visualize the info and save it in system
-                    visualize_and_save_review_information(book_review, book_name)
+                    with visualization_lock:
+                        visualize_and_save_review_information(
+                            book_review_details, book_name
+                        )
                 else:
                     Logger.log(
                         "error",
                         "MainBookScraper",
-                        "generate_book_review_images",
+                        "_scrape_book",
                         "Book details "
                         + book_name
                         + " already present in current date...skipping",
                     )
-                # print('*'*15)
-                book_index += 1
-            if book_index >= len(sci_fi_list):
-                Logger.log(
-                    "info",
-                    "MainBookScraper",
-                    "generate_book_review_images",
-                    "All books processed...",
-                )
-                break
-        except TimeoutException as e:
-            book_name = extract_book_name_from_root_url(
-                sci_fi_list[book_index]["book_URL"]
-            )
-            failure_threshold_index += 1
-            if failure_threshold_index > FAILURE_THRESHOLD:
+                return True
+            except (TimeoutException, RequestException) as e:
+                failure_threshold_index += 1
+                if failure_threshold_index > FAILURE_THRESHOLD:
+                    Logger.log(
+                        "error",
+                        "MainBookScraper",
+                        "_scrape_book",
+                        "Skipping "
+                        + book_name
+                        + " since it hit exception more than threshold limit",
+                    )
+                    return False
                 Logger.log(
                     "error",
                     "MainBookScraper",
-                    "generate_book_review_images",
-                    "Skipping "
-                    + book_name
-                    + " since it hit exception more than threshold limit",
+                    "_scrape_book",
+                    "********Timeout or request Exception while processing book -->"
+                    + repr(e)
+                    + "***********",
                 )
-                failure_threshold_index = 0
-                book_index += 1
-            else:
                 Logger.log(
                     "error",
                     "MainBookScraper",
-                    "generate_book_review_images",
-                    "********Timeout Exception while processing book -->"
-                    + repr(e)
-                    + "***********",
+                    "_scrape_book",
+                    "Retrying to process book again..." + book_name,
                 )
+            except CacheMissError as e:
                 Logger.log(
                     "error",
                     "MainBookScraper",
-                    "generate_book_review_images",
-                    "Retrying to process book again..." + book_name,
+                    "_scrape_book",
+                    "Skipping " + book_name + " in cache only mode -->" + repr(e),
+                )
+                return False
+    finally:
+        # hand the warm browser back for the next book
+        release_driver()
+
+
+def generate_book_review_images(
+    genre,
+    fetch_backend=FETCH_BACKEND_SELENIUM,
+    workers=SCRAPER_WORKERS,
+    incremental=INCREMENTAL_SCRAPE,
+):
+    """
+    Does the following:
+        
+        1. Scrapes goodreads.com to get list of most popular book & details for input `genre`
+        2. Saves details to the catalog - :mod:`FileUtil.Catalog`
+        3. Reads the books of today's list for `genre` from :data:`FileUtil.BookCatalog.book_catalog`
+        4. Loops through the book list and processes each book via `_scrape_book`
+        
+    When `workers` is more than 1, that many books are scraped at the same time.
+    Scraping mostly waits on the browser or the network so the workers are threads,
+    each of them gets its own selenium driver or http session.
+    Warm selenium drivers are shared via :data:`SiteNavigator.driver_pool` and quit at the end
+        
+        Args:
+            genre (str): book genre to process
+            fetch_backend (str): backend used to fetch review pages, see :mod:`BookReviews`
+            workers (int): number of books to scrape at the same time
+            incremental (bool): only scrape the reviews added since each book was last scraped,
+                only with the http backend and not for books due a full scrape
+        
+    .. note:: When there is a timeout or a requests error eg, connection error or a final 429/503 during scraping, `generate_book_review_images` 
+              function will retry upto `FAILURE_THRESHOLD` from :mod:`web_scraper_goodreads_root.CommonConstants.Constants` times before skipping the book
+    """
+    # Run the genre scraper and retrive book details for that genre
+    sci_fi_book_details = retriveSciFiBookList(genre)
+    # print('*'*15)
+    # Save the details to the catalog
+    save_obj(sci_fi_book_details, "sci-fi-books-list", "Data", True, genre=genre)
+    # Read the books of today's list in the order of the list
+    book_urls = [
+        book_entry.book.book_URL
+        for book_entry in book_catalog.books(genre=genre, listed_on=_today())
+    ]
+    try:
+        if workers > 1:
+            pool = ThreadPool(workers)
+            try:
+                pool.map(
+                    partial(
+                        _scrape_book,
+                        fetch_backend=fetch_backend,
+                        incremental=incremental,
+                    ),
+                    book_urls,
+                    1,
                 )
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            for book_url in book_urls:
+                _scrape_book(book_url, fetch_backend, incremental)
+    finally:
+        driver_pool.close_all()
+    Logger.log(
+        "info",
+        "MainBookScraper",
+        "generate_book_review_images",
+        "All books processed...",
+    )
 
 
 if __name__ == "__main__":
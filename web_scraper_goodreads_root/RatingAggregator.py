@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: RatingAggregator
+    :synopsis: Simple average and Bayesian Adjusted Rating of a book kept up to date as reviews come in
+
+.. moduleauthor:: DivyenduDutta
+
+The Bayesian Adjusted Rating of :mod:`review_rating_calculation` is the average over the
+reviews of (likes * rating + sum of likes * ratings) / (likes + sum of likes), where the
+likes are shifted by 1 when any review has 0 likes. Reviews with the same likes and rating
+add the same term, so `RatingAggregator` only keeps:
+
+- the number of reviews, sum of likes, sum of ratings and sum of likes * ratings
+- the number of reviews with 0 likes, to apply the shift when the rating is read
+- the number of reviews of every (likes, rating) pair and of every rating
+
+Adding a page of reviews costs a count per review and reading the ratings costs a pass over
+the distinct (likes, rating) pairs, a few hundred even for books of 100k reviews, instead
+of all the reviews. Aggregators of shards of the same book are combined with `merge`.
+
+- `RatingAggregator.add_reviews(review_likes, review_ratings)`
+- `RatingAggregator.add_columns(reviews)`
+- `RatingAggregator.add_page(page_review_details)`
+- `RatingAggregator.merge(other)`
+- `RatingAggregator.simple_average()`
+- `RatingAggregator.bayesian_adj_rating()`
+"""
+from __future__ import division
+import numpy as np
+from Records import as_review
+
+# more than the highest goodreads rating, packs (likes, rating) into one int
+RATING_KEY_BASE = 8
+
+
+class RatingAggregator(object):
+    """
+    Sufficient statistics of the reviews of a book for its simple average and BAR
+    """
+
+    def __init__(self):
+        self.review_count = 0
+        self.sum_of_likes = 0
+        self.sum_of_ratings = 0
+        self.sum_of_likes_mul_ratings = 0
+        self.zero_like_count = 0
+        self.pair_counts = {}  # (likes, rating) to number of reviews
+        self.rating_counts = {}  # rating to number of reviews
+        self._bayesian_adj_rating = None  # computed on first read after a change
+
+    def add_reviews(self, review_likes, review_ratings):
+        """
+        Args:
+            review_likes (numpy array or list) : likes from the reviews
+            review_ratings (numpy array or list) : ratings from the reviews
+        """
+        review_likes = np.asarray(review_likes, dtype=np.int64)
+        review_ratings = np.asarray(review_ratings, dtype=np.int64)
+        if len(review_likes) == 0:
+            return
+        self.review_count += len(review_likes)
+        self.sum_of_likes += int(review_likes.sum())
+        self.sum_of_ratings += int(review_ratings.sum())
+        self.sum_of_likes_mul_ratings += int((review_likes * review_ratings).sum())
+        self.zero_like_count += int((review_likes == 0).sum())
+
+        rating_keys, key_counts = np.unique(
+            review_likes * RATING_KEY_BASE + review_ratings, return_counts=True
+        )
+        for rating_key, key_count in zip(rating_keys.tolist(), key_counts.tolist()):
+            pair = divmod(rating_key, RATING_KEY_BASE)
+            self.pair_counts[pair] = self.pair_counts.get(pair, 0) + key_count
+            self.rating_counts[pair[1]] = self.rating_counts.get(pair[1], 0) + key_count
+        self._bayesian_adj_rating = None
+
+    def add_columns(self, reviews):
+        """
+        Args:
+            reviews (numpy structured array) : reviews with `REVIEW_DTYPE` - :mod:`FileUtil.ColumnarReviews`
+        """
+        self.add_reviews(reviews["review_likes"], reviews["review_rating"])
+
+    def add_page(self, page_review_details):
+        """
+        Args:
+            page_review_details (dict) : review details of a page as built by
+            :func:`BookReviews._retrieve_book_review_details_per_page`, reviews without
+            a rating are skipped
+        """
+        page_reviews = [
+            as_review(page_review_details[review_index])
+            for review_index in page_review_details
+        ]
+        page_reviews = [review for review in page_reviews if review.review_rating != 0]
+        self.add_reviews(
+            [review.review_likes for review in page_reviews],
+            [review.review_rating for review in page_reviews],
+        )
+
+    def merge(self, other):
+        """
+        Adds the reviews of another aggregator eg, of another shard of the book
+
+        Args:
+            other (RatingAggregator) : aggregator to add
+
+        Returns:
+            RatingAggregator : this aggregator
+        """
+        self.review_count += other.review_count
+        self.sum_of_likes += other.sum_of_likes
+        self.sum_of_ratings += other.sum_of_ratings
+        self.sum_of_likes_mul_ratings += other.sum_of_likes_mul_ratings
+        self.zero_like_count += other.zero_like_count
+        for pair, pair_count in other.pair_counts.items():
+            self.pair_counts[pair] = self.pair_counts.get(pair, 0) + pair_count
+        for rating, rating_count in other.rating_counts.items():
+            self.rating_counts[rating] = (
+                self.rating_counts.get(rating, 0) + rating_count
+            )
+        self._bayesian_adj_rating = None
+        return self
+
+    def simple_average(self):
+        """
+        Returns:
+            float : average rating or None when there are no reviews
+        """
+        if self.review_count == 0:
+            return None
+        return self.sum_of_ratings / self.review_count
+
+    def bayesian_adj_rating(self):
+        """
+        Same as :func:`review_rating_calculation._calculate_bayesian_adj_rating` over
+        all the reviews added, 0 like adjustment included
+
+        Returns:
+            float : average bayesian adjusted rating or None when there are no reviews
+        """
+        if self.review_count == 0:
+            return None
+        if self._bayesian_adj_rating == None:
+            like_shift = 1 if self.zero_like_count > 0 else 0
+            sum_of_likes = self.sum_of_likes + like_shift * self.review_count
+            sum_of_likes_mul_ratings = (
+                self.sum_of_likes_mul_ratings + like_shift * self.sum_of_ratings
+            )
+            pairs = np.array(list(self.pair_counts), dtype=np.int64)
+            pair_counts = np.array(
+                [self.pair_counts[tuple(pair)] for pair in pairs.tolist()],
+                dtype=np.float64,
+            )
+            review_likes = pairs[:, 0] + like_shift
+            bayesian_adj_ratings = (
+                review_likes * pairs[:, 1] + sum_of_likes_mul_ratings
+            ) / (review_likes + sum_of_likes).astype(np.float64)
+            self._bayesian_adj_rating = (
+                float((pair_counts * bayesian_adj_ratings).sum()) / self.review_count
+            )
+        return self._bayesian_adj_rating
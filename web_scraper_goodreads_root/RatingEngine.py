@@ -0,0 +1,366 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: RatingEngine
+    :synopsis: Rates every book of the corpus at once with pluggable rating models over packed review arrays
+
+.. moduleauthor:: DivyenduDutta
+
+`PackedReviews` concatenates the likes and ratings of all the books into one array each,
+with `offsets[i]:offsets[i + 1]` the reviews of book i. Every rating model is then a handful
+of grouped reductions (np.add.reduceat, np.bincount) over the whole corpus instead of a
+python loop over the books. The reductions shared by the models, like the reviews and
+ratings of each book, are computed once per pack and reused.
+
+The models shipped, registered in `RATING_MODELS` under their name:
+
+- `mean` : average of the ratings, the simple average of :mod:`review_rating_calculation`
+- `bar` : Bayesian Adjusted Rating of :mod:`review_rating_calculation`, 0 like adjustment included
+- `wilson` : lower bound of the Wilson score interval of the share of ratings of `WILSON_POSITIVE_RATING` or more
+- `dirichlet` : mean rating under a Dirichlet prior of `DIRICHLET_PRIOR` pseudo ratings per star
+
+A new model subclasses `RatingModel` and is passed to `register_rating_model`, nothing else
+has to change. Each model has a `version` to bump whenever its ratings change.
+
+Run from `web_scraper_goodreads_root` with ``python -m RatingEngine --genre science-fiction fantasy``
+to rate the books of the catalog and log the top books of every model.
+
+- `PackedReviews.from_reviews(book_reviews)`
+- `PackedReviews.group_sums(values)`
+- `PackedReviews.group_means(values)`
+- `PackedReviews.rating_counts()`
+- `RatingModel.rate(packed_reviews)`
+- `register_rating_model(rating_model)`
+- `rate_packed_reviews(packed_reviews, model_names)`
+- `rate_catalog(genres, model_names)`
+"""
+from __future__ import print_function, division
+import time
+import argparse
+from collections import OrderedDict
+import numpy as np
+from FileUtil.BookCatalog import book_catalog
+from BookRanking import top_books
+from CommonConstants.Constants import (
+    WILSON_Z,
+    WILSON_POSITIVE_RATING,
+    DIRICHLET_PRIOR,
+)
+from YALogger.custom_logger import Logger
+
+HIGHEST_RATING = 5  # goodreads ratings go from 1 to 5
+
+
+class PackedReviews(object):
+    """
+    Likes and ratings of many books packed into flat arrays
+
+    Args:
+        review_likes (numpy array) : likes of the reviews of all the books, book after book
+        review_ratings (numpy array) : ratings of the reviews in the same order
+        offsets (numpy array) : start of the reviews of each book followed by the number of reviews
+    """
+
+    def __init__(self, review_likes, review_ratings, offsets):
+        self.review_likes = np.asarray(review_likes, dtype=np.int64)
+        self.review_ratings = np.asarray(review_ratings, dtype=np.int64)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.book_count = len(self.offsets) - 1
+        self.review_counts = np.diff(self.offsets)
+        # index of the book of every review
+        self.review_books = np.repeat(np.arange(self.book_count), self.review_counts)
+        self._non_empty = self.review_counts > 0
+        self._rating_counts = None
+
+    @classmethod
+    def from_reviews(cls, book_reviews):
+        """
+        Args:
+            book_reviews (list) : numpy structured array of the reviews of each book - :mod:`FileUtil.ColumnarReviews`
+
+        Returns:
+            PackedReviews : reviews of the books packed in the same order
+        """
+        offsets = np.zeros(len(book_reviews) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(reviews) for reviews in book_reviews])
+        review_likes = np.empty(offsets[-1], dtype=np.int64)
+        review_ratings = np.empty(offsets[-1], dtype=np.int64)
+        for book_index, reviews in enumerate(book_reviews):
+            start, end = offsets[book_index], offsets[book_index + 1]
+            review_likes[start:end] = reviews["review_likes"]
+            review_ratings[start:end] = reviews["review_rating"]
+        return cls(review_likes, review_ratings, offsets)
+
+    def group_sums(self, values):
+        """
+        Sums `values` over the reviews of each book
+
+        Args:
+            values (numpy array) : one value per review
+
+        Returns:
+            numpy array : sum of each book, 0 for books without reviews
+        """
+        values = np.asarray(values)
+        sums = np.zeros(self.book_count, dtype=values.dtype)
+        if len(values) > 0:
+            # reduceat sums up to the next start so empty books are left out of the starts
+            sums[self._non_empty] = np.add.reduceat(
+                values, self.offsets[:-1][self._non_empty]
+            )
+        return sums
+
+    def group_means(self, values):
+        """
+        Args:
+            values (numpy array) : one value per review
+
+        Returns:
+            numpy array : mean of each book, nan for books without reviews
+        """
+        means = np.full(self.book_count, np.nan)
+        means[self._non_empty] = (
+            self.group_sums(values)[self._non_empty]
+            / self.review_counts[self._non_empty].astype(np.float64)
+        )
+        return means
+
+    def rating_counts(self):
+        """
+        Returns:
+            numpy array : book count x 6 counts of the reviews of each book by rating, column 0 unused
+        """
+        if self._rating_counts is None:
+            self._rating_counts = np.bincount(
+                self.review_books * (HIGHEST_RATING + 1) + self.review_ratings,
+                minlength=self.book_count * (HIGHEST_RATING + 1),
+            ).reshape(self.book_count, HIGHEST_RATING + 1)
+        return self._rating_counts
+
+
+class RatingModel(object):
+    """
+    Rating model of `RatingEngine`, subclasses set `name` and `version` and implement `rate`
+    """
+
+    name = None
+    version = 1
+
+    def rate(self, packed_reviews):
+        """
+        Args:
+            packed_reviews (PackedReviews) : reviews of the books
+
+        Returns:
+            numpy array : rating of each book, nan for books without reviews
+        """
+        raise NotImplementedError
+
+
+class MeanRatingModel(RatingModel):
+    """
+    Average of the ratings of each book
+    """
+
+    name = "mean"
+
+    def rate(self, packed_reviews):
+        return packed_reviews.group_means(packed_reviews.review_ratings)
+
+
+class BayesianAdjRatingModel(RatingModel):
+    """
+    Average Bayesian Adjusted Rating of each book, the likes of a book are shifted by 1
+    when any of its reviews has 0 likes - see :func:`review_rating_calculation._convert_to_bayesian_adj_rating`
+    """
+
+    name = "bar"
+
+    def rate(self, packed_reviews):
+        like_shifts = (
+            packed_reviews.group_sums(
+                (packed_reviews.review_likes == 0).astype(np.int64)
+            )
+            > 0
+        ).astype(np.int64)
+        review_likes = (
+            packed_reviews.review_likes + like_shifts[packed_reviews.review_books]
+        )
+        likes_mul_ratings = review_likes * packed_reviews.review_ratings
+        sum_of_likes = packed_reviews.group_sums(review_likes)
+        sum_of_likes_mul_ratings = packed_reviews.group_sums(likes_mul_ratings)
+        bayesian_adj_ratings = (
+            likes_mul_ratings + sum_of_likes_mul_ratings[packed_reviews.review_books]
+        ) / (
+            (review_likes + sum_of_likes[packed_reviews.review_books]).astype(
+                np.float64
+            )
+        )
+        return packed_reviews.group_means(bayesian_adj_ratings)
+
+
+class WilsonRatingModel(RatingModel):
+    """
+    Lower bound of the Wilson score interval, at `WILSON_Z` standard deviations, of the share
+    of ratings of `WILSON_POSITIVE_RATING` or more, so books with few reviews rank lower
+    """
+
+    name = "wilson"
+
+    def rate(self, packed_reviews):
+        rating_counts = packed_reviews.rating_counts()
+        review_counts = packed_reviews.review_counts.astype(np.float64)
+        lower_bounds = np.full(packed_reviews.book_count, np.nan)
+        non_empty = review_counts > 0
+        review_counts = review_counts[non_empty]
+        positive_share = (
+            rating_counts[non_empty, WILSON_POSITIVE_RATING:].sum(axis=1) / review_counts
+        )
+        z_squared = WILSON_Z * WILSON_Z
+        lower_bounds[non_empty] = (
+            positive_share
+            + z_squared / (2 * review_counts)
+            - WILSON_Z
+            * np.sqrt(
+                (positive_share * (1 - positive_share) + z_squared / (4 * review_counts))
+                / review_counts
+            )
+        ) / (1 + z_squared / review_counts)
+        return lower_bounds
+
+
+class DirichletRatingModel(RatingModel):
+    """
+    Posterior mean rating of each book with `DIRICHLET_PRIOR` pseudo ratings of every star
+    added to its ratings, pulling books with few reviews towards the middle
+    """
+
+    name = "dirichlet"
+
+    def rate(self, packed_reviews):
+        prior = np.asarray(DIRICHLET_PRIOR, dtype=np.float64)
+        star_counts = packed_reviews.rating_counts()[:, 1:] + prior
+        stars = np.arange(1, HIGHEST_RATING + 1)
+        posterior_means = (star_counts * stars).sum(axis=1) / star_counts.sum(axis=1)
+        posterior_means[packed_reviews.review_counts == 0] = np.nan
+        return posterior_means
+
+
+RATING_MODELS = OrderedDict()
+
+
+def register_rating_model(rating_model):
+    """
+    Adds a model to `RATING_MODELS`, replacing the one of the same name
+
+    Args:
+        rating_model (RatingModel) : the model
+    """
+    if rating_model.name == None:
+        raise ValueError(type(rating_model).__name__ + " has no name")
+    RATING_MODELS[rating_model.name] = rating_model
+
+
+for rating_model in (
+    MeanRatingModel(),
+    BayesianAdjRatingModel(),
+    WilsonRatingModel(),
+    DirichletRatingModel(),
+):
+    register_rating_model(rating_model)
+
+
+def rate_packed_reviews(packed_reviews, model_names=None):
+    """
+    Args:
+        packed_reviews (PackedReviews) : reviews of the books
+        model_names (list) : names of the models in `RATING_MODELS` to run, all of them when None
+
+    Returns:
+        OrderedDict : model name to the rating of each book
+    """
+    if model_names == None:
+        model_names = list(RATING_MODELS)
+    unknown_model_names = [name for name in model_names if name not in RATING_MODELS]
+    if len(unknown_model_names) > 0:
+        raise ValueError("Unknown rating models " + ", ".join(unknown_model_names))
+    return OrderedDict(
+        (name, RATING_MODELS[name].rate(packed_reviews)) for name in model_names
+    )
+
+
+def rate_catalog(genres=None, model_names=None):
+    """
+    Rates the books with reviews of :data:`FileUtil.BookCatalog.book_catalog` in one batch
+
+    Args:
+        genres (list) : genres whose books are rated, every book of the catalog when None
+        model_names (list) : names of the models in `RATING_MODELS` to run, all of them when None
+
+    Returns:
+        dict : index of the book to its name and its rating under every model, as
+        :func:`BookRanking.top_books` takes with the model names as metrics
+    """
+    book_entries = OrderedDict()
+    for genre in genres or [None]:
+        for book_entry in book_catalog.books(genre=genre, min_reviews=1):
+            # a book listed under many genres is rated once
+            book_entries.setdefault(book_entry.book_name, book_entry)
+    packed_reviews = PackedReviews.from_reviews(
+        [book_entry.reviews() for book_entry in book_entries.values()]
+    )
+    model_ratings = rate_packed_reviews(packed_reviews, model_names)
+    book_ratings = {}
+    for book_index, book_name in enumerate(book_entries):
+        book_ratings[book_index] = {"book_name": book_name}
+        for name, ratings in model_ratings.items():
+            book_ratings[book_index][name] = float(ratings[book_index])
+    return book_ratings
+
+
+if __name__ == "__main__":
+    argument_parser = argparse.ArgumentParser(
+        description="Rates the books of the catalog with every rating model"
+    )
+    argument_parser.add_argument(
+        "--genre", nargs="*", default=None, help="genres to rate, all books by default"
+    )
+    argument_parser.add_argument(
+        "--model",
+        nargs="*",
+        default=None,
+        help="rating models to run, all of " + ", ".join(RATING_MODELS) + " by default",
+    )
+    argument_parser.add_argument(
+        "--top", type=int, default=5, help="number of top books logged per model"
+    )
+    arguments = argument_parser.parse_args()
+    Logger.initialize_logger(
+        logger_prop_file_path="./logger.properties", log_file_path="./logs"
+    )
+    started_at = time.time()
+    book_ratings = rate_catalog(arguments.genre, arguments.model)
+    Logger.log(
+        "info",
+        "RatingEngine",
+        "__main__",
+        "Rated "
+        + str(len(book_ratings))
+        + " books in "
+        + "%.2f" % (time.time() - started_at)
+        + " seconds",
+    )
+    for name in arguments.model or RATING_MODELS:
+        Logger.log(
+            "info",
+            "RatingEngine",
+            "__main__",
+            "Top books as per "
+            + name
+            + " - "
+            + ", ".join(
+                book_rating_info["book_name"]
+                for _, book_rating_info in top_books(
+                    book_ratings, arguments.top, [name]
+                )
+            ),
+        )
@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: Records
+    :synopsis: Slotted record types for the books and reviews passed between the scrapers, the catalog and the analysis
+
+.. moduleauthor:: DivyenduDutta
+
+A `Review` or `Book` holds its details in `__slots__` instead of a dict, so it takes a
+fraction of the memory and setting a misspelt detail raises AttributeError instead
+of quietly adding a key. Book lists and review details are still dicts keyed by a
+running index, only their values are records.
+
+Pickles saved before the records hold plain dicts, `as_review` and `as_book` take
+either and `to_dict` gives back the dict format, eg, for the json copies.
+
+- `Review.to_dict()`
+- `Review.from_dict(review_details)`
+- `Book.to_dict()`
+- `Book.from_dict(book_details)`
+- `as_review(review)`
+- `as_book(book)`
+- `record_to_dict(record)`
+"""
+
+MISSING_REVIEW_ID = 0  # reviews scraped before ids were
+
+
+class _Record(object):
+    """
+    Equality, repr and pickling shared by the record types, driven by `__slots__`
+    """
+
+    __slots__ = ()
+
+    def to_dict(self):
+        """
+        Returns:
+            dict : details of the record
+        """
+        return dict((name, getattr(self, name)) for name in self.__slots__)
+
+    @classmethod
+    def from_dict(cls, details):
+        """
+        Args:
+            details (dict) : details as returned by `to_dict`, missing ones get their default
+
+        Returns:
+            record with the details
+        """
+        unknown_names = set(details) - set(cls.__slots__)
+        if len(unknown_names) > 0:
+            raise ValueError(
+                "Unknown " + cls.__name__ + " details " + ", ".join(sorted(unknown_names))
+            )
+        return cls(**details)
+
+    def __eq__(self, other):
+        return type(self) == type(other) and all(
+            getattr(self, name) == getattr(other, name) for name in self.__slots__
+        )
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None  # mutable
+
+    def __repr__(self):
+        return (
+            self.__class__.__name__
+            + "("
+            + ", ".join(
+                name + "=" + repr(getattr(self, name)) for name in self.__slots__
+            )
+            + ")"
+        )
+
+    def __getstate__(self):
+        # slotted objects have no __dict__ for pickle to save
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+
+
+class Review(_Record):
+    """
+    Details of one review as scraped by :mod:`BookReviews`
+
+    Args:
+        review_id (int) : id goodreads gives the review or `MISSING_REVIEW_ID`
+        review_likes (int) : likes on the review
+        review_rating (int) : rating given by the review, see `GOODREADS_REVIEW_RATING`
+        review_date (str) : date of the review as shown on goodreads or None
+    """
+
+    __slots__ = ("review_id", "review_likes", "review_rating", "review_date")
+
+    def __init__(
+        self,
+        review_id=MISSING_REVIEW_ID,
+        review_likes=0,
+        review_rating=0,
+        review_date=None,
+    ):
+        self.review_id = review_id
+        self.review_likes = review_likes
+        self.review_rating = review_rating
+        self.review_date = review_date
+
+    def to_dict(self):
+        """
+        Returns:
+            dict : details of the review, without `review_id` when it is `MISSING_REVIEW_ID`
+            so reviews scraped before ids were give back the dict they were read from
+        """
+        review_details = super(Review, self).to_dict()
+        if review_details["review_id"] == MISSING_REVIEW_ID:
+            del review_details["review_id"]
+        return review_details
+
+
+class Book(_Record):
+    """
+    Details of one book as scraped by :mod:`GenreScraper`
+    The author details are kept on the book and nested under `author` in the dict format
+
+    Args:
+        book_name (str) : name of the book
+        book_URL (str) : URL of the book
+        book_img_URL (str) : URL of the book cover
+        author_name (str) : name of the author
+        author_URL (str) : URL of the author
+        goodreads_author (bool) : whether the author is a goodreads author
+        shelved (int) : times the book was shelved under the genre
+        avg_rating (str) : average rating shown on goodreads
+        number_of_ratings (str) : number of ratings shown on goodreads
+        published_year (str) : year the book was published
+    """
+
+    __slots__ = (
+        "book_name",
+        "book_URL",
+        "book_img_URL",
+        "author_name",
+        "author_URL",
+        "goodreads_author",
+        "shelved",
+        "avg_rating",
+        "number_of_ratings",
+        "published_year",
+    )
+    AUTHOR_DETAIL_NAMES = ("author_name", "author_URL", "goodreads_author")
+
+    def __init__(
+        self,
+        book_name=None,
+        book_URL=None,
+        book_img_URL=None,
+        author_name=None,
+        author_URL=None,
+        goodreads_author=False,
+        shelved=None,
+        avg_rating=None,
+        number_of_ratings=None,
+        published_year=None,
+    ):
+        self.book_name = book_name
+        self.book_URL = book_URL
+        self.book_img_URL = book_img_URL
+        self.author_name = author_name
+        self.author_URL = author_URL
+        self.goodreads_author = goodreads_author
+        self.shelved = shelved
+        self.avg_rating = avg_rating
+        self.number_of_ratings = number_of_ratings
+        self.published_year = published_year
+
+    def to_dict(self):
+        """
+        Returns:
+            dict : details of the book with the author details under `author`
+        """
+        book_details = dict(
+            (name, getattr(self, name))
+            for name in self.__slots__
+            if name not in self.AUTHOR_DETAIL_NAMES
+        )
+        book_details["author"] = dict(
+            (name, getattr(self, name)) for name in self.AUTHOR_DETAIL_NAMES
+        )
+        return book_details
+
+    @classmethod
+    def from_dict(cls, book_details):
+        """
+        Args:
+            book_details (dict) : details as built by :func:`GenreScraper._build_book_details_map`
+            before the records, with the author details under `author`
+
+        Returns:
+            Book : book with the details
+        """
+        book_details = dict(book_details)
+        book_details.update(book_details.pop("author", None) or {})
+        return super(Book, cls).from_dict(book_details)
+
+
+def as_review(review):
+    """
+    Args:
+        review (Review or dict) : review, a dict when read from an older pickle
+
+    Returns:
+        Review : the review
+    """
+    if isinstance(review, Review):
+        return review
+    return Review.from_dict(review)
+
+
+def as_book(book):
+    """
+    Args:
+        book (Book or dict) : book, a dict when read from an older pickle
+
+    Returns:
+        Book : the book
+    """
+    if isinstance(book, Book):
+        return book
+    return Book.from_dict(book)
+
+
+def record_to_dict(record):
+    """
+    Used as the `default` of json.dumps so book lists and review details
+    holding records are saved in the dict format
+
+    Args:
+        record (Review or Book) : record
+
+    Returns:
+        dict : details of the record
+    """
+    if isinstance(record, _Record):
+        return record.to_dict()
+    raise TypeError(repr(record) + " is not JSON serializable")
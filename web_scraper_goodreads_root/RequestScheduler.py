@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: RequestScheduler
+    :synopsis: Shared throttling of all requests made to goodreads.com
+
+.. moduleauthor:: DivyenduDutta
+
+Every fetch in :mod:`GenreScraper`, :mod:`SiteNavigator` and :mod:`HttpNavigator` goes
+through `request_scheduler`, which keeps the following per host:
+
+- a token bucket refilled at `rate` requests per second holding at most `burst` tokens
+- a concurrency limit tuned AIMD style ie, raised by 1/limit on every success and
+  halved on every timeout or throttled (429/503) response
+- an exponential backoff with jitter, after a failure no request goes to the host
+  till the backoff has passed
+"""
+import time
+import random
+import threading
+from CommonConstants.Constants import (
+    SCHEDULER_RATE,
+    SCHEDULER_BURST,
+    SCHEDULER_INITIAL_CONCURRENCY,
+    SCHEDULER_MAX_CONCURRENCY,
+    SCHEDULER_BACKOFF_BASE,
+    SCHEDULER_BACKOFF_MAX,
+)
+from YALogger.custom_logger import Logger
+
+try:
+    from urlparse import urlparse
+except ImportError:
+    from urllib.parse import urlparse
+
+THROTTLED_STATUS_CODES = (429, 503)
+
+
+class _HostState(object):
+    """
+    Throttling state of one host
+    """
+
+    def __init__(self, burst, concurrency_limit):
+        self.tokens = float(burst)
+        self.last_refill = time.time()
+        self.in_flight = 0
+        self.concurrency_limit = float(concurrency_limit)
+        self.consecutive_failures = 0
+        self.blocked_until = 0.0
+
+
+class RequestScheduler(object):
+    """
+    Per host token bucket, AIMD concurrency limit and exponential backoff
+
+    Args:
+        rate (float) : requests per second allowed to a host
+        burst (int) : requests which can be made at once after an idle period
+        initial_concurrency (int) : requests in flight to a host to begin with
+        max_concurrency (int) : most requests ever in flight to a host
+        backoff_base (float) : seconds to back off after the first failure
+        backoff_max (float) : most seconds to back off
+    """
+
+    def __init__(
+        self,
+        rate,
+        burst,
+        initial_concurrency,
+        max_concurrency,
+        backoff_base,
+        backoff_max,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.initial_concurrency = initial_concurrency
+        self.max_concurrency = max_concurrency
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._hosts = {}
+        self._condition = threading.Condition()
+
+    def call(self, url, request_function, retries=0, retry_on=()):
+        """
+        Makes a request once the host of `url` allows it
+
+        Args:
+            url (str) : URL requested, its host decides the throttling used
+            request_function (function) : makes the request, takes no arguments
+            retries (int) : times to retry after a timeout or throttled response
+            retry_on (tuple) : exception classes which count as a timeout
+
+        Returns:
+            whatever `request_function` returns
+        """
+        host = urlparse(url).netloc
+        attempt = 0
+        while True:
+            self._acquire(host)
+            try:
+                result = request_function()
+            except retry_on as e:
+                self._release(host, False)
+                if attempt >= retries:
+                    raise
+                Logger.log(
+                    "error",
+                    "RequestScheduler",
+                    "call",
+                    "Retrying " + url + " after -->" + repr(e),
+                )
+                attempt += 1
+                continue
+            except Exception:
+                self._release(host, True)
+                raise
+            if getattr(result, "status_code", None) in THROTTLED_STATUS_CODES:
+                self._release(host, False)
+                if attempt >= retries:
+                    return result
+                Logger.log(
+                    "error",
+                    "RequestScheduler",
+                    "call",
+                    "Retrying " + url + " after status " + str(result.status_code),
+                )
+                attempt += 1
+                continue
+            self._release(host, True)
+            return result
+
+    def _host_state(self, host):
+        """
+        Returns the throttling state of a host, to be called with the lock held
+
+        Args:
+            host (str) : host of the URL
+
+        Returns:
+            _HostState : throttling state
+        """
+        if host not in self._hosts:
+            self._hosts[host] = _HostState(self.burst, self.initial_concurrency)
+        return self._hosts[host]
+
+    def _acquire(self, host):
+        """
+        Waits till the host is out of backoff, has a free concurrency slot
+        and a token in its bucket, then takes the slot and the token
+
+        Args:
+            host (str) : host of the URL
+        """
+        with self._condition:
+            host_state = self._host_state(host)
+            while True:
+                now = time.time()
+                host_state.tokens = min(
+                    float(self.burst),
+                    host_state.tokens + (now - host_state.last_refill) * self.rate,
+                )
+                host_state.last_refill = now
+                if now < host_state.blocked_until:
+                    wait = host_state.blocked_until - now
+                elif host_state.in_flight >= int(host_state.concurrency_limit):
+                    wait = None  # till a request finishes
+                elif host_state.tokens < 1:
+                    wait = (1 - host_state.tokens) / self.rate
+                else:
+                    host_state.tokens -= 1
+                    host_state.in_flight += 1
+                    return
+                self._condition.wait(wait)
+
+    def _release(self, host, success):
+        """
+        Frees the concurrency slot taken by `_acquire` and tunes the host's throttling
+
+        Args:
+            host (str) : host of the URL
+            success (bool) : False when the request timed out or was throttled
+        """
+        with self._condition:
+            host_state = self._host_state(host)
+            host_state.in_flight -= 1
+            if success:
+                host_state.consecutive_failures = 0
+                host_state.concurrency_limit = min(
+                    float(self.max_concurrency),
+                    host_state.concurrency_limit + 1 / host_state.concurrency_limit,
+                )
+            else:
+                host_state.consecutive_failures += 1
+                host_state.concurrency_limit = max(
+                    1.0, host_state.concurrency_limit / 2
+                )
+                backoff = min(
+                    self.backoff_max,
+                    self.backoff_base * 2 ** (host_state.consecutive_failures - 1),
+                )
+                # equal jitter ie, wait at least half the backoff
+                backoff = backoff / 2 + random.uniform(0, backoff / 2)
+                host_state.blocked_until = max(
+                    host_state.blocked_until, time.time() + backoff
+                )
+                Logger.log(
+                    "info",
+                    "RequestScheduler",
+                    "_release",
+                    "Backing off "
+                    + host
+                    + " for "
+                    + str(round(backoff, 2))
+                    + " seconds",
+                )
+            self._condition.notify_all()
+
+
+# scheduler shared by every module fetching from goodreads.com
+request_scheduler = RequestScheduler(
+    SCHEDULER_RATE,
+    SCHEDULER_BURST,
+    SCHEDULER_INITIAL_CONCURRENCY,
+    SCHEDULER_MAX_CONCURRENCY,
+    SCHEDULER_BACKOFF_BASE,
+    SCHEDULER_BACKOFF_MAX,
+)
@@ -7,32 +7,41 @@
 
 Functions:
 
+- `_create_driver()`
 - `_init(root_url)`
+- `release_driver()`
+- `_load_next_page(driver)`
 - `get_html_code_for_first_page(root_url, new_book)`
 - `get_html_code_for_other_pages(root_url)`
+- `resume_from_page(root_url, page_number)`
 """
+import atexit
+import threading
+from functools import partial
 from selenium import webdriver
-from selenium.common.exceptions import NoSuchElementException, JavascriptException
+from selenium.common.exceptions import (
+    NoSuchElementException,
+    JavascriptException,
+    TimeoutException,
+)
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
+from DriverPool import DriverPool
+from FileUtil.ResponseCache import response_cache
+from RequestScheduler import request_scheduler
+from CommonConstants.Constants import DRIVER_POOL_SIZE, DRIVER_RECYCLE_AFTER_PAGES
 from YALogger.custom_logger import Logger
 
-# global object - selenium driver
-driver = None
 
-
-def _init(root_url):
+def _create_driver():
     """
-    Creates and initializes selenium object for traversal.
+    Creates a selenium object for traversal.
     Running via chromedriver.exe. For this code to work ensure chromedriver.exe
     is on the path. Download from `here <https://chromedriver.chromium.org/downloads>`_
     Making this a headless selenium object via chrome_options
     
-    Args:
-        root_url (str) : used to initialize selenium object
-        
     Returns:
         selenium instance
     """
@@ -40,16 +49,111 @@ def _init(root_url):
     options.add_argument("--headless")
     options.add_argument("--disable-gpu")
 
-    driver = webdriver.Chrome(chrome_options=options)
-    driver.get(root_url)
+    return webdriver.Chrome(chrome_options=options)
+
+
+# warm selenium drivers shared by all books and threads
+driver_pool = DriverPool(_create_driver, DRIVER_POOL_SIZE, DRIVER_RECYCLE_AFTER_PAGES)
+atexit.register(driver_pool.close_all, True)
+
+# selenium driver checked out by the current thread, the pages it visited since,
+# the review page it is on and the review page last returned for the book
+navigator_state = threading.local()
+
+
+def _init(root_url):
+    """
+    Checks out a selenium object from `driver_pool` for the current thread
+    and initializes it for traversal of `root_url`
+    
+    Args:
+        root_url (str) : used to initialize selenium object
+        
+    Returns:
+        selenium instance
+    """
+    driver = driver_pool.checkout()
+    navigator_state.driver = driver
+    navigator_state.pages_visited = 0
+    navigator_state.driver_page_number = 1
+    try:
+        request_scheduler.call(
+            root_url, partial(driver.get, root_url), retry_on=(TimeoutException,)
+        )
+    except Exception:
+        navigator_state.driver = None
+        driver_pool.discard(driver)
+        raise
+    navigator_state.pages_visited = 1
     # print(driver.page_source)
     return driver
 
 
+def release_driver():
+    """
+    Gives the selenium object of the current thread back to `driver_pool`
+    The pool recycles it once it has visited `DRIVER_RECYCLE_AFTER_PAGES` pages
+    Does nothing when the thread doesnt hold one
+    """
+    driver = getattr(navigator_state, "driver", None)
+    if driver != None:
+        navigator_state.driver = None
+        driver_pool.checkin(driver, navigator_state.pages_visited)
+
+
+def _load_next_page(driver):
+    """
+    Clicks on the next review page at the bottom of the page the driver is on
+    Cliking on the a review page at the bottom performs an Ajax call which returns
+    a Element.update() which in turn updates the "reviews" id with HTML code
+    
+    The way we check whether the review data has loaded is by adding a dummy id in the HTML
+    and waiting till its not present anymore after the Ajax call
+    
+    Args:
+        driver : selenium instance
+        
+    Returns:
+        whether there was a next page, html code of the page and the current page number
+    """
+    next_page = driver.find_element_by_class_name("next_page")
+    #        driver.execute_script(
+    #                'document.getElementById("reviews").'
+    #                'insertAdjacentHTML("beforeend", \'<p id="load_reviews">loading</p>\');'
+    #            )
+    if next_page.tag_name == "a":
+        # Click the next page button
+        # scroll to 20 avoid pointing issues - specific to chrome
+        driver.execute_script("window.scrollTo(0, 20)")
+        webdriver.ActionChains(driver).move_to_element(next_page).click(
+            next_page
+        ).perform()
+        # next_page.click()
+        driver.execute_script(
+            'document.getElementById("reviews").'
+            'insertAdjacentHTML("beforeend", \'<p id="load_reviews">loading</p>\');'
+        )
+        #            time.sleep(10)
+        WebDriverWait(driver, 20).until(
+            EC.invisibility_of_element_located((By.ID, "load_reviews"))
+        )
+        #            WebDriverWait(driver, 100).until(EC.presence_of_element_located((By.CLASS_NAME, "current")))
+        navigator_state.pages_visited += 1
+        navigator_state.driver_page_number += 1
+        current_page = driver.find_element_by_class_name("current")
+        # print("Currently parsing review page - "+current_page.text.encode('utf-8'))
+
+        return True, driver.page_source, current_page.text.encode("utf-8")
+    return False, None, None
+
+
 def get_html_code_for_first_page(root_url, new_book):
     """
     Visits the first page in a book and returns the HTML code for the book review part
-    The `new_book` indicator helps to ensure we recreate the selenium driver instance for every book
+    The `new_book` indicator gives the previous book's selenium driver back to the pool
+    and takes a warm one for the book. Each thread holds its own selenium driver
+    The page is read from :data:`FileUtil.ResponseCache.response_cache` when it has been
+    fetched recently, in which case no selenium driver is needed
     
     Args:
         root_url (str) : used to initialize selenium object
@@ -58,21 +162,30 @@ def get_html_code_for_first_page(root_url, new_book):
     Returns:
         html code of the book reviews
     """
-    global driver
     if new_book:
-        driver = None
+        release_driver()
+    navigator_state.page_number = 1
+
+    first_page = response_cache.get(root_url, 1)
+    if first_page != None:
+        return first_page
 
+    driver = getattr(navigator_state, "driver", None)
     if driver == None:
         Logger.log(
             "info",
             "SiteNavigator",
             "get_html_code_for_first_page",
-            "Creating headless selenium object for first page",
+            "Checking out headless selenium object for first page",
         )
         driver = _init(root_url)
     try:
-        first_page = driver.find_element_by_id("bookReviews")
-        return first_page.get_attribute("innerHTML")
+        first_page = driver.find_element_by_id("bookReviews").get_attribute(
+            "innerHTML"
+        )
+        if navigator_state.driver_page_number == 1:
+            response_cache.put(root_url, 1, first_page)
+        return first_page
     except NoSuchElementException:
         Logger.log(
             "error",
@@ -85,12 +198,11 @@ def get_html_code_for_first_page(root_url, new_book):
 
 def get_html_code_for_other_pages(root_url):
     """
-    Visits the other review pages and returns the html code
-    Cliking on the a review page at the bottom performs an Ajax call which returns
-    a Element.update() which in turn updates the "reviews" id with HTML code
-    
-    The way we check whether the review data has loaded is by adding a dummy id in the HTML
-    and waiting till its not present anymore after the Ajax call
+    Visits the next review page and returns the html code, see `_load_next_page`
+    Clicks are throttled by :data:`RequestScheduler.request_scheduler`
+    The page is read from :data:`FileUtil.ResponseCache.response_cache` when it has been
+    fetched recently. When earlier pages came from the cache the selenium driver first
+    catches up by clicking through to the page before the one needed
     
     Args:
         root_url (str) : used to initialize selenium object
@@ -98,44 +210,42 @@ def get_html_code_for_other_pages(root_url):
     Returns:
         html code of the book reviews
     """
-    global driver
+    page_number = getattr(navigator_state, "page_number", 1) + 1
+    cached_page = response_cache.get(root_url, page_number)
+    if cached_page != None:
+        if cached_page[0]:
+            navigator_state.page_number = page_number
+        return cached_page
+
+    driver = getattr(navigator_state, "driver", None)
     if driver == None:
         Logger.log(
             "info",
             "SiteNavigator",
             "get_html_code_for_other_pages",
-            "Creating headless selenium object for other pages",
+            "Checking out headless selenium object for other pages",
         )
         driver = _init(root_url)
     try:
-        next_page = driver.find_element_by_class_name("next_page")
-        #        driver.execute_script(
-        #                'document.getElementById("reviews").'
-        #                'insertAdjacentHTML("beforeend", \'<p id="load_reviews">loading</p>\');'
-        #            )
-        if next_page.tag_name == "a":
-            # Click the next page button
-            # scroll to 20 avoid pointing issues - specific to chrome
-            driver.execute_script("window.scrollTo(0, 20)")
-            webdriver.ActionChains(driver).move_to_element(next_page).click(
-                next_page
-            ).perform()
-            # next_page.click()
-            driver.execute_script(
-                'document.getElementById("reviews").'
-                'insertAdjacentHTML("beforeend", \'<p id="load_reviews">loading</p>\');'
-            )
-            #            time.sleep(10)
-            WebDriverWait(driver, 20).until(
-                EC.invisibility_of_element_located((By.ID, "load_reviews"))
-            )
-            #            WebDriverWait(driver, 100).until(EC.presence_of_element_located((By.CLASS_NAME, "current")))
-            current_page = driver.find_element_by_class_name("current")
-            # print("Currently parsing review page - "+current_page.text.encode('utf-8'))
-
-            return True, driver.page_source, current_page.text.encode("utf-8")
-        driver.close()
-        return False, None, None
+        # a click is not retried here as the ajax call may still land after a timeout,
+        # the timeout reaches the caller which resumes the book from its checkpoint
+        load_next_page = partial(_load_next_page, driver)
+        while navigator_state.driver_page_number < page_number - 1:
+            if not request_scheduler.call(
+                root_url, load_next_page, retry_on=(TimeoutException,)
+            )[0]:
+                break
+        is_next_page_there, html_source, current_page = request_scheduler.call(
+            root_url, load_next_page, retry_on=(TimeoutException,)
+        )
+        response_cache.put(
+            root_url, page_number, (is_next_page_there, html_source, current_page)
+        )
+        if is_next_page_there:
+            navigator_state.page_number = page_number
+        else:
+            release_driver()
+        return is_next_page_there, html_source, current_page
     except JavascriptException:
         Logger.log(
             "error",
@@ -146,5 +256,19 @@ def get_html_code_for_other_pages(root_url):
         return False, None, None
 
 
+def resume_from_page(root_url, page_number):
+    """
+    Starts a book afresh but makes the next `get_html_code_for_other_pages` call return
+    review page `page_number` + 1, used to resume a book from a checkpoint
+    The selenium driver clicks through the pages already scraped when it is needed
+    
+    Args:
+        root_url (str) : used to initialize selenium object
+        page_number (int) : last review page already scraped
+    """
+    release_driver()
+    navigator_state.page_number = page_number
+
+
 if __name__ == "__main__":
     pass
@@ -15,6 +15,7 @@ from HelperUtils import (
     check_if_file_exists_otherwise_handle,
 )
 import numpy as np
+from FileUtil.ColumnarReviews import reviews_to_columns
 from matplotlib.lines import Line2D
 
 # book_review = {
@@ -29,20 +30,20 @@ def _build_color_scatter_plot_array(book_review):
     Creates the review color list based on the review rating
     
     Args:
-        book_review (dict) : details of the book review
+        book_review (numpy structured array) : details of the book review
         
     Returns:
         list of colors based on the review
     """
     colors = []
-    for review in book_review:
-        if book_review[review]["review_rating"] == 1:
+    for review_rating in book_review["review_rating"].tolist():
+        if review_rating == 1:
             colors.append("red")
-        elif book_review[review]["review_rating"] == 2:
+        elif review_rating == 2:
             colors.append("blue")
-        elif book_review[review]["review_rating"] == 3:
+        elif review_rating == 3:
             colors.append("yellow")
-        elif book_review[review]["review_rating"] == 4:
+        elif review_rating == 4:
             colors.append("black")
         else:
             colors.append("green")
@@ -59,15 +60,14 @@ def visualize_and_save_review_information(book_review, book_name):
     Normalizes the review likes via min max normalization
     
     Args:
-       book_review (dict) : details of the book review
+       book_review (numpy structured array or dict) : details of the book review, see :mod:`FileUtil.ColumnarReviews`
        book_name (str) : the name of the book whose review details are to be visualized
     """
-    min_value = min(
-        [book_review[review_detail]["review_likes"] for review_detail in book_review]
-    )
-    max_value = max(
-        [book_review[review_detail]["review_likes"] for review_detail in book_review]
-    )
+    if isinstance(book_review, dict):
+        book_review = reviews_to_columns(book_review)
+    review_likes = book_review["review_likes"].tolist()
+    min_value = min(review_likes)
+    max_value = max(review_likes)
     RANGE_DIFF = max_value - min_value
 
     # min max normalization: start
@@ -79,10 +79,7 @@ def visualize_and_save_review_information(book_review, book_name):
     b = max_value_new - a * max_value
     number_of_reviews = len(book_review)
 
-    normalized_likes = [
-        a * book_review[review_detail]["review_likes"] + b
-        for review_detail in book_review
-    ]
+    normalized_likes = [a * review_like + b for review_like in review_likes]
     # min max normalization: end
     # Fixing random state
     np.random.seed(19680801)
@@ -3,88 +3,124 @@
 .. module:: review_rating_calculation
     :synopsis: Calculates the Bayesian Adjusted Rating for each of the books
     
+The ratings are computed with vectorized numpy over the likes and ratings columns of a book,
+see :mod:`Benchmarks.RatingBenchmark` for the speedup over the earlier pure python loops.
+
 .. note::
     Reference - https://www.analyticsvidhya.com/blog/2019/07/introduction-online-rating-systems-bayesian-adjusted-rating/
 
 .. moduleauthor:: DivyenduDutta
 
 - `_extract_review_likes_ratings(book_review)`
+- `_adjust_zero_likes(review_likes)`
 - `_calculate_simple_avg_review_rating(review_ratings)`
 - `_convert_to_bayesian_adj_rating(review_likes, review_ratings)`
 - `_calculate_bayesian_adj_rating(bayesian_adj_ratings)`
-- `_build_ratings_list(processed_book_review_info)`
-- `quicksort(arr_to_be_sorted, start, end)`
-- `_process_reviews()`
+- `_calculate_book_ratings(book_review)`
+- `_rate_book(book_entry)`
+- `_rate_books(book_entries, workers, chunk_size)`
+- `_process_reviews(genre, workers, chunk_size)`
 """
 from __future__ import division
-from FileUtil.FilePicking import load_obj, load_latest_obj, save_obj
+import numpy as np
+from multiprocessing.pool import ThreadPool
+from FileUtil.Catalog import save_obj, _today
+from FileUtil.BookCatalog import book_catalog
+from FileUtil.RatingMemo import RatingMemo
+from BookRanking import METRIC_BAR, top_books
+from CommonConstants.Constants import (
+    RATING_WORKERS,
+    RATING_CHUNK_SIZE,
+    RATING_MEMO_PATH,
+    RATING_MEMO_ENABLED,
+    RATING_MEMO_MAX_AGE_DAYS,
+    RATING_MEMO_MAX_ENTRIES,
+)
 from YALogger.custom_logger import Logger
-from HelperUtils import extract_book_name_from_root_url
 
 Logger.initialize_logger(
     logger_prop_file_path=".\logger.properties", log_file_path="./logs"
 )
 
+# bump whenever the ratings calculated for the same reviews change, so memoized ones are not reused
+RATING_MODEL_VERSION = 1
+# ratings of the review snapshots rated before, keyed by the digest of their reviews
+rating_memo = RatingMemo(
+    RATING_MEMO_PATH,
+    RATING_MODEL_VERSION,
+    enabled=RATING_MEMO_ENABLED,
+    max_age_days=RATING_MEMO_MAX_AGE_DAYS,
+    max_entries=RATING_MEMO_MAX_ENTRIES,
+)
+
 
 def _extract_review_likes_ratings(book_review):
     """
-    Extracts the likes and ratings from the dict (pkl file)
+    Extracts the likes and ratings columns
     
     Args:
-        book_review (dict) : details of a book
+        book_review (numpy structured array) : details of a book - :mod:`FileUtil.ReviewArrays`
         
     Returns:
-        2 lists : likes and ratings
+        2 numpy arrays : likes and ratings as int64
     """
-    review_likes = []
-    review_ratings = []
-    for review in book_review:
-        review_likes.append(book_review[review]["review_likes"])
-        review_ratings.append(book_review[review]["review_rating"])
+    review_likes = np.asarray(book_review["review_likes"], dtype=np.int64)
+    review_ratings = np.asarray(book_review["review_rating"], dtype=np.int64)
     return review_likes, review_ratings
 
 
+def _adjust_zero_likes(review_likes):
+    """
+    Adds 1 to all likes if even one review has 0 likes so those reviews still count
+    
+    Args:
+        review_likes (numpy array) : likes from the reviews
+        
+    Returns:
+        numpy array : likes, adjusted if needed
+        bool : whether 0 likes were present
+    """
+    review_likes = np.asarray(review_likes, dtype=np.int64)
+    are_zero_likes_present = not review_likes.all()
+    if are_zero_likes_present:
+        review_likes = review_likes + 1
+    return review_likes, are_zero_likes_present
+
+
 def _calculate_simple_avg_review_rating(review_ratings):
     """
     Calculates the average rating
     
     Args:
-       review_ratings (list) : ratings from the reviews
+       review_ratings (numpy array) : ratings from the reviews
        
     Returns:
         float : average rating
     """
-    total_rating = 0
-    for review_rating in review_ratings:
-        total_rating += review_rating
-    return total_rating / len(review_ratings)
+    review_ratings = np.asarray(review_ratings, dtype=np.int64)
+    return int(review_ratings.sum()) / len(review_ratings)
 
 
 def _convert_to_bayesian_adj_rating(review_likes, review_ratings):
     """
     Calculates the Bayesian Adjusted ratings from the goodreads ratings and likes on the ratings
+    BAR of review i = (likes_i * rating_i + sum(likes * ratings)) / (likes_i + sum(likes))
     
     Args:
-        review_likes (list) : likes from the reviews
-        review_ratings (list) : ratings from the reviews
+        review_likes (numpy array) : likes from the reviews
+        review_ratings (numpy array) : ratings from the reviews
         
     Returns:
-        list : bayesian adjusted ratings
+        numpy array : bayesian adjusted ratings as float64
     """
-    bayesian_adj_ratings = []
-    sum_of_likes = sum(review_likes)
-    sum_of_likes_mul_ratings = sum(
-        [
-            review_like * review_rating
-            for review_like, review_rating in zip(review_likes, review_ratings)
-        ]
+    review_likes = np.asarray(review_likes, dtype=np.int64)
+    review_ratings = np.asarray(review_ratings, dtype=np.int64)
+    likes_mul_ratings = review_likes * review_ratings
+    sum_of_likes = review_likes.sum()
+    sum_of_likes_mul_ratings = likes_mul_ratings.sum()
+    return (likes_mul_ratings + sum_of_likes_mul_ratings) / (
+        (review_likes + sum_of_likes).astype(np.float64)
     )
-    for i in range(len(review_likes)):
-        bayesian_adj_ratings.append(
-            (review_likes[i] * review_ratings[i] + sum_of_likes_mul_ratings)
-            / (review_likes[i] + sum_of_likes)
-        )
-    return bayesian_adj_ratings
 
 
 def _calculate_bayesian_adj_rating(bayesian_adj_ratings):
@@ -92,174 +128,178 @@ def _calculate_bayesian_adj_rating(bayesian_adj_ratings):
     Calculates the average bayesian adjusted rating
     
     Args:
-        bayesian_adj_ratings (list) : bayesian adjusted ratings from the reviews
+        bayesian_adj_ratings (numpy array) : bayesian adjusted ratings from the reviews
         
     Returns:
         float : average bayesian adjusted rating
     """
-    return sum(bayesian_adj_ratings) / len(bayesian_adj_ratings)
+    bayesian_adj_ratings = np.asarray(bayesian_adj_ratings, dtype=np.float64)
+    return float(bayesian_adj_ratings.sum()) / len(bayesian_adj_ratings)
 
 
-def _build_ratings_list(processed_book_review_info):
+def _calculate_book_ratings(book_review):
     """
-    Build a list rating details from a python dict
+    Calculates the simple average and bayesian adjusted rating of a book
+    We are making sure to add 1 to review likes which are 0 so as to not ignore those reviews completely
     
     Args:
-        processed_book_review_info (dict) : processed review details
+        book_review (numpy structured array) : details of a book - :mod:`FileUtil.ReviewArrays`
         
     Returns:
-        list : processed review details but as a list
+        2 floats : average rating and average bayesian adjusted rating
     """
-    processed_ratings_list = []
-    for index in processed_book_review_info:
-        ratings_list = []
-        ratings_list.append(
-            processed_book_review_info[index]["bayesianAdj_rating_goodreads"]
+    review_likes, review_ratings = _extract_review_likes_ratings(book_review)
+    Logger.log(
+        "debug",
+        "review_rating_calculation",
+        "_calculate_book_ratings",
+        str(len(review_likes)) + "  " + str(len(review_ratings)),
+    )
+    review_likes, are_zero_likes_present = _adjust_zero_likes(review_likes)
+    if are_zero_likes_present:
+        Logger.log(
+            "debug",
+            "review_rating_calculation",
+            "_calculate_book_ratings",
+            "0 likes present",
+        )
+        Logger.log(
+            "debug",
+            "review_rating_calculation",
+            "_calculate_book_ratings",
+            "Adding 1 to all likes if even one 0 liked review is present",
+        )
+    else:
+        Logger.log(
+            "debug",
+            "review_rating_calculation",
+            "_calculate_book_ratings",
+            "0 likes not present",
         )
-        ratings_list.append(processed_book_review_info[index]["avg_rating_goodreads"])
-        ratings_list.append(processed_book_review_info[index]["avg_rating_simple"])
-        ratings_list.append(processed_book_review_info[index]["book_name"])
-        processed_ratings_list.append(ratings_list)
-    return processed_ratings_list
+
+    avg_book_rating_simple = _calculate_simple_avg_review_rating(review_ratings)
+    Logger.log(
+        "debug",
+        "review_rating_calculation",
+        "_calculate_book_ratings",
+        "avg book rating -simple- " + str(avg_book_rating_simple),
+    )
+
+    bayesian_adj_ratings = _convert_to_bayesian_adj_rating(review_likes, review_ratings)
+    avg_book_rating_bayesian_adj = _calculate_bayesian_adj_rating(bayesian_adj_ratings)
+    Logger.log(
+        "debug",
+        "review_rating_calculation",
+        "_calculate_book_ratings",
+        "Bayesian Adjusted rating -BAR- " + str(avg_book_rating_bayesian_adj),
+    )
+    return avg_book_rating_simple, avg_book_rating_bayesian_adj
 
 
-def quicksort(arr_to_be_sorted, start, end):
+def _rate_book(book_entry):
     """
-    Quicksort implementation to sort a list in ascending order
-    Complexity - n * logn
+    Calculates the ratings of one book
+    Ratings calculated before by the same `RATING_MODEL_VERSION` for reviews of the same
+    digest are taken from `rating_memo` instead, so books whose reviews did not change are
+    neither read nor rated again
     
     Args:
-        arr_to_be_sorted (list) : the input list to be sorted
-        start (int) : the start index
-        end (int) : the end index
+        book_entry (BookEntry) : book from :data:`FileUtil.BookCatalog.book_catalog`
+        
+    Returns:
+        dict : book name, simple average, goodreads average and bayesian adjusted rating of the book
     """
-    p = start + 1
-    q = end
-    partition_pos = start
-    if (end - start) <= 0:  # one element/no element
-        return
-    elif (end - start) == 1:  # 2 elements
-        if arr_to_be_sorted[start][0] > arr_to_be_sorted[end][0]:
-            arr_to_be_sorted[start], arr_to_be_sorted[end] = (
-                arr_to_be_sorted[end],
-                arr_to_be_sorted[start],
-            )
-        return
+    book_rating_info = {}
+    book_name = book_entry.book_name
+    book_rating_info["book_name"] = book_name
+    Logger.log(
+        "debug", "review_rating_calculation", "_rate_book", "Processing " + book_name
+    )
+    book_ratings = rating_memo.get(book_entry.review_digest)
+    if book_ratings == None:
+        book_review = book_entry.reviews()
+        Logger.log("debug", "review_rating_calculation", "_rate_book", book_review)
+        book_ratings = _calculate_book_ratings(book_review)
+        rating_memo.put(book_name, book_entry.review_digest, book_ratings)
+    else:
+        Logger.log(
+            "debug",
+            "review_rating_calculation",
+            "_rate_book",
+            "Reviews of " + book_name + " did not change, ratings taken from the memo",
+        )
+    avg_book_rating_simple, avg_book_rating_bayesian_adj = book_ratings
 
-    while p < q:
-        while arr_to_be_sorted[p][0] < arr_to_be_sorted[start][0] and p < end:
-            p += 1
-        while (
-            arr_to_be_sorted[q][0] > arr_to_be_sorted[start][0]
-        ):  # and p < end similar condition ie q>=start because at the beginning we take "start" as the start
-            q -= 1
-        if p < q:
-            arr_to_be_sorted[p], arr_to_be_sorted[q] = (
-                arr_to_be_sorted[q],
-                arr_to_be_sorted[p],
-            )
+    book_rating_info["avg_rating_simple"] = avg_book_rating_simple
+    book_rating_info["avg_rating_goodreads"] = book_entry.book.avg_rating
+    book_rating_info["bayesianAdj_rating_goodreads"] = avg_book_rating_bayesian_adj
+    return book_rating_info
 
-    arr_to_be_sorted[start], arr_to_be_sorted[q] = (
-        arr_to_be_sorted[q],
-        arr_to_be_sorted[start],
-    )
-    partition_pos = q
-    quicksort(arr_to_be_sorted, start, partition_pos - 1)
-    quicksort(arr_to_be_sorted, partition_pos + 1, end)
+
+def _rate_books(book_entries, workers=RATING_WORKERS, chunk_size=RATING_CHUNK_SIZE):
+    """
+    Calculates the ratings of every book via `_rate_book`
+    When `workers` is more than 1 that many books are rated at the same time by a thread pool,
+    numpy lets go of the GIL while reading the review arrays and computing the ratings.
+    The ratings are kept in the order of `book_entries` so the result is the same either way.
+    The ratings memoized while rating are written to `rating_memo` once all the books are rated
+    
+    Args:
+        book_entries (iterable) : `BookEntry` of each book
+        workers (int) : number of books rated at the same time
+        chunk_size (int) : books handed to a worker at a time
+        
+    Returns:
+        dict : shelf rank of the book to its ratings, books without one are keyed by their place in `book_entries`
+    """
+    book_entries = list(book_entries)
+    if workers > 1:
+        pool = ThreadPool(workers)
+        try:
+            book_rating_infos = list(pool.imap(_rate_book, book_entries, chunk_size))
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        book_rating_infos = [_rate_book(book_entry) for book_entry in book_entries]
+    rating_memo.save()
+    processed_book_review_info = {}
+    for book_position, (book_entry, book_rating_info) in enumerate(
+        zip(book_entries, book_rating_infos)
+    ):
+        book_index = book_entry.shelf_rank
+        if book_index == None:
+            book_index = book_position
+        processed_book_review_info[book_index] = book_rating_info
+    return processed_book_review_info
 
 
-def _process_reviews():
+def _process_reviews(
+    genre="science-fiction", workers=RATING_WORKERS, chunk_size=RATING_CHUNK_SIZE
+):
     """
     Main code to start processing the review details
-    Ensure sci-fi-books-list_YYYY-MM-DD.pkl file is present in current date otherwise run MainBookScraper to get it
-    We are making sure to add 1 to review likes which are 0 so as to not ignore those reviews completely
-    
+    Ensure the book list of `genre` of the current date is in the catalog - :mod:`FileUtil.Catalog` otherwise run MainBookScraper to get it
+    Books are read one at a time from :data:`FileUtil.BookCatalog.book_catalog`, books without reviews are left out
+    The ratings are keyed by the shelf rank of the book, its place in the goodreads list
     
+    Args:
+        genre (str) : genre of the book list
+        workers (int) : number of books rated at the same time, see `_rate_books`
+        chunk_size (int) : books handed to a worker at a time
     """
     try:
-        books_details_pickle_file_name = "sci-fi-books-list"
-        book_details = load_obj(books_details_pickle_file_name, "Data")
-        # Logger.log('info', 'review_rating_calculation','_process_reviews',book_details)
-        # Logger.log('info', 'review_rating_calculation','_process_reviews',str(len(book_details)))
-        processed_book_review_info = {}
-
-        for book_index in book_details:
-            processed_book_review_info[book_index] = {}
-            book_name = extract_book_name_from_root_url(
-                book_details[book_index]["book_URL"]
-            )
-            processed_book_review_info[book_index]["book_name"] = book_name
-            Logger.log(
-                "debug",
-                "review_rating_calculation",
-                "_process_reviews",
-                "Processing " + book_name,
-            )
-            book_review = load_latest_obj("book_review_details", "Data/" + book_name)
-            Logger.log(
-                "debug", "review_rating_calculation", "_process_reviews", book_review
-            )
-            review_likes, review_ratings = _extract_review_likes_ratings(book_review)
-            Logger.log(
-                "debug",
-                "review_rating_calculation",
-                "_process_reviews",
-                str(len(review_likes)) + "  " + str(len(review_ratings)),
-            )
-            are_zero_likes_not_present = [
-                review_like != 0 for review_like in review_likes
-            ]
-            if all(are_zero_likes_not_present):
-                Logger.log(
-                    "debug",
-                    "review_rating_calculation",
-                    "_process_reviews",
-                    "0 likes not present",
-                )
-            else:
-                Logger.log(
-                    "debug",
-                    "review_rating_calculation",
-                    "_process_reviews",
-                    "0 likes present",
-                )
-                review_likes = [review_like + 1 for review_like in review_likes]
-                Logger.log(
-                    "debug",
-                    "review_rating_calculation",
-                    "_process_reviews",
-                    "Adding 1 to all likes if even one 0 liked review is present",
-                )
-
-            avg_book_rating_simple = _calculate_simple_avg_review_rating(review_ratings)
-            processed_book_review_info[book_index][
-                "avg_rating_simple"
-            ] = avg_book_rating_simple
-            processed_book_review_info[book_index][
-                "avg_rating_goodreads"
-            ] = book_details[book_index]["avg_rating"]
-            Logger.log(
-                "debug",
-                "review_rating_calculation",
-                "_process_reviews",
-                "avg book rating -simple- " + str(avg_book_rating_simple),
-            )
-
-            bayesian_adj_ratings = _convert_to_bayesian_adj_rating(
-                review_likes, review_ratings
-            )
-            avg_book_rating_bayesian_adj = _calculate_bayesian_adj_rating(
-                bayesian_adj_ratings
-            )
-            processed_book_review_info[book_index][
-                "bayesianAdj_rating_goodreads"
-            ] = avg_book_rating_bayesian_adj
-            Logger.log(
-                "debug",
-                "review_rating_calculation",
-                "_process_reviews",
-                "Bayesian Adjusted rating -BAR- " + str(avg_book_rating_bayesian_adj),
-            )
+        # in the order of the goodreads list
+        book_entries = list(book_catalog.books(genre=genre, listed_on=_today()))
+        if len(book_entries) == 0:
+            raise IOError("no books of " + genre + " listed today")
+        processed_book_review_info = _rate_books(
+            [book_entry for book_entry in book_entries if book_entry.review_count],
+            workers,
+            chunk_size,
+        )
+        if len(processed_book_review_info) == 0:
+            raise IOError("no books of " + genre + " with reviews today")
 
         Logger.log(
             "debug",
@@ -274,10 +314,10 @@ def _process_reviews():
             True,
         )
 
-        aggregated_ratings_list = _build_ratings_list(processed_book_review_info)
-        goodreads_top_book = aggregated_ratings_list[0][3]
-        quicksort(aggregated_ratings_list, 0, len(aggregated_ratings_list) - 1)
-        our_calculated_top_book = aggregated_ratings_list[-1][3]
+        goodreads_top_book = book_entries[0].book_name
+        our_calculated_top_book = top_books(
+            processed_book_review_info, 1, [METRIC_BAR]
+        )[0][1]["book_name"]
         Logger.log(
             "info",
             "review_rating_calculation",
@@ -287,12 +327,16 @@ def _process_reviews():
             + " and as per our calculation is - "
             + our_calculated_top_book,
         )
-    except IOError:
+    except IOError as e:
         Logger.log(
             "error",
             "review_rating_calculation",
             "_process_reviews",
-            "sci-fi-books-list_YYYY-MM-DD.pkl not present in current date. Run MainBookScraper to get it",
+            repr(e)
+            + ", book list of "
+            + genre
+            + " of the current date not in the catalog or not scraped."
+            + " Run MainBookScraper to get it",
         )
 
 
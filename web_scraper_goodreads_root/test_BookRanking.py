@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: test_BookRanking
+    :synopsis: Regression tests of ranking the top k books and of breaking their ties
+
+.. moduleauthor:: DivyenduDutta
+
+Run from `web_scraper_goodreads_root` with ``python -m pytest test_BookRanking.py``
+or ``python -m unittest test_BookRanking``.
+"""
+import random
+import unittest
+from BookRanking import (
+    METRIC_BAR,
+    METRIC_SIMPLE_AVG,
+    METRIC_GOODREADS_AVG,
+    top_books,
+)
+
+
+def _build_book_rating_info(bar, simple_avg=None, goodreads_avg=None):
+    """
+    Returns:
+        dict : ratings of a book as built by
+        :func:`review_rating_calculation._process_reviews`, metrics given as None are
+        left out
+    """
+    book_rating_info = {}
+    for metric, value in [
+        (METRIC_BAR, bar),
+        (METRIC_SIMPLE_AVG, simple_avg),
+        (METRIC_GOODREADS_AVG, goodreads_avg),
+    ]:
+        if value != None:
+            book_rating_info[metric] = value
+    return book_rating_info
+
+
+def _book_indexes(ranked_books):
+    return [book_index for book_index, _ in ranked_books]
+
+
+class TopBooksTest(unittest.TestCase):
+    def setUp(self):
+        self.processed_book_review_info = {
+            0: _build_book_rating_info(4.1, 3.9, "4.20"),
+            1: _build_book_rating_info(4.5, 4.0, "4.05"),
+            2: _build_book_rating_info(4.1, 4.2, "3.90"),
+            3: _build_book_rating_info(None, 4.8, "4.60"),
+            4: _build_book_rating_info(4.5, 4.0, "4.35"),
+            5: _build_book_rating_info(4.1, 3.9, None),
+        }
+
+    def test_top_book(self):
+        self.assertEqual(
+            top_books(self.processed_book_review_info),
+            [(1, self.processed_book_review_info[1])],
+        )
+
+    def test_ties_keep_the_order_of_the_book_list(self):
+        self.assertEqual(
+            _book_indexes(top_books(self.processed_book_review_info, k=None)),
+            [1, 4, 0, 2, 5, 3],
+        )
+
+    def test_later_metrics_break_ties(self):
+        self.assertEqual(
+            _book_indexes(
+                top_books(
+                    self.processed_book_review_info,
+                    k=4,
+                    metrics=[METRIC_BAR, METRIC_GOODREADS_AVG],
+                )
+            ),
+            [4, 1, 0, 2],
+        )
+        self.assertEqual(
+            _book_indexes(
+                top_books(
+                    self.processed_book_review_info,
+                    k=None,
+                    metrics=[METRIC_BAR, (METRIC_SIMPLE_AVG, False)],
+                )
+            ),
+            [1, 4, 0, 5, 2, 3],
+        )
+
+    def test_books_missing_a_metric_rank_last(self):
+        # book 3 has no BAR and book 5 no goodreads average
+        self.assertEqual(
+            _book_indexes(
+                top_books(
+                    self.processed_book_review_info,
+                    k=None,
+                    metrics=[(METRIC_GOODREADS_AVG, False)],
+                )
+            ),
+            [2, 1, 0, 4, 3, 5],
+        )
+        self.processed_book_review_info[2][METRIC_GOODREADS_AVG] = "n/a"
+        self.assertEqual(
+            _book_indexes(
+                top_books(
+                    self.processed_book_review_info,
+                    k=2,
+                    metrics=[METRIC_GOODREADS_AVG],
+                )
+            ),
+            [3, 4],
+        )
+
+    def test_k_out_of_range(self):
+        self.assertEqual(
+            len(top_books(self.processed_book_review_info, k=100)),
+            len(self.processed_book_review_info),
+        )
+        self.assertEqual(top_books(self.processed_book_review_info, k=0), [])
+        self.assertEqual(top_books({}, k=3), [])
+
+    def test_large_corpus(self):
+        random_generator = random.Random(0)
+        processed_book_review_info = {}
+        for book_index in range(30000):
+            processed_book_review_info[book_index] = _build_book_rating_info(
+                round(random_generator.uniform(1, 5), 2),
+                round(random_generator.uniform(1, 5), 1),
+            )
+        expected_book_indexes = sorted(
+            processed_book_review_info,
+            key=lambda book_index: (
+                -processed_book_review_info[book_index][METRIC_BAR],
+                -processed_book_review_info[book_index][METRIC_SIMPLE_AVG],
+                book_index,
+            ),
+        )
+        self.assertEqual(
+            _book_indexes(
+                top_books(
+                    processed_book_review_info,
+                    k=50,
+                    metrics=[METRIC_BAR, METRIC_SIMPLE_AVG],
+                )
+            ),
+            expected_book_indexes[:50],
+        )
+
+    def test_already_ordered_books(self):
+        # sorted input took the recursive quicksort past the recursion limit
+        processed_book_review_info = {}
+        for book_index in range(20000):
+            processed_book_review_info[book_index] = _build_book_rating_info(
+                book_index / 1000.0
+            )
+        self.assertEqual(
+            _book_indexes(top_books(processed_book_review_info, k=3)),
+            [19999, 19998, 19997],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: test_BookReviews
+    :synopsis: Regression tests of parsing only the review subtree and of merging incrementally scraped reviews into the known ones
+
+.. moduleauthor:: DivyenduDutta
+
+The review pages are read from `Fixtures/1-fixture-book` and parsed with every parser
+backend installed. The reviews are scraped once from :mod:`FixtureServer` with the http
+backend, the known reviews of an earlier scrape are then built from them.
+
+Run from `web_scraper_goodreads_root` with ``python -m pytest test_BookReviews.py``
+or ``python -m unittest test_BookReviews``.
+"""
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import BookReviews
+from BookReviews import (
+    retrieve_book_review_details,
+    _merge_known_reviews,
+    _select_parser_backend,
+)
+from Benchmarks.ReviewParseBenchmark import (
+    FIXTURE_PAGES,
+    _build_review_page_source,
+    _parse_and_extract,
+)
+from FixtureServer import (
+    start_fixture_server,
+    stop_fixture_server,
+    _read_fixture,
+    _build_book_page,
+)
+from CommonConstants.Constants import FETCH_BACKEND_HTTP
+
+FIXTURE_BOOK_ID = "1-fixture-book"
+FIRST_PAGE_REVIEW_COUNT = 5
+
+
+class SubtreeParseTest(unittest.TestCase):
+    def setUp(self):
+        self.parser_backend = BookReviews.parser_backend
+        self.parser_backends = ["html.parser"]
+        if _select_parser_backend("lxml") == "lxml":
+            self.parser_backends.append("lxml")
+
+    def tearDown(self):
+        BookReviews.parser_backend = self.parser_backend
+
+    def assertParsedAlike(self, html_source):
+        """
+        Checks every parser backend extracts the same review details from the whole
+        page and from the `bookReviews` div only as `html.parser` from the whole page
+        """
+        BookReviews.parser_backend = "html.parser"
+        review_details = _parse_and_extract(html_source, False)
+        self.assertTrue(len(review_details) > 0)
+        for parser_backend in self.parser_backends:
+            BookReviews.parser_backend = parser_backend
+            for subtree_only in [False, True]:
+                self.assertEqual(
+                    _parse_and_extract(html_source, subtree_only),
+                    review_details,
+                    parser_backend + " subtree only " + str(subtree_only),
+                )
+        return review_details
+
+    def test_fixture_pages(self):
+        review_counts = [
+            len(
+                self.assertParsedAlike(
+                    _build_book_page(_read_fixture(FIXTURE_BOOK_ID, page_number))
+                )
+            )
+            for page_number in range(1, FIXTURE_PAGES + 1)
+        ]
+        self.assertEqual(review_counts[0], FIRST_PAGE_REVIEW_COUNT)
+        self.assertEqual(sum(review_counts), 14)
+
+    def test_page_with_markup_around_the_reviews(self):
+        self.assertParsedAlike(_build_review_page_source(2, 20))
+
+    def test_subtree_holds_only_the_reviews(self):
+        soup = BookReviews._create_book_review_scraper_from_source(
+            _build_review_page_source(1, 20), True
+        )
+        self.assertEqual(soup.find("a", attrs={"class": "bookPageGenreLink"}), None)
+        self.assertNotEqual(soup.find("div", attrs={"id": "bookReviews"}), None)
+
+
+class MergeKnownReviewsTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.working_directory = os.getcwd()
+        # review streams and cached pages are written under the current directory
+        cls.scrape_directory = tempfile.mkdtemp()
+        os.chdir(cls.scrape_directory)
+        server, base_url = start_fixture_server()
+        try:
+            cls.reviews = retrieve_book_review_details(
+                base_url + "/book/show/" + FIXTURE_BOOK_ID,
+                True,
+                fetch_backend=FETCH_BACKEND_HTTP,
+            )
+        finally:
+            stop_fixture_server(server)
+
+    @classmethod
+    def tearDownClass(cls):
+        os.chdir(cls.working_directory)
+        shutil.rmtree(cls.scrape_directory, ignore_errors=True)
+
+    def test_fixture_book_is_scraped(self):
+        self.assertEqual(len(self.reviews), 14)
+        self.assertEqual(len(np.unique(self.reviews["review_id"])), len(self.reviews))
+
+    def test_new_reviews_come_before_the_known_ones(self):
+        merged_reviews = _merge_known_reviews(
+            self.reviews[:FIRST_PAGE_REVIEW_COUNT],
+            self.reviews[FIRST_PAGE_REVIEW_COUNT:],
+        )
+        self.assertEqual(merged_reviews.tolist(), self.reviews.tolist())
+
+    def test_reviews_scraped_again_replace_the_known_ones(self):
+        # the earlier scrape missed the 2 newest reviews and saw fewer likes
+        known_reviews = self.reviews[2:].copy()
+        known_reviews["review_likes"][:3] = 0
+        merged_reviews = _merge_known_reviews(
+            self.reviews[:FIRST_PAGE_REVIEW_COUNT], known_reviews
+        )
+        self.assertEqual(merged_reviews.tolist(), self.reviews.tolist())
+
+    def test_known_reviews_not_scraped_again_are_kept(self):
+        # gone from the site since, only a full scrape drops it
+        deleted_review = self.reviews[-1:].copy()
+        deleted_review["review_id"] = 999999
+        known_reviews = np.concatenate([self.reviews[2:], deleted_review])
+        merged_reviews = _merge_known_reviews(
+            self.reviews[:FIRST_PAGE_REVIEW_COUNT], known_reviews
+        )
+        self.assertEqual(
+            merged_reviews.tolist(), self.reviews.tolist() + deleted_review.tolist()
+        )
+
+    def test_nothing_known(self):
+        merged_reviews = _merge_known_reviews(
+            self.reviews, np.empty(0, dtype=self.reviews.dtype)
+        )
+        self.assertEqual(merged_reviews.tolist(), self.reviews.tolist())
+
+
+if __name__ == "__main__":
+    unittest.main()
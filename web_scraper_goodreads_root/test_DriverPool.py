@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: test_DriverPool
+    :synopsis: Regression tests of reusing, recycling and bounding the drivers of DriverPool
+
+.. moduleauthor:: DivyenduDutta
+
+The pool hands out fake drivers which only answer `current_url` and `quit`, so no browser is started.
+
+Run from `web_scraper_goodreads_root` with ``python -m pytest test_DriverPool.py``
+or ``python -m unittest test_DriverPool``.
+"""
+import time
+import threading
+import unittest
+from DriverPool import DriverPool
+
+MAX_SIZE = 3
+MAX_PAGES_PER_DRIVER = 5
+
+
+class _Driver(object):
+    """
+    Stands in for a selenium driver, its browser can be made to stop responding
+    """
+
+    def __init__(self):
+        self.is_dead = False
+        self.quit_count = 0
+
+    @property
+    def current_url(self):
+        if self.is_dead:
+            raise Exception("chrome not reachable")
+        return "about:blank"
+
+    def quit(self):
+        self.quit_count += 1
+
+
+class DriverPoolTest(unittest.TestCase):
+    def setUp(self):
+        self.created_drivers = []
+        self._lock = threading.Lock()
+        self.driver_pool = DriverPool(self._create_driver, MAX_SIZE, MAX_PAGES_PER_DRIVER)
+
+    def _create_driver(self):
+        driver = _Driver()
+        with self._lock:
+            self.created_drivers.append(driver)
+        return driver
+
+    def test_driver_is_reused(self):
+        driver = self.driver_pool.checkout()
+        self.driver_pool.checkin(driver, 1)
+        self.assertIs(self.driver_pool.checkout(), driver)
+        self.assertEqual(len(self.created_drivers), 1)
+
+    def test_driver_is_recycled_after_its_pages(self):
+        driver = self.driver_pool.checkout()
+        self.driver_pool.checkin(driver, MAX_PAGES_PER_DRIVER - 1)
+        self.assertIs(self.driver_pool.checkout(), driver)
+        self.driver_pool.checkin(driver, 1)
+        self.assertEqual(driver.quit_count, 1)
+        self.assertIsNot(self.driver_pool.checkout(), driver)
+
+    def test_dead_driver_is_replaced(self):
+        driver = self.driver_pool.checkout()
+        self.driver_pool.checkin(driver)
+        driver.is_dead = True
+        self.assertIsNot(self.driver_pool.checkout(), driver)
+        self.assertEqual(driver.quit_count, 1)
+
+    def test_discarded_driver_is_quit(self):
+        driver = self.driver_pool.checkout()
+        self.driver_pool.discard(driver)
+        self.assertEqual(driver.quit_count, 1)
+        # given back by mistake afterwards
+        self.driver_pool.checkin(driver)
+        self.assertIsNot(self.driver_pool.checkout(), driver)
+
+    def test_checkout_waits_for_a_driver_when_full(self):
+        drivers = [self.driver_pool.checkout() for _ in range(MAX_SIZE)]
+        checked_out_drivers = []
+        waiting_thread = threading.Thread(
+            target=lambda: checked_out_drivers.append(self.driver_pool.checkout())
+        )
+        waiting_thread.start()
+        time.sleep(0.1)
+        self.assertEqual(checked_out_drivers, [])
+        self.driver_pool.checkin(drivers[0])
+        waiting_thread.join(5)
+        self.assertEqual(checked_out_drivers, [drivers[0]])
+        self.assertEqual(len(self.created_drivers), MAX_SIZE)
+
+    def test_close_all_quits_checked_out_drivers_on_checkin(self):
+        idle_driver = self.driver_pool.checkout()
+        checked_out_driver = self.driver_pool.checkout()
+        self.driver_pool.checkin(idle_driver)
+        self.driver_pool.close_all()
+        self.assertEqual(idle_driver.quit_count, 1)
+        self.assertEqual(checked_out_driver.quit_count, 0)
+        self.driver_pool.checkin(checked_out_driver)
+        self.assertEqual(checked_out_driver.quit_count, 1)
+        # the pool starts new drivers afterwards
+        self.assertNotIn(self.driver_pool.checkout(), [idle_driver, checked_out_driver])
+
+    def test_close_all_at_exit_quits_every_driver(self):
+        drivers = [self.driver_pool.checkout() for _ in range(2)]
+        self.driver_pool.checkin(drivers[0])
+        self.driver_pool.close_all(include_checked_out=True)
+        self.assertEqual([driver.quit_count for driver in drivers], [1, 1])
+
+    def test_threads_never_exceed_the_pool(self):
+        def scrape_books():
+            for book_index in range(20):
+                driver = self.driver_pool.checkout()
+                if book_index % 7 == 3:
+                    driver.is_dead = True
+                self.driver_pool.checkin(driver, 1)
+
+        threads = [threading.Thread(target=scrape_books) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(30)
+        self.assertTrue(len(self.driver_pool._live_drivers) <= MAX_SIZE)
+        self.assertEqual(self.driver_pool._drivers_starting, 0)
+        self.driver_pool.close_all(include_checked_out=True)
+        # every driver created was quit once
+        self.assertEqual(
+            [driver.quit_count for driver in self.created_drivers],
+            [1] * len(self.created_drivers),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
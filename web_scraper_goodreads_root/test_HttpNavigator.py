@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: test_HttpNavigator
+    :synopsis: Regression tests of the http fetch backend against the selenium one
+
+.. moduleauthor:: DivyenduDutta
+
+Review pages come from :mod:`FixtureServer`. The comparison with the selenium backend
+is skipped when no headless chrome can be started.
+
+Run from `web_scraper_goodreads_root` with ``python -m pytest test_HttpNavigator.py``
+or ``python -m unittest test_HttpNavigator``.
+"""
+import os
+import shutil
+import tempfile
+import unittest
+import HttpNavigator
+from FixtureServer import (
+    start_fixture_server,
+    stop_fixture_server,
+    compare_fetch_backends,
+)
+
+FIXTURE_BOOK_PATH = "/book/show/1-fixture-book"
+
+
+def _start_selenium_driver():
+    """
+    Returns:
+        bool flag indicating whether a selenium driver could be started
+    """
+    try:
+        import SiteNavigator
+
+        driver = SiteNavigator.driver_pool.checkout()
+    except Exception:
+        return False
+    SiteNavigator.driver_pool.checkin(driver)
+    return True
+
+
+class HttpNavigatorTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.working_directory = os.getcwd()
+        # cached pages are written under the current directory
+        cls.scrape_directory = tempfile.mkdtemp()
+        os.chdir(cls.scrape_directory)
+        cls.server, base_url = start_fixture_server()
+        cls.book_url = base_url + FIXTURE_BOOK_PATH
+
+    @classmethod
+    def tearDownClass(cls):
+        stop_fixture_server(cls.server)
+        os.chdir(cls.working_directory)
+        shutil.rmtree(cls.scrape_directory, ignore_errors=True)
+
+    def test_page_numbers_are_encoded_like_selenium_ones(self):
+        first_page = HttpNavigator.get_html_code_for_first_page(self.book_url, True)
+        self.assertIn("next_page", first_page)
+        (
+            is_next_page_there,
+            html_source,
+            current_page,
+        ) = HttpNavigator.get_html_code_for_other_pages(self.book_url)
+        self.assertTrue(is_next_page_there)
+        self.assertTrue(html_source.startswith('<div id="bookReviews">'))
+        self.assertEqual(current_page, "2".encode("utf-8"))
+        self.assertIsInstance(current_page, bytes)
+
+    def test_last_page_has_no_next_page(self):
+        HttpNavigator.get_html_code_for_first_page(self.book_url, True)
+        page_numbers = []
+        while True:
+            (
+                is_next_page_there,
+                html_source,
+                current_page,
+            ) = HttpNavigator.get_html_code_for_other_pages(self.book_url)
+            if not is_next_page_there:
+                break
+            page_numbers.append(int(current_page))
+        self.assertEqual(page_numbers, list(range(2, len(page_numbers) + 2)))
+        self.assertEqual(html_source, None)
+
+    def test_backends_produce_the_same_reviews(self):
+        if not _start_selenium_driver():
+            self.skipTest("no headless chrome to run the selenium backend")
+        self.assertTrue(compare_fetch_backends(self.book_url))
+
+
+if __name__ == "__main__":
+    unittest.main()
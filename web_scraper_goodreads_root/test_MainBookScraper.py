@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: test_MainBookScraper
+    :synopsis: Regression tests of the retries of _scrape_book and of scraping books on a thread pool
+
+.. moduleauthor:: DivyenduDutta
+
+The scraping, saving and visualizing functions MainBookScraper calls are replaced by
+fakes on the module for each test and put back after it, so nothing is fetched or saved.
+
+Run from `web_scraper_goodreads_root` with ``python -m pytest test_MainBookScraper.py``
+or ``python -m unittest test_MainBookScraper``.
+"""
+import threading
+import unittest
+from requests.exceptions import ConnectionError
+import MainBookScraper
+from MainBookScraper import _scrape_book, generate_book_review_images
+from FileUtil.ResponseCache import CacheMissError
+from Records import Book
+from CommonConstants.Constants import FETCH_BACKEND_HTTP, FETCH_BACKEND_SELENIUM
+
+BOOK_URL_TEMPLATE = "https://www.goodreads.com/book/show/{book_id}.Book_{book_id}"
+
+
+class _BookEntry(object):
+    """
+    Book of today's list as `generate_book_review_images` reads it from the book catalog
+    """
+
+    def __init__(self, book_URL):
+        self.book = Book(book_URL=book_URL)
+
+
+class _BookCatalog(object):
+    """
+    Book catalog listing the books of `book_urls`
+    """
+
+    def __init__(self, book_urls):
+        self.book_urls = book_urls
+
+    def books(self, genre=None, listed_on=None):
+        return [_BookEntry(book_url) for book_url in self.book_urls]
+
+    def forget(self, book_name):
+        pass
+
+
+class _DriverPool(object):
+    def __init__(self):
+        self.close_count = 0
+
+    def close_all(self, include_checked_out=False):
+        self.close_count += 1
+
+
+class ScrapeBookTest(unittest.TestCase):
+    def setUp(self):
+        self._replaced_attributes = {}
+        self._lock = threading.Lock()
+        self.failures_left = {}  # book URL to failures before its reviews are scraped
+        self.uncached_book_urls = set()
+        self.scrape_calls = []
+        self.saved_book_names = []
+        self.released_driver_count = 0
+        self.book_urls = [
+            BOOK_URL_TEMPLATE.format(book_id=book_id) for book_id in range(1, 5)
+        ]
+        self.driver_pool = _DriverPool()
+
+        self._replace("FAILURE_THRESHOLD", 2)
+        self._replace("retrieve_book_review_details", self._retrieve_book_review_details)
+        self._replace("data_for_book_exists_current_date", lambda book_directory: False)
+        self._replace("_is_full_scrape_due", lambda book_name: False)
+        self._replace("save_reviews", self._save_reviews)
+        self._replace("save_review_array", lambda reviews, book_name: None)
+        self._replace("remove_review_stream", lambda book_name: None)
+        self._replace(
+            "visualize_and_save_review_information", lambda reviews, book_name: None
+        )
+        self._replace("release_driver", self._release_driver)
+        self._replace("retriveSciFiBookList", lambda genre: {})
+        self._replace("save_obj", lambda *args, **kwargs: None)
+        self._replace("book_catalog", _BookCatalog(self.book_urls))
+        self._replace("driver_pool", self.driver_pool)
+
+    def tearDown(self):
+        for name, value in self._replaced_attributes.items():
+            setattr(MainBookScraper, name, value)
+
+    def _replace(self, name, value):
+        """
+        Replaces an attribute of MainBookScraper till the end of the test
+        """
+        self._replaced_attributes[name] = getattr(MainBookScraper, name)
+        setattr(MainBookScraper, name, value)
+
+    def _retrieve_book_review_details(
+        self, book_url, new_book, fetch_backend, resume, incremental
+    ):
+        with self._lock:
+            self.scrape_calls.append((book_url, resume, incremental))
+            failures_left = self.failures_left.get(book_url, 0)
+            self.failures_left[book_url] = failures_left - 1
+        if book_url in self.uncached_book_urls:
+            raise CacheMissError(book_url)
+        if failures_left > 0:
+            raise ConnectionError(book_url + " dropped")
+        return {}
+
+    def _save_reviews(self, reviews, name, directory, incremental):
+        with self._lock:
+            self.saved_book_names.append(directory.split("/")[-1])
+
+    def _release_driver(self):
+        with self._lock:
+            self.released_driver_count += 1
+
+    def test_retry_resumes_the_book(self):
+        book_url = self.book_urls[0]
+        self.failures_left[book_url] = 2
+        self.assertTrue(_scrape_book(book_url, FETCH_BACKEND_HTTP, False))
+        self.assertEqual(
+            self.scrape_calls,
+            [(book_url, False, False), (book_url, True, False), (book_url, True, False)],
+        )
+        self.assertEqual(self.saved_book_names, ["1_Book_1"])
+        self.assertEqual(self.released_driver_count, 1)
+
+    def test_book_is_skipped_after_too_many_failures(self):
+        book_url = self.book_urls[0]
+        self.failures_left[book_url] = 3
+        self.assertFalse(_scrape_book(book_url, FETCH_BACKEND_HTTP, False))
+        self.assertEqual(len(self.scrape_calls), 3)
+        self.assertEqual(self.saved_book_names, [])
+        self.assertEqual(self.released_driver_count, 1)
+
+    def test_cache_miss_is_not_retried(self):
+        book_url = self.book_urls[0]
+        self.uncached_book_urls.add(book_url)
+        self.assertFalse(_scrape_book(book_url, FETCH_BACKEND_HTTP, False))
+        self.assertEqual(len(self.scrape_calls), 1)
+        self.assertEqual(self.released_driver_count, 1)
+
+    def test_incremental_only_with_the_http_backend(self):
+        book_url = self.book_urls[0]
+        _scrape_book(book_url, FETCH_BACKEND_HTTP, True)
+        _scrape_book(book_url, FETCH_BACKEND_SELENIUM, True)
+        self.assertEqual(
+            [incremental for _, _, incremental in self.scrape_calls], [True, False]
+        )
+
+    def test_books_on_a_thread_pool_keep_their_own_retries(self):
+        # every book fails as often as it may, together far more than one book may
+        for book_url in self.book_urls:
+            self.failures_left[book_url] = 2
+        generate_book_review_images(
+            "science-fiction", FETCH_BACKEND_HTTP, workers=3, incremental=False
+        )
+        self.assertEqual(
+            sorted(self.saved_book_names),
+            ["1_Book_1", "2_Book_2", "3_Book_3", "4_Book_4"],
+        )
+        self.assertEqual(len(self.scrape_calls), 3 * len(self.book_urls))
+        self.assertEqual(self.released_driver_count, len(self.book_urls))
+        self.assertEqual(self.driver_pool.close_count, 1)
+
+    def test_books_one_at_a_time(self):
+        self.failures_left[self.book_urls[1]] = 3
+        generate_book_review_images(
+            "science-fiction", FETCH_BACKEND_HTTP, workers=1, incremental=False
+        )
+        self.assertEqual(self.saved_book_names, ["1_Book_1", "3_Book_3", "4_Book_4"])
+        self.assertEqual(self.driver_pool.close_count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
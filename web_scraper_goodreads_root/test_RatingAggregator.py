@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: test_RatingAggregator
+    :synopsis: Regression tests of the ratings kept up to date page by page and merged across shards
+
+.. moduleauthor:: DivyenduDutta
+
+The ratings are checked against the pure python loops of
+:func:`Benchmarks.RatingBenchmark._reference_rate_book` over all the reviews at once.
+
+Run from `web_scraper_goodreads_root` with ``python -m pytest test_RatingAggregator.py``
+or ``python -m unittest test_RatingAggregator``.
+"""
+import unittest
+import numpy as np
+from Benchmarks.RatingBenchmark import (
+    RATING_TOLERANCE,
+    _reference_rate_book,
+    _build_book,
+)
+from FileUtil.ColumnarReviews import reviews_to_columns
+from RatingAggregator import RatingAggregator
+from Records import Review
+
+
+def _build_aggregator(review_likes, review_ratings, page_size):
+    """
+    Returns:
+        RatingAggregator : aggregator fed the reviews `page_size` at a time
+    """
+    rating_aggregator = RatingAggregator()
+    for page_start in range(0, len(review_likes), page_size):
+        rating_aggregator.add_reviews(
+            review_likes[page_start : page_start + page_size],
+            review_ratings[page_start : page_start + page_size],
+        )
+    return rating_aggregator
+
+
+class RatingAggregatorTest(unittest.TestCase):
+    def assertRatingsOf(self, rating_aggregator, review_likes, review_ratings):
+        self.assertEqual(rating_aggregator.review_count, len(review_likes))
+        self.assertTrue(
+            np.isclose(
+                rating_aggregator.simple_average(),
+                np.mean(review_ratings),
+                rtol=RATING_TOLERANCE,
+                atol=0,
+            )
+        )
+        self.assertTrue(
+            np.isclose(
+                rating_aggregator.bayesian_adj_rating(),
+                _reference_rate_book(list(review_likes), list(review_ratings))[1],
+                rtol=RATING_TOLERANCE,
+                atol=0,
+            )
+        )
+
+    def test_ratings_page_by_page(self):
+        for review_count, page_size in [(1, 30), (29, 30), (1000, 30), (20000, 7)]:
+            review_likes, review_ratings = _build_book(review_count, review_count)
+            review_likes = review_likes.tolist()
+            review_ratings = review_ratings.tolist()
+            self.assertRatingsOf(
+                _build_aggregator(review_likes, review_ratings, page_size),
+                review_likes,
+                review_ratings,
+            )
+
+    def test_ratings_are_read_again_after_new_reviews(self):
+        review_likes, review_ratings = [4, 1, 9, 2], [5, 3, 4, 1]
+        rating_aggregator = _build_aggregator(review_likes[:2], review_ratings[:2], 2)
+        self.assertRatingsOf(rating_aggregator, review_likes[:2], review_ratings[:2])
+        # the first review of 0 likes shifts the likes of every review
+        rating_aggregator.add_reviews([0] + review_likes[2:], [2] + review_ratings[2:])
+        self.assertRatingsOf(
+            rating_aggregator, [0] + review_likes, [2] + review_ratings
+        )
+
+    def test_merged_shards(self):
+        review_likes, review_ratings = _build_book(5000, 3)
+        review_ratings = review_ratings.tolist()
+        # only the last shard has reviews of 0 likes
+        review_likes = (review_likes[:3000] + 1).tolist() + review_likes[3000:].tolist()
+        shards = [(0, 1200), (1200, 3000), (3000, 5000)]
+        rating_aggregator = RatingAggregator()
+        for shard_start, shard_end in shards:
+            self.assertIs(
+                rating_aggregator.merge(
+                    _build_aggregator(
+                        review_likes[shard_start:shard_end],
+                        review_ratings[shard_start:shard_end],
+                        100,
+                    )
+                ),
+                rating_aggregator,
+            )
+        self.assertRatingsOf(rating_aggregator, review_likes, review_ratings)
+        whole_book_aggregator = _build_aggregator(review_likes, review_ratings, 5000)
+        self.assertEqual(
+            rating_aggregator.pair_counts, whole_book_aggregator.pair_counts
+        )
+        self.assertEqual(
+            rating_aggregator.rating_counts, whole_book_aggregator.rating_counts
+        )
+
+    def test_merge_with_an_empty_aggregator(self):
+        rating_aggregator = _build_aggregator([0, 3], [4, 2], 30)
+        bayesian_adj_rating = rating_aggregator.bayesian_adj_rating()
+        rating_aggregator.merge(RatingAggregator())
+        self.assertEqual(rating_aggregator.bayesian_adj_rating(), bayesian_adj_rating)
+        self.assertRatingsOf(
+            RatingAggregator().merge(rating_aggregator), [0, 3], [4, 2]
+        )
+
+    def test_pages_skip_reviews_without_a_rating(self):
+        rating_aggregator = RatingAggregator()
+        rating_aggregator.add_page(
+            {
+                0: Review(review_id=1, review_likes=3, review_rating=5),
+                1: Review(review_id=2, review_likes=8, review_rating=0),
+                2: {"review_likes": 0, "review_rating": 2, "review_date": None},
+            }
+        )
+        rating_aggregator.add_page({})
+        self.assertRatingsOf(rating_aggregator, [3, 0], [5, 2])
+        self.assertEqual(rating_aggregator.rating_counts, {5: 1, 2: 1})
+
+        column_aggregator = RatingAggregator()
+        column_aggregator.add_columns(
+            reviews_to_columns(
+                {
+                    0: Review(review_id=1, review_likes=3, review_rating=5),
+                    1: Review(review_id=3, review_likes=0, review_rating=2),
+                }
+            )
+        )
+        self.assertEqual(
+            column_aggregator.bayesian_adj_rating(),
+            rating_aggregator.bayesian_adj_rating(),
+        )
+
+    def test_no_reviews(self):
+        rating_aggregator = RatingAggregator()
+        rating_aggregator.add_reviews([], [])
+        self.assertEqual(rating_aggregator.review_count, 0)
+        self.assertEqual(rating_aggregator.simple_average(), None)
+        self.assertEqual(rating_aggregator.bayesian_adj_rating(), None)
+
+
+if __name__ == "__main__":
+    unittest.main()
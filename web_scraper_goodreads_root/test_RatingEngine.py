@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: test_RatingEngine
+    :synopsis: Regression tests of the packed rating models against rating the books one at a time
+
+.. moduleauthor:: DivyenduDutta
+
+The books are the synthetic likes and ratings of :func:`Benchmarks.RatingBenchmark._build_book`,
+some without reviews, some without a review of 0 likes.
+
+Run from `web_scraper_goodreads_root` with ``python -m pytest test_RatingEngine.py``
+or ``python -m unittest test_RatingEngine``.
+"""
+from __future__ import division
+import math
+import unittest
+import numpy as np
+from Benchmarks.RatingBenchmark import _build_book
+from FileUtil.ColumnarReviews import REVIEW_DTYPE
+from RatingEngine import (
+    PackedReviews,
+    RatingModel,
+    RATING_MODELS,
+    register_rating_model,
+    rate_packed_reviews,
+)
+from review_rating_calculation import _calculate_book_ratings
+from CommonConstants.Constants import WILSON_Z, WILSON_POSITIVE_RATING, DIRICHLET_PRIOR
+
+# books without reviews first, in between and last so every offset case is covered
+BOOK_REVIEW_COUNTS = [0, 1, 7, 0, 0, 250, 3, 1000, 0]
+RATING_TOLERANCE = 1e-9
+
+
+def _build_book_reviews(review_count, seed):
+    """
+    Args:
+        review_count (int) : number of reviews
+        seed (int) : seed of the random likes and ratings
+
+    Returns:
+        numpy structured array : reviews with `REVIEW_DTYPE`
+    """
+    review_likes, review_ratings = _build_book(review_count, seed)
+    reviews = np.zeros(review_count, dtype=REVIEW_DTYPE)
+    reviews["review_likes"] = review_likes
+    reviews["review_rating"] = review_ratings
+    return reviews
+
+
+def _wilson_lower_bound(review_ratings):
+    """
+    Args:
+        review_ratings (list) : ratings of a book
+
+    Returns:
+        float : lower bound of the Wilson score interval of the share of positive ratings
+    """
+    review_count = len(review_ratings)
+    positive_share = (
+        len([rating for rating in review_ratings if rating >= WILSON_POSITIVE_RATING])
+        / review_count
+    )
+    z_squared = WILSON_Z * WILSON_Z
+    return (
+        positive_share
+        + z_squared / (2 * review_count)
+        - WILSON_Z
+        * math.sqrt(
+            (positive_share * (1 - positive_share) + z_squared / (4 * review_count))
+            / review_count
+        )
+    ) / (1 + z_squared / review_count)
+
+
+def _dirichlet_mean(review_ratings):
+    """
+    Args:
+        review_ratings (list) : ratings of a book
+
+    Returns:
+        float : mean rating with the `DIRICHLET_PRIOR` pseudo ratings added
+    """
+    star_counts = [
+        DIRICHLET_PRIOR[star - 1] + review_ratings.count(star) for star in range(1, 6)
+    ]
+    return sum(
+        star * star_count for star, star_count in zip(range(1, 6), star_counts)
+    ) / sum(star_counts)
+
+
+class PackedReviewsTest(unittest.TestCase):
+    def setUp(self):
+        self.book_reviews = [
+            _build_book_reviews(review_count, seed)
+            for seed, review_count in enumerate(BOOK_REVIEW_COUNTS)
+        ]
+        # one book whose reviews all have likes so its likes are not shifted
+        self.book_reviews[2]["review_likes"] += 1
+        self.packed_reviews = PackedReviews.from_reviews(self.book_reviews)
+
+    def assertRatingsEqual(self, ratings, expected_ratings):
+        for book_index, (rating, expected_rating) in enumerate(
+            zip(ratings, expected_ratings)
+        ):
+            if expected_rating == None:
+                self.assertTrue(np.isnan(rating), "book " + str(book_index))
+            else:
+                self.assertTrue(
+                    abs(rating - expected_rating)
+                    <= RATING_TOLERANCE * abs(expected_rating),
+                    "book "
+                    + str(book_index)
+                    + " "
+                    + repr(rating)
+                    + " != "
+                    + repr(expected_rating),
+                )
+
+    def _rate_books_one_at_a_time(self, rate_book):
+        """
+        Returns:
+            list : rating of each book by `rate_book`, None for books without reviews
+        """
+        return [
+            rate_book(reviews) if len(reviews) > 0 else None
+            for reviews in self.book_reviews
+        ]
+
+    def test_offsets(self):
+        self.assertEqual(self.packed_reviews.book_count, len(BOOK_REVIEW_COUNTS))
+        self.assertEqual(self.packed_reviews.review_counts.tolist(), BOOK_REVIEW_COUNTS)
+        self.assertEqual(
+            self.packed_reviews.group_sums(self.packed_reviews.review_ratings).tolist(),
+            [int(reviews["review_rating"].sum()) for reviews in self.book_reviews],
+        )
+
+    def test_mean_and_bar_match_review_rating_calculation(self):
+        model_ratings = rate_packed_reviews(self.packed_reviews, ["mean", "bar"])
+        self.assertEqual(list(model_ratings), ["mean", "bar"])
+        self.assertRatingsEqual(
+            model_ratings["mean"],
+            self._rate_books_one_at_a_time(
+                lambda reviews: _calculate_book_ratings(reviews)[0]
+            ),
+        )
+        self.assertRatingsEqual(
+            model_ratings["bar"],
+            self._rate_books_one_at_a_time(
+                lambda reviews: _calculate_book_ratings(reviews)[1]
+            ),
+        )
+
+    def test_wilson_and_dirichlet_match_their_formulas(self):
+        model_ratings = rate_packed_reviews(self.packed_reviews, ["wilson", "dirichlet"])
+        self.assertRatingsEqual(
+            model_ratings["wilson"],
+            self._rate_books_one_at_a_time(
+                lambda reviews: _wilson_lower_bound(reviews["review_rating"].tolist())
+            ),
+        )
+        self.assertRatingsEqual(
+            model_ratings["dirichlet"],
+            self._rate_books_one_at_a_time(
+                lambda reviews: _dirichlet_mean(reviews["review_rating"].tolist())
+            ),
+        )
+
+    def test_no_books(self):
+        model_ratings = rate_packed_reviews(PackedReviews.from_reviews([]))
+        self.assertEqual(list(model_ratings), list(RATING_MODELS))
+        for ratings in model_ratings.values():
+            self.assertEqual(len(ratings), 0)
+
+    def test_unknown_model_is_rejected(self):
+        self.assertRaises(
+            ValueError, rate_packed_reviews, self.packed_reviews, ["mean", "median"]
+        )
+
+    def test_registered_model_is_run(self):
+        class ReviewCountModel(RatingModel):
+            name = "review_count"
+
+            def rate(self, packed_reviews):
+                return packed_reviews.review_counts.astype(np.float64)
+
+        register_rating_model(ReviewCountModel())
+        try:
+            model_ratings = rate_packed_reviews(self.packed_reviews)
+            self.assertEqual(
+                model_ratings["review_count"].tolist(), BOOK_REVIEW_COUNTS
+            )
+        finally:
+            del RATING_MODELS["review_count"]
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: test_Records
+    :synopsis: Regression tests of the dict round trip of the Review and Book records
+
+.. moduleauthor:: DivyenduDutta
+
+Run from `web_scraper_goodreads_root` with ``python -m pytest test_Records.py``
+or ``python -m unittest test_Records``.
+"""
+import json
+import pickle
+import unittest
+from Records import (
+    Book,
+    Review,
+    MISSING_REVIEW_ID,
+    as_book,
+    as_review,
+    record_to_dict,
+)
+
+
+class ReviewDictTest(unittest.TestCase):
+    """
+    A review gives back the dict it was read from, with or without an id
+    """
+
+    def test_dict_without_id_round_trips(self):
+        review_details = {
+            "review_likes": 3,
+            "review_rating": 4,
+            "review_date": "Jan 02, 2020",
+        }
+        review = as_review(review_details)
+        self.assertEqual(review.review_id, MISSING_REVIEW_ID)
+        self.assertEqual(review.to_dict(), review_details)
+
+    def test_dict_with_id_round_trips(self):
+        review_details = {
+            "review_id": 1001,
+            "review_likes": 3,
+            "review_rating": 4,
+            "review_date": None,
+        }
+        review = as_review(review_details)
+        self.assertEqual(review.to_dict(), review_details)
+        self.assertEqual(as_review(review.to_dict()), review)
+
+    def test_json_of_review_details_has_no_missing_ids(self):
+        book_review_details = {0: Review(review_likes=1, review_rating=5)}
+        saved_details = json.loads(
+            json.dumps(book_review_details, default=record_to_dict)
+        )
+        self.assertNotIn("review_id", saved_details["0"])
+        self.assertEqual(as_review(saved_details["0"]), book_review_details[0])
+
+    def test_unknown_detail_is_rejected(self):
+        with self.assertRaises(ValueError):
+            as_review({"review_rating": 4, "review_text": "Great"})
+
+    def test_pickle_round_trip(self):
+        review = Review(1001, 3, 4, "Jan 02, 2020")
+        self.assertEqual(pickle.loads(pickle.dumps(review, 2)), review)
+
+
+class BookDictTest(unittest.TestCase):
+    """
+    A book gives back the dict format with the author details under `author`
+    """
+
+    def test_dict_round_trips(self):
+        book_details = {
+            "book_name": "Dune",
+            "book_URL": "https://www.goodreads.com/book/show/234225.Dune",
+            "book_img_URL": None,
+            "author": {
+                "author_name": "Frank Herbert",
+                "author_URL": None,
+                "goodreads_author": False,
+            },
+            "shelved": "45",
+            "avg_rating": "4.22",
+            "number_of_ratings": "730,149",
+            "published_year": "1965",
+        }
+        book = as_book(book_details)
+        self.assertEqual(book.author_name, "Frank Herbert")
+        self.assertEqual(book.to_dict(), book_details)
+        self.assertEqual(pickle.loads(pickle.dumps(book, 2)), book)
+
+
+if __name__ == "__main__":
+    unittest.main()
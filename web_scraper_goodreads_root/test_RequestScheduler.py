@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: test_RequestScheduler
+    :synopsis: Regression tests of the retries and backoff of RequestScheduler
+
+.. moduleauthor:: DivyenduDutta
+
+Requests go to :mod:`FixtureServer`, failed ones to a closed port on the same machine.
+
+Run from `web_scraper_goodreads_root` with ``python -m pytest test_RequestScheduler.py``
+or ``python -m unittest test_RequestScheduler``.
+"""
+import time
+import socket
+import unittest
+import requests
+from requests.exceptions import ConnectionError
+from HttpNavigator import RETRYABLE_EXCEPTIONS
+from FixtureServer import start_fixture_server, stop_fixture_server
+from RequestScheduler import RequestScheduler
+
+FIXTURE_BOOK_PATH = "/book/show/1-fixture-book"
+
+
+def _closed_port_url():
+    """
+    Returns:
+        str : URL of a port nothing listens on, requests to it fail at once
+    """
+    closed_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    closed_socket.bind(("127.0.0.1", 0))
+    port = closed_socket.getsockname()[1]
+    closed_socket.close()
+    return "http://127.0.0.1:" + str(port) + FIXTURE_BOOK_PATH
+
+
+class _Response(object):
+    """
+    Response with only a status code eg, of a throttled request
+    """
+
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+class RequestSchedulerTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server, base_url = start_fixture_server()
+        cls.book_url = base_url + FIXTURE_BOOK_PATH
+        cls.closed_port_url = _closed_port_url()
+
+    @classmethod
+    def tearDownClass(cls):
+        stop_fixture_server(cls.server)
+
+    def setUp(self):
+        self.request_scheduler = RequestScheduler(
+            rate=1000,
+            burst=10,
+            initial_concurrency=4,
+            max_concurrency=8,
+            backoff_base=0.01,
+            backoff_max=0.05,
+        )
+        self.attempts = 0
+
+    def _fail_then_fetch(self, failure_count):
+        """
+        Returns:
+            function : fetches from the closed port `failure_count` times, then the book page
+        """
+
+        def fetch():
+            self.attempts += 1
+            if self.attempts <= failure_count:
+                return requests.get(self.closed_port_url, timeout=5)
+            return requests.get(self.book_url, timeout=5)
+
+        return fetch
+
+    def _respond(self, status_codes):
+        """
+        Returns:
+            function : returns a response with each status code in turn
+        """
+
+        def respond():
+            self.attempts += 1
+            return _Response(status_codes[self.attempts - 1])
+
+        return respond
+
+    def _host_state(self):
+        return self.request_scheduler._hosts[self.book_url.split("/")[2]]
+
+    def _fail_once_with(self, status_code):
+        """
+        Makes one request answered with `status_code` and no retry
+        """
+        self.attempts = 0
+        self.request_scheduler.call(self.book_url, self._respond([status_code]))
+
+    def test_connection_errors_are_retried(self):
+        page = self.request_scheduler.call(
+            self.book_url,
+            self._fail_then_fetch(2),
+            retries=2,
+            retry_on=RETRYABLE_EXCEPTIONS,
+        )
+        self.assertEqual(page.status_code, 200)
+        self.assertEqual(self.attempts, 3)
+        host_state = self._host_state()
+        self.assertEqual(host_state.consecutive_failures, 0)
+        # halved twice from 4 and raised by 1 / limit on the success
+        self.assertEqual(host_state.concurrency_limit, 2.0)
+        self.assertEqual(host_state.in_flight, 0)
+
+    def test_last_connection_error_is_raised(self):
+        self.assertRaises(
+            ConnectionError,
+            self.request_scheduler.call,
+            self.book_url,
+            self._fail_then_fetch(5),
+            retries=1,
+            retry_on=RETRYABLE_EXCEPTIONS,
+        )
+        self.assertEqual(self.attempts, 2)
+        self.assertEqual(self._host_state().consecutive_failures, 2)
+        self.assertEqual(self._host_state().in_flight, 0)
+
+    def test_other_errors_are_not_retried(self):
+        self.assertRaises(
+            ConnectionError,
+            self.request_scheduler.call,
+            self.book_url,
+            self._fail_then_fetch(1),
+            retries=3,
+        )
+        self.assertEqual(self.attempts, 1)
+        self.assertEqual(self._host_state().consecutive_failures, 0)
+
+    def test_throttled_responses_are_retried(self):
+        response = self.request_scheduler.call(
+            self.book_url, self._respond([429, 503, 200]), retries=2
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.attempts, 3)
+
+    def test_last_throttled_response_is_returned(self):
+        response = self.request_scheduler.call(
+            self.book_url, self._respond([429, 503, 200]), retries=1
+        )
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(self.attempts, 2)
+        self.assertEqual(self._host_state().consecutive_failures, 2)
+
+    def test_host_is_backed_off_after_a_failure(self):
+        self.request_scheduler.backoff_base = 0.2
+        self.request_scheduler.backoff_max = 0.2
+        self._fail_once_with(429)
+        started_at = time.time()
+        page = self.request_scheduler.call(
+            self.book_url, lambda: requests.get(self.book_url, timeout=5)
+        )
+        # equal jitter waits at least half the backoff
+        self.assertGreaterEqual(time.time() - started_at, 0.1)
+        self.assertEqual(page.status_code, 200)
+
+    def test_backoff_doubles_up_to_the_max(self):
+        self.request_scheduler.backoff_base = 1.0
+        self.request_scheduler.backoff_max = 3.0
+        backoffs = []
+        for status_code in [429, 429, 429, 429]:
+            self._fail_once_with(status_code)
+            backoffs.append(self._host_state().blocked_until - time.time())
+            self._host_state().blocked_until = 0.0
+        for backoff, full_backoff in zip(backoffs, [1.0, 2.0, 3.0, 3.0]):
+            self.assertGreater(backoff, full_backoff / 2 - 0.1)
+            self.assertLessEqual(backoff, full_backoff)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,327 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: test_review_rating_calculation
+    :synopsis: Regression tests of the rating kernels and of rating books one after another, on a thread pool and from the rating memo
+
+.. moduleauthor:: DivyenduDutta
+
+The numpy kernels are checked against the pure python loops they replaced, kept in
+:func:`Benchmarks.RatingBenchmark._reference_rate_book`, on synthetic books.
+The reviews are scraped once from :mod:`FixtureServer` with the http backend and saved,
+varied a little for each book, to a temporary catalog the books are read back from.
+The rating memo of :mod:`review_rating_calculation` is replaced by one in the same
+temporary directory for each test, turned off unless the memo is tested.
+
+Run from `web_scraper_goodreads_root` with ``python -m pytest test_review_rating_calculation.py``
+or ``python -m unittest test_review_rating_calculation``.
+"""
+import os
+import time
+import pickle
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import review_rating_calculation
+from BookReviews import retrieve_book_review_details
+from FixtureServer import start_fixture_server, stop_fixture_server
+from FileUtil.Catalog import (
+    Catalog,
+    REVIEW_SNAPSHOT_NAME,
+    BOOK_LIST_SNAPSHOT_NAME,
+    _today,
+)
+from FileUtil.BookCatalog import BookCatalog, BookEntry
+from FileUtil.ReviewArrays import save_review_array
+from FileUtil.RatingMemo import RatingMemo, DAY_SECONDS
+from Benchmarks.RatingBenchmark import (
+    RATING_TOLERANCE,
+    _reference_rate_book,
+    _vectorized_rate_book,
+    _build_book,
+    run_benchmark,
+)
+from FileUtil.ColumnarReviews import REVIEW_DTYPE
+from review_rating_calculation import (
+    _adjust_zero_likes,
+    _convert_to_bayesian_adj_rating,
+    _calculate_book_ratings,
+    _rate_books,
+    _rate_book,
+    RATING_MODEL_VERSION,
+)
+from Records import Book
+from CommonConstants.Constants import FETCH_BACKEND_HTTP, RATING_MEMO_PATH
+
+FIXTURE_BOOK_ID = "1-fixture-book"
+GENRE = "science-fiction"
+BOOK_COUNT = 6
+
+
+class RatingKernelTest(unittest.TestCase):
+    def assertRatingsClose(self, ratings, expected_ratings):
+        self.assertTrue(
+            np.allclose(ratings, expected_ratings, rtol=RATING_TOLERANCE, atol=0),
+            repr(ratings) + " != " + repr(expected_ratings),
+        )
+
+    def _books(self):
+        """
+        Returns:
+            list : likes and ratings of books of every size, some without 0 likes
+        """
+        books = [
+            _build_book(review_count, seed)
+            for seed, review_count in enumerate([1, 2, 17, 1000, 20000])
+        ]
+        review_likes, review_ratings = _build_book(500, 99)
+        books.append((review_likes + 1, review_ratings))  # no review of 0 likes
+        books.append((np.zeros(50, dtype=np.int64), review_ratings[:50]))
+        books.append((np.array([10 ** 9, 0, 3]), np.array([1, 5, 4])))
+        return books
+
+    def test_kernels_match_the_python_loops(self):
+        for review_likes, review_ratings in self._books():
+            self.assertRatingsClose(
+                _vectorized_rate_book(review_likes, review_ratings),
+                _reference_rate_book(review_likes.tolist(), review_ratings.tolist()),
+            )
+
+    def test_kernels_take_lists(self):
+        self.assertRatingsClose(
+            _vectorized_rate_book([0, 2, 5], [4, 3, 5]),
+            _reference_rate_book([0, 2, 5], [4, 3, 5]),
+        )
+
+    def test_zero_likes_adjustment(self):
+        review_likes, are_zero_likes_present = _adjust_zero_likes([0, 2, 5])
+        self.assertTrue(are_zero_likes_present)
+        self.assertEqual(review_likes.tolist(), [1, 3, 6])
+        review_likes, are_zero_likes_present = _adjust_zero_likes([1, 2, 5])
+        self.assertFalse(are_zero_likes_present)
+        self.assertEqual(review_likes.tolist(), [1, 2, 5])
+
+    def test_bayesian_adjusted_rating_of_each_review(self):
+        # sum of likes 6, sum of likes times ratings 4 + 10 + 15 = 29
+        self.assertRatingsClose(
+            _convert_to_bayesian_adj_rating([1, 2, 3], [4, 5, 5]),
+            [33 / 7.0, 39 / 8.0, 44 / 9.0],
+        )
+
+    def test_book_ratings_from_review_columns(self):
+        review_likes, review_ratings = _build_book(300, 7)
+        reviews = np.zeros(300, dtype=REVIEW_DTYPE)
+        reviews["review_likes"] = review_likes
+        reviews["review_rating"] = review_ratings
+        self.assertRatingsClose(
+            _calculate_book_ratings(reviews),
+            _reference_rate_book(review_likes.tolist(), review_ratings.tolist()),
+        )
+
+    def test_benchmark_on_small_books(self):
+        results = run_benchmark(review_counts=[100, 2000], runs=1)
+        self.assertEqual([result[0] for result in results], [100, 2000])
+        for _, python_seconds, numpy_seconds, speedup in results:
+            self.assertTrue(python_seconds > 0 and numpy_seconds > 0 and speedup > 0)
+
+
+class FixtureCatalogTestCase(unittest.TestCase):
+    """
+    Books of the fixture scrape in a temporary catalog, shared by the tests of a class
+    """
+
+    rating_memo_enabled = False
+
+    @classmethod
+    def setUpClass(cls):
+        cls.working_directory = os.getcwd()
+        # review arrays, review streams and cached pages are written under the current directory
+        cls.catalog_directory = tempfile.mkdtemp()
+        os.chdir(cls.catalog_directory)
+        server, base_url = start_fixture_server()
+        try:
+            reviews = retrieve_book_review_details(
+                base_url + "/book/show/" + FIXTURE_BOOK_ID,
+                True,
+                fetch_backend=FETCH_BACKEND_HTTP,
+            )
+        finally:
+            stop_fixture_server(server)
+
+        cls.catalog = Catalog(os.path.join("Data", "catalog.sqlite3"))
+        book_details = {}
+        for book_index in range(BOOK_COUNT):
+            book_name = str(book_index + 1) + "_Fixture_Book"
+            book_details[book_index] = Book(
+                book_name="Fixture Book " + str(book_index + 1),
+                book_URL=base_url
+                + "/book/show/"
+                + str(book_index + 1)
+                + ".Fixture_Book",
+                avg_rating="4.0" + str(book_index),
+            )
+            book_reviews = reviews[book_index:].copy()
+            book_reviews["review_likes"] += book_index
+            cls.catalog.save_reviews(
+                book_reviews, REVIEW_SNAPSHOT_NAME, "Data/" + book_name
+            )
+            save_review_array(book_reviews, book_name)
+        cls.catalog.save_obj(book_details, BOOK_LIST_SNAPSHOT_NAME, "Data", genre=GENRE)
+
+    @classmethod
+    def tearDownClass(cls):
+        if cls.catalog._connection != None:
+            cls.catalog._connection.close()
+        os.chdir(cls.working_directory)
+        shutil.rmtree(cls.catalog_directory, ignore_errors=True)
+
+    def setUp(self):
+        # nothing kept open so every run reads the review arrays again
+        self.book_entries = list(
+            BookCatalog(self.catalog, cache_size=0).books(
+                genre=GENRE, listed_on=_today()
+            )
+        )
+        if os.path.exists(RATING_MEMO_PATH):
+            os.remove(RATING_MEMO_PATH)
+        self.rating_memo = review_rating_calculation.rating_memo
+        review_rating_calculation.rating_memo = self._build_rating_memo()
+
+    def tearDown(self):
+        review_rating_calculation.rating_memo = self.rating_memo
+
+    def _build_rating_memo(self, model_version=RATING_MODEL_VERSION):
+        """
+        Returns:
+            RatingMemo : memo reading the file of the one in use
+        """
+        return RatingMemo(
+            RATING_MEMO_PATH, model_version, enabled=self.rating_memo_enabled
+        )
+
+
+class RateBooksTest(FixtureCatalogTestCase):
+    def test_books_are_listed_with_their_reviews(self):
+        self.assertEqual(
+            [book_entry.shelf_rank for book_entry in self.book_entries],
+            list(range(BOOK_COUNT)),
+        )
+        self.assertEqual(
+            [book_entry.review_count for book_entry in self.book_entries],
+            [14 - book_index for book_index in range(BOOK_COUNT)],
+        )
+
+    def test_thread_pool_rates_like_one_worker(self):
+        sequential_ratings = _rate_books(self.book_entries, 1)
+        self.assertEqual(sorted(sequential_ratings), list(range(BOOK_COUNT)))
+        for workers, chunk_size in [(2, 1), (4, 1), (4, 4), (BOOK_COUNT + 2, 2)]:
+            pool_ratings = _rate_books(self.book_entries, workers, chunk_size)
+            self.assertEqual(
+                pickle.dumps(pool_ratings, pickle.HIGHEST_PROTOCOL),
+                pickle.dumps(sequential_ratings, pickle.HIGHEST_PROTOCOL),
+            )
+
+    def test_ratings_are_keyed_by_shelf_rank(self):
+        ratings = _rate_books(self.book_entries[::-1], 4, 1)
+        for book_entry in self.book_entries:
+            self.assertEqual(ratings[book_entry.shelf_rank], _rate_book(book_entry))
+
+
+def _unreadable_book_entries(book_entries):
+    """
+    Args:
+        book_entries (list) : `BookEntry` of each book
+
+    Returns:
+        list : copies of the book entries whose reviews cannot be read
+    """
+    return [
+        BookEntry(
+            book_entry.book_name,
+            book_entry.book,
+            book_entry.review_count,
+            book_entry.as_of,
+            None,
+            shelf_rank=book_entry.shelf_rank,
+            scraped_at=book_entry.scraped_at,
+            review_digest=book_entry.review_digest,
+        )
+        for book_entry in book_entries
+    ]
+
+
+class RatingMemoTest(FixtureCatalogTestCase):
+    rating_memo_enabled = True
+
+    def test_books_are_listed_with_review_digests(self):
+        review_digests = [book_entry.review_digest for book_entry in self.book_entries]
+        self.assertNotIn(None, review_digests)
+        self.assertEqual(len(set(review_digests)), BOOK_COUNT)
+
+    def test_hit_does_not_read_the_reviews(self):
+        rated_ratings = _rate_books(self.book_entries, 1)
+        self.assertTrue(os.path.exists(RATING_MEMO_PATH))
+        # a new memo reads the ratings back from the file
+        review_rating_calculation.rating_memo = self._build_rating_memo()
+        memoized_ratings = _rate_books(_unreadable_book_entries(self.book_entries), 1)
+        self.assertEqual(memoized_ratings, rated_ratings)
+
+    def test_miss_reads_the_reviews(self):
+        _rate_books(self.book_entries[:1], 1)
+        review_rating_calculation.rating_memo = self._build_rating_memo()
+        unreadable_book_entries = _unreadable_book_entries(self.book_entries)
+        _rate_books(unreadable_book_entries[:1], 1)
+        # the other books have other reviews
+        self.assertRaises(AttributeError, _rate_books, unreadable_book_entries[1:2], 1)
+        self.assertEqual(
+            _rate_books(self.book_entries, 1)[BOOK_COUNT - 1],
+            _rate_book(self.book_entries[-1]),
+        )
+
+    def test_version_bump_rates_the_books_again(self):
+        _rate_books(self.book_entries, 1)
+        review_rating_calculation.rating_memo = self._build_rating_memo(
+            RATING_MODEL_VERSION + 1
+        )
+        self.assertRaises(
+            AttributeError,
+            _rate_books,
+            _unreadable_book_entries(self.book_entries[:1]),
+            1,
+        )
+
+    def test_corrupt_memo_is_replaced(self):
+        _rate_books(self.book_entries, 1)
+        with open(RATING_MEMO_PATH, "wb") as f:
+            f.write(b"not a rating memo")
+        review_rating_calculation.rating_memo = self._build_rating_memo()
+        rated_ratings = _rate_books(self.book_entries, 1)
+        review_rating_calculation.rating_memo = self._build_rating_memo()
+        self.assertEqual(
+            _rate_books(_unreadable_book_entries(self.book_entries), 1), rated_ratings
+        )
+
+    def test_entries_not_used_lately_are_dropped(self):
+        rating_memo = RatingMemo(
+            RATING_MEMO_PATH, RATING_MODEL_VERSION, max_age_days=30, max_entries=3
+        )
+        for book_index in range(5):
+            rating_memo.put("Book " + str(book_index), str(book_index), (4.0, 4.0))
+        rating_memo.get("0")
+        old_entry = rating_memo._entries[("1", RATING_MODEL_VERSION)]
+        rating_memo._entries[("1", RATING_MODEL_VERSION)] = (
+            old_entry[0],
+            time.time() - 31 * DAY_SECONDS,
+            old_entry[2],
+        )
+        rating_memo.save()
+        rating_memo = RatingMemo(RATING_MEMO_PATH, RATING_MODEL_VERSION)
+        # 1 is too old, 2 the least recently used of the rest
+        self.assertEqual(
+            [rating_memo.get(str(book_index)) != None for book_index in range(5)],
+            [True, False, False, True, True],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()